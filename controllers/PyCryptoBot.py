@@ -9,17 +9,22 @@ import functools
 import pandas as pd
 import numpy as np
 from regex import R
+from concurrent.futures import ThreadPoolExecutor
 from rich.console import Console
+from rich.progress import BarColumn, MofNCompleteColumn, Progress, TextColumn
 from rich.table import Table
 from rich.text import Text
 from rich import box
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from os.path import exists as file_exists
 from urllib3.exceptions import ReadTimeoutError
 
 from models.BotConfig import BotConfig
+from models.exchange.ClientPool import configure as configure_api_pool, get_client
 from models.exchange.ExchangesEnum import Exchange
 from models.exchange.Granularity import Granularity
+from models.exchange.RateLimiter import configure as configure_api_quota
+from models.exchange.WebSocketHub import HubClient
 from models.exchange.coinbase_pro import WebSocketClient as CWebSocketClient
 from models.exchange.coinbase_pro import AuthAPI as CAuthAPI, PublicAPI as CPublicAPI
 from models.exchange.kucoin import AuthAPI as KAuthAPI, PublicAPI as KPublicAPI
@@ -29,10 +34,16 @@ from models.exchange.binance import WebSocketClient as BWebSocketClient
 from models.exchange.coinbase import AuthAPI as CBAuthAPI
 from models.exchange.coinbase import WebSocketClient as CBWebSocketClient
 from models.helper.TelegramBotHelper import TelegramBotHelper
+from models.helper.CandleHelper import compare_candles, resample_candles
 from models.helper.MarginHelper import calculate_margin
+from models.OrderLedger import get_ledger
 from models.TradingAccount import TradingAccount
 from models.Stats import Stats
 from models.AppState import AppState
+from models.Backtest import Backtest
+from models.CandleStore import CandleStore, MAX_CANDLES_PER_REQUEST
+from models.EventTrigger import CANDLE_BOUNDARY, CANDLE_CLOSED, EventTrigger
+from models.TradingIncremental import IncrementalTechnicalAnalysis
 from models.helper.TextBoxHelper import TextBox
 from models.Strategy import Strategy
 from views.TradingGraphs import TradingGraphs
@@ -64,6 +75,14 @@ except ImportError:
 
 pd.set_option("display.float_format", "{:.8f}".format)
 
+# concurrent historical data requests, within the public rate limits of each exchange
+HISTORICAL_DATA_WORKERS = {
+    Exchange.BINANCE: 4,
+    Exchange.COINBASE: 3,
+    Exchange.COINBASEPRO: 3,
+    Exchange.KUCOIN: 2,
+}
+
 
 def signal_handler(signum):
     if signum == 2:
@@ -75,6 +94,8 @@ class PyCryptoBot(BotConfig):
     def __init__(self, config_file: str = None, exchange: Exchange = None):
         self.config_file = config_file or "config.json"
         super(PyCryptoBot, self).__init__(filename=self.config_file, exchange=exchange)
+        configure_api_pool(self.api_pool_size, self.api_timeout)
+        configure_api_quota(shared=self.usesharedquota)
 
         self.console_term = Console(no_color=(not self.term_color), width=self.term_width)  # logs to the screen
         self.console_log = Console(file=open(self.logfile, "w"), no_color=True, width=self.log_width)  # logs to file
@@ -89,10 +110,15 @@ class PyCryptoBot(BotConfig):
         self.account = None
         self.state = None
         self.technical_analysis = None
+        self.incremental_analysis = None
         self.websocket_connection = None
+        self.event_trigger = None
+        self.refresh_at_close = False
         self.ticker_self = None
         self.df_last = pd.DataFrame()
         self.trading_data = pd.DataFrame()
+        self.sim_close_range = None
+        self.sim_bull_flags = {}
         self.telegram_bot = TelegramBotHelper(self)
 
         self.trade_tracker = pd.DataFrame(
@@ -163,16 +189,17 @@ class PyCryptoBot(BotConfig):
             if control_status == "reload":
                 RichText.notify(f"Reloading config parameters {self.market}", self, "normal")
                 self.read_config(self.exchange)
+                self.open_event_trigger()
                 if self.websocket:
                     self.websocket_connection.close()
                     if self.exchange == Exchange.BINANCE:
-                        self.websocket_connection = BWebSocketClient([self.market], self.granularity, app=self)
+                        self.websocket_connection = self.open_websocket(BWebSocketClient)
                     elif self.exchange == Exchange.COINBASE:
-                        self.websocket_connection = CBWebSocketClient([self.market], self.granularity, app=self)
+                        self.websocket_connection = self.open_websocket(CBWebSocketClient)
                     elif self.exchange == Exchange.COINBASEPRO:
-                        self.websocket_connection = CWebSocketClient([self.market], self.granularity, app=self)
+                        self.websocket_connection = self.open_websocket(CWebSocketClient)
                     elif self.exchange == Exchange.KUCOIN:
-                        self.websocket_connection = KWebSocketClient([self.market], self.granularity, app=self)
+                        self.websocket_connection = self.open_websocket(KWebSocketClient)
                     self.websocket_connection.start()
 
                 list(map(self.s.cancel, self.s.queue))
@@ -215,9 +242,11 @@ class PyCryptoBot(BotConfig):
         # increment self.state.iterations
         self.state.iterations = self.state.iterations + 1
 
+        trading_data_refreshed = False
+
         if not self.is_sim:
             # check if data exists or not and only refresh at candle close.
-            if len(self.trading_data) == 0 or (
+            if len(self.trading_data) == 0 or self.refresh_at_close or (
                 len(self.trading_data) > 0
                 and (
                     datetime.timestamp(datetime.utcnow()) - self.granularity.to_integer
@@ -229,9 +258,11 @@ class PyCryptoBot(BotConfig):
                     )
                 )
             ):
-                self.trading_data = self.get_historical_data(self.market, self.granularity, self.websocket_connection)
+                self.trading_data = self.refresh_historical_data(self.market, self.granularity, self.websocket_connection)
                 self.state.closed_candle_row = -1
+                self.refresh_at_close = False
                 self.price = float(self.trading_data.iloc[-1, self.trading_data.columns.get_loc("close")])
+                trading_data_refreshed = True
 
             else:
                 # set time and price with ticker data and add/update current candle
@@ -364,7 +395,21 @@ class PyCryptoBot(BotConfig):
 
         else:
             _technical_analysis = TechnicalAnalysis(self.trading_data, len(self.trading_data), app=self)
-            _technical_analysis.add_all()
+
+            # between candle closes only the last row changes, so update it incrementally
+            if trading_data_refreshed or self.incremental_analysis is None or self.enable_pandas_ta:
+                _technical_analysis.add_all()
+                self.incremental_analysis = None
+                if not self.enable_pandas_ta:
+                    self.incremental_analysis = IncrementalTechnicalAnalysis(len(self.trading_data))
+                    self.incremental_analysis.seed(self.trading_data)
+            else:
+                try:
+                    self.incremental_analysis.update_df(self.trading_data)
+                except ValueError:
+                    _technical_analysis.add_all()
+                    self.incremental_analysis = None
+
             df = _technical_analysis.get_df()
 
         if self.is_sim:
@@ -631,21 +676,22 @@ class PyCryptoBot(BotConfig):
                 sys.exit()
 
             # Log data for Telegram Bot
-            self.telegram_bot.add_indicators("EMA", ema12gtema26 or ema12gtema26co)
-            if not self.disablebuyelderray:
-                self.telegram_bot.add_indicators("ERI", elder_ray_buy)
-            if self.disablebullonly:
-                self.telegram_bot.add_indicators("BULL", goldencross)
-            if not self.disablebuymacd:
-                self.telegram_bot.add_indicators("MACD", macdgtsignal or macdgtsignalco)
-            if not self.disablebuyobv:
-                self.telegram_bot.add_indicators("OBV", float(obv_pc) > 0)
+            if not self.is_sim:
+                self.telegram_bot.add_indicators("EMA", ema12gtema26 or ema12gtema26co)
+                if not self.disablebuyelderray:
+                    self.telegram_bot.add_indicators("ERI", elder_ray_buy)
+                if self.disablebullonly:
+                    self.telegram_bot.add_indicators("BULL", goldencross)
+                if not self.disablebuymacd:
+                    self.telegram_bot.add_indicators("MACD", macdgtsignal or macdgtsignalco)
+                if not self.disablebuyobv:
+                    self.telegram_bot.add_indicators("OBV", float(obv_pc) > 0)
 
             if self.is_sim:
                 # Reset the Strategy so that the last record is the current sim date
                 # To allow for calculations to be done on the sim date being processed
-                sdf = df[df["date"] <= current_sim_date].tail(self.adjusttotalperiods)
-                strategy = Strategy(self, self.state, sdf, sdf.index.get_loc(str(current_sim_date)) + 1)
+                sdf = df.iloc[max(0, self.state.iterations - self.adjusttotalperiods) : self.state.iterations]
+                strategy = Strategy(self, self.state, sdf, len(sdf))
             else:
                 strategy = Strategy(self, self.state, df)
 
@@ -660,7 +706,8 @@ class PyCryptoBot(BotConfig):
             # Reset the TA so that the last record is the current sim date
             # To allow for calculations to be done on the sim date being processed
             if self.is_sim:
-                trading_dataCopy = self.trading_data[self.trading_data["date"] <= current_sim_date].tail(self.adjusttotalperiods).copy()
+                sim_rows = self.trading_data["date"].searchsorted(pd.Timestamp(current_sim_date), side="right")
+                trading_dataCopy = self.trading_data.iloc[max(0, sim_rows - self.adjusttotalperiods) : sim_rows].copy()
                 _technical_analysis = TechnicalAnalysis(trading_dataCopy, self.adjusttotalperiods, app=self)
 
             if self.state.last_buy_size > 0 and self.state.last_buy_price > 0 and self.price > 0 and self.state.last_action == "BUY":
@@ -812,8 +859,8 @@ class PyCryptoBot(BotConfig):
                     range_start = str(df.iloc[0, 0])
                     range_end = str(df.iloc[len(df) - 1, 0])
                 else:
-                    df_high = df["close"].max()
-                    df_low = df["close"].min()
+                    df_high = self.get_sim_close_range(df)[0][-1]
+                    df_low = self.get_sim_close_range(df)[1][-1]
                     if len(df) > self.adjusttotalperiods:
                         range_start = str(df.iloc[self.state.iterations - self.adjusttotalperiods, 0])  # noqa: F841
                     else:
@@ -1117,8 +1164,8 @@ class PyCryptoBot(BotConfig):
                                         "Price": self.price,
                                         "Quote": self.state.last_buy_size,
                                         "Base": float(self.state.last_buy_size) / float(self.price),
-                                        "DF_High": df[df["date"] <= current_sim_date]["close"].max(),
-                                        "DF_Low": df[df["date"] <= current_sim_date]["close"].min(),
+                                        "DF_High": self.get_sim_close_range(df)[0][self.state.iterations - 1] if self.is_sim else df[df["date"] <= current_sim_date]["close"].max(),
+                                        "DF_Low": self.get_sim_close_range(df)[1][self.state.iterations - 1] if self.is_sim else df[df["date"] <= current_sim_date]["close"].min(),
                                     },
                                     index=[0],
                                 ),
@@ -1359,8 +1406,8 @@ class PyCryptoBot(BotConfig):
                                         "Margin": margin,
                                         "Profit": profit,
                                         "Fee": sell_fee,
-                                        "DF_High": df[df["date"] <= current_sim_date]["close"].max(),
-                                        "DF_Low": df[df["date"] <= current_sim_date]["close"].min(),
+                                        "DF_High": self.get_sim_close_range(df)[0][self.state.iterations - 1] if self.is_sim else df[df["date"] <= current_sim_date]["close"].max(),
+                                        "DF_Low": self.get_sim_close_range(df)[1][self.state.iterations - 1] if self.is_sim else df[df["date"] <= current_sim_date]["close"].min(),
                                     },
                                     index=[0],
                                 ),
@@ -1414,6 +1461,16 @@ class PyCryptoBot(BotConfig):
                 self._simulation_summary()
                 self._simulation_save_orders()
 
+        # the telegram bot and watchdog only follow live and test bots
+        if self.is_sim:
+            # decrement ignored iteration
+            if self.smart_switch:
+                self.state.iterations = self.state.iterations - 1
+
+            # the simulation driver runs the next job while this returns True
+            list(map(self.s.cancel, self.s.queue))
+            return self.state.iterations < len(df)
+
         if self.state.last_buy_size <= 0 and self.state.last_buy_price <= 0 and self.state.last_action != "BUY":
             self.telegram_bot.add_info(
                 f'Current price: {str(self.price)}{trailing_action_logtext} | {str(round(((self.price-df["close"].max()) / df["close"].max())*100, 2))}% from DF HIGH',
@@ -1442,10 +1499,6 @@ class PyCryptoBot(BotConfig):
         # Update the watchdog_ping
         self.telegram_bot.update_watch_dog_ping()
 
-        # decrement ignored iteration
-        if self.is_sim and self.smart_switch:
-            self.state.iterations = self.state.iterations - 1
-
         # if live but not websockets
         if not self.disabletracker and self.is_live and not self.websocket_connection:
             # update order tracker csv
@@ -1454,59 +1507,75 @@ class PyCryptoBot(BotConfig):
             elif self.exchange == Exchange.COINBASE or self.exchange == Exchange.COINBASEPRO or self.exchange == Exchange.KUCOIN:
                 self.account.save_tracker_csv()
 
-        if self.is_sim:
-            if self.state.iterations < len(df):
-                if self.sim_speed in ["fast", "fast-sample"]:
-                    # fast processing
-                    list(map(self.s.cancel, self.s.queue))
-                    self.s.enter(
-                        0,
-                        1,
-                        self.execute_job,
-                        (),
-                    )
-                else:
-                    # slow processing
-                    list(map(self.s.cancel, self.s.queue))
-                    self.s.enter(
-                        1,
-                        1,
-                        self.execute_job,
-                        (),
-                    )
-
+        list(map(self.s.cancel, self.s.queue))
+        if self.event_trigger is not None:
+            # wait for the next candle close or price move instead of polling
+            self.s.enter(0, 1, self.wait_for_event, ())
+        elif (
+            self.websocket_connection
+            and self.websocket_connection is not None
+            and (isinstance(self.websocket_connection.tickers, pd.DataFrame) and len(self.websocket_connection.tickers) == 1)
+            and (isinstance(self.websocket_connection.candles, pd.DataFrame) and len(self.websocket_connection.candles) == self.adjusttotalperiods)
+        ):
+            # poll every 5 seconds (self.websocket_connection)
+            self.s.enter(
+                5,
+                1,
+                self.execute_job,
+                (),
+            )
         else:
-            list(map(self.s.cancel, self.s.queue))
-            if (
-                self.websocket_connection
-                and self.websocket_connection is not None
-                and (isinstance(self.websocket_connection.tickers, pd.DataFrame) and len(self.websocket_connection.tickers) == 1)
-                and (isinstance(self.websocket_connection.candles, pd.DataFrame) and len(self.websocket_connection.candles) == self.adjusttotalperiods)
-            ):
-                # poll every 5 seconds (self.websocket_connection)
+            if self.websocket:
+                # poll every 15 seconds (waiting for self.websocket_connection)
                 self.s.enter(
-                    5,
+                    15,
                     1,
                     self.execute_job,
                     (),
                 )
             else:
-                if self.websocket and not self.is_sim:
-                    # poll every 15 seconds (waiting for self.websocket_connection)
-                    self.s.enter(
-                        15,
-                        1,
-                        self.execute_job,
-                        (),
-                    )
-                else:
-                    # poll every 1 minute (no self.websocket_connection)
-                    self.s.enter(
-                        60,
-                        1,
-                        self.execute_job,
-                        (),
-                    )
+                # poll every 1 minute (no self.websocket_connection)
+                self.s.enter(
+                    60,
+                    1,
+                    self.execute_job,
+                    (),
+                )
+
+    def wait_for_event(self):
+        """Runs the trading job on the next candle close, price move or candle boundary"""
+
+        # the wait is capped so telegram pause, exit and reload requests are still seen
+        reason = self.event_trigger.wait(self.granularity, timeout=60)
+        # a closed candle is refreshed right away, without waiting for the clock
+        self.refresh_at_close = reason in (CANDLE_CLOSED, CANDLE_BOUNDARY)
+        self.execute_job()
+
+    def open_event_trigger(self):
+        """Creates, or removes, the event trigger of the bot as set in the config"""
+
+        if not self.event_driven or self.is_sim:
+            self.event_trigger = None
+            return
+
+        if self.event_trigger is None:
+            self.event_trigger = EventTrigger()
+            if self.websocket_connection is not None:
+                self.event_trigger.attach(self.websocket_connection)
+
+    def open_websocket(self, client):
+        """Returns the websocket of the bot, attached to the websocket hub if enabled"""
+
+        if self.websocket_hub:
+            websocket = HubClient(self.exchange, [self.market], self.granularity, app=self)
+        else:
+            websocket = client([self.market], self.granularity, app=self)
+
+        # a new websocket keeps waking the job
+        if self.event_trigger is not None:
+            self.event_trigger.attach(websocket)
+
+        return websocket
 
     def run(self):
         try:
@@ -1516,30 +1585,32 @@ class PyCryptoBot(BotConfig):
                 if self.websocket and not self.is_sim:
                     RichText.notify("Opening websocket to Coinbase", self, "normal")
                     print("")
-                    self.websocket_connection = CWebSocketClient([self.market], self.granularity, app=self)
+                    self.websocket_connection = self.open_websocket(CWebSocketClient)
                     self.websocket_connection.start()
             elif self.exchange == Exchange.COINBASEPRO:
                 message += "Coinbase Pro bot"
                 if self.websocket and not self.is_sim:
                     RichText.notify("Opening websocket to Coinbase Pro", self, "normal")
                     print("")
-                    self.websocket_connection = CWebSocketClient([self.market], self.granularity, app=self)
+                    self.websocket_connection = self.open_websocket(CWebSocketClient)
                     self.websocket_connection.start()
             elif self.exchange == Exchange.BINANCE:
                 message += "Binance bot"
                 if self.websocket and not self.is_sim:
                     RichText.notify("Opening websocket to Binance", self, "normal")
                     print("")
-                    self.websocket_connection = BWebSocketClient([self.market], self.granularity, app=self)
+                    self.websocket_connection = self.open_websocket(BWebSocketClient)
                     self.websocket_connection.start()
             elif self.exchange == Exchange.KUCOIN:
                 message += "Kucoin bot"
                 if self.websocket and not self.is_sim:
                     RichText.notify("Opening websocket to Kucoin", self, "normal")
                     print("")
-                    self.websocket_connection = KWebSocketClient([self.market], self.granularit, app=self)
+                    self.websocket_connection = self.open_websocket(KWebSocketClient)
                     self.websocket_connection.start()
 
+            self.open_event_trigger()
+
             smartswitchstatus = "enabled" if self.smart_switch else "disabled"
             message += f" for {self.market} using granularity {self.print_granularity()}. Smartswitch {smartswitchstatus}"
 
@@ -1557,8 +1628,21 @@ class PyCryptoBot(BotConfig):
                     pass
 
             try:
-                self.execute_job()
-                self.s.run()
+                if self.is_sim == "fast-vector" and len(Backtest.unsupported_options(self)) == 0:
+                    self._run_backtest()
+                else:
+                    if self.is_sim == "fast-vector":
+                        RichText.notify(
+                            f"Vectorised simulation does not support {', '.join(Backtest.unsupported_options(self))}, using the fast simulation instead.",
+                            self,
+                            "warning",
+                        )
+
+                    if self.is_sim:
+                        self._run_simulation()
+                    else:
+                        self.execute_job()
+                        self.s.run()
 
             except (KeyboardInterrupt, SystemExit):
                 raise
@@ -1576,8 +1660,11 @@ class PyCryptoBot(BotConfig):
                     map(self.s.cancel, self.s.queue)
 
                     # Restart the app
-                    self.execute_job()
-                    self.s.run()
+                    if self.is_sim:
+                        self._run_simulation()
+                    else:
+                        self.execute_job()
+                        self.s.run()
                 else:
                     raise
 
@@ -1623,16 +1710,16 @@ class PyCryptoBot(BotConfig):
                     quote_currency = (buy_percent / 100) * quote_currency
 
             if self.exchange == Exchange.COINBASE:
-                api = CBAuthAPI(self.api_key, self.api_secret, self.api_url, app=self)
+                api = get_client(CBAuthAPI, self.api_key, self.api_secret, self.api_url, app=self)
                 return api.market_buy(market, float(_truncate(quote_currency, 8)))
             elif self.exchange == Exchange.COINBASEPRO:
-                api = CAuthAPI(self.api_key, self.api_secret, self.api_passphrase, self.api_url, app=self)
+                api = get_client(CAuthAPI, self.api_key, self.api_secret, self.api_passphrase, self.api_url, app=self)
                 return api.market_buy(market, float(_truncate(quote_currency, 8)))
             elif self.exchange == Exchange.KUCOIN:
-                api = KAuthAPI(self.api_key, self.api_secret, self.api_passphrase, self.api_url, use_cache=self.usekucoincache, app=self)
+                api = get_client(KAuthAPI, self.api_key, self.api_secret, self.api_passphrase, self.api_url, use_cache=self.usekucoincache, app=self)
                 return api.market_buy(market, (float(quote_currency) - (float(quote_currency) * api.get_maker_fee())))
             elif self.exchange == Exchange.BINANCE:
-                api = BAuthAPI(self.api_key, self.api_secret, self.api_url, recv_window=self.recv_window, app=self)
+                api = get_client(BAuthAPI, self.api_key, self.api_secret, self.api_url, recv_window=self.recv_window, app=self)
                 return api.market_buy(market, quote_currency)
             else:
                 return None
@@ -1644,16 +1731,16 @@ class PyCryptoBot(BotConfig):
                     base_currency = (sell_percent / 100) * base_currency
 
                 if self.exchange == Exchange.COINBASE:
-                    api = CBAuthAPI(self.api_key, self.api_secret, self.api_url, app=self)
+                    api = get_client(CBAuthAPI, self.api_key, self.api_secret, self.api_url, app=self)
                     return api.market_sell(market, base_currency)
                 elif self.exchange == Exchange.COINBASEPRO:
-                    api = CAuthAPI(self.api_key, self.api_secret, self.api_passphrase, self.api_url, app=self)
+                    api = get_client(CAuthAPI, self.api_key, self.api_secret, self.api_passphrase, self.api_url, app=self)
                     return api.market_sell(market, base_currency)
                 elif self.exchange == Exchange.BINANCE:
-                    api = BAuthAPI(self.api_key, self.api_secret, self.api_url, recv_window=self.recv_window, app=self)
+                    api = get_client(BAuthAPI, self.api_key, self.api_secret, self.api_url, recv_window=self.recv_window, app=self)
                     return api.market_sell(market, base_currency, use_fees=self.use_sell_fee)
                 elif self.exchange == Exchange.KUCOIN:
-                    api = KAuthAPI(self.api_key, self.api_secret, self.api_passphrase, self.api_url, use_cache=self.usekucoincache, app=self)
+                    api = get_client(KAuthAPI, self.api_key, self.api_secret, self.api_passphrase, self.api_url, use_cache=self.usekucoincache, app=self)
                     return api.market_sell(market, base_currency)
             else:
                 return None
@@ -1800,6 +1887,46 @@ class PyCryptoBot(BotConfig):
                         self.get_date_from_iso8601_str(str(end_date)).isoformat(),
                     )
 
+    def _run_simulation(self) -> None:
+        """Simulates candle by candle in a plain loop instead of re-entering the scheduler"""
+
+        candles = 0
+        running = True
+        started = time.perf_counter()
+        while running:
+            running = self.execute_job()
+            candles += 1
+
+            if running and self.sim_speed in ["slow", "slow-sample"]:
+                time.sleep(1)
+
+        elapsed = time.perf_counter() - started
+        if not self.simresultonly and candles > 0 and elapsed > 0:
+            RichText.notify(f"Simulated {candles} candles in {elapsed:.2f} seconds ({candles / elapsed:.1f} candles/second)", self, "normal")
+
+    def _run_backtest(self) -> None:
+        """Simulates the whole history in one pass using the vectorised back test"""
+
+        if len(self.trading_data) == 0:
+            return None
+
+        _technical_analysis = TechnicalAnalysis(self.trading_data, len(self.trading_data), app=self)
+        _technical_analysis.add_all()
+        df = _technical_analysis.get_df()
+
+        start = 0
+        if self.simstartdate is not None:
+            try:
+                start = df.index.get_loc(str(self.get_date_from_iso8601_str(self.simstartdate)))
+            except KeyError:
+                RichText.notify("Simulation data is invalid, unable to locate interval using date key.", self, "error")
+                sys.exit(0)
+
+        Backtest(self, df, start).run()
+
+        self._simulation_summary()
+        self._simulation_save_orders()
+
     def _simulation_summary(self) -> dict:
         simulation = {
             "config": {},
@@ -2159,7 +2286,7 @@ class PyCryptoBot(BotConfig):
             table.add_row("Bot Mode", "LIVE", "Live trades using your funds!", "--live <1|0>")
         else:
             if self.is_sim:
-                table.add_row("Bot Mode", "SIMULATION", "Back testing using simulations", "--sim <fast|slow>")
+                table.add_row("Bot Mode", "SIMULATION", "Back testing using simulations", "--sim <fast|slow|fast-vector>")
             else:
                 table.add_row("Bot Mode", "TEST", "Test trades using dummy funds :)", "--live <1|0>")
 
@@ -2264,6 +2391,14 @@ class PyCryptoBot(BotConfig):
         config_option_row_bool(
             "Enable Smart Switching", "smart_switch", "Enable switching between intervals", store_invert=False, default_value=False, arg_name="smartswitch"
         )
+        config_option_row_bool(
+            "Smart Switch Resample",
+            "smart_switch_resample",
+            "Resample the smart switch granularities from the finest one",
+            store_invert=False,
+            default_value=False,
+            arg_name="smartswitchresample",
+        )
         config_option_row_bool(
             "Enable Tracker", "disabletracker", "Enable trade order logging", store_invert=True, default_value=False, arg_name="tradetracker"
         )
@@ -2273,6 +2408,22 @@ class PyCryptoBot(BotConfig):
         config_option_row_bool(
             "Enable Websocket", "websocket", "Enable websockets for data retrieval", store_invert=False, default_value=False, arg_name="websocket"
         )
+        config_option_row_bool(
+            "Websocket Hub",
+            "websocket_hub",
+            "Use the websocket hub of the host instead of a websocket per bot",
+            store_invert=False,
+            default_value=False,
+            arg_name="websockethub",
+        )
+        config_option_row_bool(
+            "Event Driven",
+            "event_driven",
+            "Run the bot on candle closes and price moves instead of polling",
+            store_invert=False,
+            default_value=False,
+            arg_name="eventdriven",
+        )
         config_option_row_bool(
             "Insufficient Funds Log",
             "enableinsufficientfundslogging",
@@ -2318,6 +2469,17 @@ class PyCryptoBot(BotConfig):
             default_value=5000,
             arg_name="recvwindow",
         )
+        config_option_row_int("API Pool Size", "api_pool_size", "Exchange API connection pool size", default_value=10, arg_name="apipoolsize")
+        config_option_row_float("API Timeout", "api_timeout", "Exchange API request timeout in seconds", default_value=30.0, arg_name="apitimeout")
+        config_option_row_bool(
+            "Shared API Quota",
+            "usesharedquota",
+            "Share the exchange API rate limits with every bot on this host",
+            break_below=False,
+            store_invert=False,
+            default_value=False,
+            arg_name="sharedquota",
+        )
         config_option_row_bool(
             "Exit After Sell",
             "exitaftersell",
@@ -2327,6 +2489,15 @@ class PyCryptoBot(BotConfig):
             default_value=False,
             arg_name="exitaftersell",
         )
+        config_option_row_bool(
+            "Candle Store",
+            "usecandlestore",
+            "Enable the local candle store for historical data",
+            break_below=False,
+            store_invert=False,
+            default_value=False,
+            arg_name="candlestore",
+        )
         config_option_row_bool(
             "Ignore Previous Buy",
             "ignorepreviousbuy",
@@ -2671,49 +2842,32 @@ class PyCryptoBot(BotConfig):
 
                 df_first = simend
                 df_first -= timedelta(minutes=((granularity.to_integer / 60) * 200))
-                df1 = self.get_historical_data(
-                    market,
-                    granularity,
-                    None,
-                    str(df_first.isoformat()),
-                    str(simend.isoformat()),
+                date_ranges = [(df_first, simend)]
+
+                # pages back to the start date, then one more with 300 candles or adjusted total periods before it to match live
+                extra_candles_start = None
+                if df_first > simstart:
+                    page_size = timedelta(minutes=(self.adjusttotalperiods * (granularity.to_integer / 60)))
+                    extra_candles_start = simstart - page_size
+                    while df_first > extra_candles_start:
+                        end_date = df_first
+                        df_first = max(df_first - page_size, simstart if end_date > simstart else extra_candles_start)
+                        date_ranges.append((df_first, end_date))
+
+                pages = self.get_historical_data_pages(
+                    market, granularity, [(str(page_start.isoformat()), str(page_end.isoformat())) for page_start, page_end in date_ranges]
                 )
 
-                result_df_cache = df1
-                originalSimStart = self.get_date_from_iso8601_str(str(simstart))
-                adding_extra_candles = False
-                while df_first.isoformat(timespec="milliseconds") > simstart.isoformat(timespec="milliseconds") or df_first.isoformat(
-                    timespec="milliseconds"
-                ) > originalSimStart.isoformat(timespec="milliseconds"):
-                    end_date = df_first
-                    df_first -= timedelta(minutes=(self.adjusttotalperiods * (granularity.to_integer / 60)))
-
-                    if df_first.isoformat(timespec="milliseconds") < simstart.isoformat(timespec="milliseconds"):
-                        df_first = self.get_date_from_iso8601_str(str(simstart))
-
-                    df2 = self.get_historical_data(
-                        market,
-                        granularity,
-                        None,
-                        str(df_first.isoformat()),
-                        str(end_date.isoformat()),
-                    )
-
+                if extra_candles_start is not None:
                     # check to see if there are an extra 300 candles available to be used, if not just use the original starting point
-                    if self.adjusttotalperiods >= 300 and adding_extra_candles is True and len(df2) <= 0:
+                    if self.adjusttotalperiods >= 300 and len(pages[-1]) <= 0:
                         self.extra_candles_found = False
-                        simstart = originalSimStart
+                        pages = pages[:-1]
                     else:
-                        result_df_cache = pd.concat([df2.copy(), df1.copy()]).drop_duplicates()
-                        df1 = result_df_cache
-
-                    # create df with 300 candles or adjusted total periods before the required start_date to match live
-                    if df_first.isoformat(timespec="milliseconds") == simstart.isoformat(timespec="milliseconds"):
-                        if adding_extra_candles is False:
-                            simstart -= timedelta(minutes=(self.adjusttotalperiods * (granularity.to_integer / 60)))
-                        adding_extra_candles = True
                         self.extra_candles_found = True
 
+                result_df_cache = pd.concat(pages[::-1]).drop_duplicates() if len(pages) > 1 else pages[0]
+
             if len(result_df_cache) > 0 and "morning_star" not in result_df_cache:
                 result_df_cache.sort_values(by=["date"], ascending=True, inplace=True)
 
@@ -2733,11 +2887,14 @@ class PyCryptoBot(BotConfig):
         end: str = "",
     ) -> pd.DataFrame:
         if self.is_sim:
-            if self.sell_smart_switch == 1:
-                self.ema1226_5m_cache = self.get_smart_switch_df(self.ema1226_5m_cache, market, Granularity.FIVE_MINUTES, start, end)
-            self.ema1226_15m_cache = self.get_smart_switch_df(self.ema1226_15m_cache, market, Granularity.FIFTEEN_MINUTES, start, end)
-            self.ema1226_1h_cache = self.get_smart_switch_df(self.ema1226_1h_cache, market, Granularity.ONE_HOUR, start, end)
-            self.ema1226_6h_cache = self.get_smart_switch_df(self.ema1226_6h_cache, market, Granularity.SIX_HOURS, start, end)
+            if self.smart_switch_resample:
+                self.get_smart_switch_resampled_df(market, start, end)
+            else:
+                if self.sell_smart_switch == 1:
+                    self.ema1226_5m_cache = self.get_smart_switch_df(self.ema1226_5m_cache, market, Granularity.FIVE_MINUTES, start, end)
+                self.ema1226_15m_cache = self.get_smart_switch_df(self.ema1226_15m_cache, market, Granularity.FIFTEEN_MINUTES, start, end)
+                self.ema1226_1h_cache = self.get_smart_switch_df(self.ema1226_1h_cache, market, Granularity.ONE_HOUR, start, end)
+                self.ema1226_6h_cache = self.get_smart_switch_df(self.ema1226_6h_cache, market, Granularity.SIX_HOURS, start, end)
 
             if len(self.ema1226_15m_cache) == 0:
                 raise Exception(f"No data return for selected date range {start} - {end}")
@@ -2784,31 +2941,95 @@ class PyCryptoBot(BotConfig):
             else:
                 return self.ema1226_1h_cache
 
+    def get_smart_switch_resampled_df(self, market, start: str = "", end: str = "") -> None:
+        """Retrieves the finest smart switch granularity and resamples the coarser ones from it"""
+
+        if self.sell_smart_switch == 1:
+            self.ema1226_5m_cache = self.get_smart_switch_df(self.ema1226_5m_cache, market, Granularity.FIVE_MINUTES, start, end)
+            base, base_df = Granularity.FIVE_MINUTES, self.ema1226_5m_cache
+        else:
+            self.ema1226_15m_cache = self.get_smart_switch_df(self.ema1226_15m_cache, market, Granularity.FIFTEEN_MINUTES, start, end)
+            base, base_df = Granularity.FIFTEEN_MINUTES, self.ema1226_15m_cache
+
+        # like get_smart_switch_df(), candles are only retrieved once
+        def _is_cached(df: pd.DataFrame) -> bool:
+            return isinstance(df, pd.DataFrame) and len(df) > 0
+
+        if base == Granularity.FIVE_MINUTES and not _is_cached(self.ema1226_15m_cache):
+            self.ema1226_15m_cache = self.get_resampled_df(market, base_df, base, Granularity.FIFTEEN_MINUTES, start, end)
+        if not _is_cached(self.ema1226_1h_cache):
+            self.ema1226_1h_cache = self.get_resampled_df(market, base_df, base, Granularity.ONE_HOUR, start, end)
+        if not _is_cached(self.ema1226_6h_cache):
+            self.ema1226_6h_cache = self.get_resampled_df(market, base_df, base, Granularity.SIX_HOURS, start, end)
+
+    def get_resampled_df(self, market, base_df: pd.DataFrame, base: Granularity, granularity: Granularity, start: str = "", end: str = "") -> pd.DataFrame:
+        """Resamples candles into a coarser granularity, validated against the exchange candles"""
+
+        resampled = resample_candles(base_df, base, granularity)
+
+        if len(resampled) > 0:
+            # one page of exchange candles up to the first resampled candles validates them and warms up the indicators
+            page_end = resampled.index[min(len(resampled), 50) - 1]
+            page_start = page_end - timedelta(seconds=granularity.to_integer * (MAX_CANDLES_PER_REQUEST - 1))
+            exchange_df = self.get_historical_data(market, granularity, None, page_start.isoformat(), page_end.isoformat())
+
+            if isinstance(exchange_df, pd.DataFrame) and compare_candles(resampled, exchange_df):
+                return pd.concat([exchange_df[exchange_df.index < resampled.index[0]], resampled]).sort_values(by=["date"])
+
+        if not self.is_sim or (self.is_sim and not self.simresultonly):
+            RichText.notify(f"Resampled {granularity.to_short} candles do not match the exchange, retrieving them from the exchange.", self, "warning")
+
+        return self.get_smart_switch_df(None, market, granularity, start, end)
+
     def get_historical_data_chained(self, market, granularity: Granularity, max_iterations: int = 1) -> pd.DataFrame:
         df1 = self.get_historical_data(market, granularity, None)
 
-        if max_iterations == 1:
+        if max_iterations == 1 or "date" not in df1:
             return df1
 
-        def get_previous_date_range(df: pd.DataFrame = None) -> tuple:
-            end_date = df["date"].min() - timedelta(seconds=(granularity.to_integer / 60))
-            new_start = df["date"].min() - timedelta(hours=self.adjusttotalperiods)
-            return (str(new_start).replace(" ", "T"), str(end_date).replace(" ", "T"))
+        # the earlier pages follow on from the first one, so they can all be requested at once
+        page_size = min(timedelta(hours=self.adjusttotalperiods), timedelta(seconds=granularity.to_integer * MAX_CANDLES_PER_REQUEST))
+        new_start = df1["date"].min()
+        date_ranges = []
+        for _ in range(max_iterations - 1):
+            end_date = new_start - timedelta(seconds=(granularity.to_integer / 60))
+            new_start = new_start - page_size
+            date_ranges.append((str(new_start).replace(" ", "T"), str(end_date).replace(" ", "T")))
 
-        iterations = 0
-        result_df = pd.DataFrame()
-        while iterations < (max_iterations - 1):
-            start_date, end_date = get_previous_date_range(df1)
-            df2 = self.get_historical_data(market, granularity, None, start_date, end_date)
-            result_df = pd.concat([df2, df1]).drop_duplicates()
-            df1 = result_df
-            iterations = iterations + 1
+        pages = self.get_historical_data_pages(market, granularity, date_ranges)
+        result_df = pd.concat(pages[::-1] + [df1]).drop_duplicates()
 
         if "date" in result_df:
             result_df.sort_values(by=["date"], ascending=True, inplace=True)
 
         return result_df
 
+    def get_historical_data_pages(self, market, granularity: Granularity, date_ranges: list) -> list:
+        """Retrieves pages of historical data concurrently, within the rate limits of the exchange"""
+
+        # the candle store pages and caches the requests itself
+        workers = 1 if self.usecandlestore else HISTORICAL_DATA_WORKERS.get(self.exchange, 1)
+
+        def _get_page(date_range: tuple) -> pd.DataFrame:
+            return self.get_historical_data(market, granularity, None, date_range[0], date_range[1])
+
+        pages = []
+        with Progress(
+            TextColumn("[violet]{task.description}"),
+            BarColumn(),
+            MofNCompleteColumn(),
+            console=self.console_term,
+            transient=True,
+            disable=len(date_ranges) < 2 or (self.is_sim and self.simresultonly),
+        ) as progress:
+            task = progress.add_task(f"Retrieving {granularity.to_short} {market} market data", total=len(date_ranges))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                for page in executor.map(_get_page, date_ranges):
+                    pages.append(page)
+                    progress.advance(task)
+
+        return pages
+
     def get_historical_data(
         self,
         market,
@@ -2818,13 +3039,13 @@ class PyCryptoBot(BotConfig):
         iso8601end="",
     ):
         if self.exchange == Exchange.COINBASE:
-            api = CBAuthAPI(self.api_key, self.api_secret, self.api_url, app=self)
+            api = get_client(CBAuthAPI, self.api_key, self.api_secret, self.api_url, app=self)
 
         elif self.exchange == Exchange.BINANCE:
-            api = BPublicAPI(api_url=self.api_url, app=self)
+            api = get_client(BPublicAPI, api_url=self.api_url, app=self)
 
         elif self.exchange == Exchange.KUCOIN:  # returns data from coinbase if not specified
-            api = KPublicAPI(api_url=self.api_url, app=self)
+            api = get_client(KPublicAPI, api_url=self.api_url, app=self)
 
             # Kucoin only returns 100 rows if start not specified, make sure we get the right amount
             if not self.is_sim and iso8601start == "":
@@ -2832,7 +3053,10 @@ class PyCryptoBot(BotConfig):
                 iso8601start = str(start.isoformat()).split(".")[0]
 
         else:  # returns data from coinbase pro if not specified
-            api = CPublicAPI(app=self)
+            api = get_client(CPublicAPI, app=self)
+
+        if self.usecandlestore and websocket is None:
+            return self.get_stored_historical_data(api, market, granularity, iso8601start, iso8601end)
 
         if iso8601start != "" and iso8601end == "" and self.exchange != Exchange.BINANCE:
             return api.get_historical_data(
@@ -2852,35 +3076,109 @@ class PyCryptoBot(BotConfig):
         else:
             return api.get_historical_data(market, granularity, websocket)
 
+    def refresh_historical_data(self, market, granularity: Granularity, websocket) -> pd.DataFrame:
+        """Returns the trading data with the candles since the last refresh, only requesting those candles"""
+
+        stored = self.trading_data
+        if len(stored) == 0 or websocket is not None or self.usecandlestore:
+            return self.get_historical_data(market, granularity, websocket)
+
+        def iso8601(date: datetime) -> str:
+            # Binance and Kucoin read the range in the local time of the host, the others in UTC
+            if self.exchange in (Exchange.BINANCE, Exchange.KUCOIN):
+                date = date.replace(tzinfo=timezone.utc).astimezone().replace(tzinfo=None)
+            return date.strftime("%Y-%m-%dT%H:%M:%S")
+
+        # the last stored candle was still open when it was retrieved, so it is requested again
+        last_candle = stored.index[-1]
+        now = datetime.utcnow()
+        delta = self.get_historical_data(market, granularity, None, iso8601(last_candle.to_pydatetime()), iso8601(now))
+
+        # anything that could leave a gap in the candles, or stale candles, needs a full refresh
+        current_candle = pd.Timestamp(now).floor(f"{granularity.to_integer}s")
+        if (
+            not isinstance(delta, pd.DataFrame)
+            or len(delta) == 0
+            or len(delta) >= MAX_CANDLES_PER_REQUEST
+            or not set(delta.columns).issubset(stored.columns)
+            or delta.index[0] > last_candle + timedelta(seconds=granularity.to_integer)
+            or delta.index[-1] < current_candle
+        ):
+            return self.get_historical_data(market, granularity, websocket)
+
+        df = pd.concat([stored.loc[stored.index < delta.index[0], delta.columns], delta])
+        return df.tail(len(stored))
+
+    def get_stored_historical_data(
+        self,
+        api,
+        market,
+        granularity: Granularity,
+        iso8601start="",
+        iso8601end="",
+    ) -> pd.DataFrame:
+        """Returns historical data from the local candle store, only requesting the missing candles"""
+
+        page = timedelta(seconds=granularity.to_integer * (MAX_CANDLES_PER_REQUEST - 1))
+
+        # same ranges as the exchange APIs return for the request
+        if iso8601start == "" or (iso8601end == "" and self.exchange == Exchange.BINANCE):
+            end = datetime.utcnow()
+            start = end - page
+        else:
+            start = self.get_date_from_iso8601_str(iso8601start)
+            if iso8601end != "":
+                end = self.get_date_from_iso8601_str(iso8601end)
+            elif self.exchange == Exchange.KUCOIN:
+                end = datetime.utcnow()
+            else:
+                end = start + page
+
+        candle_store = CandleStore(self.exchange, market, granularity)
+        return candle_store.get_candles(
+            start,
+            end,
+            lambda iso8601start, iso8601end: api.get_historical_data(market, granularity, None, iso8601start, iso8601end),
+        )
+
     def get_ticker(self, market, websocket):
         if self.exchange == Exchange.COINBASE:
-            api = CBAuthAPI(self.api_key, self.api_secret, self.api_url, app=self)
+            api = get_client(CBAuthAPI, self.api_key, self.api_secret, self.api_url, app=self)
             return api.get_ticker(market, websocket)
         if self.exchange == Exchange.BINANCE:
-            api = BPublicAPI(api_url=self.api_url, app=self)
+            api = get_client(BPublicAPI, api_url=self.api_url, app=self)
             return api.get_ticker(market, websocket)
         elif self.exchange == Exchange.KUCOIN:
-            api = KPublicAPI(api_url=self.api_url, app=self)
+            api = get_client(KPublicAPI, api_url=self.api_url, app=self)
             return api.get_ticker(market, websocket)
         else:  # returns data from coinbase pro if not specified
-            api = CPublicAPI(app=self)
+            api = get_client(CPublicAPI, app=self)
             return api.get_ticker(market, websocket)
 
     def get_time(self):
         if self.exchange == Exchange.COINBASE:
-            return CPublicAPI(app=self).get_time()
+            return get_client(CPublicAPI, app=self).get_time()
         elif self.exchange == Exchange.COINBASEPRO:
-            return CPublicAPI(app=self).get_time()
+            return get_client(CPublicAPI, app=self).get_time()
         elif self.exchange == Exchange.KUCOIN:
-            return KPublicAPI(app=self).get_time()
+            return get_client(KPublicAPI, app=self).get_time()
         elif self.exchange == Exchange.BINANCE:
             try:
-                return BPublicAPI(app=self).get_time()
+                return get_client(BPublicAPI, app=self).get_time()
             except ReadTimeoutError:
                 return ""
         else:
             return ""
 
+    def get_sim_close_range(self, df: pd.DataFrame) -> tuple:
+        """Running high and low close of the simulation data, computed once per data frame"""
+
+        if self.sim_close_range is None or self.sim_close_range[0] is not df:
+            close = df["close"].to_numpy(dtype=float)
+            self.sim_close_range = (df, np.fmax.accumulate(close), np.fmin.accumulate(close))
+
+        return self.sim_close_range[1], self.sim_close_range[2]
+
     def get_interval(self, df: pd.DataFrame = pd.DataFrame(), iterations: int = 0) -> pd.DataFrame:
         if len(df) == 0:
             return df
@@ -2895,7 +3193,7 @@ class PyCryptoBot(BotConfig):
     def is_1h_ema1226_bull(self, iso8601end: str = ""):
         try:
             if self.is_sim and isinstance(self.ema1226_1h_cache, pd.DataFrame):
-                df_data = self.ema1226_1h_cache.loc[self.ema1226_1h_cache["date"] <= iso8601end].copy()
+                return self.get_sim_bull("1h_ema1226", self.ema1226_1h_cache, "ema", 12, 26, iso8601end)
             elif self.exchange != Exchange.DUMMY:
                 df_data = self.get_additional_df("1h", self.websocket_connection).copy()
                 self.ema1226_1h_cache = df_data
@@ -2920,7 +3218,7 @@ class PyCryptoBot(BotConfig):
     def is_6h_ema1226_bull(self, iso8601end: str = ""):
         try:
             if self.is_sim and isinstance(self.ema1226_1h_cache, pd.DataFrame):
-                df_data = self.ema1226_6h_cache.loc[self.ema1226_6h_cache["date"] <= iso8601end].copy()
+                return self.get_sim_bull("6h_ema1226", self.ema1226_6h_cache, "ema", 12, 26, iso8601end)
             elif self.exchange != Exchange.DUMMY:
                 df_data = self.get_additional_df("6h", self.websocket_connection).copy()
                 self.ema1226_6h_cache = df_data
@@ -2949,7 +3247,7 @@ class PyCryptoBot(BotConfig):
 
         try:
             if self.is_sim and isinstance(self.sma50200_1h_cache, pd.DataFrame):
-                df_data = self.sma50200_1h_cache.loc[self.sma50200_1h_cache["date"] <= iso8601end].copy()
+                return self.get_sim_bull("1h_sma50200", self.sma50200_1h_cache, "sma", 50, 200, iso8601end)
             elif self.exchange != Exchange.DUMMY:
                 df_data = self.get_additional_df("1h", self.websocket_connection).copy()
                 self.sma50200_1h_cache = df_data
@@ -2971,6 +3269,56 @@ class PyCryptoBot(BotConfig):
         except Exception:
             return False
 
+    def get_sim_bull(self, name: str, cache: pd.DataFrame, indicator: str, fast: int, slow: int, iso8601end: str) -> bool:
+        """Higher timeframe moving average bull flag as of a simulation date
+
+        The flags are calculated once per cache and aligned to the simulation candles with an
+        as-of join, so a check on the current simulation candle is an array lookup.
+        """
+
+        flags = self.sim_bull_flags.get(name)
+        if flags is None or flags[0] is not cache or flags[1] is not self.trading_data:
+            df_data = cache.sort_values(by=["date"]) if not cache["date"].is_monotonic_increasing else cache.copy()
+            ta = TechnicalAnalysis(df_data, app=self)
+            add_indicator = ta.add_ema if indicator == "ema" else ta.add_sma
+
+            # moving averages can't be added while the data is shorter than their period
+            min_rows = 1
+            for period in [fast, slow]:
+                if f"{indicator}{period}" not in df_data:
+                    min_rows = max(min_rows, period)
+                    if len(df_data) >= period:
+                        add_indicator(period)
+
+            cache_flags = np.zeros(len(df_data), dtype=bool)
+            if len(df_data) >= min_rows:
+                df_data = ta.get_df()
+                cache_flags = (df_data[f"{indicator}{fast}"] > df_data[f"{indicator}{slow}"]).to_numpy(dtype=bool)
+                cache_flags[: min_rows - 1] = False
+
+            cache_dates = pd.DatetimeIndex(df_data["date"])
+            sim_dates = pd.DatetimeIndex(self.trading_data["date"]) if "date" in self.trading_data else pd.DatetimeIndex([])
+            sim_flags = np.zeros(0, dtype=bool)
+            if sim_dates.is_monotonic_increasing:
+                sim_flags = pd.merge_asof(
+                    pd.DataFrame({"date": sim_dates}), pd.DataFrame({"date": cache_dates, "bull": cache_flags}), on="date", direction="backward"
+                )["bull"]
+                sim_flags = sim_flags.fillna(False).to_numpy(dtype=bool)
+
+            flags = (cache, self.trading_data, cache_dates.asi8, cache_flags, sim_dates.asi8, sim_flags)
+            self.sim_bull_flags[name] = flags
+
+        _, _, cache_dates, cache_flags, sim_dates, sim_flags = flags
+        date = pd.Timestamp(iso8601end).value
+
+        row = self.state.iterations - 1
+        if 0 <= row < len(sim_flags) and sim_dates[row] == date:
+            return bool(sim_flags[row])
+
+        # not the current simulation candle, e.g. after a smart switch
+        row = np.searchsorted(cache_dates, date, side="right") - 1
+        return bool(cache_flags[row]) if row >= 0 else False
+
     def get_additional_df(self, short_granularity, websocket) -> pd.DataFrame:
         granularity = Granularity.convert_to_enum(short_granularity)
 
@@ -3067,8 +3415,8 @@ class PyCryptoBot(BotConfig):
 
         try:
             if self.exchange == Exchange.COINBASE:
-                api = CBAuthAPI(self.api_key, self.api_secret, self.api_url, app=self)
-                orders = api.get_orders(self.market, "", "done")
+                api = get_client(CBAuthAPI, self.api_key, self.api_secret, self.api_url, app=self)
+                orders = get_ledger(api, self.market).sync()
 
                 if len(orders) == 0:
                     return None
@@ -3087,8 +3435,8 @@ class PyCryptoBot(BotConfig):
                     "date": str(pd.DatetimeIndex(pd.to_datetime(last_order["created_at"]).dt.strftime("%Y-%m-%dT%H:%M:%S.%Z"))[0]),
                 }
             elif self.exchange == Exchange.COINBASEPRO:
-                api = CAuthAPI(self.api_key, self.api_secret, self.api_passphrase, self.api_url, app=self)
-                orders = api.get_orders(self.market, "", "done")
+                api = get_client(CAuthAPI, self.api_key, self.api_secret, self.api_passphrase, self.api_url, app=self)
+                orders = get_ledger(api, self.market).sync()
 
                 if len(orders) == 0:
                     return None
@@ -3107,8 +3455,8 @@ class PyCryptoBot(BotConfig):
                     "date": str(pd.DatetimeIndex(pd.to_datetime(last_order["created_at"]).dt.strftime("%Y-%m-%dT%H:%M:%S.%Z"))[0]),
                 }
             elif self.exchange == Exchange.KUCOIN:
-                api = KAuthAPI(self.api_key, self.api_secret, self.api_passphrase, self.api_url, use_cache=self.usekucoincache, app=self)
-                orders = api.get_orders(self.market, "", "done")
+                api = get_client(KAuthAPI, self.api_key, self.api_secret, self.api_passphrase, self.api_url, use_cache=self.usekucoincache, app=self)
+                orders = get_ledger(api, self.market).sync()
 
                 if len(orders) == 0:
                     return None
@@ -3127,8 +3475,8 @@ class PyCryptoBot(BotConfig):
                     "date": str(pd.DatetimeIndex(pd.to_datetime(last_order["created_at"]).dt.strftime("%Y-%m-%dT%H:%M:%S.%Z"))[0]),
                 }
             elif self.exchange == Exchange.BINANCE:
-                api = BAuthAPI(self.api_key, self.api_secret, self.api_url, recv_window=self.recv_window, app=self)
-                orders = api.get_orders(self.market)
+                api = get_client(BAuthAPI, self.api_key, self.api_secret, self.api_url, recv_window=self.recv_window, app=self)
+                orders = get_ledger(api, self.market).sync()
 
                 if len(orders) == 0:
                     return None
@@ -3170,19 +3518,19 @@ class PyCryptoBot(BotConfig):
         elif self.takerfee > -1.0:
             return self.takerfee
         elif self.exchange == Exchange.COINBASE:
-            api = CBAuthAPI(self.api_key, self.api_secret, self.api_url, app=self)
+            api = get_client(CBAuthAPI, self.api_key, self.api_secret, self.api_url, app=self)
             self.takerfee = api.get_taker_fee()
             return self.takerfee
         elif self.exchange == Exchange.COINBASEPRO:
-            api = CAuthAPI(self.api_key, self.api_secret, self.api_passphrase, self.api_url, app=self)
+            api = get_client(CAuthAPI, self.api_key, self.api_secret, self.api_passphrase, self.api_url, app=self)
             self.takerfee = api.get_taker_fee()
             return self.takerfee
         elif self.exchange == Exchange.BINANCE:
-            api = BAuthAPI(self.api_key, self.api_secret, self.api_url, recv_window=self.recv_window, app=self)
+            api = get_client(BAuthAPI, self.api_key, self.api_secret, self.api_url, recv_window=self.recv_window, app=self)
             self.takerfee = api.get_taker_fee(self.get_market())
             return self.takerfee
         elif self.exchange == Exchange.KUCOIN:
-            api = KAuthAPI(self.api_key, self.api_secret, self.api_passphrase, self.api_url, use_cache=self.usekucoincache, app=self)
+            api = get_client(KAuthAPI, self.api_key, self.api_secret, self.api_passphrase, self.api_url, use_cache=self.usekucoincache, app=self)
             self.takerfee = api.get_taker_fee()
             return self.takerfee
         else:
@@ -3200,16 +3548,16 @@ class PyCryptoBot(BotConfig):
         elif self.makerfee > -1.0:
             return self.makerfee
         elif self.exchange == Exchange.COINBASE:
-            api = CBAuthAPI(self.api_key, self.api_secret, self.api_url, app=self)
+            api = get_client(CBAuthAPI, self.api_key, self.api_secret, self.api_url, app=self)
             return api.get_maker_fee()
         elif self.exchange == Exchange.COINBASEPRO:
-            api = CAuthAPI(self.api_key, self.api_secret, self.api_passphrase, self.api_url, app=self)
+            api = get_client(CAuthAPI, self.api_key, self.api_secret, self.api_passphrase, self.api_url, app=self)
             return api.get_maker_fee()
         elif self.exchange == Exchange.BINANCE:
-            api = BAuthAPI(self.api_key, self.api_secret, self.api_url, recv_window=self.recv_window, app=self)
+            api = get_client(BAuthAPI, self.api_key, self.api_secret, self.api_url, recv_window=self.recv_window, app=self)
             return api.get_maker_fee(self.get_market())
         elif self.exchange == Exchange.KUCOIN:
-            api = KAuthAPI(self.api_key, self.api_secret, self.api_passphrase, self.api_url, use_cache=self.usekucoincache, app=self)
+            api = get_client(KAuthAPI, self.api_key, self.api_secret, self.api_passphrase, self.api_url, use_cache=self.usekucoincache, app=self)
             return api.get_maker_fee()
         else:
             return 0.005
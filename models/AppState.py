@@ -4,6 +4,7 @@ from datetime import datetime, timedelta
 from numpy import array as np_array, min as np_min, ptp as np_ptp
 
 from models.TradingAccount import TradingAccount
+from models.exchange.ClientPool import get_client
 from models.exchange.ExchangesEnum import Exchange
 from models.exchange.binance import AuthAPI as BAuthAPI
 from models.exchange.coinbase import AuthAPI as CBAuthAPI
@@ -15,7 +16,8 @@ from views.PyCryptoBot import RichText
 class AppState:
     def __init__(self, app, account: TradingAccount) -> None:
         if app.exchange == Exchange.BINANCE:
-            self.api = BAuthAPI(
+            self.api = get_client(
+                BAuthAPI,
                 app.api_key,
                 app.api_secret,
                 app.api_url,
@@ -23,14 +25,16 @@ class AppState:
                 app=app
             )
         elif app.exchange == Exchange.COINBASE:
-            self.api = CBAuthAPI(
+            self.api = get_client(
+                CBAuthAPI,
                 app.api_key,
                 app.api_secret,
                 app.api_url,
                 app=app
             )
         elif app.exchange == Exchange.COINBASEPRO:
-            self.api = CAuthAPI(
+            self.api = get_client(
+                CAuthAPI,
                 app.api_key,
                 app.api_secret,
                 app.api_passphrase,
@@ -38,7 +42,8 @@ class AppState:
                 app=app
             )
         elif app.exchange == Exchange.KUCOIN:
-            self.api = KAuthAPI(
+            self.api = get_client(
+                KAuthAPI,
                 app.api_key,
                 app.api_secret,
                 app.api_passphrase,
@@ -288,7 +293,7 @@ class AppState:
             quote = 0.0 if len(df_quote) == 0 else float(df_quote.values[0])
         except Exception:
             pass
-        orders = self.account.get_orders(self.app.market, "", "done")
+        orders = self.account.get_last_orders(self.app.market)
         if orders is not None and len(orders) > 0:
             last_order = orders[-1:]
 
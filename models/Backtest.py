@@ -0,0 +1,366 @@
+"""Vectorised back testing engine"""
+
+import numpy as np
+import pandas as pd
+
+from models.helper.MarginHelper import calculate_margin
+from models.Strategy import Strategy
+from utils.PyCryptoBot import truncate as _truncate
+
+
+class Backtest:
+    def __init__(self, app, df: pd.DataFrame = pd.DataFrame(), start: int = 0, chunk_size: int = 1024) -> None:
+        """Back test a market over its whole history in one pass
+
+        Parameters
+        ----------
+        app : PyCryptoBot
+            bot instance, its state and trade tracker are updated in place
+        df : Pandas Time Series
+            historic data with the technical indicators from add_all()
+        start : int
+            row of the first simulated candle (earlier rows only warm up indicators)
+        chunk_size : int
+            number of candles evaluated at a time while searching for an exit
+        """
+
+        if not isinstance(df, pd.DataFrame):
+            raise TypeError("'df' not a Pandas dataframe")
+
+        if len(df) == 0:
+            raise ValueError("'df' is empty")
+
+        if start < 0 or start >= len(df):
+            raise ValueError("'start' is out of bounds")
+
+        self.app = app
+        self.state = app.state
+        self._df = df
+        self._start = start
+        self._chunk_size = chunk_size
+
+        self._close = df["close"].to_numpy(dtype=float)
+        self._dates = df.index.strftime("%Y-%m-%d %H:%M:%S")
+        self._df_high = np.maximum.accumulate(self._close)
+        self._df_low = np.minimum.accumulate(self._close)
+
+        self._trades = []
+
+    @staticmethod
+    def unsupported_options(app) -> list:
+        """Returns the enabled options only the candle by candle simulator supports"""
+
+        options = []
+        if app.enable_custom_strategy:
+            options.append("custom strategy")
+        if app.smart_switch:
+            options.append("smartswitch")
+        if app.dynamic_tsl:
+            options.append("dynamictsl")
+        if app.sellatresistance:
+            options.append("sellatresistance")
+        if app.disablefailsafefibonaccilow is False:
+            options.append("sellatfibonaccilow")
+        if app.buymaxsize and app.buylastsellsize:
+            options.append("buylastsellsize")
+
+        return options
+
+    def run(self) -> pd.DataFrame:
+        """Runs the simulation and returns the trade tracker"""
+
+        taker_fee = self.app.get_taker_fee()
+        sell_percent = self.app.get_sell_percent()
+
+        buy_candidates = np.flatnonzero(self._buy_signals(near_high=False))
+        buy_candidates_near_high = np.flatnonzero(self._buy_signals(near_high=True))
+        sell_signals = self._sell_signals()
+
+        strategy = Strategy(self.app, self.state, self._df.iloc[self._start : self._start + 1], 1)
+
+        position = self._start
+        while position < len(self._close):
+            if self.state.last_action != "BUY":
+                candidates = buy_candidates_near_high if self.state.last_action == "SELL" else buy_candidates
+                buy_index = self._next_buy(strategy, candidates, position)
+                if buy_index is None:
+                    break
+
+                self._buy(buy_index)
+                position = buy_index + 1
+            else:
+                sell_index = self._next_sell(sell_signals, position, taker_fee, sell_percent)
+                if sell_index is None:
+                    break
+
+                self._sell(sell_index, taker_fee, sell_percent)
+                position = sell_index + 1
+
+        self.state.iterations = len(self._close)
+        self.state.last_df_index = self._dates[-1]
+
+        if len(self._trades) > 0:
+            self.app.trade_tracker = pd.concat([self.app.trade_tracker, pd.DataFrame(self._trades, index=[0] * len(self._trades))])
+
+        return self.app.trade_tracker
+
+    def _column(self, name: str) -> np.ndarray:
+        return self._df[name].to_numpy()
+
+    def _buy_signals(self, near_high: bool = True) -> np.ndarray:
+        """Strategy.is_buy_signal and the bull only wait trigger for every candle"""
+
+        app = self.app
+        signals = np.zeros(len(self._close), dtype=bool)
+
+        if app.manual_trades_only or (app.enableinsufficientfundslogging and app.insufficientfunds):
+            return signals
+
+        if (
+            app.disablebuyema
+            and app.disablebuymacd
+            and app.disablebuyobv
+            and app.disablebuyelderray
+            and app.disablebuybbands_s1
+            and app.disablebuybbands_s2
+        ):
+            return signals
+
+        if app.disablebuyema and app.disablebuymacd and app.disablebuybbands_s1 and app.disablebuybbands_s2:
+            return signals
+
+        closegtbb20_upperco = self._column("closegtbb20_upperco").astype(bool)
+
+        criteria_1 = (
+            (self._column("ema12gtema26co").astype(bool) | app.disablebuyema)
+            & (self._column("macdgtsignal").astype(bool) | app.disablebuymacd)
+            & ((self._column("obv_pc").astype(float) > -5) | app.disablebuyobv)
+            & (self._column("eri_buy").astype(bool) | app.disablebuyelderray)
+            & (closegtbb20_upperco | app.disablebuybbands_s1)
+            & (closegtbb20_upperco | app.disablebuybbands_s2)
+        )
+        criteria_2 = closegtbb20_upperco | app.disablebuybbands_s2
+        signals = criteria_1 | criteria_2
+
+        if app.disablebullonly is False:
+            goldencross = self._column("goldencross").astype(bool)
+            signals &= goldencross
+            if app.adjusttotalperiods < 200:
+                signals[:] = False
+
+        if near_high and app.disablebuynearhigh is True:
+            window_high = pd.Series(self._close).rolling(app.adjusttotalperiods, min_periods=1).max().to_numpy()
+            signals &= ~(self._close > (window_high * (1 - app.nobuynearhighpcnt / 100)))
+
+        return signals
+
+    def _sell_signals(self) -> np.ndarray:
+        """Strategy.is_sell_signal for every candle"""
+
+        app = self.app
+        signals = np.zeros(len(self._close), dtype=bool)
+
+        if (
+            app.disablebuyema
+            and app.disablebuymacd
+            and app.disablebuyobv
+            and app.disablebuyelderray
+            and app.disablebuybbands_s1
+            and app.disablebuybbands_s2
+        ):
+            return signals
+
+        if app.disablebuyema and app.disablebuymacd and app.disablebuybbands_s1 and app.disablebuybbands_s2:
+            return signals
+
+        return (
+            (self._column("ema12ltema26co").astype(bool) | app.disablebuyema)
+            & (self._column("macdltsignal").astype(bool) | app.disablebuymacd)
+            & (self._column("closeltbb20_lowerco").astype(bool) | app.disablebuybbands_s1)
+            & (self._column("closeltbb20_midco").astype(bool) | app.disablebuybbands_s2)
+        )
+
+    def _next_buy(self, strategy: Strategy, candidates: np.ndarray, position: int):
+        """Returns the row of the next buy, applying the trailing buy to each buy signal"""
+
+        for index in candidates[np.searchsorted(candidates, position) :]:
+            action, self.state.trailing_buy, _, _ = strategy.check_trailing_buy(self.state, self._close[index])
+            if action == "BUY":
+                return index
+
+        return None
+
+    def _next_sell(self, sell_signals: np.ndarray, position: int, taker_fee: float, sell_percent: int):
+        """Returns the row of the next sell, evaluating the sell and wait triggers a chunk of candles at a time"""
+
+        app, state = self.app, self.state
+
+        state.last_buy_fee = round(state.last_buy_size * taker_fee, 8)
+        state.last_buy_filled = round(((state.last_buy_size - state.last_buy_fee) / state.last_buy_price), 8)
+
+        nosell_bounds = app.nosellminpcnt is not None and app.nosellmaxpcnt is not None
+
+        while position < len(self._close):
+            end = min(position + self._chunk_size, len(self._close))
+            price = self._close[position:end]
+
+            last_buy_high = np.maximum(np.maximum.accumulate(price), state.last_buy_high)
+            change_pcnt_high = ((price / last_buy_high) - 1) * 100
+
+            # vectorised calculate_margin()
+            sell_size = np.round((sell_percent / 100) * (price * state.last_buy_filled), 8)
+            sell_fee = np.round(sell_size * taker_fee, 8)
+            profit = np.round(np.round(sell_size - sell_fee, 8) - state.last_buy_size, 8)
+            margin = np.round((profit / state.last_buy_size) * 100, 8)
+
+            # Strategy.is_sell_trigger()
+            prevent_loss = np.full(len(price), state.prevent_loss)
+            prevent_loss_exit = np.zeros(len(price), dtype=bool)
+            if app.preventloss:
+                above_trigger = margin > app.preventlosstrigger
+                prevent_loss_before = state.prevent_loss | np.concatenate(([False], np.logical_or.accumulate(above_trigger)[:-1]))
+                prevent_loss_set = ~prevent_loss_before & above_trigger
+                prevent_loss = prevent_loss_before | prevent_loss_set
+                prevent_loss_exit = ~prevent_loss_set & (
+                    (prevent_loss_before & (margin <= app.preventlossmargin)) | ((app.preventlosstrigger == 0) & (margin <= app.preventlossmargin))
+                )
+
+            no_sell = (not app.sellatloss) & (margin <= 0)
+            if nosell_bounds:
+                no_sell |= (margin >= app.nosellminpcnt) & (margin <= app.nosellmaxpcnt)
+
+            reached = ~prevent_loss_exit & ~no_sell
+            triggered = np.zeros(len(price), dtype=bool)
+            tsl_triggered = np.full(len(price), state.tsl_triggered)
+            if state.tsl_pcnt is not None:
+                tsl_triggered = state.tsl_triggered | np.logical_or.accumulate(reached & (margin > state.tsl_trigger))
+                triggered |= tsl_triggered & (change_pcnt_high < state.tsl_pcnt)
+            if app.disablefailsafelowerpcnt is False and app.sellatloss and app.sell_lower_pcnt is not None:
+                triggered |= margin < app.sell_lower_pcnt
+            if app.disableprofitbankupperpcnt is False and app.sell_upper_pcnt is not None:
+                triggered |= margin > app.sell_upper_pcnt
+
+            sell = prevent_loss_exit | (reached & triggered) | sell_signals[position:end]
+
+            # Strategy.is_wait_trigger()
+            keep_selling = (prevent_loss & (margin <= app.preventlossmargin)) | ((app.preventlosstrigger == 0) & (margin <= app.preventlossmargin))
+            sell &= keep_selling | ~no_sell
+
+            if app.manual_trades_only:
+                sell[:] = False
+
+            exits = np.flatnonzero(sell)
+            last = exits[0] if len(exits) > 0 else len(price) - 1
+
+            state.last_buy_high = float(last_buy_high[last])
+            state.prevent_loss = bool(prevent_loss[last])
+            state.tsl_triggered = bool(tsl_triggered[last])
+            state.open_trade_margin_float = margin[last]
+            state.open_trade_margin = _truncate(margin[last], 8 if price[last] < 0.01 else 4) + "%"
+
+            if len(exits) > 0:
+                return position + last
+
+            position = end
+
+        return None
+
+    def _buy(self, index: int) -> None:
+        app, state = self.app, self.state
+        price = self._close[index]
+
+        state.last_buy_price = price
+        state.last_buy_high = state.last_buy_price
+
+        if state.last_buy_size == 0 and state.last_buy_filled == 0:
+            # sim mode can now use buymaxsize as the amount used for a buy
+            if app.buymaxsize > 0:
+                state.last_buy_size = app.buymaxsize
+                state.first_buy_size = app.buymaxsize
+            else:
+                state.last_buy_size = 1
+                state.first_buy_size = 1
+
+        state.buy_count = state.buy_count + 1
+        state.buy_sum = state.buy_sum + state.last_buy_size
+        state.trailing_buy = False
+        state.action = "DONE"
+        state.trailing_buy_immediate = False
+
+        self._trades.append(
+            {
+                "Datetime": self._dates[index],
+                "Market": app.market,
+                "Action": "BUY",
+                "Price": price,
+                "Quote": state.last_buy_size,
+                "Base": float(state.last_buy_size) / float(price),
+                "DF_High": self._df_high[index],
+                "DF_Low": self._df_low[index],
+            }
+        )
+
+        state.in_open_trade = True
+        state.last_action = "BUY"
+
+    def _sell(self, index: int, taker_fee: float, sell_percent: int) -> None:
+        app, state = self.app, self.state
+        price = self._close[index]
+
+        margin, profit, sell_fee = calculate_margin(
+            buy_size=state.last_buy_size,
+            buy_filled=state.last_buy_filled,
+            buy_price=state.last_buy_price,
+            buy_fee=state.last_buy_fee,
+            sell_percent=sell_percent,
+            sell_price=price,
+            sell_taker_fee=taker_fee,
+            app=app,
+        )
+
+        # save last buy before this sell to use in Sim Summary
+        state.previous_buy_size = state.last_buy_size
+        state.sell_count = state.sell_count + 1
+        sell_size = (sell_percent / 100) * ((price / state.last_buy_price) * (state.last_buy_size - state.last_buy_fee))
+        state.last_sell_size = sell_size - sell_fee
+        state.sell_sum = state.sell_sum + state.last_sell_size
+
+        state.margintracker += float(margin)
+        state.profitlosstracker += float(profit)
+        state.feetracker += float(sell_fee)
+        state.buy_tracker += float(state.last_buy_size)
+
+        self._trades.append(
+            {
+                "Datetime": self._dates[index],
+                "Market": app.market,
+                "Action": "SELL",
+                "Price": price,
+                "Quote": state.last_sell_size,
+                "Base": state.last_buy_filled,
+                "Margin": margin,
+                "Profit": profit,
+                "Fee": sell_fee,
+                "DF_High": self._df_high[index],
+                "DF_Low": self._df_low[index],
+            }
+        )
+
+        state.in_open_trade = False
+        state.last_action = "SELL"
+        state.prevent_loss = False
+        state.trailing_sell = False
+        state.trailing_sell_immediate = False
+        state.tsl_triggered = False
+
+        if app.trailing_stop_loss:
+            state.tsl_pcnt = float(app.trailing_stop_loss)
+
+        if app.trailing_stop_loss_trigger:
+            state.tsl_trigger = float(app.trailing_stop_loss_trigger)
+
+        # adjust the next simulation buy with the current balance
+        state.last_buy_size += profit
+
+        state.tsl_max = False
+        state.action = "DONE"
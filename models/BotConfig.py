@@ -66,6 +66,7 @@ class BotConfig:
         self.sellatloss = 1
         self.smart_switch = 1
         self.sell_smart_switch = 0
+        self.smart_switch_resample = False
         self.preventloss = False
         self.preventlosstrigger = 1.0
         self.preventlossmargin = 0.1
@@ -122,6 +123,8 @@ class BotConfig:
         self.disablelog = False
         self.disabletracker = True
         self.websocket = False
+        self.websocket_hub = False
+        self.event_driven = False
         self.exitaftersell = False
         self.ignorepreviousbuy = True
         self.ignoreprevioussell = True
@@ -154,10 +157,14 @@ class BotConfig:
         self.sim_smartswitch = False
 
         self.usekucoincache = False
+        self.usecandlestore = False
         self.adjusttotalperiods = 300
         self.manual_trades_only = False
 
         self.recv_window = self._set_recv_window()
+        self.api_pool_size = 10
+        self.api_timeout = 30.0
+        self.usesharedquota = False
 
         self.config_file = kwargs.get("config_file", "config.json")
 
@@ -400,7 +407,7 @@ class BotConfig:
         parser.add_argument("--logfile", type=str, help="Use the log file at the given location. e.g 'mymarket.log'")
         parser.add_argument("--tradesfile", type=str, help="Path to file to log trades done during simulation. eg './trades/BTCBUSD-trades.csv")
 
-        parser.add_argument("--sim", type=str, help="Simulation modes: fast, fast-sample, slow-sample")
+        parser.add_argument("--sim", type=str, help="Simulation modes: fast, fast-sample, slow-sample, fast-vector")
         parser.add_argument("--simstartdate", type=str, help="Start date for sample simulation e.g '2021-01-15'")
         parser.add_argument("--simenddate", type=str, help="End date for sample simulation e.g '2021-01-15' or 'now'")
         parser.add_argument("--simresultonly", action="store_true", help="show simulation result only")
@@ -417,16 +424,23 @@ class BotConfig:
 
         parser.add_argument("--log", type=int, help="Enable console logging")
         parser.add_argument("--smartswitch", type=int, help="Smart switch between 1 hour and 15 minute intervals")
+        parser.add_argument("--smartswitchresample", type=int, help="Resample the smart switch granularities from the finest one")
         parser.add_argument("--tradetracker", type=int, help="Enable trade order logging")
         parser.add_argument("--autorestart", type=int, help="Auto restart the bot in case of exception")
         parser.add_argument("--websocket", type=int, help="Enable websockets for data retrieval")
+        parser.add_argument("--websockethub", type=int, help="Use the websocket hub of the host instead of a websocket per bot")
+        parser.add_argument("--eventdriven", type=int, help="Run the bot on candle closes and price moves instead of polling")
         parser.add_argument("--insufficientfundslogging", type=int, help="Enable insufficient funds logging")
         parser.add_argument("--logbuysellinjson", type=int, help="Log buy and sell orders in a JSON file")
         parser.add_argument("--manualtradesonly", type=int, help="Manual Trading Only (HODL)")
         parser.add_argument("--startmethod", type=str, help="Bot start method ('scanner', 'standard', 'telegram')")
         parser.add_argument("--recvwindow", type=int, help="Binance exchange API recvwindow, integer between 5000 and 60000")
+        parser.add_argument("--apipoolsize", type=int, help="Exchange API connection pool size")
+        parser.add_argument("--apitimeout", type=float, help="Exchange API request timeout in seconds")
+        parser.add_argument("--sharedquota", type=int, help="Share the exchange API rate limits with every bot on this host")
         parser.add_argument("--lastaction", type=str, help="Manually set the last action performed by the bot (BUY, SELL)")
         parser.add_argument("--kucoincache", type=int, help="Enable the Kucoin cache")
+        parser.add_argument("--candlestore", type=int, help="Enable the local candle store for historical data")
         parser.add_argument("--exitaftersell", type=int, help="Exit the bot after a sell order")
         parser.add_argument("--ignorepreviousbuy", type=int, help="Ignore previous buy failure")
         parser.add_argument("--ignoreprevioussell", type=int, help="Ignore previous sell failure")
@@ -0,0 +1,257 @@
+"""Persistent local store of closed candles"""
+
+import json
+import os
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from models.exchange.ExchangesEnum import Exchange
+from models.exchange.Granularity import Granularity
+
+CANDLE_DTYPE = np.dtype(
+    [
+        ("epoch", "<i8"),
+        ("low", "<f8"),
+        ("high", "<f8"),
+        ("open", "<f8"),
+        ("close", "<f8"),
+        ("volume", "<f8"),
+    ]
+)
+
+# the exchanges return at most 300 candles per request
+MAX_CANDLES_PER_REQUEST = 300
+
+
+class CandleStore:
+    def __init__(self, exchange: Exchange, market: str, granularity: Granularity, cache_path: str = "cache") -> None:
+        """On disk candle store for one exchange, market and granularity
+
+        Closed candles are kept in a memory mapped file with the ranges known to be
+        complete, so only the missing ranges are requested from the exchange.
+
+        Parameters
+        ----------
+        exchange : Exchange
+            exchange the candles are from
+        market : str
+            market in the exchange format
+        granularity : Granularity
+            candle granularity
+        cache_path : str
+            candles are stored in {cache_path}/candles/{exchange}/{market}/{granularity}
+        """
+
+        if not isinstance(exchange, Exchange):
+            raise TypeError("Exchange Enum required.")
+
+        if not isinstance(market, str) or market == "":
+            raise TypeError("Market required.")
+
+        if not isinstance(granularity, Granularity):
+            raise TypeError("Granularity Enum required.")
+
+        self.exchange = exchange
+        self.market = market
+        self.granularity = granularity
+
+        self._path = os.path.join(cache_path, "candles", exchange.value, market, granularity.to_short)
+        self._data_filepath = os.path.join(self._path, "candles.bin")
+        self._meta_filepath = os.path.join(self._path, "meta.json")
+
+        self._meta = {"rows": 0, "coverage": [], "market": market, "granularity": granularity.to_short}
+        if os.path.isfile(self._meta_filepath):
+            with open(self._meta_filepath, "r", encoding="utf8") as meta_file:
+                self._meta.update(json.load(meta_file))
+
+    @property
+    def coverage(self) -> list:
+        """Candle open time ranges (epoch seconds, inclusive) stored from the exchange"""
+
+        return [tuple(interval) for interval in self._meta["coverage"]]
+
+    def get_candles(self, start: datetime, end: datetime, fetch, now: datetime = None) -> pd.DataFrame:
+        """Returns the candles opened between start and end, fetching only missing ranges
+
+        Parameters
+        ----------
+        start : datetime
+            UTC start date
+        end : datetime
+            UTC end date
+        fetch : callable
+            fetch(iso8601start, iso8601end) returning the exchange DataFrame for a range
+        now : datetime
+            UTC time used to decide which candles are closed, defaults to utcnow()
+        """
+
+        size = self.granularity.to_integer
+        now_epoch = self._to_epoch(now if now is not None else datetime.utcnow())
+        last_closed = now_epoch // size * size - size
+        start_epoch = self._to_epoch(start) // size * size
+        end_epoch = min(self._to_epoch(end), now_epoch) // size * size
+
+        if end_epoch < start_epoch:
+            return self._to_dataframe(np.empty(0, dtype=CANDLE_DTYPE))
+
+        # missing closed ranges, plus the candle that is still open
+        ranges = self._subtract_coverage(start_epoch, min(end_epoch, last_closed))
+        if end_epoch > last_closed:
+            if len(ranges) > 0 and ranges[-1][1] == last_closed:
+                ranges[-1] = (ranges[-1][0], end_epoch)
+            else:
+                ranges.append((max(start_epoch, last_closed + size), end_epoch))
+
+        open_candles = np.empty(0, dtype=CANDLE_DTYPE)
+        for range_start, range_end in ranges:
+            for page_start in range(range_start, range_end + 1, size * MAX_CANDLES_PER_REQUEST):
+                page_end = min(page_start + size * (MAX_CANDLES_PER_REQUEST - 1), range_end)
+                candles = self._from_dataframe(fetch(self._to_iso8601(page_start), self._to_iso8601(page_end)))
+                candles = candles[(candles["epoch"] >= page_start) & (candles["epoch"] <= page_end)]
+
+                closed = candles[candles["epoch"] <= last_closed]
+                open_candles = np.concatenate([open_candles, candles[candles["epoch"] > last_closed]])
+
+                # gaps in the history are trusted, a missing tail may just not be published yet
+                covered_end = min(page_end, last_closed)
+                if len(candles) == 0:
+                    # an empty page is what a failed request returns, it is requested again next time
+                    covered_end = page_start - size
+                elif covered_end >= last_closed - size * MAX_CANDLES_PER_REQUEST:
+                    covered_end = min(covered_end, int(closed["epoch"][-1]) if len(closed) > 0 else page_start - size)
+
+                self._write(closed, page_start, covered_end)
+
+        stored = self._read()
+        first = np.searchsorted(stored["epoch"], start_epoch, side="left")
+        last = np.searchsorted(stored["epoch"], end_epoch, side="right")
+
+        return self._to_dataframe(np.concatenate([stored[first:last], open_candles]))
+
+    def _subtract_coverage(self, start: int, end: int) -> list:
+        """Ranges between start and end (inclusive) not in the coverage"""
+
+        size = self.granularity.to_integer
+        ranges = []
+        for covered_start, covered_end in self._meta["coverage"]:
+            if covered_end < start:
+                continue
+            if covered_start > end:
+                break
+            if covered_start > start:
+                ranges.append((start, covered_start - size))
+            start = max(start, covered_end + size)
+
+        if start <= end:
+            ranges.append((start, end))
+
+        return ranges
+
+    def _read(self) -> np.ndarray:
+        """Memory maps the stored candles"""
+
+        rows = self._meta["rows"]
+        if rows == 0 or not os.path.isfile(self._data_filepath):
+            return np.empty(0, dtype=CANDLE_DTYPE)
+
+        return np.memmap(self._data_filepath, dtype=CANDLE_DTYPE, mode="r", shape=(rows,))
+
+    def _write(self, candles: np.ndarray, covered_start: int, covered_end: int) -> None:
+        """Stores closed candles and extends the coverage"""
+
+        if len(candles) == 0 and covered_end < covered_start:
+            return
+
+        if not os.path.exists(self._path):
+            os.makedirs(self._path)
+
+        stored = self._read()
+        rows = len(stored)
+
+        if len(candles) > 0:
+            if rows == 0 or candles["epoch"][0] > stored["epoch"][-1]:
+                # newly closed candles are appended, rows beyond the meta data are from an interrupted write
+                with open(self._data_filepath, "ab") as data_file:
+                    data_file.truncate(rows * CANDLE_DTYPE.itemsize)
+                    candles.tofile(data_file)
+                rows += len(candles)
+            else:
+                merged = np.concatenate([np.array(stored), candles])
+                # keep the most recent copy of a candle
+                _, index = np.unique(merged["epoch"][::-1], return_index=True)
+                merged = merged[::-1][index]
+                tmp_filepath = self._data_filepath + ".tmp"
+                merged.tofile(tmp_filepath)
+                del stored
+                os.replace(tmp_filepath, self._data_filepath)
+                rows = len(merged)
+
+        self._meta["rows"] = rows
+        if covered_end >= covered_start:
+            self._meta["coverage"] = self._merge_coverage(self._meta["coverage"] + [[covered_start, covered_end]])
+
+        tmp_filepath = self._meta_filepath + ".tmp"
+        with open(tmp_filepath, "w", encoding="utf8") as meta_file:
+            json.dump(self._meta, meta_file)
+        os.replace(tmp_filepath, self._meta_filepath)
+
+    def _merge_coverage(self, coverage: list) -> list:
+        """Sorts and merges overlapping or adjacent ranges"""
+
+        size = self.granularity.to_integer
+        merged = []
+        for start, end in sorted(coverage):
+            if len(merged) > 0 and start <= merged[-1][1] + size:
+                merged[-1][1] = max(merged[-1][1], end)
+            else:
+                merged.append([start, end])
+        return merged
+
+    def _from_dataframe(self, df: pd.DataFrame) -> np.ndarray:
+        """Converts an exchange DataFrame into sorted candles"""
+
+        if df is None or len(df) == 0:
+            return np.empty(0, dtype=CANDLE_DTYPE)
+
+        # the market and granularity columns are formatted differently by each exchange
+        for column in ["market", "granularity"]:
+            value = df[column].iloc[0]
+            self._meta[column] = value.item() if isinstance(value, np.generic) else value
+
+        candles = np.empty(len(df), dtype=CANDLE_DTYPE)
+        candles["epoch"] = pd.DatetimeIndex(df["date"]).asi8 // 1_000_000_000
+        for column in ["low", "high", "open", "close", "volume"]:
+            candles[column] = df[column].astype(float).to_numpy()
+
+        _, index = np.unique(candles["epoch"][::-1], return_index=True)
+        return candles[::-1][index]
+
+    def _to_dataframe(self, candles: np.ndarray) -> pd.DataFrame:
+        """Converts candles into the DataFrame format of the exchange APIs"""
+
+        tsidx = pd.DatetimeIndex(pd.to_datetime(candles["epoch"], unit="s"), dtype="datetime64[ns]")
+        df = pd.DataFrame(
+            {
+                "date": tsidx,
+                "market": self._meta["market"],
+                "granularity": self._meta["granularity"],
+                "low": candles["low"],
+                "high": candles["high"],
+                "open": candles["open"],
+                "close": candles["close"],
+                "volume": candles["volume"],
+            },
+            index=tsidx,
+        )
+        df.index.names = ["ts"]
+        return df
+
+    @staticmethod
+    def _to_epoch(date: datetime) -> int:
+        return int(pd.Timestamp(date).value // 1_000_000_000)
+
+    @staticmethod
+    def _to_iso8601(epoch: int) -> str:
+        return (datetime(1970, 1, 1) + timedelta(seconds=int(epoch))).strftime("%Y-%m-%dT%H:%M:%S")
@@ -0,0 +1,102 @@
+"""Wakes the trading job on candle closes and price moves instead of polling it"""
+
+import time
+from threading import Condition
+
+from models.exchange.AsyncWebSocket import hook_events
+from models.exchange.Granularity import Granularity
+
+# what woke the trading job
+CANDLE_CLOSED = "candle"
+PRICE_MOVED = "ticker"
+CANDLE_BOUNDARY = "timer"
+WAIT_TIMEOUT = "timeout"
+
+
+def next_candle_boundary(now: float, granularity: Granularity) -> float:
+    """Epoch seconds at which the candle open at now closes"""
+
+    if not isinstance(granularity, Granularity):
+        raise TypeError("Granularity Enum required.")
+
+    seconds = granularity.to_integer
+    return (now // seconds + 1) * seconds
+
+
+class EventTrigger:
+    def __init__(self, price_move: float = 0.1, delay: float = 1.0) -> None:
+        """Wakes the trading job when a candle closes or the price moves
+
+        The events come from the on_candle_closed and on_ticker hooks of a websocket client
+        and are coalesced, the job runs once for any number of events that arrive while it
+        runs. Without events the job still wakes at the candle boundary, so a bot without a
+        websocket, or a market without trades, refreshes its candles at candle close.
+
+        Parameters
+        ----------
+        price_move : float
+            price change in percent, since the last wake up, that wakes the job
+        delay : float
+            seconds after the candle boundary for the exchange to close the candle
+        """
+
+        if price_move < 0:
+            raise ValueError("Price move can not be negative.")
+
+        if delay < 0:
+            raise ValueError("Delay can not be negative.")
+
+        self.price_move = price_move
+        self.delay = delay
+
+        self._condition = Condition()
+        self._reason = None
+        self._prices = {}
+
+    def attach(self, client) -> None:
+        """Hooks the trigger to the events of a websocket client"""
+
+        hook_events(client, self.on_ticker, self.on_candle_closed)
+
+    def on_ticker(self, market: str, date, price: float) -> None:
+        # runs on the websocket thread
+        with self._condition:
+            last = self._prices.get(market)
+            if last is not None and abs(price - last) < abs(last) * self.price_move / 100:
+                return
+            self._prices[market] = price
+            self._notify(PRICE_MOVED)
+
+    def on_candle_closed(self, market: str, candle: tuple) -> None:
+        # runs on the websocket thread
+        with self._condition:
+            self._notify(CANDLE_CLOSED)
+
+    def _notify(self, reason: str) -> None:
+        # a candle close outranks a price move that is still pending
+        if self._reason != CANDLE_CLOSED:
+            self._reason = reason
+        self._condition.notify_all()
+
+    def wait(self, granularity: Granularity, timeout: float = None) -> str:
+        """Waits for the next event, or the close of the open candle, and returns what woke it
+
+        With a timeout, WAIT_TIMEOUT is returned when nothing happened within timeout seconds.
+        """
+
+        now = time.time()
+        # the candle that closed less than delay seconds ago still wakes the job
+        deadline = next_candle_boundary(now - self.delay, granularity) + self.delay
+        reason = CANDLE_BOUNDARY
+        if timeout is not None and now + timeout < deadline:
+            deadline, reason = now + timeout, WAIT_TIMEOUT
+
+        with self._condition:
+            while self._reason is None:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return reason
+                self._condition.wait(remaining)
+
+            reason, self._reason = self._reason, None
+            return reason
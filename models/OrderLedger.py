@@ -0,0 +1,125 @@
+"""In memory ledger of the latest done orders of a market"""
+
+import time
+from threading import Lock
+
+import pandas as pd
+
+# done orders kept per market
+MAX_ORDERS = 100
+
+# seconds between syncs of the whole order history, which pick up orders that filled after later orders
+FULL_SYNC_INTERVAL = 3600
+
+_lock = Lock()
+_ledgers = {}
+
+
+def created_at(orders: pd.DataFrame) -> pd.Series:
+    """Returns the UTC creation time of orders in any exchange format"""
+
+    if "created_at" in orders:
+        values = orders["created_at"]
+    elif "index" in orders:
+        # Kucoin returns the time series index reset into a column
+        values = orders["index"]
+    else:
+        values = orders.index.to_series()
+
+    return pd.Series(pd.to_datetime(values.to_numpy(), utc=True), index=orders.index)
+
+
+class OrderLedger:
+    def __init__(self, api, market: str, max_orders: int = MAX_ORDERS, clock=time.monotonic) -> None:
+        """Latest done orders of a market, synced incrementally from the exchange
+
+        The first sync fetches the order history of the market, later syncs only fetch the
+        orders created since the newest order in the ledger.
+
+        Parameters
+        ----------
+        api : AuthAPI
+            exchange API with a get_orders(market, action, status, since=datetime) method
+        market : str
+            market in the exchange format
+        max_orders : int
+            latest orders kept in the ledger
+        """
+
+        if max_orders < 1:
+            raise ValueError("The ledger has to keep at least one order.")
+
+        self.api = api
+        self.market = market
+        self.max_orders = max_orders
+
+        self._clock = clock
+        self._lock = Lock()
+        self._orders = pd.DataFrame()
+        self._cursor = None
+        self._full_sync = None
+
+    @property
+    def cursor(self) -> pd.Timestamp:
+        """UTC creation time of the newest order, None before any order is seen"""
+
+        return self._cursor
+
+    @property
+    def orders(self) -> pd.DataFrame:
+        return self._orders
+
+    @property
+    def last_order(self) -> pd.DataFrame:
+        return self._orders.tail(1)
+
+    def sync(self) -> pd.DataFrame:
+        """Adds the orders created since the last sync and returns the ledger, oldest order first"""
+
+        with self._lock:
+            full_sync = self._cursor is None or self._clock() - self._full_sync >= FULL_SYNC_INTERVAL
+            if full_sync:
+                new = self.api.get_orders(self.market, status="done")
+            else:
+                new = self.api.get_orders(self.market, status="done", since=self._cursor.to_pydatetime())
+
+            # an error or a market without orders leaves the ledger as it is
+            if not isinstance(new, pd.DataFrame) or len(new) == 0:
+                if full_sync and isinstance(new, pd.DataFrame):
+                    self._full_sync = self._clock()
+                return self._orders
+
+            times = created_at(new)
+            if full_sync:
+                orders = new
+                self._full_sync = self._clock()
+            else:
+                # the orders at the cursor are fetched again and replace the copies in the ledger
+                kept = (created_at(self._orders) < self._cursor).values
+                fresh = (times >= self._cursor).values
+                orders = pd.concat([self._orders[kept], new[fresh]])
+                times = pd.concat([created_at(self._orders)[kept], times[fresh]])
+
+            order = times.reset_index(drop=True).sort_values(kind="stable").index[-self.max_orders :]
+            orders = orders.iloc[order]
+            if not isinstance(orders.index, pd.DatetimeIndex):
+                orders = orders.reset_index(drop=True)
+
+            self._orders = orders
+            self._cursor = times.iloc[order].max() if len(orders) > 0 else None
+
+            return self._orders
+
+
+def get_ledger(api, market: str) -> OrderLedger:
+    """Returns the ledger of a market for the account of an exchange API"""
+
+    key = (type(api).__module__, type(api).__name__, getattr(api, "_api_url", None), getattr(api, "_api_key", None), market)
+    with _lock:
+        if key not in _ledgers:
+            _ledgers[key] = OrderLedger(api, market)
+        ledger = _ledgers[key]
+
+    # pooled clients are replaced when closed, the ledger follows the current client
+    ledger.api = api
+    return ledger
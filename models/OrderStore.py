@@ -0,0 +1,182 @@
+"""Persistent local store of exchange orders"""
+
+import json
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+from threading import Lock
+
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows
+    fcntl = None
+
+from models.exchange.ExchangesEnum import Exchange
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS orders (
+    id TEXT PRIMARY KEY,
+    symbol TEXT NOT NULL,
+    created_at INTEGER NOT NULL,
+    active INTEGER NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS orders_symbol ON orders (symbol, created_at);
+CREATE INDEX IF NOT EXISTS orders_created_at ON orders (created_at);
+CREATE INDEX IF NOT EXISTS orders_active ON orders (active, created_at);
+CREATE TABLE IF NOT EXISTS sync (
+    name TEXT PRIMARY KEY,
+    value REAL NOT NULL
+);
+"""
+
+
+class OrderStore:
+    def __init__(self, exchange: Exchange, cache_path: str = "cache") -> None:
+        """On disk order history of an exchange account, shared by every bot on the host
+
+        Orders are kept in SQLite in WAL mode, so bots read the store while another bot writes
+        to it, and are indexed by symbol and creation time. Only one bot at a time syncs the
+        store with the exchange, the others carry on with the stored orders.
+
+        Parameters
+        ----------
+        exchange : Exchange
+            exchange the orders are from
+        cache_path : str
+            orders are stored in {cache_path}/orders/{exchange}.db
+        """
+
+        if not isinstance(exchange, Exchange):
+            raise TypeError("Exchange Enum required.")
+
+        self.exchange = exchange
+
+        path = os.path.join(cache_path, "orders")
+        if not os.path.exists(path):
+            os.makedirs(path)
+
+        self.filepath = os.path.join(path, f"{exchange.value}.db")
+        self._sync_lock_filepath = self.filepath + ".sync"
+
+        self._lock = Lock()
+        self._db = sqlite3.connect(self.filepath, timeout=30, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(SCHEMA)
+
+    @contextmanager
+    def _transaction(self):
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._db
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+            self._db.execute("COMMIT")
+
+    def _query(self, sql: str, params: tuple = ()) -> list:
+        with self._lock:
+            return self._db.execute(sql, params).fetchall()
+
+    def __len__(self) -> int:
+        return self._query("SELECT COUNT(*) FROM orders")[0][0]
+
+    def add_orders(self, orders: pd.DataFrame) -> int:
+        """Adds or updates orders in the exchange format, returns the number of orders written
+
+        The DataFrame needs the id, symbol and createdAt (epoch milliseconds) columns.
+        """
+
+        if orders is None or len(orders) == 0:
+            return 0
+
+        for column in ["id", "symbol", "createdAt"]:
+            if column not in orders:
+                raise ValueError(f"Orders require a {column} column.")
+
+        # to_json converts the numpy values the json module can not encode
+        records = json.loads(orders.to_json(orient="records"))
+        rows = [
+            (str(order["id"]), str(order["symbol"]), int(order["createdAt"]), int(bool(order.get("isActive", False))), json.dumps(order))
+            for order in records
+        ]
+
+        with self._transaction() as db:
+            db.executemany("INSERT OR REPLACE INTO orders (id, symbol, created_at, active, data) VALUES (?, ?, ?, ?, ?)", rows)
+
+        return len(rows)
+
+    def get_orders(self, symbol: str = None, since: int = None) -> pd.DataFrame:
+        """Returns the stored orders, newest first, of a symbol and created since epoch milliseconds"""
+
+        conditions, params = [], []
+        if symbol is not None:
+            conditions.append("symbol = ?")
+            params.append(symbol)
+        if since is not None:
+            conditions.append("created_at >= ?")
+            params.append(int(since))
+
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        rows = self._query(f"SELECT data FROM orders {where} ORDER BY created_at DESC", tuple(params))
+
+        return pd.DataFrame([json.loads(data) for data, in rows])
+
+    def purge(self, before: int) -> int:
+        """Removes the orders created before epoch milliseconds, returns the number removed"""
+
+        with self._transaction() as db:
+            return db.execute("DELETE FROM orders WHERE created_at < ?", (int(before),)).rowcount
+
+    @property
+    def cursor(self) -> int:
+        """Epoch milliseconds the next sync starts from, None when the store is empty
+
+        Orders after the newest stored order are new, active orders may have filled since.
+        """
+
+        newest, oldest_active = self._query("SELECT MAX(created_at), (SELECT MIN(created_at) FROM orders WHERE active = 1) FROM orders")[0]
+        if newest is None:
+            return None
+
+        return oldest_active if oldest_active is not None else newest + 1
+
+    @property
+    def synced(self) -> float:
+        """Epoch seconds of the last completed sync, 0 if never synced"""
+
+        rows = self._query("SELECT value FROM sync WHERE name = 'synced'")
+        return rows[0][0] if rows else 0.0
+
+    def set_synced(self, epoch: float = None) -> None:
+        with self._transaction() as db:
+            db.execute("INSERT OR REPLACE INTO sync (name, value) VALUES ('synced', ?)", (time.time() if epoch is None else epoch,))
+
+    @contextmanager
+    def syncing(self):
+        """Yields True to the one bot allowed to sync with the exchange, False to the others without waiting"""
+
+        if fcntl is None:
+            yield True
+            return
+
+        with open(self._sync_lock_filepath, "a") as lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                yield False
+                return
+
+            try:
+                yield True
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,173 @@
+"""Parallel parameter sweep over vectorised back tests"""
+
+import copy
+import io
+import itertools
+import multiprocessing
+import random
+from contextlib import redirect_stdout
+
+import pandas as pd
+
+from models.Backtest import Backtest
+
+# options that change the candles or indicators rather than the trading decisions
+DATA_OPTIONS = ["exchange", "market", "granularity", "simstartdate", "simenddate", "smart_switch"]
+
+# app, candles and initial state shared with the forked workers
+_sweep = None
+
+
+class ParameterSweep:
+    def __init__(self, app, df: pd.DataFrame = pd.DataFrame(), start: int = 0, space: dict = {}, samples: int = 0, seed: int = None) -> None:
+        """Back test every combination of bot options in a search space
+
+        Parameters
+        ----------
+        app : PyCryptoBot
+            initialised bot instance in simulation mode
+        df : Pandas Time Series
+            historic data with the technical indicators from add_all(), shared by all runs
+        start : int
+            row of the first simulated candle
+        space : dict
+            bot option to a list of values, or a {"min": x, "max": y} range for random search
+        samples : int
+            number of random combinations, 0 runs the whole grid
+        seed : int
+            random seed for reproducible random searches
+        """
+
+        if not isinstance(space, dict) or len(space) == 0:
+            raise TypeError("'space' must be a dictionary of bot options")
+
+        if not isinstance(samples, int) or samples < 0:
+            raise ValueError("'samples' must be a positive integer")
+
+        for option, values in space.items():
+            if option in DATA_OPTIONS or not hasattr(app, option):
+                raise ValueError(f"'{option}' is not a bot option that can be swept")
+
+            if isinstance(values, dict):
+                if samples == 0:
+                    raise ValueError(f"'{option}' range requires a random search")
+                if "min" not in values or "max" not in values or values["min"] > values["max"]:
+                    raise ValueError(f"'{option}' range requires a min and max")
+            elif not isinstance(values, list) or len(values) == 0:
+                raise ValueError(f"'{option}' requires a list of values")
+
+        self.app = app
+        self.space = space
+        self._df = df
+        self._start = start
+        self._samples = samples
+        self._seed = seed
+
+        # the back test validates the candles before any worker is started
+        Backtest(app, df, start)
+
+    def combinations(self) -> list:
+        """Returns the bot options of every run"""
+
+        options = list(self.space.keys())
+
+        if self._samples == 0:
+            return [dict(zip(options, values)) for values in itertools.product(*self.space.values())]
+
+        rng = random.Random(self._seed)
+        combinations = []
+        for _ in range(self._samples):
+            combination = {}
+            for option, values in self.space.items():
+                if isinstance(values, dict):
+                    value = rng.uniform(values["min"], values["max"])
+                    combination[option] = round(value, values.get("decimals", 2))
+                else:
+                    combination[option] = rng.choice(values)
+            combinations.append(combination)
+
+        return combinations
+
+    def run(self, workers: int = None) -> pd.DataFrame:
+        """Runs the back tests across a process pool and returns the results ranked by margin"""
+
+        global _sweep
+
+        combinations = self.combinations()
+        for combination in combinations:
+            unsupported = Backtest.unsupported_options(_Options(self.app, combination))
+            if len(unsupported) > 0:
+                raise ValueError(f"Vectorised simulation does not support {', '.join(unsupported)}")
+
+        if workers is None:
+            workers = multiprocessing.cpu_count()
+
+        # forked workers inherit the candles instead of each fetching and analysing them again
+        _sweep = (self.app, self._df, self._start, copy.copy(self.app.state), self.app.trade_tracker.iloc[0:0])
+        app_state = {option: getattr(self.app, option) for option in ["state", "trade_tracker"] + list(self.space.keys())}
+        try:
+            if workers > 1 and "fork" in multiprocessing.get_all_start_methods():
+                with multiprocessing.get_context("fork").Pool(min(workers, len(combinations))) as pool:
+                    summaries = pool.map(_simulate, combinations, chunksize=1)
+            else:
+                summaries = [_simulate(combination) for combination in combinations]
+        finally:
+            _sweep = None
+            for option, value in app_state.items():
+                setattr(self.app, option, value)
+
+        return self.rank(combinations, summaries)
+
+    @staticmethod
+    def rank(combinations: list, summaries: list) -> pd.DataFrame:
+        """Ranks the simulation summaries by the margin of all trades"""
+
+        rows = []
+        for combination, summary in zip(combinations, summaries):
+            data = summary["data"]
+            all_trades = data.get("all_trades", {})
+            row = dict(combination)
+            row["buy_count"] = data["buy_count"]
+            row["sell_count"] = data["sell_count"]
+            row["margin"] = all_trades.get("margin", data["margin"])
+            row["profit_loss"] = all_trades.get("profit_loss", 0.0)
+            row["fees"] = all_trades.get("fees", 0.0)
+            row["open_trade_margin"] = all_trades.get("open_trade_margin", 0.0)
+            rows.append(row)
+
+        df = pd.DataFrame(rows)
+        return df.sort_values(["margin", "profit_loss"], ascending=False, kind="stable").reset_index(drop=True)
+
+
+class _Options:
+    """Read only view of the app with the swept options applied"""
+
+    def __init__(self, app, options: dict) -> None:
+        self._app = app
+        self._options = options
+
+    def __getattr__(self, name):
+        if name in self._options:
+            return self._options[name]
+        return getattr(self._app, name)
+
+
+def _simulate(combination: dict) -> dict:
+    """Back tests one combination in the shared app and returns its simulation summary"""
+
+    app, df, start, state, trade_tracker = _sweep
+
+    for option, value in combination.items():
+        setattr(app, option, value)
+
+    app.state = copy.copy(state)
+    # the state takes the trailing stop loss from the options when it is built
+    app.state.tsl_pcnt = float(app.trailing_stop_loss) if app.trailing_stop_loss is not None else None
+    app.state.tsl_trigger = app.trailing_stop_loss_trigger
+    app.trade_tracker = trade_tracker.copy()
+
+    Backtest(app, df, start).run()
+
+    # the summary is printed as json when simresultonly is set
+    with redirect_stdout(io.StringIO()):
+        return app._simulation_summary()
@@ -8,11 +8,13 @@ import numpy as np
 import pandas as pd
 
 from utils.PyCryptoBot import truncate
+from models.exchange.ClientPool import get_client
 from models.exchange.ExchangesEnum import Exchange
 from models.exchange.binance import AuthAPI as BAuthAPI
 from models.exchange.coinbase import AuthAPI as CAuthAPI
 from models.exchange.coinbase_pro import AuthAPI as CBAuthAPI
 from models.exchange.kucoin import AuthAPI as KAuthAPI
+from models.OrderLedger import get_ledger
 
 
 class TradingAccount:
@@ -109,7 +111,8 @@ class TradingAccount:
         if self.app.exchange == Exchange.BINANCE:
             if self.mode == "live":
                 # if config is provided and live connect to Binance account portfolio
-                model = BAuthAPI(
+                model = get_client(
+                    BAuthAPI,
                     self.app.api_key,
                     self.app.api_secret,
                     self.app.api_url,
@@ -129,7 +132,8 @@ class TradingAccount:
         if self.app.exchange == Exchange.KUCOIN:
             if self.mode == "live":
                 # if config is provided and live connect to Kucoin account portfolio
-                model = KAuthAPI(
+                model = get_client(
+                    KAuthAPI,
                     self.app.api_key,
                     self.app.api_secret,
                     self.app.api_passphrase,
@@ -149,7 +153,8 @@ class TradingAccount:
         if self.app.exchange == Exchange.COINBASE:
             if self.mode == "live":
                 # if config is provided and live connect to Coinbase Pro account portfolio
-                model = CAuthAPI(
+                model = get_client(
+                    CAuthAPI,
                     self.app.api_key,
                     self.app.api_secret,
                     self.app.api_url,
@@ -171,7 +176,8 @@ class TradingAccount:
         if self.app.exchange == Exchange.COINBASEPRO:
             if self.mode == "live":
                 # if config is provided and live connect to Coinbase Pro account portfolio
-                model = CBAuthAPI(
+                model = get_client(
+                    CBAuthAPI,
                     self.app.api_key,
                     self.app.api_secret,
                     self.app.api_passphrase,
@@ -194,7 +200,8 @@ class TradingAccount:
         if self.app.exchange == Exchange.COINBASE:
             if self.mode == "live":
                 # if config is provided and live connect to Coinbase account portfolio
-                model = CAuthAPI(
+                model = get_client(
+                    CAuthAPI,
                     self.app.api_key,
                     self.app.api_secret,
                     self.app.api_url,
@@ -228,6 +235,44 @@ class TradingAccount:
                 ]
             ]
 
+    def _get_client(self):
+        """Returns the API client of the live exchange account"""
+
+        if self.app.exchange == Exchange.BINANCE:
+            return get_client(BAuthAPI, self.app.api_key, self.app.api_secret, self.app.api_url, recv_window=self.app.recv_window, app=self.app)
+        elif self.app.exchange == Exchange.KUCOIN:
+            return get_client(
+                KAuthAPI, self.app.api_key, self.app.api_secret, self.app.api_passphrase, self.app.api_url, use_cache=self.app.usekucoincache, app=self.app
+            )
+        elif self.app.exchange == Exchange.COINBASEPRO:
+            return get_client(CBAuthAPI, self.app.api_key, self.app.api_secret, self.app.api_passphrase, self.app.api_url, app=self.app)
+        elif self.app.exchange == Exchange.COINBASE:
+            return get_client(CAuthAPI, self.app.api_key, self.app.api_secret, self.app.api_url, app=self.app)
+
+        return None
+
+    def get_last_orders(self, market=""):
+        """Retrieves the latest done orders of a market, oldest first
+
+        Live orders come from an in memory ledger that only fetches the orders created since the
+        last call, so the latest order can be checked every iteration.
+
+        Parameters
+        ----------
+        market : str
+            Market of the orders
+        """
+
+        # validate market is syntactically correct
+        self._check_market_syntax(market)
+
+        if self.mode == "live":
+            client = self._get_client()
+            if client is not None:
+                return get_ledger(client, market).sync()
+
+        return self.get_orders(market, "", "done")
+
     def get_balance(self, currency=""):
         """Retrieves balance either live or simulation
 
@@ -239,7 +284,8 @@ class TradingAccount:
 
         if self.app.exchange == Exchange.KUCOIN:
             if self.mode == "live":
-                model = KAuthAPI(
+                model = get_client(
+                    KAuthAPI,
                     self.app.api_key,
                     self.app.api_secret,
                     self.app.api_passphrase,
@@ -342,7 +388,8 @@ class TradingAccount:
 
         elif self.app.exchange == Exchange.BINANCE:
             if self.mode == "live":
-                model = BAuthAPI(
+                model = get_client(
+                    BAuthAPI,
                     self.app.api_key,
                     self.app.api_secret,
                     self.app.api_url,
@@ -445,7 +492,8 @@ class TradingAccount:
         elif self.app.exchange == Exchange.COINBASE:
             if self.mode == "live":
                 # if config is provided and live connect to Coinbase Pro account portfolio
-                model = CAuthAPI(
+                model = get_client(
+                    CAuthAPI,
                     self.app.api_key,
                     self.app.api_secret,
                     self.app.api_url,
@@ -506,7 +554,8 @@ class TradingAccount:
         elif self.app.exchange == Exchange.COINBASEPRO:
             if self.mode == "live":
                 # if config is provided and live connect to Coinbase Pro account portfolio
-                model = CBAuthAPI(
+                model = get_client(
+                    CBAuthAPI,
                     self.app.api_key,
                     self.app.api_secret,
                     self.app.api_passphrase,
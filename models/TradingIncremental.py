@@ -0,0 +1,554 @@
+"""Incremental (streaming) technical analysis matching TechnicalAnalysis.add_all()"""
+
+from collections import deque
+from math import copysign, inf, isnan, nan, sqrt
+from sys import float_info
+
+import numpy as np
+import pandas as pd
+
+
+def _divide(numerator: float, denominator: float) -> float:
+    """Float division with the numpy semantics for a zero denominator"""
+
+    if denominator == 0:
+        if numerator == 0 or isnan(numerator):
+            return nan
+        return copysign(inf, numerator) * copysign(1.0, denominator)
+    return numerator / denominator
+
+
+class _Ewm:
+    """Running Series.ewm(com=com, adjust=adjust, min_periods=min_periods).mean()"""
+
+    def __init__(self, com: float, adjust: bool = False, min_periods: int = 0) -> None:
+        alpha = 1.0 / (1.0 + com)
+        self._factor = 1.0 - alpha
+        self._new_wt = 1.0 if adjust else alpha
+        self._adjust = adjust
+        self._min_periods = max(min_periods, 1)
+        self._avg = nan
+        self._old_wt = 1.0
+        self._nobs = 0
+
+    def step(self, value: float, commit: bool = True) -> float:
+        avg, old_wt = self._avg, self._old_wt
+        is_observation = value == value
+        nobs = self._nobs + is_observation
+
+        if avg == avg:
+            old_wt *= self._factor
+            if is_observation:
+                if avg != value:
+                    avg = old_wt * avg + self._new_wt * value
+                    avg /= old_wt + self._new_wt
+                old_wt = old_wt + self._new_wt if self._adjust else 1.0
+        elif is_observation:
+            avg = value
+
+        if commit:
+            self._avg, self._old_wt, self._nobs = avg, old_wt, nobs
+
+        return avg if nobs >= self._min_periods else nan
+
+
+class _Ema:
+    """Running pandas_ta ema(), seeded with the mean of the first 'length' values"""
+
+    def __init__(self, length: int) -> None:
+        self._length = length
+        self._seed = []
+        self._ewm = _Ewm((length - 1) / 2.0)
+
+    def step(self, value: float, commit: bool = True) -> float:
+        if self._seed is not None:
+            if len(self._seed) + 1 < self._length:
+                if commit:
+                    self._seed.append(value)
+                return nan
+
+            value = float(np.sum(np.array(self._seed + [value]))) / self._length
+            if commit:
+                self._seed = None
+
+        return self._ewm.step(value, commit)
+
+
+class _RollingMean:
+    """Running Series.rolling(window).sum() or .mean(), window=None is expanding()"""
+
+    def __init__(self, window: int = None, min_periods: int = None, mean: bool = True) -> None:
+        self._window = window
+        self._min_periods = window if min_periods is None else min_periods
+        self._mean = mean
+        self._values = deque()
+        # nobs, neg_ct, sum_x, compensation_add, compensation_remove, num_consecutive_same_value, prev_value
+        self._state = (0, 0, 0.0, 0.0, 0.0, 0, nan)
+
+    def step(self, value: float, commit: bool = True) -> float:
+        nobs, neg_ct, sum_x, compensation_add, compensation_remove, same_count, prev_value = self._state
+
+        if self._window is not None and len(self._values) == self._window:
+            removed = self._values[0]
+            if removed == removed:
+                nobs -= 1
+                y = -removed - compensation_remove
+                t = sum_x + y
+                compensation_remove = t - sum_x - y
+                sum_x = t
+                if copysign(1.0, removed) < 0:
+                    neg_ct -= 1
+
+        if value == value:
+            nobs += 1
+            y = value - compensation_add
+            t = sum_x + y
+            compensation_add = t - sum_x - y
+            sum_x = t
+            if copysign(1.0, value) < 0:
+                neg_ct += 1
+            same_count = same_count + 1 if value == prev_value else 1
+            prev_value = value
+
+        if commit:
+            self._state = (nobs, neg_ct, sum_x, compensation_add, compensation_remove, same_count, prev_value)
+            if self._window is not None:
+                self._values.append(value)
+                if len(self._values) > self._window:
+                    self._values.popleft()
+
+        if not self._mean:
+            if nobs == 0 == self._min_periods:
+                return 0.0
+            if nobs < self._min_periods:
+                return nan
+            return prev_value * nobs if same_count >= nobs else sum_x
+
+        if nobs < self._min_periods or nobs == 0:
+            return nan
+        if same_count >= nobs:
+            return prev_value
+        result = sum_x / nobs
+        if neg_ct == 0 and result < 0:
+            return 0.0
+        if neg_ct == nobs and result > 0:
+            return 0.0
+        return result
+
+
+class _RollingStd:
+    """Running Series.rolling(window).std(ddof) using the Welford updates pandas uses"""
+
+    def __init__(self, window: int, ddof: int = 1) -> None:
+        self._window = window
+        self._ddof = ddof
+        self._values = deque()
+        # nobs, mean_x, ssqdm_x, compensation_add, compensation_remove, num_consecutive_same_value, prev_value
+        self._state = (0, 0.0, 0.0, 0.0, 0.0, 0, nan)
+
+    def step(self, value: float, commit: bool = True) -> float:
+        nobs, mean_x, ssqdm_x, compensation_add, compensation_remove, same_count, prev_value = self._state
+
+        if len(self._values) == self._window:
+            removed = self._values[0]
+            if removed == removed:
+                nobs -= 1
+                if nobs:
+                    prev_mean = mean_x - compensation_remove
+                    y = removed - compensation_remove
+                    t = y - mean_x
+                    compensation_remove = t + mean_x - y
+                    mean_x = mean_x - t / nobs
+                    ssqdm_x = ssqdm_x - (removed - prev_mean) * (removed - mean_x)
+                else:
+                    mean_x = 0.0
+                    ssqdm_x = 0.0
+
+        if value == value:
+            nobs += 1
+            same_count = same_count + 1 if value == prev_value else 1
+            prev_value = value
+            prev_mean = mean_x - compensation_add
+            y = value - compensation_add
+            t = y - mean_x
+            compensation_add = t + mean_x - y
+            mean_x = mean_x + t / nobs
+            ssqdm_x = ssqdm_x + (value - prev_mean) * (value - mean_x)
+
+        if commit:
+            self._state = (nobs, mean_x, ssqdm_x, compensation_add, compensation_remove, same_count, prev_value)
+            self._values.append(value)
+            if len(self._values) > self._window:
+                self._values.popleft()
+
+        if nobs < self._window or nobs <= self._ddof:
+            return nan
+        if nobs == 1 or same_count >= nobs:
+            return 0.0
+        return sqrt(max(ssqdm_x / (nobs - self._ddof), 0.0))
+
+
+class _RollingExtreme:
+    """Running Series.rolling(window).max() or .min() using a monotonic deque"""
+
+    def __init__(self, window: int, maximum: bool = True) -> None:
+        self._window = window
+        self._sign = 1.0 if maximum else -1.0
+        self._count = 0
+        self._nobs = 0
+        self._values = deque()
+        self._candidates = deque()
+
+    def step(self, value: float, commit: bool = True) -> float:
+        is_observation = value == value
+        nobs = self._nobs + is_observation
+        if len(self._values) == self._window and self._values[0] == self._values[0]:
+            nobs -= 1
+
+        result = self._candidates[0][1] if self._candidates else nan
+        if is_observation and (result != result or self._sign * (value - result) > 0):
+            result = value
+
+        if commit:
+            self._nobs = nobs
+            self._values.append(value)
+            if len(self._values) > self._window:
+                self._values.popleft()
+
+            if is_observation:
+                while self._candidates and self._sign * (value - self._candidates[-1][1]) >= 0:
+                    self._candidates.pop()
+                self._candidates.append((self._count, value))
+            while self._candidates and self._candidates[0][0] <= self._count - self._window + 1:
+                self._candidates.popleft()
+            self._count += 1
+
+        return result if nobs >= self._window else nan
+
+
+class IncrementalTechnicalAnalysis:
+    def __init__(self, total_periods: int = 300, max_rows: int = None) -> None:
+        """Streaming technical analysis with O(1) work per candle
+
+        Emits the same columns as TechnicalAnalysis.add_all() for the latest candle.
+        Warm up rows can differ for the ADX columns as add_all() fills them with the
+        mean of the whole frame, including candles that arrive later.
+
+        Parameters
+        ----------
+        total_periods : int
+            same as TechnicalAnalysis, decides if the sma50/sma200 columns are added
+        max_rows : int
+            number of rows add_all() would see (e.g. the 300 candles of a live bot),
+            None matches add_all() over the whole history seen so far
+        """
+
+        if not isinstance(total_periods, int):
+            raise TypeError("total_periods integer required.")
+
+        if total_periods < 26:
+            raise ValueError("total_periods is out of range")
+
+        if max_rows is not None and max_rows < 2:
+            raise ValueError("max_rows is out of range")
+
+        self.total_periods = total_periods
+        self.max_rows = max_rows
+        self.reset()
+
+    def reset(self) -> None:
+        """Clears the running state"""
+
+        self.rows = 0
+        self._pending = None
+        self._last = None
+        self._first = (nan, nan)
+        self._cumprod = 1.0
+        # close, volume and signed volume of the committed rows add_all() still sees
+        self._frame = deque(maxlen=self.max_rows or 0)
+
+        self._sma_periods = [5, 8, 13, 20]
+        if self.total_periods >= 50:
+            self._sma_periods.append(50)
+        if self.total_periods >= 200:
+            self._sma_periods.append(200)
+
+        self._cma = _RollingMean(self.max_rows, 1)
+        self._sma = {period: _RollingMean(period) for period in self._sma_periods}
+        self._ema = {period: _Ema(period) for period in [8, 12, 13, 26]}
+        self._bb20_std = _RollingStd(20, 0)
+        self._close_std = _RollingStd(20, 1)
+        self._tp_mean = _RollingMean(20)
+        self._tp_std = _RollingStd(20, 1)
+        # pandas_ta rma(), ewm(alpha=1/14) is converted to a center of mass by pandas
+        self._rsi_pos = _Ewm((1.0 - 1.0 / 14) / (1.0 / 14), True, 14)
+        self._rsi_neg = _Ewm((1.0 - 1.0 / 14) / (1.0 / 14), True, 14)
+        self._rsi_min = _RollingExtreme(14, False)
+        self._rsi_max = _RollingExtreme(14, True)
+        self._stoch_k = _RollingMean(3)
+        self._stoch_d = _RollingMean(3)
+        self._low_min = _RollingExtreme(14, False)
+        self._high_max = _RollingExtreme(14, True)
+        self._macd_signal = _Ema(9)
+        self._tr = _RollingMean(14, mean=False)
+        self._plus_dm = _RollingMean(14, mean=False)
+        self._minus_dm = _RollingMean(14, mean=False)
+        self._dx = _RollingMean(14)
+        self._adx_fill = {column: _RollingMean(self.max_rows, 1) for column in ["-di14", "+di14", "adx14"]}
+
+    def seed(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Replays a history and returns its indicator columns
+
+        The last row stays pending, so it can still be updated by update()
+        """
+
+        if not isinstance(df, pd.DataFrame):
+            raise TypeError("Pandas DataFrame required.")
+
+        for column in ["open", "high", "low", "close", "volume"]:
+            if column not in df.columns:
+                raise AttributeError(f"Pandas DataFrame '{column}' column required.")
+
+        self.reset()
+
+        rows = [
+            self.update(candle, True)
+            for candle in zip(
+                df["open"].to_numpy(dtype=float),
+                df["high"].to_numpy(dtype=float),
+                df["low"].to_numpy(dtype=float),
+                df["close"].to_numpy(dtype=float),
+                df["volume"].to_numpy(dtype=float),
+            )
+        ]
+
+        return pd.DataFrame(rows, index=df.index)
+
+    def update(self, candle: tuple, new_candle: bool = False) -> dict:
+        """Adds a new candle, or updates the pending one, and returns its indicators
+
+        Parameters
+        ----------
+        candle : tuple
+            (open, high, low, close, volume)
+        new_candle : bool
+            True if the candle follows the pending one, False if it replaces it
+        """
+
+        if new_candle:
+            if self._pending is not None:
+                self._last = self._step(self._pending, True)
+            self.rows += 1
+        elif self._pending is None:
+            raise ValueError("No pending candle to update, seed() or add a new candle first.")
+
+        self._pending = tuple(float(value) for value in candle)
+        return self._step(self._pending, False)
+
+    def update_df(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Applies the last row of an add_all() DataFrame and writes its indicators into it
+
+        The last row either updates the pending candle or is one new candle.
+        """
+
+        if len(df) - self.rows not in (0, 1):
+            raise ValueError("DataFrame does not follow the seeded history.")
+
+        values = self.update(
+            (df["open"].iloc[-1], df["high"].iloc[-1], df["low"].iloc[-1], df["close"].iloc[-1], df["volume"].iloc[-1]),
+            len(df) > self.rows,
+        )
+
+        for column, value in values.items():
+            df.iat[-1, df.columns.get_loc(column)] = value
+
+        return df
+
+    def _step(self, candle: tuple, commit: bool) -> dict:
+        """Indicator values for the candle following the committed rows"""
+
+        _open, high, low, close, volume = candle
+        last = self._last
+        row = {}
+
+        # add_all() only sees the last max_rows candles, frame holds the committed ones
+        slid = self.max_rows is not None and self.rows > self.max_rows
+        if last is None:
+            frame_close, frame_volume = close, volume
+        elif slid:
+            frame_close, frame_volume = self._frame[1][0], self._frame[1][1]
+        else:
+            frame_close, frame_volume = self._first
+
+        # change percentage and cumulative moving average
+        prev_close = last["_close"] if last is not None else nan
+        close_pc = _divide(close, prev_close) - 1 if last is not None else 0.0
+        row["close_pc"] = 0.0 if close_pc != close_pc else close_pc
+        cumprod = nan if slid else self._cumprod * (1 + row["close_pc"])
+        row["close_cpc"] = _divide(close, frame_close) - 1 if slid else cumprod - 1
+        row["cma"] = self._cma.step(close, commit)
+
+        # moving averages
+        sma = {}
+        for period in self._sma_periods:
+            sma[period] = self._sma[period].step(close, commit)
+            row[f"sma{period}"] = close if sma[period] != sma[period] else sma[period]
+
+        ema = {period: self._ema[period].step(close, commit) for period in self._ema}
+        for period in [8, 12, 26]:
+            row[f"ema{period}"] = close if ema[period] != ema[period] else ema[period]
+
+        if self.total_periods < 200:
+            row["goldencross"] = False
+            row["deathcross"] = False
+        else:
+            row["goldencross"] = row["sma50"] > row["sma200"]
+            row["deathcross"] = row["sma50"] < row["sma200"]
+
+        # bollinger bands
+        deviations = 2.0 * self._bb20_std.step(close, commit)
+        valid = sma[20] == sma[20] and deviations == deviations
+        row["bb20_upper"] = sma[20] + deviations if valid else close
+        row["bb20_mid"] = sma[20] if sma[20] == sma[20] else close
+        row["bb20_lower"] = sma[20] - deviations if valid else close
+
+        # fibonacci bollinger bands
+        tp = (high + low + close) / 3
+        fbb_mid = self._tp_mean.step(tp, commit)
+        fbb_sd = 3 * self._tp_std.step(tp, commit)
+        fbb_mid = 0.0 if fbb_mid != fbb_mid else fbb_mid
+        fbb_sd = 0.0 if fbb_sd != fbb_sd else fbb_sd
+        row["fbb_mid"] = fbb_mid
+        for ratio, name in [(0.236, "0_236"), (0.382, "0_382"), (0.5, "0_5"), (0.618, "0_618"), (0.786, "0_786"), (1, "1")]:
+            row[f"fbb_upper{name}"] = fbb_mid + (ratio * fbb_sd)
+        for ratio, name in [(0.236, "0_236"), (0.382, "0_382"), (0.5, "0_5"), (0.618, "0_618"), (0.786, "0_786"), (1, "1")]:
+            row[f"fbb_lower{name}"] = fbb_mid - (ratio * fbb_sd)
+
+        # support and resistance
+        rolling_std = self._close_std.step(close, commit)
+        row["rolling_mean"] = sma[20]
+        row["rolling_std"] = rolling_std
+        row["support"] = sma[20] - 2 * rolling_std
+        row["resistance"] = sma[20] + 2 * rolling_std
+
+        # relative strength index
+        change = close - prev_close
+        positive = self._rsi_pos.step(change if change != change or change > 0 else 0.0, commit)
+        negative = self._rsi_neg.step(change if change != change or change < 0 else 0.0, commit)
+        rsi = _divide(100.0 * positive, positive + abs(negative))
+        row["rsi14"] = 50.0 if rsi != rsi else rsi
+
+        lowest_rsi = self._rsi_min.step(rsi, commit)
+        highest_rsi = self._rsi_max.step(rsi, commit)
+        rsi_range = highest_rsi - lowest_rsi
+        stoch = _divide(100 * (rsi - lowest_rsi), float_info.epsilon if rsi_range == 0 else rsi_range)
+        stoch_k = self._stoch_k.step(stoch, commit)
+        stoch_d = self._stoch_d.step(stoch_k, commit)
+        row["stochrsi14k"] = 50.0 if stoch_k != stoch_k else stoch_k
+        row["stochrsi14d"] = 50.0 if stoch_d != stoch_d else stoch_d
+
+        # williams %r
+        lowest_low = self._low_min.step(low, commit)
+        highest_high = self._high_max.step(high, commit)
+        williamsr = 100 * (_divide(close - lowest_low, highest_high - lowest_low) - 1)
+        row["williamsr14"] = close if williamsr != williamsr else williamsr
+
+        # moving average convergence divergence
+        macd = ema[12] - ema[26]
+        signal = self._macd_signal.step(macd, commit) if macd == macd else nan
+        row["macd"] = 0.0 if macd != macd else macd
+        row["signal"] = 0.0 if signal != signal else signal
+
+        # on balance volume, add_all() starts the cumulative sum at the first row of the frame
+        if last is None:
+            signed_volume = volume
+        elif close == prev_close:
+            signed_volume = 0.0
+        elif close > prev_close:
+            signed_volume = volume
+        elif close < prev_close:
+            signed_volume = -volume
+        else:
+            signed_volume = frame_volume
+        if last is None:
+            prev_obv = nan
+        elif slid:
+            prev_obv = last["obv"] - self._frame[0][1] - self._frame[1][2] + self._frame[1][1]
+        else:
+            prev_obv = last["obv"]
+        obv = signed_volume if last is None else prev_obv + signed_volume
+        obv_pc = (_divide(obv, prev_obv) - 1) * 100
+        row["obv"] = obv
+        row["obv_pc"] = float(np.round(0.0 if obv_pc != obv_pc else obv_pc, 2))
+
+        # elder ray index
+        elder_ray_bull = high - ema[13]
+        elder_ray_bear = low - ema[13]
+        row["elder_ray_bull"] = 0.0 if elder_ray_bull != elder_ray_bull else elder_ray_bull
+        row["elder_ray_bear"] = 0.0 if elder_ray_bear != elder_ray_bear else elder_ray_bear
+        prev_bull = last["elder_ray_bull"] if last is not None else nan
+        prev_bear = last["elder_ray_bear"] if last is not None else nan
+        row["eri_buy"] = bool((row["elder_ray_bear"] < 0 and row["elder_ray_bear"] > prev_bear) or row["elder_ray_bull"] > prev_bull)
+        row["eri_sell"] = bool((row["elder_ray_bull"] > 0 and row["elder_ray_bull"] < prev_bull) or row["elder_ray_bear"] < prev_bear)
+
+        # ema buy signals
+        self._add_crossover(row, last, "ema8gtema12", row["ema8"] > row["ema12"])
+        self._add_crossover(row, last, "ema8ltema12", row["ema8"] < row["ema12"])
+        self._add_crossover(row, last, "ema12gtema26", row["ema12"] > row["ema26"])
+        self._add_crossover(row, last, "ema12ltema26", row["ema12"] < row["ema26"])
+
+        # sma buy signals
+        if self.total_periods >= 200:
+            self._add_crossover(row, last, "sma5gtsma8", row["sma5"] > row["sma8"])
+            self._add_crossover(row, last, "sma5ltsma8", row["sma5"] < row["sma8"])
+            self._add_crossover(row, last, "sma8gtsma13", row["sma8"] > row["sma13"])
+            self._add_crossover(row, last, "sma8ltsma13", row["sma8"] < row["sma13"])
+            self._add_crossover(row, last, "sma50gtsma200", row["sma50"] > row["sma200"])
+            self._add_crossover(row, last, "sma50ltsma200", row["sma50"] < row["sma200"])
+
+        # macd buy signals
+        self._add_crossover(row, last, "macdgtsignal", row["macd"] > row["signal"])
+        self._add_crossover(row, last, "macdltsignal", row["macd"] < row["signal"])
+
+        # average directional index
+        prev_high = last["_high"] if last is not None else nan
+        prev_low = last["_low"] if last is not None else nan
+        minus_dm = prev_low - low
+        plus_dm = high - prev_high
+        plus_dm = plus_dm if plus_dm > minus_dm and plus_dm > 0 else 0.0
+        minus_dm = minus_dm if minus_dm > plus_dm and minus_dm > 0 else 0.0
+        true_range = high - low
+        if last is not None:
+            true_range = max(true_range, abs(high - prev_close), abs(low - prev_close))
+        tr14 = self._tr.step(true_range, commit)
+        plus_di = _divide(self._plus_dm.step(plus_dm, commit), tr14) * 100
+        minus_di = _divide(self._minus_dm.step(minus_dm, commit), tr14) * 100
+        dx = _divide(abs(plus_di - minus_di), plus_di + minus_di) * 100
+        adx = self._dx.step(dx, commit)
+        for column, value in [("-di14", minus_di), ("+di14", plus_di), ("adx14", adx)]:
+            mean = self._adx_fill[column].step(value, commit)
+            row[column] = mean if value != value else value
+        row["adx14_trend"] = "bull" if row["+di14"] > row["-di14"] else "bear"
+        row["adx14_strength"] = "strong" if row["adx14"] > 25 else ("weak" if row["adx14"] < 20 else "normal")
+
+        # bbands buy signals
+        self._add_crossover(row, last, "closegtbb20_upper", close > row["bb20_upper"])
+        self._add_crossover(row, last, "closeltbb20_mid", close < row["bb20_mid"])
+        self._add_crossover(row, last, "closeltbb20_lower", close < row["bb20_lower"])
+        self._add_crossover(row, last, "closegtbb20_mid", close > row["bb20_mid"])
+
+        if commit:
+            if last is None:
+                self._first = (close, volume)
+            self._cumprod = cumprod
+            self._frame.append((close, volume, signed_volume))
+            row["_close"], row["_high"], row["_low"] = close, high, low
+
+        return row
+
+    @staticmethod
+    def _add_crossover(row: dict, last: dict, column: str, value: bool) -> None:
+        """Adds a signal column and its crossover column"""
+
+        row[column] = bool(value)
+        row[column + "co"] = bool(value) and (last is None or last[column] != bool(value))
@@ -220,7 +220,7 @@ def default_config_parse(app, config):
     config_option_bool(option_name="graphs", option_default=False, store_name="save_graphs", store_invert=False)
 
     config_option_str(
-        option_name="sim", option_default=0, store_name="is_sim", valid_options=["slow", "fast", "slow-sample", "fast-sample"], disable_variable="is_live"
+        option_name="sim", option_default=0, store_name="is_sim", valid_options=["slow", "fast", "slow-sample", "fast-sample", "fast-vector"], disable_variable="is_live"
     )
     config_option_date(option_name="simstartdate", option_default=None, store_name="simstartdate", date_format="%Y-%m-%d", allow_now=False)
     config_option_date(option_name="simenddate", option_default=None, store_name="simenddate", date_format="%Y-%m-%d", allow_now=True)
@@ -238,16 +238,23 @@ def default_config_parse(app, config):
 
     config_option_bool(option_name="log", option_default=True, store_name="disablelog", store_invert=True)
     config_option_bool(option_name="smartswitch", option_default=False, store_name="smart_switch", store_invert=False)
+    config_option_bool(option_name="smartswitchresample", option_default=False, store_name="smart_switch_resample", store_invert=False)
     config_option_bool(option_name="tradetracker", option_default=False, store_name="disabletracker", store_invert=True)
     config_option_bool(option_name="autorestart", option_default=False, store_name="autorestart", store_invert=False)
     config_option_bool(option_name="websocket", option_default=False, store_name="websocket", store_invert=False)
+    config_option_bool(option_name="websockethub", option_default=False, store_name="websocket_hub", store_invert=False)
+    config_option_bool(option_name="eventdriven", option_default=False, store_name="event_driven", store_invert=False)
     config_option_bool(option_name="insufficientfundslogging", option_default=False, store_name="enableinsufficientfundslogging", store_invert=False)
     config_option_bool(option_name="logbuysellinjson", option_default=False, store_name="logbuysellinjson", store_invert=False)
     config_option_bool(option_name="manualtradesonly", option_default=False, store_name="manual_trades_only", store_invert=False)
     config_option_str(option_name="startmethod", option_default="standard", store_name="startmethod", valid_options=["scanner", "standard", "telegram"])
     config_option_int(option_name="recvwindow", option_default=5000, store_name="recv_window", value_min=5000, value_max=60000)
+    config_option_int(option_name="apipoolsize", option_default=10, store_name="api_pool_size", value_min=1, value_max=100)
+    config_option_float(option_name="apitimeout", option_default=30.0, store_name="api_timeout", value_min=1, value_max=300)
+    config_option_bool(option_name="sharedquota", option_default=False, store_name="usesharedquota", store_invert=False)
     config_option_str(option_name="lastaction", option_default=None, store_name="last_action", valid_options=["BUY", "SELL"])
     config_option_bool(option_name="kucoincache", option_default=False, store_name="usekucoincache", store_invert=False)
+    config_option_bool(option_name="candlestore", option_default=False, store_name="usecandlestore", store_invert=False)
     config_option_bool(option_name="exitaftersell", option_default=False, store_name="exitaftersell", store_invert=False)
 
     config_option_int(option_name="adjusttotalperiods", option_default=300, store_name="adjusttotalperiods", value_min=200, value_max=500)
@@ -0,0 +1,69 @@
+"""Asyncio interface to the exchange API clients"""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial, wraps
+from threading import Lock
+
+from models.exchange import ClientPool
+
+_lock = Lock()
+_executor = None
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """Returns the thread pool the requests run on, one worker per pooled connection"""
+
+    global _executor
+
+    with _lock:
+        if _executor is None or _executor._max_workers != ClientPool.pool_size():
+            if _executor is not None:
+                _executor.shutdown(wait=False)
+            _executor = ThreadPoolExecutor(max_workers=ClientPool.pool_size(), thread_name_prefix="exchange-api")
+
+        return _executor
+
+
+class AsyncAPI:
+    def __init__(self, api: object) -> None:
+        """Asyncio exchange API object model
+
+        Every method of the wrapped PublicAPI or AuthAPI client is available as a coroutine,
+        e.g. `await AsyncAPI(api).get_historical_data(market, granularity, None)`. The requests
+        run concurrently on a shared thread pool over the pooled exchange sessions.
+
+        Parameters
+        ----------
+        api : object
+            Exchange PublicAPI or AuthAPI client
+        """
+
+        if api is None:
+            raise TypeError("Exchange API client required.")
+
+        self.api = api
+
+    def __getattr__(self, name: str):
+        attr = getattr(self.api, name)
+        if not callable(attr):
+            return attr
+
+        @wraps(attr)
+        async def coroutine(*args, **kwargs):
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(get_executor(), partial(attr, *args, **kwargs))
+
+        return coroutine
+
+
+async def gather(calls: list, limit: int = None) -> list:
+    """Awaits many coroutines with at most limit in flight, exceptions are returned in place of results"""
+
+    semaphore = asyncio.Semaphore(limit or ClientPool.pool_size())
+
+    async def bounded(call):
+        async with semaphore:
+            return await call
+
+    return await asyncio.gather(*[bounded(call) for call in calls], return_exceptions=True)
@@ -0,0 +1,217 @@
+"""Asyncio runtime of the exchange websocket clients"""
+
+import asyncio
+from collections import deque
+from threading import Lock
+
+# what a full queue does with a new item
+DROP_OLDEST = "oldest"
+DROP_NEWEST = "newest"
+
+
+def hook_events(client, on_ticker, on_candle_closed) -> None:
+    """Adds handlers to the on_ticker and on_candle_closed events of a websocket client, after the handlers it has"""
+
+    client_on_ticker, client_on_candle_closed = client.on_ticker, client.on_candle_closed
+
+    def ticker(market: str, date, price: float) -> None:
+        client_on_ticker(market, date, price)
+        on_ticker(market, date, price)
+
+    def candle_closed(market: str, candle: tuple) -> None:
+        client_on_candle_closed(market, candle)
+        on_candle_closed(market, candle)
+
+    client.on_ticker = ticker
+    client.on_candle_closed = candle_closed
+
+
+def validate_queue(maxsize: int, drop: str) -> None:
+    if maxsize < 1:
+        raise ValueError("The queue has to keep at least one item.")
+
+    if drop not in (DROP_OLDEST, DROP_NEWEST):
+        raise ValueError(f"Drop policy options: {DROP_OLDEST}, {DROP_NEWEST}")
+
+
+class DropQueue:
+    def __init__(self, maxsize: int = 100, drop: str = DROP_OLDEST) -> None:
+        """Bounded asyncio queue that drops items instead of blocking the producer
+
+        Parameters
+        ----------
+        maxsize : int
+            items kept
+        drop : str
+            DROP_OLDEST drops the oldest item for a new one, DROP_NEWEST drops the new item
+        """
+
+        validate_queue(maxsize, drop)
+
+        self.maxsize = maxsize
+        self.drop = drop
+        self.dropped = 0
+
+        self._items = deque()
+        self._ready = asyncio.Event()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def put(self, item) -> bool:
+        """Adds an item without waiting, returns False if the item was dropped"""
+
+        if len(self._items) >= self.maxsize:
+            self.dropped += 1
+            if self.drop == DROP_NEWEST:
+                return False
+            self._items.popleft()
+
+        self._items.append(item)
+        self._ready.set()
+        return True
+
+    async def get(self):
+        while not self._items:
+            self._ready.clear()
+            await self._ready.wait()
+
+        return self._items.popleft()
+
+
+class AsyncWebSocket:
+    def __init__(self, client, queue_size: int = 100, drop: str = DROP_OLDEST) -> None:
+        """Asyncio interface to an exchange websocket client
+
+        The client reads the frames on its own thread and keeps its tickers and candles
+        attributes. The runtime hands its events to the event loop without ever blocking the
+        reader: tickers are coalesced per market, at most one wake up is pending however fast
+        they arrive, and closed candles go to the consumers over bounded queues, so a slow
+        consumer neither grows memory nor holds up the feed.
+
+        Parameters
+        ----------
+        client : WebSocketClient
+            exchange websocket client with the on_ticker and on_candle_closed events
+        queue_size : int
+            closed candles kept for a consumer that has not read them
+        drop : str
+            drop policy of the consumer queues, DROP_OLDEST or DROP_NEWEST
+        """
+
+        validate_queue(queue_size, drop)
+
+        self.client = client
+        self.queue_size = queue_size
+        self.drop = drop
+
+        self._loop = None
+        self._lock = Lock()
+        self._tickers = {}
+        self._changed = set()
+        self._flush_pending = False
+        self._ticker_waiters = []
+        self._candle_waiters = []
+        self._queues = []
+
+        hook_events(client, self._on_ticker, self._on_candle_closed)
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.close()
+
+    async def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self.client.start()
+
+    async def close(self) -> None:
+        if self._loop is None:
+            return
+
+        # the client joins its threads on close
+        await self._loop.run_in_executor(None, self.client.close)
+        self._loop = None
+
+    def ticker(self, market: str) -> tuple:
+        """Latest (date, price) of a market, None before its first ticker"""
+
+        return self._tickers.get(market)
+
+    async def next_ticker(self, market: str = None, timeout: float = None) -> tuple:
+        """Waits for the next ticker of a market, or of any market, returns (market, date, price)
+
+        Only the latest ticker of a market counts, tickers that arrived while nobody waited are skipped.
+        """
+
+        return await self._wait(self._ticker_waiters, market, timeout)
+
+    async def next_candle(self, market: str = None, timeout: float = None) -> tuple:
+        """Waits for the next closed candle of a market, or of any market
+
+        Returns (market, (epoch, low, high, open, close, volume)), raises asyncio.TimeoutError
+        when no candle closes within timeout seconds.
+        """
+
+        return await self._wait(self._candle_waiters, market, timeout)
+
+    async def _wait(self, waiters: list, market: str, timeout: float) -> tuple:
+        waiter = (market, asyncio.get_running_loop().create_future())
+        waiters.append(waiter)
+        try:
+            return await asyncio.wait_for(waiter[1], timeout)
+        finally:
+            if waiter in waiters:
+                waiters.remove(waiter)
+
+    def subscribe(self, queue_size: int = None, drop: str = None) -> DropQueue:
+        """Returns a queue that receives every closed candle as (market, candle)"""
+
+        queue = DropQueue(queue_size or self.queue_size, drop or self.drop)
+        self._queues.append(queue)
+        return queue
+
+    def unsubscribe(self, queue: DropQueue) -> None:
+        if queue in self._queues:
+            self._queues.remove(queue)
+
+    def _on_ticker(self, market: str, date, price: float) -> None:
+        # runs on the client thread
+        with self._lock:
+            self._tickers[market] = (date, price)
+            self._changed.add(market)
+            if self._flush_pending or self._loop is None:
+                return
+            self._flush_pending = True
+
+        self._loop.call_soon_threadsafe(self._flush_tickers)
+
+    def _flush_tickers(self) -> None:
+        with self._lock:
+            changed, self._changed = self._changed, set()
+            self._flush_pending = False
+
+        for market in changed:
+            self._resolve(self._ticker_waiters, market, (market, *self._tickers[market]))
+
+    def _on_candle_closed(self, market: str, candle: tuple) -> None:
+        # runs on the client thread
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._publish_candle, market, tuple(candle))
+
+    def _publish_candle(self, market: str, candle: tuple) -> None:
+        for queue in self._queues:
+            queue.put((market, candle))
+
+        self._resolve(self._candle_waiters, market, (market, candle))
+
+    @staticmethod
+    def _resolve(waiters: list, market: str, result: tuple) -> None:
+        for waiter in list(waiters):
+            waiting_market, future = waiter
+            if waiting_market is None or waiting_market == market:
+                if not future.done():
+                    future.set_result(result)
+                waiters.remove(waiter)
@@ -0,0 +1,132 @@
+"""Shared exchange HTTP sessions and API clients"""
+
+import json
+import os
+from threading import RLock
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    import orjson
+except ImportError:  # optional faster JSON decoder
+    orjson = None
+
+DEFAULT_POOL_SIZE = 10
+DEFAULT_TIMEOUT = 30.0
+
+# requests and websockets go to this base URL instead of the exchange, e.g. http://127.0.0.1:8080
+MOCK_EXCHANGE_ENV = "PYCRYPTOBOT_MOCK_EXCHANGE"
+
+_lock = RLock()
+_sessions = {}
+_clients = {}
+_pool_size = DEFAULT_POOL_SIZE
+_timeout = DEFAULT_TIMEOUT
+
+
+class PooledSession(requests.Session):
+    """Keep-alive session with a sized connection pool and a default request timeout"""
+
+    def __init__(self, pool_size: int = DEFAULT_POOL_SIZE, timeout: float = DEFAULT_TIMEOUT) -> None:
+        super().__init__()
+
+        self.timeout = timeout
+
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.mount("https://", adapter)
+        self.mount("http://", adapter)
+
+    def request(self, method, url, **kwargs):
+        if kwargs.get("timeout") is None:
+            kwargs["timeout"] = self.timeout
+
+        return super().request(method, mock_url(url), **kwargs)
+
+
+def mock_url(url: str) -> str:
+    """Routes an exchange URL to the mock exchange server when one is configured"""
+
+    base = os.environ.get(MOCK_EXCHANGE_ENV, "")
+    if base == "":
+        return url
+
+    parts = urlsplit(url)
+    if parts.scheme in ("ws", "wss"):
+        base = base.replace("https://", "wss://", 1).replace("http://", "ws://", 1)
+
+    # the exchange host becomes the first path segment so the server knows which exchange was called
+    return f"{base.rstrip('/')}/{parts.netloc}{parts.path}" + (f"?{parts.query}" if parts.query else "")
+
+
+def configure(pool_size: int = DEFAULT_POOL_SIZE, timeout: float = DEFAULT_TIMEOUT) -> None:
+    """Sets the connection pool size and request timeout of the shared sessions"""
+
+    global _pool_size, _timeout
+
+    if not isinstance(pool_size, int) or pool_size < 1:
+        raise ValueError("Connection pool size must be a positive integer.")
+
+    if not isinstance(timeout, (int, float)) or timeout <= 0:
+        raise ValueError("Request timeout must be a positive number.")
+
+    with _lock:
+        if pool_size != _pool_size or timeout != _timeout:
+            _pool_size, _timeout = pool_size, float(timeout)
+            close()
+
+
+def pool_size() -> int:
+    """Returns the connection pool size of the shared sessions"""
+
+    return _pool_size
+
+
+def get_session(api_url: str) -> requests.Session:
+    """Returns the shared session for an exchange API host"""
+
+    url = urlsplit(api_url)
+    key = f"{url.scheme}://{url.netloc}" if url.netloc else api_url
+
+    with _lock:
+        if key not in _sessions:
+            _sessions[key] = PooledSession(_pool_size, _timeout)
+
+        return _sessions[key]
+
+
+def decode_json(resp: requests.Response):
+    """Decodes a JSON response body, with orjson when it is installed"""
+
+    if orjson is not None:
+        return orjson.loads(resp.content)
+
+    return json.loads(resp.content)
+
+
+def get_client(cls, *args, **kwargs):
+    """Returns one long-lived API client per class, credentials and options"""
+
+    key = (cls, args, tuple(sorted(kwargs.items())))
+    try:
+        hash(key)
+    except TypeError:
+        return cls(*args, **kwargs)
+
+    with _lock:
+        if key not in _clients:
+            _clients[key] = cls(*args, **kwargs)
+
+        return _clients[key]
+
+
+def close() -> None:
+    """Closes the shared sessions and forgets the API clients"""
+
+    with _lock:
+        for session in _sessions.values():
+            session.close()
+
+        _sessions.clear()
+        _clients.clear()
@@ -0,0 +1,119 @@
+"""Exchange metadata cache for fees, market filters, increments and product lists"""
+
+import time
+from functools import wraps
+from threading import RLock
+
+import pandas as pd
+
+FEES_TTL = 3600  # fee tiers follow the 30 day trading volume
+MARKETS_TTL = 86400  # filters, tick and lot sizes and product lists rarely change
+
+
+class TTLCache:
+    def __init__(self, clock=time.monotonic) -> None:
+        """Thread safe cache with a time to live for each key"""
+
+        self._clock = clock
+        self._lock = RLock()
+        self._entries = {}
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._expire()
+            return len(self._entries)
+
+    def _expire(self) -> None:
+        now = self._clock()
+        for key in [key for key, (expires, _) in self._entries.items() if expires <= now]:
+            del self._entries[key]
+
+    def get(self, key, default=None):
+        """Returns the value of a key, or the default when it is missing or expired"""
+
+        with self._lock:
+            if key in self._entries:
+                expires, value = self._entries[key]
+                if expires > self._clock():
+                    return value
+                del self._entries[key]
+
+            return default
+
+    def set(self, key, value, ttl: float) -> None:
+        """Stores the value of a key for ttl seconds"""
+
+        if ttl <= 0:
+            raise ValueError("Cache time to live must be positive.")
+
+        with self._lock:
+            self._entries[key] = (self._clock() + ttl, value)
+
+    def invalidate(self, match=None) -> int:
+        """Removes every key, or the keys a predicate matches, returns the number removed"""
+
+        with self._lock:
+            keys = [key for key in self._entries if match is None or match(key)]
+            for key in keys:
+                del self._entries[key]
+
+            return len(keys)
+
+
+_cache = TTLCache()
+_missing = object()
+
+
+def _copy(value):
+    return value.copy() if isinstance(value, (pd.DataFrame, pd.Series, list, dict)) else value
+
+
+def _is_empty(value) -> bool:
+    return value is None or (isinstance(value, (pd.DataFrame, pd.Series, list, dict)) and len(value) == 0)
+
+
+def _client_key(api) -> tuple:
+    # clients of the same account share entries, including the throwaway clients order methods create
+    return (type(api).__module__, type(api).__name__, getattr(api, "_api_url", ""), getattr(api, "_api_key", ""))
+
+
+def cached(ttl: float):
+    """Caches an exchange client method per account and arguments for ttl seconds
+
+    Empty responses are not cached so a failed request is retried on the next call.
+    """
+
+    def decorator(func):
+        @wraps(func)
+        def wrapper(self, *args, **kwargs):
+            try:
+                key = _client_key(self) + (func.__name__, args, tuple(sorted(kwargs.items())))
+                hash(key)
+            except TypeError:
+                return func(self, *args, **kwargs)
+
+            value = _cache.get(key, _missing)
+            if value is _missing:
+                value = func(self, *args, **kwargs)
+                if _is_empty(value):
+                    return value
+                _cache.set(key, _copy(value), ttl)
+
+            return _copy(value)
+
+        return wrapper
+
+    return decorator
+
+
+def invalidate(api=None, method: str = None) -> int:
+    """Drops cached metadata, for every client or one client, and for every method or one method"""
+
+    client_key = _client_key(api) if api is not None else None
+
+    def match(key) -> bool:
+        if client_key is not None and key[:4] != client_key:
+            return False
+        return method is None or key[4] == method
+
+    return _cache.invalidate(match)
@@ -0,0 +1,232 @@
+"""Exchange API rate limiting"""
+
+import mmap
+import os
+import struct
+import tempfile
+import time
+from contextlib import contextmanager
+from threading import Lock
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows
+    fcntl = None
+
+from models.exchange.ExchangesEnum import Exchange
+
+# (capacity, tokens per second) for each exchange and endpoint class
+RATE_LIMITS = {
+    (Exchange.BINANCE, "weight"): (1200, 1200 / 60),  # 1200 request weight per minute
+    (Exchange.BINANCE, "orders"): (50, 50 / 10),  # 50 orders per 10 seconds
+    (Exchange.COINBASE, "public"): (10, 10),  # 10 requests per second
+    (Exchange.COINBASE, "private"): (30, 30),  # 30 requests per second
+    (Exchange.COINBASEPRO, "public"): (15, 10),  # 10 requests per second, bursts of 15
+    (Exchange.COINBASEPRO, "private"): (30, 15),  # 15 requests per second, bursts of 30
+    (Exchange.KUCOIN, "public"): (30, 30 / 3),  # 30 requests per 3 seconds
+    (Exchange.KUCOIN, "private"): (45, 45 / 3),  # 45 requests per 3 seconds
+}
+
+# Binance request weights, every other endpoint weighs 1
+BINANCE_WEIGHTS = {
+    "/api/v3/account": 10,
+    "/api/v3/allOrders": 10,
+    "/api/v3/exchangeInfo": 10,
+}
+
+# Binance request weights when no symbol is given
+BINANCE_WEIGHTS_ALL_SYMBOLS = {
+    "/api/v3/ticker/24hr": 40,
+    "/api/v3/ticker/price": 2,
+}
+
+# Binance kline weights by the upper bound of the limit, a request without a limit gets 500 candles
+BINANCE_KLINES_WEIGHTS = ((99, 1), (499, 2), (1000, 5))
+BINANCE_KLINES_MAX_WEIGHT = 10
+
+SHARED_QUOTA_PATH = os.path.join(tempfile.gettempdir(), "pycryptobot-quota")
+
+_lock = Lock()
+_limiters = {}
+_shared_path = None
+
+
+class TokenBucket:
+    def __init__(self, capacity: float, rate: float, clock=time.monotonic, sleep=time.sleep) -> None:
+        """Token bucket rate limiter
+
+        Parameters
+        ----------
+        capacity : float
+            Maximum number of tokens, the size of a burst
+        rate : float
+            Tokens added per second
+        """
+
+        if capacity <= 0 or rate <= 0:
+            raise ValueError("Token bucket capacity and rate must be positive.")
+
+        self.capacity = float(capacity)
+        self.rate = float(rate)
+
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = Lock()
+        self._tokens = self.capacity
+        self._updated = clock()
+
+    def _refill(self) -> None:
+        now = self._clock()
+        self._tokens = min(self.capacity, self._tokens + max(0.0, now - self._updated) * self.rate)
+        self._updated = now
+
+    @contextmanager
+    def _state(self):
+        with self._lock:
+            self._refill()
+            yield
+
+    @property
+    def tokens(self) -> float:
+        with self._state():
+            return self._tokens
+
+    def acquire(self, tokens: float = 1) -> float:
+        """Takes tokens from the bucket, blocking until they are available, returns the seconds waited"""
+
+        tokens = min(float(tokens), self.capacity)
+
+        with self._state():
+            # reserve the tokens so concurrent callers queue up behind each other
+            self._tokens -= tokens
+            wait = max(0.0, -self._tokens / self.rate)
+
+        if wait > 0:
+            self._sleep(wait)
+
+        return wait
+
+    def update(self, used: float) -> None:
+        """Aligns the bucket with the usage reported by the exchange"""
+
+        with self._state():
+            self._tokens = min(self._tokens, self.capacity - float(used))
+
+    def backoff(self, seconds: float) -> None:
+        """Empties the bucket for a number of seconds after the exchange rejected a request"""
+
+        with self._state():
+            self._tokens = min(self._tokens, -float(seconds) * self.rate)
+
+
+class SharedTokenBucket(TokenBucket):
+    def __init__(self, path: str, capacity: float, rate: float, clock=time.time, sleep=time.sleep) -> None:
+        """Token bucket shared by every process on the host
+
+        The bucket state lives in a memory mapped file locked with flock, callers reserve tokens
+        in the order they arrive so every bot sharing the quota is served in turn.
+
+        Parameters
+        ----------
+        path : str
+            Bucket state file, processes using the same file share the bucket
+        capacity : float
+            Maximum number of tokens, the size of a burst
+        rate : float
+            Tokens added per second
+        """
+
+        if fcntl is None:
+            raise RuntimeError("A shared token bucket requires fcntl file locking.")
+
+        super().__init__(capacity, rate, clock=clock, sleep=sleep)
+
+        self.path = path
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        try:
+            if os.fstat(self._fd).st_size < struct.calcsize("dd"):
+                os.ftruncate(self._fd, struct.calcsize("dd"))
+                os.pwrite(self._fd, struct.pack("dd", self._tokens, self._updated), 0)
+            self._mmap = mmap.mmap(self._fd, struct.calcsize("dd"))
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    @contextmanager
+    def _state(self):
+        with self._lock:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                self._tokens, self._updated = struct.unpack_from("dd", self._mmap)
+                self._refill()
+                yield
+                struct.pack_into("dd", self._mmap, 0, self._tokens, self._updated)
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def close(self) -> None:
+        self._mmap.close()
+        os.close(self._fd)
+
+
+def configure(shared: bool = False, path: str = SHARED_QUOTA_PATH) -> None:
+    """Shares the rate limits with every bot on the host that uses the same path"""
+
+    global _shared_path
+
+    if shared and fcntl is None:
+        raise RuntimeError("A shared API quota requires fcntl file locking.")
+
+    with _lock:
+        shared_path = path if shared else None
+        if shared_path != _shared_path:
+            for limiter in _limiters.values():
+                if isinstance(limiter, SharedTokenBucket):
+                    limiter.close()
+            _limiters.clear()
+            _shared_path = shared_path
+
+
+def get_limiter(exchange: Exchange, endpoint: str) -> TokenBucket:
+    """Returns the shared rate limiter for an exchange endpoint class"""
+
+    if (exchange, endpoint) not in RATE_LIMITS:
+        raise ValueError(f"No rate limit for {exchange} {endpoint} endpoints.")
+
+    with _lock:
+        if (exchange, endpoint) not in _limiters:
+            if _shared_path is not None:
+                os.makedirs(_shared_path, exist_ok=True)
+                path = os.path.join(_shared_path, f"{exchange.value}-{endpoint}.bucket")
+                _limiters[(exchange, endpoint)] = SharedTokenBucket(path, *RATE_LIMITS[(exchange, endpoint)])
+            else:
+                _limiters[(exchange, endpoint)] = TokenBucket(*RATE_LIMITS[(exchange, endpoint)])
+
+        return _limiters[(exchange, endpoint)]
+
+
+def binance_weight(uri: str, payload: dict = None) -> int:
+    """Returns the Binance request weight of an endpoint"""
+
+    if not payload or "symbol" not in payload:
+        if uri in BINANCE_WEIGHTS_ALL_SYMBOLS:
+            return BINANCE_WEIGHTS_ALL_SYMBOLS[uri]
+
+    if uri == "/api/v3/klines":
+        limit = int((payload or {}).get("limit", 500))
+        for upper, weight in BINANCE_KLINES_WEIGHTS:
+            if limit <= upper:
+                return weight
+        return BINANCE_KLINES_MAX_WEIGHT
+
+    return BINANCE_WEIGHTS.get(uri, 1)
+
+
+def retry_after(resp, default: float = 1.0) -> float:
+    """Returns the seconds to wait after a rate limited response"""
+
+    try:
+        return float(resp.headers.get("Retry-After", default))
+    except (TypeError, ValueError):
+        return default
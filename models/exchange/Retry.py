@@ -0,0 +1,221 @@
+"""Exchange API retry policy and circuit breakers"""
+
+import random
+import re
+import time
+from threading import Lock
+
+from models.exchange.ExchangesEnum import Exchange
+from models.exchange.Granularity import Granularity
+
+# consecutive failed requests before an endpoint fails fast
+FAILURE_THRESHOLD = 5
+
+# seconds an endpoint fails fast before a trial request is let through
+RESET_TIMEOUT = 60.0
+
+# backoff of the first retry and the longest backoff, in seconds
+BACKOFF_BASE = 1.0
+BACKOFF_CAP = 30.0
+
+# seconds kept free before the next candle closes, and the shortest deadline
+DEADLINE_MARGIN = 5.0
+MIN_DEADLINE = 10.0
+
+# path segments that identify an order, account or request rather than an endpoint
+_ID_SEGMENT = re.compile(r"^(\d+|[0-9a-fA-F]{16,}|[0-9a-fA-F]{8}(-[0-9a-fA-F]{4}){3}-[0-9a-fA-F]{12})$")
+
+_lock = Lock()
+_breakers = {}
+
+
+class CircuitBreaker:
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half-open"
+
+    def __init__(self, failure_threshold: int = FAILURE_THRESHOLD, reset_timeout: float = RESET_TIMEOUT, clock=time.monotonic) -> None:
+        """Circuit breaker for an exchange endpoint
+
+        The breaker opens after consecutive failures and rejects requests until the reset timeout
+        has passed, then lets a trial request through which closes or reopens it. A trial that never
+        reports back is retried after another reset timeout.
+
+        Parameters
+        ----------
+        failure_threshold : int
+            Consecutive failures that open the breaker
+        reset_timeout : float
+            Seconds the breaker stays open
+        """
+
+        if failure_threshold < 1:
+            raise ValueError("Circuit breaker failure threshold must be at least 1.")
+
+        if reset_timeout <= 0:
+            raise ValueError("Circuit breaker reset timeout must be positive.")
+
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = float(reset_timeout)
+
+        self._clock = clock
+        self._lock = Lock()
+        self._failures = 0
+        self._opened = None
+        self._trial = False
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state()
+
+    def _state(self) -> str:
+        if self._opened is None:
+            return self.CLOSED
+        if self._clock() - self._opened < self.reset_timeout:
+            return self.OPEN
+        return self.HALF_OPEN
+
+    @property
+    def retry_in(self) -> float:
+        """Seconds until the breaker lets a trial request through"""
+
+        with self._lock:
+            if self._opened is None:
+                return 0.0
+            return max(0.0, self._opened + self.reset_timeout - self._clock())
+
+    def allow(self) -> bool:
+        """Returns True when a request may be sent"""
+
+        with self._lock:
+            state = self._state()
+            if state == self.HALF_OPEN:
+                # the trial request holds the breaker open for everyone else
+                self._opened = self._clock()
+                self._trial = True
+
+            return state != self.OPEN
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened = None
+            self._trial = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._trial or self._failures >= self.failure_threshold:
+                self._opened = self._clock()
+                self._trial = False
+
+
+class Deadline:
+    def __init__(self, seconds: float = None, clock=time.monotonic) -> None:
+        """Point in time a call has to finish by, None never expires"""
+
+        self._clock = clock
+        self._end = None if seconds is None else clock() + seconds
+
+    def remaining(self) -> float:
+        if self._end is None:
+            return float("inf")
+        return max(0.0, self._end - self._clock())
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() == 0
+
+
+class RetryPolicy:
+    def __init__(
+        self,
+        deadline: Deadline = None,
+        breaker: CircuitBreaker = None,
+        base: float = BACKOFF_BASE,
+        cap: float = BACKOFF_CAP,
+        sleep=time.sleep,
+        rng=random.random,
+    ) -> None:
+        """Exponential backoff with jitter between the attempts of an API call
+
+        Parameters
+        ----------
+        deadline : Deadline
+            No retry is started that could not finish before the deadline
+        breaker : CircuitBreaker
+            No retry is started while the breaker of the endpoint is open
+        base : float
+            Backoff of the first retry in seconds, doubling each retry
+        cap : float
+            Longest backoff in seconds
+        """
+
+        if base <= 0 or cap < base:
+            raise ValueError("Backoff base must be positive and no larger than the cap.")
+
+        self.deadline = deadline if deadline is not None else Deadline()
+        self.breaker = breaker
+        self.base = base
+        self.cap = cap
+
+        self._sleep = sleep
+        self._rng = rng
+
+    def backoff(self, attempt: int) -> float:
+        """Returns the seconds to wait after a failed attempt, half fixed and half random"""
+
+        delay = min(self.cap, self.base * 2 ** max(0, attempt - 1))
+        return delay / 2 + self._rng() * delay / 2
+
+    def wait(self, attempt: int) -> bool:
+        """Sleeps before the next attempt, returns False when the call should give up instead"""
+
+        if self.breaker is not None and self.breaker.state == CircuitBreaker.OPEN:
+            return False
+
+        delay = self.backoff(attempt)
+        if delay >= self.deadline.remaining():
+            return False
+
+        self._sleep(delay)
+        return True
+
+
+def endpoint(uri: str) -> str:
+    """Returns the endpoint of a request URI, without the query and order or request ids"""
+
+    path = uri.split("?", 1)[0].strip("/")
+    return "/".join("*" if _ID_SEGMENT.match(segment) else segment for segment in path.split("/"))
+
+
+def get_breaker(exchange: Exchange, uri: str) -> CircuitBreaker:
+    """Returns the circuit breaker shared by every request to an exchange endpoint"""
+
+    key = (exchange, endpoint(uri))
+    with _lock:
+        if key not in _breakers:
+            _breakers[key] = CircuitBreaker()
+
+        return _breakers[key]
+
+
+def reset_breakers() -> None:
+    with _lock:
+        _breakers.clear()
+
+
+def candle_deadline(granularity=None, now: float = None) -> Deadline:
+    """Returns a deadline shortly before the next candle closes, so retries never delay its processing"""
+
+    if isinstance(granularity, Granularity):
+        granularity = granularity.to_integer
+
+    if not isinstance(granularity, int) or granularity <= 0:
+        return Deadline()
+
+    now = time.time() if now is None else now
+    until_close = granularity - now % granularity
+
+    return Deadline(max(MIN_DEADLINE, until_close - DEADLINE_MARGIN))
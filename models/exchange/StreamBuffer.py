@@ -0,0 +1,357 @@
+"""Fixed size stream state of the websocket clients"""
+
+import copy
+from threading import Lock
+
+import numpy as np
+import pandas as pd
+
+from models.CandleStore import CANDLE_DTYPE, MAX_CANDLES_PER_REQUEST
+from models.exchange.Granularity import Granularity
+from models.helper.CandleHelper import CANDLE_COLUMNS
+
+
+class CandleRing:
+    def __init__(self, capacity: int = MAX_CANDLES_PER_REQUEST) -> None:
+        """Latest candles of a market in a ring buffer, oldest candles are overwritten
+
+        Parameters
+        ----------
+        capacity : int
+            candles kept
+        """
+
+        if capacity < 1:
+            raise ValueError("The ring buffer has to keep at least one candle.")
+
+        self._data = np.zeros(capacity, dtype=CANDLE_DTYPE)
+        self._head = 0
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def capacity(self) -> int:
+        return len(self._data)
+
+    @property
+    def last_epoch(self) -> int:
+        """Open time (epoch seconds) of the latest candle, None when empty"""
+
+        if self._size == 0:
+            return None
+        return int(self._data["epoch"][self._head - 1])
+
+    @property
+    def last(self) -> tuple:
+        """Latest candle as (epoch, low, high, open, close, volume), None when empty"""
+
+        if self._size == 0:
+            return None
+        return self._data[self._head - 1].item()
+
+    def update(self, epoch: int, low: float, high: float, open: float, close: float, volume: float) -> bool:
+        """Updates the latest candle in place or adds a newer one, returns False for older candles"""
+
+        last = self.last_epoch
+        if last is not None and epoch < last:
+            return False
+
+        if last is not None and epoch == last:
+            self._data[self._head - 1] = (epoch, low, high, open, close, volume)
+            return True
+
+        self._data[self._head] = (epoch, low, high, open, close, volume)
+        self._head = (self._head + 1) % len(self._data)
+        self._size = min(self._size + 1, len(self._data))
+        return True
+
+    def extend(self, df: pd.DataFrame) -> None:
+        """Adds the candles of a candle dataframe, earliest first"""
+
+        if not isinstance(df, pd.DataFrame) or len(df) == 0:
+            return
+
+        epochs = pd.DatetimeIndex(df["date"]).asi8 // 10**9
+        prices = df[["low", "high", "open", "close", "volume"]].to_numpy(dtype=np.float64)
+        for epoch, row in zip(epochs, prices):
+            self.update(int(epoch), *row)
+
+    def to_array(self) -> np.ndarray:
+        """Copy of the candles, earliest first"""
+
+        if self._size < len(self._data):
+            return self._data[: self._size].copy()
+        return np.concatenate([self._data[self._head :], self._data[: self._head]])
+
+
+class CandleAggregator:
+    def __init__(self, granularity: int, capacity: int = MAX_CANDLES_PER_REQUEST) -> None:
+        """Candles of a market built from its trades
+
+        The open candle is kept as running scalars and only written to the ring buffer
+        once a trade opens the next candle, so a trade does not allocate any arrays.
+
+        Parameters
+        ----------
+        granularity : int
+            candle length in seconds
+        capacity : int
+            candles kept, including the open candle
+        """
+
+        if granularity < 1:
+            raise ValueError("Granularity of at least one second required.")
+
+        self.granularity = granularity
+        self.ring = CandleRing(capacity)
+        self._epoch = None
+        self._low = self._high = self._open = self._close = self._volume = 0.0
+
+    def __len__(self) -> int:
+        if self._epoch is None or self._epoch == self.ring.last_epoch:
+            return len(self.ring)
+        return min(len(self.ring) + 1, self.ring.capacity)
+
+    @property
+    def open_epoch(self) -> int:
+        """Open time (epoch seconds) of the open candle, None before the first trade"""
+
+        return self._epoch
+
+    def seed(self, df: pd.DataFrame) -> None:
+        """Adds the candles of a candle dataframe, the latest candle is continued by its trades"""
+
+        self.ring.extend(df)
+
+    def add_trade(self, epoch: int, price: float, size: float) -> bool:
+        """Adds a trade at epoch seconds to its candle, returns False for trades of closed candles"""
+
+        start = epoch - epoch % self.granularity
+        if self._epoch is not None and start == self._epoch:
+            if price > self._high:
+                self._high = price
+            if price < self._low:
+                self._low = price
+            self._close = price
+            self._volume += size
+            return True
+
+        if (self._epoch is not None and start < self._epoch) or (self.ring.last_epoch is not None and start < self.ring.last_epoch):
+            return False
+
+        # the trade opens the next candle, the open candle is rolled into the ring buffer
+        if self._epoch is not None:
+            self.ring.update(self._epoch, self._low, self._high, self._open, self._close, self._volume)
+
+        if start == self.ring.last_epoch:
+            # the latest candle of the seed is still open
+            _, low, high, open, close, volume = self.ring.last
+            self._low, self._high, self._open, self._close, self._volume = min(low, price), max(high, price), open, price, volume + size
+        else:
+            self._low = self._high = self._open = self._close = price
+            self._volume = size
+
+        self._epoch = start
+        return True
+
+    def to_array(self) -> np.ndarray:
+        """Copy of the candles, earliest first, the open candle last"""
+
+        candles = self.ring.to_array()
+        if self._epoch is None:
+            return candles
+
+        if len(candles) > 0 and candles["epoch"][-1] == self._epoch:
+            candles = candles[:-1]
+        candles = np.concatenate([candles, np.array([(self._epoch, self._low, self._high, self._open, self._close, self._volume)], dtype=CANDLE_DTYPE)])
+        return candles[-self.ring.capacity :]
+
+
+def candle_frame(candles: np.ndarray, markets: np.ndarray, granularity: str, freq: str = None) -> pd.DataFrame:
+    """Builds a candle dataframe, formatted like parse_candles, from candle ring arrays"""
+
+    dates = candles["epoch"].astype("datetime64[s]").astype("datetime64[ns]")
+    try:
+        tsidx = pd.DatetimeIndex(dates, freq=freq, name="ts")
+    except ValueError:
+        tsidx = pd.DatetimeIndex(dates, name="ts")
+
+    return pd.DataFrame(
+        {
+            "date": tsidx,
+            "market": markets,
+            "granularity": granularity,
+            "low": candles["low"],
+            "high": candles["high"],
+            "open": candles["open"],
+            "close": candles["close"],
+            "volume": candles["volume"],
+        },
+        index=tsidx,
+        columns=CANDLE_COLUMNS,
+    )
+
+
+class TickerBoard:
+    def __init__(self, markets: list) -> None:
+        """Latest ticker of each market of a websocket, one slot per market
+
+        Parameters
+        ----------
+        markets : list
+            markets of the websocket
+        """
+
+        self.markets = list(markets)
+        self._slots = {market: slot for slot, market in enumerate(self.markets)}
+        self._dates = np.zeros(len(self.markets), dtype="datetime64[ns]")
+        self._prices = np.zeros(len(self.markets), dtype=np.float64)
+        self._seen = np.zeros(len(self.markets), dtype=bool)
+
+    def __len__(self) -> int:
+        return int(self._seen.sum())
+
+    def update(self, market: str, date, price: float) -> bool:
+        """Sets the ticker of a market in place, returns False for markets not on the board"""
+
+        slot = self._slots.get(market)
+        if slot is None:
+            return False
+
+        self._dates[slot] = np.datetime64(date, "ns")
+        self._prices[slot] = price
+        self._seen[slot] = True
+        return True
+
+    def to_frame(self, freq: str) -> pd.DataFrame:
+        """Builds the ticker dataframe of the markets seen, indexed by the ticker time"""
+
+        seen = self._seen
+        dates = pd.DatetimeIndex(self._dates[seen], name="ts")
+        return pd.DataFrame(
+            {
+                "date": dates,
+                "market": np.array(self.markets, dtype=object)[seen],
+                "price": self._prices[seen],
+                "candle": dates.floor(freq=freq),
+            },
+            index=dates,
+        )
+
+
+class TradeStream:
+    def __init__(self, markets: list, granularity: Granularity, seed, on_ticker=None, on_candle_closed=None) -> None:
+        """Tickers and candles of the markets of a trade feed
+
+        Trades update the ticker board and the candle aggregator of their market in place,
+        the dataframes are only built when read and are kept until the next trade.
+
+        Parameters
+        ----------
+        markets : list
+            markets of the websocket
+        granularity : Granularity
+            candle granularity
+        seed : callable
+            returns the candle dataframe of a market, called on the first trade of the market
+        on_ticker : callable
+            called with the market, date and price of every trade
+        on_candle_closed : callable
+            called with the market and the (epoch, low, high, open, close, volume) candle a trade closed
+        """
+
+        if not isinstance(granularity, Granularity):
+            raise TypeError("Granularity Enum required.")
+
+        self.markets = list(markets)
+        self.granularity = granularity
+        self._seed = seed
+        self._on_ticker = on_ticker
+        self._on_candle_closed = on_candle_closed
+        self._lock = Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self._tickers = TickerBoard(self.markets)
+            self._candles = {}
+            self._tickers_view = None
+            self._candles_view = None
+
+    def adopt(self, stream) -> None:
+        """Takes over the candles another stream holds for the markets of this one, they are not seeded again"""
+
+        with stream._lock:
+            candles = copy_buffers(stream._candles, self.markets)
+
+        with self._lock:
+            for market, aggregator in candles.items():
+                self._candles.setdefault(market, aggregator)
+            self._candles_view = None
+
+    def add_trade(self, market: str, time: str, price: float, size: float) -> None:
+        """Adds a trade at an ISO 8601 UTC time"""
+
+        date = np.datetime64(time[:19], "s")
+
+        # the candles of a market are seeded on its first trade
+        if market not in self._candles:
+            aggregator = CandleAggregator(self.granularity.to_integer)
+            aggregator.seed(self._seed(market))
+            with self._lock:
+                self._candles.setdefault(market, aggregator)
+
+        closed = None
+        with self._lock:
+            self._tickers.update(market, date, price)
+            aggregator = self._candles[market]
+            opened = aggregator.open_epoch
+            if aggregator.add_trade(int(date.astype(np.int64)), price, size) and opened is not None and aggregator.open_epoch != opened:
+                closed = aggregator.ring.last
+            self._tickers_view = None
+            self._candles_view = None
+
+        if self._on_ticker is not None:
+            self._on_ticker(market, date, price)
+        if closed is not None and self._on_candle_closed is not None:
+            self._on_candle_closed(market, closed)
+
+    @property
+    def tickers(self) -> pd.DataFrame:
+        """Latest trade price of each market, None before the first trade"""
+
+        with self._lock:
+            if len(self._tickers) == 0:
+                return None
+            if self._tickers_view is None:
+                self._tickers_view = self._tickers.to_frame(self.granularity.get_frequency)
+            return self._tickers_view
+
+    @property
+    def candles(self) -> pd.DataFrame:
+        """Candles of each market sorted by date, the open candle included, None before the first trade"""
+
+        with self._lock:
+            if len(self._candles) == 0:
+                return None
+            if self._candles_view is None:
+                self._candles_view = candles_view(self._candles, self.granularity.to_integer, self.granularity.get_frequency)
+            return self._candles_view
+
+
+def copy_buffers(buffers: dict, markets: list) -> dict:
+    """Copies of the candle buffers of the markets, for a websocket client taking over from another"""
+
+    return {market: copy.deepcopy(buffer) for market, buffer in buffers.items() if market in markets}
+
+
+def candles_view(buffers: dict, granularity, freq: str = None) -> pd.DataFrame:
+    """Builds the candle dataframe of candle buffers by market, sorted by date"""
+
+    arrays = [buffer.to_array() for buffer in buffers.values()]
+    candles = np.concatenate(arrays)
+    markets = np.repeat(np.array(list(buffers), dtype=object), [len(array) for array in arrays])
+    order = np.argsort(candles["epoch"], kind="stable")
+    return candle_frame(candles[order], markets[order], granularity, freq if len(arrays) == 1 else None)
@@ -0,0 +1,519 @@
+"""Market data hub sharing one exchange websocket per granularity with every bot on the host"""
+
+import json
+import os
+import socket
+import tempfile
+import time
+from datetime import datetime
+from threading import Event, Lock, Thread
+
+import numpy as np
+import pandas as pd
+
+from models.exchange.ExchangesEnum import Exchange
+from models.exchange.Granularity import Granularity
+from models.exchange.StreamBuffer import CandleRing, TickerBoard, candles_view
+from views.PyCryptoBot import RichText
+
+HUB_SOCKET_ENV = "PYCRYPTOBOT_HUB_SOCKET"
+
+# the exchanges close websockets after 24 hours
+WEBSOCKET_RESTART = 82800
+
+# bytes of messages a bot may fall behind before it is detached
+MAX_PENDING = 1 << 20
+
+
+def hub_socket_path() -> str:
+    """Unix socket of the hub, set with the PYCRYPTOBOT_HUB_SOCKET environment variable"""
+
+    return os.environ.get(HUB_SOCKET_ENV, os.path.join(tempfile.gettempdir(), "pycryptobot-hub.sock"))
+
+
+def websocket_client(exchange: Exchange, markets: list, granularity: Granularity):
+    """Returns the websocket client of an exchange, the bots use the Coinbase Pro feed for Coinbase"""
+
+    if exchange == Exchange.BINANCE:
+        from models.exchange.binance import WebSocketClient
+    elif exchange in (Exchange.COINBASE, Exchange.COINBASEPRO):
+        from models.exchange.coinbase_pro import WebSocketClient
+    elif exchange == Exchange.KUCOIN:
+        from models.exchange.kucoin import WebSocketClient
+    else:
+        raise ValueError(f"{exchange.value} has no websocket.")
+
+    return WebSocketClient(markets, granularity)
+
+
+def candle_rows(candles: pd.DataFrame, market: str, since: int = None) -> list:
+    """Candles of a market as [epoch, low, high, open, close, volume] rows, opened at or after since"""
+
+    df = candles.loc[candles["market"] == market]
+    epochs = pd.DatetimeIndex(df["date"]).asi8 // 10**9
+    prices = df[["low", "high", "open", "close", "volume"]].to_numpy(dtype=np.float64)
+    if since is not None:
+        prices, epochs = prices[epochs >= since], epochs[epochs >= since]
+
+    return [[int(epoch), *row] for epoch, row in zip(epochs, prices.tolist())]
+
+
+def _send(conn: socket.socket, message: dict) -> None:
+    conn.sendall(json.dumps(message).encode() + b"\n")
+
+
+class Subscriber:
+    def __init__(self, conn: socket.socket, exchange: Exchange, markets: list, granularity: Granularity) -> None:
+        self.conn = conn
+        self.key = (exchange, granularity)
+        self.markets = markets
+        self.tickers = {}
+        self.epochs = {}
+        self._pending = bytearray()
+
+    def send(self, message: dict) -> None:
+        """Queues a message for the bot and sends what its socket takes without blocking"""
+
+        self._pending += json.dumps(message).encode() + b"\n"
+        self.flush()
+
+    def flush(self) -> None:
+        """Sends the queued messages without blocking, raises OSError for a bot that stopped reading"""
+
+        while self._pending:
+            try:
+                sent = self.conn.send(self._pending, socket.MSG_DONTWAIT)
+            except BlockingIOError:
+                break
+            del self._pending[:sent]
+
+        if len(self._pending) > MAX_PENDING:
+            raise OSError("The bot is not reading its messages.")
+
+
+class WebSocketHub:
+    def __init__(self, path: str = None, client_factory=websocket_client, interval: float = 0.25, linger: float = 300, app: object = None) -> None:
+        """Local market data hub for the bots of a host
+
+        The hub holds one websocket per exchange and granularity that covers the markets of
+        every attached bot. Bots attach over a Unix socket and receive the tickers and the
+        candles of their markets as they change.
+
+        Parameters
+        ----------
+        path : str
+            Unix socket the hub listens on, see hub_socket_path
+        client_factory : callable
+            returns the websocket client of an exchange, markets and granularity
+        interval : float
+            seconds between the fan outs to the bots
+        linger : float
+            seconds a market stays subscribed after its last bot detached
+        """
+
+        if not hasattr(socket, "AF_UNIX"):
+            raise ValueError("The websocket hub requires Unix sockets.")
+
+        self.path = path or hub_socket_path()
+        self.client_factory = client_factory
+        self.interval = interval
+        self.linger = linger
+        self.app = app
+
+        self._lock = Lock()
+        self._stop = Event()
+        self._subscribers = []
+        self._feeds = {}
+        self._message_counts = {}
+        self._unused_since = {}
+        self._server = None
+        self._threads = []
+
+    @property
+    def feeds(self) -> dict:
+        """Websocket clients by (exchange, granularity)"""
+
+        return dict(self._feeds)
+
+    def start(self) -> None:
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+        self._stop.clear()
+        self._server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._server.bind(self.path)
+        self._server.listen()
+
+        self._threads = [Thread(target=self._accept, daemon=True), Thread(target=self._fan_out, daemon=True)]
+        for thread in self._threads:
+            thread.start()
+
+    def serve_forever(self) -> None:
+        self.start()
+        try:
+            while not self._stop.wait(1):
+                pass
+        finally:
+            self.close()
+
+    def close(self) -> None:
+        self._stop.set()
+        if self._server is not None:
+            try:
+                self._server.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            self._server.close()
+            self._server = None
+
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+        with self._lock:
+            subscribers, self._subscribers = self._subscribers, []
+        for subscriber in subscribers:
+            subscriber.conn.close()
+
+        for feed in self._feeds.values():
+            feed.close()
+        self._feeds = {}
+
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def _accept(self) -> None:
+        while not self._stop.is_set():
+            try:
+                conn, _ = self._server.accept()
+            except OSError:
+                return
+            Thread(target=self._serve, args=(conn,), daemon=True).start()
+
+    def _serve(self, conn: socket.socket) -> None:
+        """Registers the subscription a bot sends on attaching, until the bot detaches"""
+
+        reader = conn.makefile("rb")
+        subscriber = None
+        try:
+            request = json.loads(reader.readline())
+            subscriber = Subscriber(
+                conn,
+                Exchange(request["exchange"]),
+                list(request["markets"]),
+                Granularity.convert_to_enum(request["granularity"]),
+            )
+            # the client validates the markets, a subscription with an invalid market is rejected
+            self.client_factory(subscriber.key[0], subscriber.markets, subscriber.key[1])
+        except Exception as err:
+            try:
+                _send(conn, {"type": "error", "message": str(err)})
+            except OSError:
+                pass
+            conn.close()
+            return
+
+        with self._lock:
+            self._subscribers.append(subscriber)
+
+        # the bot only sends its subscription, an empty read is the bot detaching
+        try:
+            while reader.readline():
+                pass
+        except OSError:
+            pass
+
+        self._detach(subscriber)
+
+    def _detach(self, subscriber: Subscriber) -> None:
+        with self._lock:
+            if subscriber in self._subscribers:
+                self._subscribers.remove(subscriber)
+        subscriber.conn.close()
+
+    def _sync_feeds(self) -> None:
+        """Opens one websocket per exchange and granularity for the markets of the attached bots
+
+        A new market opens a new websocket, which takes over the candles of the previous one
+        before it is closed, so the markets already streamed are not seeded again. Markets no
+        bot uses any more are kept for the linger seconds, a bot that restarts finds them there.
+        """
+
+        with self._lock:
+            wanted = {}
+            for subscriber in self._subscribers:
+                wanted.setdefault(subscriber.key, set()).update(subscriber.markets)
+
+        now = time.monotonic()
+        for key in set(self._feeds) | set(wanted):
+            feed = self._feeds.get(key)
+            markets = wanted.get(key, set())
+            subscribed = set(feed.markets) if feed is not None else set()
+
+            if subscribed - markets:
+                self._unused_since.setdefault(key, now)
+            else:
+                self._unused_since.pop(key, None)
+            lingered = key in self._unused_since and now - self._unused_since[key] >= self.linger
+
+            if feed is not None and markets <= subscribed and not lingered and feed.time_elapsed <= WEBSOCKET_RESTART:
+                continue
+
+            if len(markets) == 0:
+                feed.close()
+                del self._feeds[key]
+                self._message_counts.pop(key, None)
+                self._unused_since.pop(key, None)
+                continue
+
+            # unused markets are dropped once they lingered, or kept while the websocket changes anyway
+            if not lingered:
+                markets = markets | subscribed
+            self._replace_feed(key, sorted(markets))
+
+    def _replace_feed(self, key: tuple, markets: list) -> None:
+        feed = self.client_factory(key[0], markets, key[1])
+        previous = self._feeds.get(key)
+        if previous is not None:
+            feed.adopt(previous)
+
+        # the new websocket is open before the previous one closes
+        feed.start()
+        self._feeds[key] = feed
+        self._message_counts.pop(key, None)
+        if previous is not None:
+            previous.close()
+
+        if self.app:
+            RichText.notify(f"Websocket hub subscribed to {', '.join(markets)} on {key[0].value}", self.app, "info")
+
+    def _fan_out(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self._sync_feeds()
+                self.publish()
+            except Exception as err:
+                if self.app:
+                    RichText.notify(f"Websocket hub error: {err}", self.app, "error")
+
+    def publish(self) -> None:
+        """Sends the tickers and candles that changed since the last fan out to the bots"""
+
+        with self._lock:
+            subscribers = list(self._subscribers)
+
+        # a bot that fell behind catches up, or is detached once too far behind
+        for subscriber in list(subscribers):
+            try:
+                subscriber.flush()
+            except OSError:
+                self._detach(subscriber)
+                subscribers.remove(subscriber)
+
+        for key, feed in self._feeds.items():
+            message_count = getattr(feed, "message_count", 0)
+            changed = self._message_counts.get(key) != message_count
+            self._message_counts[key] = message_count
+
+            attached = [subscriber for subscriber in subscribers if subscriber.key == key]
+            if not attached or not (changed or any(len(subscriber.epochs) < len(subscriber.markets) for subscriber in attached)):
+                continue
+
+            tickers, candles = feed.tickers, feed.candles
+            for subscriber in attached:
+                try:
+                    for market in subscriber.markets:
+                        self._publish_market(subscriber, market, tickers, candles)
+                except OSError:
+                    self._detach(subscriber)
+
+    def _publish_market(self, subscriber: Subscriber, market: str, tickers: pd.DataFrame, candles: pd.DataFrame) -> None:
+        if isinstance(tickers, pd.DataFrame):
+            row = tickers.loc[tickers["market"] == market]
+            if len(row) > 0:
+                ticker = (pd.Timestamp(row["date"].values[0]).isoformat(), float(row["price"].values[0]))
+                if subscriber.tickers.get(market) != ticker:
+                    subscriber.send({"type": "ticker", "market": market, "date": ticker[0], "price": ticker[1]})
+                    subscriber.tickers[market] = ticker
+
+        if isinstance(candles, pd.DataFrame) and len(candles) > 0:
+            # the latest candle sent is sent again as it may have changed
+            rows = candle_rows(candles, market, subscriber.epochs.get(market))
+            if len(rows) > 0:
+                granularity = candles["granularity"].iloc[-1]
+                subscriber.send(
+                    {"type": "candles", "market": market, "granularity": granularity.item() if hasattr(granularity, "item") else granularity, "rows": rows},
+                )
+                subscriber.epochs[market] = rows[-1][0]
+
+
+class HubClient:
+    def __init__(
+        self,
+        exchange: Exchange,
+        markets: list,
+        granularity: Granularity = Granularity.ONE_HOUR,
+        path: str = None,
+        app: object = None,
+        retry: float = 5,
+    ) -> None:
+        """Websocket client of a bot attached to the websocket hub
+
+        The client has the tickers, candles and connection attributes of the exchange
+        websocket clients, so the bot uses it in their place.
+
+        Parameters
+        ----------
+        exchange : Exchange
+            exchange of the markets
+        markets : list
+            markets in the exchange format
+        granularity : Granularity
+            candle granularity
+        path : str
+            Unix socket of the hub, see hub_socket_path
+        retry : float
+            seconds between attempts to attach to the hub
+        """
+
+        if not isinstance(exchange, Exchange):
+            raise TypeError("Exchange Enum required.")
+
+        if not isinstance(granularity, Granularity):
+            raise TypeError("Granularity Enum required.")
+
+        if len(markets) == 0:
+            raise ValueError("A list of one or more markets is required.")
+
+        self.exchange = exchange
+        self.markets = markets
+        self.granularity = granularity
+        self.path = path or hub_socket_path()
+        self.app = app
+        self.retry = retry
+
+        self.stop = True
+        self.start_time = None
+        self.time_elapsed = 0
+        self.message_count = 0
+
+        self._lock = Lock()
+        self._conn = None
+        self._thread = None
+        self._reset()
+
+    def _reset(self) -> None:
+        with self._lock:
+            self._tickers = TickerBoard(self.markets)
+            self._candles = {}
+            self._candle_granularity = self.granularity.to_integer
+            self._tickers_view = None
+            self._candles_view = None
+
+    @property
+    def tickers(self) -> pd.DataFrame:
+        with self._lock:
+            if len(self._tickers) == 0:
+                return None
+            if self._tickers_view is None:
+                self._tickers_view = self._tickers.to_frame(self.granularity.get_frequency)
+            return self._tickers_view
+
+    @property
+    def candles(self) -> pd.DataFrame:
+        with self._lock:
+            if len(self._candles) == 0:
+                return None
+            if self._candles_view is None:
+                self._candles_view = candles_view(self._candles, self._candle_granularity, self.granularity.get_frequency)
+            return self._candles_view
+
+    def start(self) -> None:
+        self.stop = False
+        self.start_time = datetime.now()
+        self.message_count = 0
+        self._thread = Thread(target=self._listen, daemon=True)
+        self._thread.start()
+
+    def close(self) -> None:
+        self.stop = True
+        self.start_time = None
+        self.time_elapsed = 0
+        conn = self._conn
+        if conn is not None:
+            try:
+                conn.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _listen(self) -> None:
+        while not self.stop:
+            try:
+                with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as conn:
+                    conn.connect(self.path)
+                    self._conn = conn
+                    _send(conn, {"exchange": self.exchange.value, "markets": self.markets, "granularity": self.granularity.to_integer})
+                    for line in conn.makefile("rb"):
+                        self.on_message(json.loads(line))
+            except (OSError, ValueError) as err:
+                self.on_error(err)
+            finally:
+                self._conn = None
+
+            # the hub may be restarting, the bot attaches again
+            deadline = time.monotonic() + self.retry
+            while not self.stop and time.monotonic() < deadline:
+                time.sleep(min(0.1, self.retry))
+
+    def on_message(self, msg: dict) -> None:
+        if self.start_time is not None:
+            self.time_elapsed = round((datetime.now() - self.start_time).total_seconds())
+
+        if msg.get("type") == "ticker":
+            date, price = np.datetime64(msg["date"]), float(msg["price"])
+            with self._lock:
+                updated = self._tickers.update(msg["market"], date, price)
+                if updated:
+                    self._tickers_view = None
+            if updated:
+                self.on_ticker(msg["market"], date, price)
+
+        elif msg.get("type") == "candles":
+            closed = []
+            with self._lock:
+                ring = self._candles.setdefault(msg["market"], CandleRing())
+                seeded = len(ring) > 0
+                for row in msg["rows"]:
+                    # once seeded, a newer candle closes the latest one
+                    last = ring.last
+                    if ring.update(*row) and seeded and row[0] > last[0]:
+                        closed.append(last)
+                self._candle_granularity = msg["granularity"]
+                self._candles_view = None
+            for candle in closed:
+                self.on_candle_closed(msg["market"], candle)
+
+        elif msg.get("type") == "error":
+            self.on_error(msg["message"])
+            self.stop = True
+
+        self.message_count += 1
+
+    def on_ticker(self, market: str, date, price: float) -> None:
+        """Called with every ticker the hub sends"""
+
+    def on_candle_closed(self, market: str, candle: tuple) -> None:
+        """Called with every (epoch, low, high, open, close, volume) candle that closes"""
+
+    def on_error(self, e, data=None) -> None:
+        if self.app and not self.stop:
+            RichText.notify(f"Websocket hub: {e}", self.app, "error")
+
+    def getStartTime(self) -> datetime:
+        return self.start_time
+
+    def get_timeElapsed(self) -> int:
+        return self.time_elapsed
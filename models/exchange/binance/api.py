@@ -7,17 +7,23 @@ import math
 import re
 import sys
 import time
-from datetime import datetime, timedelta
-from threading import Thread
+from datetime import datetime, timedelta, timezone
+from functools import partial
+from threading import Lock, Thread
 from urllib.parse import urlencode
 
 import numpy as np
 import pandas as pd
 import requests
-from requests import Session
 from websocket import create_connection, WebSocketConnectionClosedException
 
+from models.exchange.ClientPool import decode_json, get_session, mock_url
+from models.exchange.ExchangesEnum import Exchange
 from models.exchange.Granularity import Granularity
+from models.exchange.MetadataCache import FEES_TTL, MARKETS_TTL, cached
+from models.exchange.RateLimiter import binance_weight, get_limiter, retry_after
+from models.exchange.StreamBuffer import CandleRing, TickerBoard, candles_view, copy_buffers
+from models.helper.CandleHelper import parse_candles
 from views.PyCryptoBot import RichText
 
 DEFAULT_MAKER_FEE_RATE = 0.0015  # added 0.0005 to allow for self.price movements
@@ -39,6 +45,23 @@ class AuthAPIBase:
             epoch_str = str(epoch)[0:10]
             return datetime.fromtimestamp(int(epoch_str))
 
+    def _rate_limit(self, method: str, uri: str, payload: dict = None) -> None:
+        """Waits for the request weight (and order count) to be available"""
+
+        get_limiter(Exchange.BINANCE, "weight").acquire(binance_weight(uri, payload))
+        if method == "POST" and uri == "/api/v3/order":
+            get_limiter(Exchange.BINANCE, "orders").acquire()
+
+    def _update_rate_limit(self, resp) -> None:
+        """Syncs the request weight with the weight Binance reports as used"""
+
+        used_weight = resp.headers.get("X-MBX-USED-WEIGHT-1M", resp.headers.get("X-MBX-USED-WEIGHT"))
+        if used_weight is not None:
+            get_limiter(Exchange.BINANCE, "weight").update(int(used_weight))
+
+        if resp.status_code in (418, 429):
+            get_limiter(Exchange.BINANCE, "weight").backoff(retry_after(resp, 5))
+
 
 class AuthAPI(AuthAPIBase):
     def __init__(
@@ -107,18 +130,16 @@ class AuthAPI(AuthAPIBase):
             raise SystemExit(err)
 
     def _dispatch_request(self, method: str):
-        session = Session()
-        session.headers.update(
-            {
-                "Content-Type": "application/json; charset=utf-8",
-                "X-MBX-APIKEY": self._api_key,
-            }
-        )
+        session = get_session(self._api_url)
+        headers = {
+            "Content-Type": "application/json; charset=utf-8",
+            "X-MBX-APIKEY": self._api_key,
+        }
         return {
-            "GET": session.get,
-            "DELETE": session.delete,
-            "PUT": session.put,
-            "POST": session.post,
+            "GET": partial(session.get, headers=headers),
+            "DELETE": partial(session.delete, headers=headers),
+            "PUT": partial(session.put, headers=headers),
+            "POST": partial(session.post, headers=headers),
         }.get(method, "GET")
 
     def createHash(self, uri: str = ""):
@@ -207,6 +228,7 @@ class AuthAPI(AuthAPIBase):
 
         return self.get_accounts()
 
+    @cached(FEES_TTL)
     def get_fees(self, market: str = "") -> pd.DataFrame:
         """Retrieves a account fees"""
 
@@ -316,6 +338,7 @@ class AuthAPI(AuthAPIBase):
         fees = self.get_fees()
         return float(fees["usd_volume"].to_string(index=False).strip())
 
+    @cached(MARKETS_TTL)
     def getMarkets(self) -> list:
         """Retrieves a list of markets on the exchange"""
 
@@ -340,8 +363,8 @@ class AuthAPI(AuthAPIBase):
         except Exception:
             return pd.DataFrame()
 
-    def get_orders(self, market: str = "", action: str = "", status: str = "done", order_history: list = []) -> pd.DataFrame:
-        """Retrieves your list of orders with optional filtering"""
+    def get_orders(self, market: str = "", action: str = "", status: str = "done", order_history: list = [], since: datetime = None) -> pd.DataFrame:
+        """Retrieves your list of orders with optional filtering, created since a UTC datetime when given"""
 
         # if market provided
         markets = None
@@ -392,9 +415,6 @@ class AuthAPI(AuthAPIBase):
                     if len(resp) == 0:
                         return pd.DataFrame()
 
-                    if full_scan is True:
-                        time.sleep(0.25)
-
                     if isinstance(resp, list):
                         df_tmp = pd.DataFrame.from_dict(resp)
                     else:
@@ -413,12 +433,12 @@ class AuthAPI(AuthAPIBase):
                 if full_scan is True:
                     print(f"add to order history to prevent full scan: {self.order_history}")
             else:
+                payload = {"symbol": market, "recvWindow": self.recv_window}
+                if since is not None:
+                    payload["startTime"] = int(since.replace(tzinfo=timezone.utc).timestamp() * 1000)
+
                 # GET /api/v3/allOrders
-                resp = self.auth_api(
-                    "GET",
-                    "/api/v3/allOrders",
-                    {"symbol": market, "recvWindow": self.recv_window},
-                )
+                resp = self.auth_api("GET", "/api/v3/allOrders", payload)
 
                 if isinstance(resp, str) and resp.endswith("Invalid symbol."):
                     return "Invalid market."
@@ -437,8 +457,8 @@ class AuthAPI(AuthAPIBase):
 
             # feature engineering
 
-            df.time = df["time"].map(self.convert_time)
-            df["time"] = pd.to_datetime(df["time"]).dt.tz_localize("UTC")
+            # the order times are epoch milliseconds, convert_time would give the local time of the host
+            df["time"] = pd.to_datetime(df["time"].astype("int64") // 1000, unit="s", utc=True)
 
             df["size"] = np.where(
                 df["side"] == "BUY",
@@ -524,6 +544,7 @@ class AuthAPI(AuthAPIBase):
                 RichText.notify(f"Error: {e}", self.app, "error")
             return None
 
+    @cached(MARKETS_TTL)
     def get_market_info_filters(self, market: str) -> pd.DataFrame:
         """Retrieves markets exchange info"""
 
@@ -550,6 +571,7 @@ class AuthAPI(AuthAPIBase):
         except Exception:
             return df
 
+    @cached(FEES_TTL)
     def get_trade_fee(self, market: str) -> float:
         """Retrieves the trade fees"""
 
@@ -744,7 +766,9 @@ class AuthAPI(AuthAPIBase):
         params = {"url": url, "params": {}}
 
         try:
+            self._rate_limit(method, uri, payload)
             resp = self._dispatch_request(method)(**params)
+            self._update_rate_limit(resp)
 
             if "msg" in resp.json():
                 resp_message = resp.json()["msg"]
@@ -764,10 +788,9 @@ class AuthAPI(AuthAPIBase):
                     RichText.notify(f"{message}", self.app, "error")
                 return {}
             elif resp.status_code == 429 and (resp_message.startswith("Too much request weight used")):
-                message = f"{method} ({resp.status_code}) {self._api_url}{uri} - {resp_message} (sleeping for 5 seconds to prevent being banned)"
+                message = f"{method} ({resp.status_code}) {self._api_url}{uri} - {resp_message} (backing off for {retry_after(resp, 5)} seconds to prevent being banned)"
                 if self.app:
                     RichText.notify(f"Error: {message}", self.app, "error")
-                time.sleep(5)
                 return {}
             elif resp.status_code != 200:
                 message = f"{method} ({resp.status_code}) {self._api_url}{uri} - {resp_message}"
@@ -984,87 +1007,25 @@ class PublicAPI(AuthAPIBase):
                         {"symbol": market, "interval": granularity, "limit": 300},
                     )
 
-            # convert the API response into a Pandas DataFrame
-            df = pd.DataFrame(
-                resp,
-                columns=[
-                    "open_time",
-                    "open",
-                    "high",
-                    "low",
-                    "close",
-                    "volume",
-                    "close_time",
-                    "quote_asset_volume",
-                    "number_of_trades",
-                    "taker_buy_base_asset_volume",
-                    "traker_buy_quote_asset_volume",
-                    "ignore",
-                ],
-            )
-
-            df["market"] = market
-            if isinstance(granularity, Granularity):
-                df["granularity"] = granularity.to_short
-            else:
-                df["granularity"] = granularity
-
-            # binance epoch is too long
-            df["open_time"] = df["open_time"] + 1
-            df["open_time"] = df["open_time"].astype(str)
-            df["open_time"] = df["open_time"].str.replace(r"\d{3}$", "", regex=True)
-
             try:
                 freq = granularity.get_frequency
             except Exception:
                 freq = "D"
 
-            # convert the DataFrame into a time series with the date as the index/key
-            try:
-                tsidx = pd.DatetimeIndex(
-                    pd.to_datetime(df["open_time"], unit="s"),
-                    dtype="datetime64[ns]",
-                    freq=freq,
-                )
-                df.set_index(tsidx, inplace=True)
-                df = df.drop(columns=["open_time"])
-                df.index.names = ["ts"]
-                df["date"] = tsidx
-            except ValueError:
-                tsidx = pd.DatetimeIndex(pd.to_datetime(df["open_time"], unit="s"), dtype="datetime64[ns]")
-                df.set_index(tsidx, inplace=True)
-                df = df.drop(columns=["open_time"])
-                df.index.names = ["ts"]
-                df["date"] = tsidx
+            # convert the API response into a Pandas DataFrame
+            df = parse_candles(
+                resp,
+                ["time", "open", "high", "low", "close", "volume"],
+                market,
+                granularity.to_short if isinstance(granularity, Granularity) else granularity,
+                unit="ms",
+                freq=freq,
+            )
 
             # if specified, fix end time
             if iso8601end != "":
                 df = df[df["date"] <= iso8601end]
 
-            # re-order columns
-            df = df[
-                [
-                    "date",
-                    "market",
-                    "granularity",
-                    "low",
-                    "high",
-                    "open",
-                    "close",
-                    "volume",
-                ]
-            ]
-
-            # correct column types
-            df["low"] = df["low"].astype(float)
-            df["high"] = df["high"].astype(float)
-            df["open"] = df["open"].astype(float)
-            df["close"] = df["close"].astype(float)
-            df["volume"] = df["volume"].astype(float)
-
-            # reset pandas dataframe index
-            df.reset_index()
-
         return df
 
     def auth_api(self, method: str, uri: str, payload: str = {}) -> dict:
@@ -1080,7 +1041,9 @@ class PublicAPI(AuthAPIBase):
             raise TypeError("URI is not a string.")
 
         try:
-            resp = requests.get(f"{self._api_url}{uri}", params=payload)
+            self._rate_limit(method, uri, payload)
+            resp = get_session(self._api_url).get(f"{self._api_url}{uri}", params=payload)
+            self._update_rate_limit(resp)
 
             if resp.status_code != 200:
                 resp_message = resp.json()["msg"]
@@ -1093,7 +1056,7 @@ class PublicAPI(AuthAPIBase):
                     return {}
 
             resp.raise_for_status()
-            return resp.json()
+            return decode_json(resp)
 
         except requests.ConnectionError as err:
             return self.handle_api_error(err, "ConnectionError")
@@ -1195,7 +1158,7 @@ class WebSocket(AuthAPIBase):
             params.append(f"{market.lower()}@miniTicker")
             params.append(f"{market.lower()}@kline_{self.granularity.to_short}")
 
-        self.ws = create_connection(f"{self._ws_url}ws")
+        self.ws = create_connection(mock_url(f"{self._ws_url}ws"))
         self.ws.send(
             json.dumps(
                 {
@@ -1334,11 +1297,69 @@ class WebSocketClient(WebSocket, AuthAPIBase):
         self._ws_url = ws_url
         self.markets = markets
         self.granularity = granularity
-        self.tickers = None
-        self.candles = None
         self.start_time = None
         self.time_elapsed = 0
 
+        self._lock = Lock()
+        self._reset()
+
+    def _reset(self) -> None:
+        with self._lock:
+            self._tickers = TickerBoard(self.markets)
+            self._candles = {}
+            self._tickers_view = None
+            self._candles_view = None
+
+    @property
+    def tickers(self) -> pd.DataFrame:
+        """Latest ticker of each market, None before the first ticker"""
+
+        with self._lock:
+            if len(self._tickers) == 0:
+                return None
+            if self._tickers_view is None:
+                self._tickers_view = self._tickers.to_frame(self.granularity.get_frequency)
+            return self._tickers_view
+
+    @tickers.setter
+    def tickers(self, value) -> None:
+        # the stream state is only cleared, it is built from the websocket messages
+        if value is None and hasattr(self, "_lock"):
+            self._reset()
+
+    @property
+    def candles(self) -> pd.DataFrame:
+        """Latest candles of each market sorted by date, None before the first kline"""
+
+        with self._lock:
+            if len(self._candles) == 0:
+                return None
+            if self._candles_view is None:
+                self._candles_view = candles_view(self._candles, self.granularity.to_short, self.granularity.get_frequency)
+            return self._candles_view
+
+    @candles.setter
+    def candles(self, value) -> None:
+        if value is None and hasattr(self, "_lock"):
+            self._reset()
+
+    def adopt(self, client) -> None:
+        """Takes over the candles another websocket client holds for the markets of this one, they are not seeded again"""
+
+        with client._lock:
+            candles = copy_buffers(client._candles, self.markets)
+
+        with self._lock:
+            for market, ring in candles.items():
+                self._candles.setdefault(market, ring)
+            self._candles_view = None
+
+    def on_ticker(self, market: str, date, price: float) -> None:
+        """Called with every ticker of the websocket"""
+
+    def on_candle_closed(self, market: str, candle: tuple) -> None:
+        """Called with every (epoch, low, high, open, close, volume) candle that closes"""
+
     def on_open(self):
         self.start_time = datetime.now()
         self.message_count = 0
@@ -1348,111 +1369,36 @@ class WebSocketClient(WebSocket, AuthAPIBase):
             self.time_elapsed = round((datetime.now() - self.start_time).total_seconds())
 
         if "e" in msg:
-            df = None
             if msg["e"] == "24hrMiniTicker" and "E" in msg and "s" in msg and "c" in msg:
-                # create dataframe from websocket message
-                df = pd.DataFrame(
-                    columns=["date", "market", "price"],
-                    data=[
-                        [
-                            self.convert_time(msg["E"]) - timedelta(hours=1),
-                            msg["s"],
-                            msg["c"],
-                        ]
-                    ],
-                )
-
-                # set column types
-                df["date"] = df["date"].astype("datetime64[ns]")
-                df["price"] = df["price"].astype("float64")
-                df["candle"] = df["date"].dt.floor(freq=self.granularity.get_frequency)
-
-            if df is not None:
-                # insert first entry
-                if self.tickers is None and len(df) > 0:
-                    self.tickers = df
-                # append future entries without duplicates
-                elif self.tickers is not None and len(df) > 0:
-                    self.tickers = pd.concat([self.tickers, df]).drop_duplicates(subset="market", keep="last").reset_index(drop=True)
-
-                # convert dataframes to a time series
-                tsidx = pd.DatetimeIndex(pd.to_datetime(self.tickers["date"]).dt.strftime("%Y-%m-%dT%H:%M:%S.%Z"))
-                self.tickers.set_index(tsidx, inplace=True)
-                self.tickers.index.name = "ts"
+                date, price = self.convert_time(msg["E"]) - timedelta(hours=1), float(msg["c"])
+                with self._lock:
+                    updated = self._tickers.update(msg["s"], date, price)
+                    if updated:
+                        self._tickers_view = None
+                if updated:
+                    self.on_ticker(msg["s"], date, price)
 
             if msg["e"] == "kline" and "s" in msg and "k" in msg:
                 k = msg["k"]
                 if "i" in k and "t" in k and "o" in k and "h" in k and "c" in k and "l" in k and "v" in k:
-                    # create dataframe from websocket message
-                    df = pd.DataFrame(
-                        columns=[
-                            "date",
-                            "market",
-                            "granularity",
-                            "low",
-                            "high",
-                            "open",
-                            "close",
-                            "volume",
-                        ],
-                        data=[
-                            [
-                                self.convert_time(k["t"]) - timedelta(hours=1),
-                                msg["s"],
-                                k["i"],
-                                float(k["l"]),
-                                float(k["h"]),
-                                float(k["o"]),
-                                float(k["c"]),
-                                float(k["V"]),
-                            ]
-                        ],
-                    )
+                    market = msg["s"]
 
-                    if self.candles is None:
-                        resp = PublicAPI().get_historical_data(df["market"].values[0], self.granularity)
-                        if len(resp) > 0:
-                            self.candles = resp
-                        else:
-                            self.candles = pd.DataFrame(
-                                columns=[
-                                    "date",
-                                    "market",
-                                    "granularity",
-                                    "low",
-                                    "high",
-                                    "open",
-                                    "close",
-                                    "volume",
-                                ],
-                                data=[],
-                            )
+                    # the candles of a market are seeded from the REST API on its first kline
+                    if market not in self._candles:
+                        ring = CandleRing()
+                        ring.extend(PublicAPI().get_historical_data(market, self.granularity))
+                        with self._lock:
+                            self._candles.setdefault(market, ring)
+                            self._candles_view = None
 
+                    # closed candles replace the open candle of the seed or follow the latest candle
                     if k["i"] == self.granularity.to_short and k["x"] is True:
-                        try:
-                            self.candles.drop(index=str(self.tickers[self.tickers["market"] == msg["s"]].candle[0]), inplace=True)
-                        except KeyError:
-                            pass
-
-                        # check if the current candle exists
-                        candle_exists = ((self.candles["date"] == df["date"].values[0]) & (self.candles["market"] == df["market"].values[0])).any()
-                        if not candle_exists:
-                            self.candles = pd.concat([self.candles, df])
-
-                        tsidx = pd.DatetimeIndex(pd.to_datetime(self.candles["date"]).dt.strftime("%Y-%m-%dT%H:%M:%S.%Z"))
-                        self.candles.set_index(tsidx, inplace=True)
-                        self.candles.index.name = "ts"
-
-                    if self.candles is not None:
-                        # keep last 300 candles per market
-                        self.candles = self.candles.groupby("market").tail(300)
-                        # sort columns by date
-                        self.candles = self.candles.copy().sort_values(by=["date"])
-                        # set correct column types
-                        self.candles["open"] = self.candles["open"].astype("float64")
-                        self.candles["high"] = self.candles["high"].astype("float64")
-                        self.candles["close"] = self.candles["close"].astype("float64")
-                        self.candles["low"] = self.candles["low"].astype("float64")
-                        self.candles["volume"] = self.candles["volume"].astype("float64")
+                        candle = (int(k["t"]) // 1000, float(k["l"]), float(k["h"]), float(k["o"]), float(k["c"]), float(k["V"]))
+                        with self._lock:
+                            updated = self._candles[market].update(*candle)
+                            if updated:
+                                self._candles_view = None
+                        if updated:
+                            self.on_candle_closed(market, candle)
 
         self.message_count += 1
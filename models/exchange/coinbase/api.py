@@ -15,7 +15,13 @@ from requests.auth import AuthBase
 from requests import Request
 from threading import Thread
 from websocket import create_connection, WebSocketConnectionClosedException
+from models.exchange.ClientPool import get_session, mock_url
+from models.exchange.ExchangesEnum import Exchange
 from models.exchange.Granularity import Granularity
+from models.exchange.MetadataCache import FEES_TTL, MARKETS_TTL, cached
+from models.exchange.RateLimiter import get_limiter, retry_after
+from models.exchange.Retry import RetryPolicy, candle_deadline, get_breaker
+from models.exchange.StreamBuffer import TradeStream
 from views.PyCryptoBot import RichText
 
 MARGIN_ADJUSTMENT = 0.0025
@@ -171,6 +177,7 @@ class AuthAPI(AuthAPIBase):
         return df
 
     # wallet:user:read
+    @cached(MARKETS_TTL)
     def get_products(self) -> pd.DataFrame:
         """Retrieves your list of products"""
 
@@ -189,6 +196,7 @@ class AuthAPI(AuthAPIBase):
         return df
 
     # wallet:user:read
+    @cached(MARKETS_TTL)
     def get_product(self, market: str = DEFAULT_MARKET) -> pd.DataFrame:
         """Retrieves a product"""
 
@@ -250,6 +258,7 @@ class AuthAPI(AuthAPIBase):
                 time.sleep(15)
 
     # wallet:transactions:read
+    @cached(FEES_TTL)
     def get_fees(self) -> pd.DataFrame:
         """Retrieves fee tiers"""
 
@@ -299,8 +308,8 @@ class AuthAPI(AuthAPIBase):
         return float(fees["taker_fee_rate"].to_string(index=False).strip())
 
     # wallet:orders:read
-    def get_orders(self, market: str = "", action: str = "", status: str = "all") -> pd.DataFrame:
-        """Retrieves your list of orders with optional filtering"""
+    def get_orders(self, market: str = "", action: str = "", status: str = "all", since: datetime = None) -> pd.DataFrame:
+        """Retrieves your list of orders with optional filtering, created since a UTC datetime when given"""
 
         # if market provided
         if market != "":
@@ -330,6 +339,8 @@ class AuthAPI(AuthAPIBase):
                     payload["order_status"] = "FILLED"
                 else:
                     payload["order_status"] = status.upper()
+            if since is not None:
+                payload["start_date"] = since.strftime("%Y-%m-%dT%H:%M:%SZ")
 
             df = self.auth_api("GET", "api/v3/brokerage/orders/historical/batch", payload)
         except Exception:
@@ -467,7 +478,7 @@ class AuthAPI(AuthAPIBase):
     def market_base_increment(self, market, amount) -> float:
         """Retrieves the market base increment"""
 
-        product = self.auth_api("GET", "api/v3/brokerage/products/" + market)
+        product = self.get_product(market)
 
         if "base_increment" not in product:
             return amount
@@ -485,7 +496,7 @@ class AuthAPI(AuthAPIBase):
     def market_quote_increment(self, market, amount) -> float:
         """Retrieves the market quote increment"""
 
-        product = self.auth_api("GET", "api/v3/brokerage/products/" + market)
+        product = self.get_product(market)
 
         if "quote_increment" not in product:
             return amount
@@ -779,18 +790,33 @@ class AuthAPI(AuthAPIBase):
         if not isinstance(uri, str):
             raise TypeError("URI is not a string.")
 
+        breaker = get_breaker(Exchange.COINBASE, uri)
+        if not breaker.allow():
+            return self.handle_api_error(f"CoinbasePro API Error: {uri} is failing, next attempt in {breaker.retry_in:.0f} seconds", "CoinbasePro Private API Error")
+        retry = RetryPolicy(candle_deadline(getattr(self.app, "granularity", None)), breaker)
+
         reason, msg = (None, None)
-        trycnt, maxretry, connretry = (1, 5, 10)
-        while trycnt <= connretry:
+        trycnt, maxretry, connretry = (0, 5, 10)
+        while trycnt < connretry:
+            trycnt += 1
             try:
+                get_limiter(Exchange.COINBASE, "private").acquire()
                 if method == "DELETE":
-                    resp = requests.delete(self._api_url + uri, auth=self)
+                    resp = get_session(self._api_url).delete(self._api_url + uri, auth=self)
                 elif method == "GET":
-                    resp = requests.get(self._api_url + uri, params=payload, auth=self)
+                    resp = get_session(self._api_url).get(self._api_url + uri, params=payload, auth=self)
                 elif method == "POST":
-                    resp = requests.post(self._api_url + uri, json=payload, auth=self)
+                    resp = get_session(self._api_url).post(self._api_url + uri, json=payload, auth=self)
 
-                trycnt += 1
+                # only server errors count towards opening the circuit breaker
+                if resp.status_code >= 500:
+                    breaker.record_failure()
+                else:
+                    breaker.record_success()
+
+                if resp.status_code == 429:
+                    get_limiter(Exchange.COINBASE, "private").backoff(retry_after(resp))
+                    continue
                 resp.raise_for_status()
 
                 if resp.status_code == 200:
@@ -991,6 +1017,7 @@ class AuthAPI(AuthAPIBase):
                     reason = "Invalid Response"
 
             except requests.ConnectionError as err:
+                breaker.record_failure()
                 reason, msg = ("ConnectionError", err)
                 print(str(err), resp.text)
 
@@ -999,6 +1026,7 @@ class AuthAPI(AuthAPIBase):
                 print(str(err), resp.text)
 
             except requests.Timeout as err:
+                breaker.record_failure()
                 reason, msg = ("TimeoutError", err)
                 print(str(err), resp.text)
 
@@ -1010,22 +1038,19 @@ class AuthAPI(AuthAPIBase):
                 reason, msg = ("GeneralException", err)
                 print(str(err), resp.json())
 
-            if trycnt >= maxretry:
-                if reason in ("ConnectionError", "HTTPError") and trycnt <= connretry:
-                    if self.app:
-                        RichText.notify(f"{reason}:  URI: {uri} trying again.  Attempt: {trycnt}", self.app, "error")
-                    if trycnt > 5:
-                        time.sleep(30)
-                else:
-                    if msg is None:
-                        msg = f"Unknown CoinbasePro Private API Error: call to {uri} attempted {trycnt} times, resulted in error"
-                    if reason is None:
-                        reason = "Unknown Error"
-                    return self.handle_api_error(msg, reason)
-            else:
+            if trycnt >= maxretry and reason not in ("ConnectionError", "HTTPError"):
+                if msg is None:
+                    msg = f"Unknown CoinbasePro Private API Error: call to {uri} attempted {trycnt} times, resulted in error"
+                if reason is None:
+                    reason = "Unknown Error"
+                return self.handle_api_error(msg, reason)
+
+            if trycnt < connretry:
+                # back off with jitter, unless the endpoint is failing or the next candle is due
+                if not retry.wait(trycnt):
+                    return self.handle_api_error(f"CoinbasePro API Error: call to {uri} attempted {trycnt} times, stopped retrying - {msg}", reason)
                 if self.app:
-                    RichText.notify(f"{str(msg)} - trying again.  Attempt: {trycnt}", self.app, "error")
-                time.sleep(15)
+                    RichText.notify(f"{str(msg)} - trying again.  Attempt: {trycnt + 1}", self.app, "error")
         else:
             return self.handle_api_error(
                 f"CoinbasePro API Error: call to {uri} attempted {trycnt} times without valid response", "CoinbasePro Private API Error"
@@ -1119,7 +1144,7 @@ class WebSocket(AuthAPIBase):
         elif not isinstance(self.markets, list):
             self.markets = [self.markets]
 
-        self.ws = create_connection(self._ws_url)
+        self.ws = create_connection(mock_url(self._ws_url))
         self.ws.send(
             json.dumps(
                 {
@@ -1260,181 +1285,59 @@ class WebSocketClient(WebSocket):
 
         self.markets = markets
         self.granularity = granularity
-        self.tickers = None
-        self.candles = None
         self.start_time = None
         self.time_elapsed = 0
 
-    def on_open(self):
-        self.message_count = 0
+        self._stream = TradeStream(
+            markets,
+            granularity,
+            self._seed,
+            on_ticker=lambda *ticker: self.on_ticker(*ticker),
+            on_candle_closed=lambda *candle: self.on_candle_closed(*candle),
+        )
 
-    def on_message(self, msg):
-        if self.start_time is not None:
-            self.time_elapsed = round((datetime.now() - self.start_time).total_seconds())
+    def _seed(self, market: str) -> pd.DataFrame:
+        return AuthAPI(self.app.api_key, self.app.api_secret, self.app.api_url, app=self.app).get_historical_data(market, self.granularity)
 
-        if "time" in msg and "product_id" in msg and "price" in msg:
-            # create dataframe from websocket message
-            df = pd.DataFrame(
-                columns=["date", "market", "price"],
-                data=[
-                    [
-                        datetime.strptime(msg["time"], "%Y-%m-%dT%H:%M:%S.%fZ").strftime("%Y-%m-%d %H:%M:%S"),
-                        msg["product_id"],
-                        msg["price"],
-                    ]
-                ],
-            )
+    @property
+    def tickers(self) -> pd.DataFrame:
+        return self._stream.tickers
 
-            # set column types
-            df["date"] = df["date"].astype("datetime64[ns]")
-            df["price"] = df["price"].astype("float64")
+    @tickers.setter
+    def tickers(self, value) -> None:
+        # the stream state is only cleared, it is built from the websocket messages
+        if value is None and hasattr(self, "_stream"):
+            self._stream.reset()
 
-            # form candles
-            df["candle"] = df["date"].dt.floor(freq=self.granularity.frequency)
+    @property
+    def candles(self) -> pd.DataFrame:
+        return self._stream.candles
 
-            # candles dataframe is empty
-            if self.candles is None:
-                resp = AuthAPI(self.app.api_key, self.app.api_secret, self.app.api_url, app=self.app).get_historical_data(
-                    df["market"].values[0], self.granularity.to_integer
-                )
+    @candles.setter
+    def candles(self, value) -> None:
+        if value is None and hasattr(self, "_stream"):
+            self._stream.reset()
 
-                if len(resp) > 0:
-                    self.candles = resp
-                else:
-                    # create dataframe from websocket message
-                    self.candles = pd.DataFrame(
-                        columns=[
-                            "date",
-                            "market",
-                            "granularity",
-                            "open",
-                            "high",
-                            "close",
-                            "low",
-                            "volume",
-                        ],
-                        data=[
-                            [
-                                df["candle"].values[0],
-                                df["market"].values[0],
-                                self.granularity.to_integer,
-                                df["price"].values[0],
-                                df["price"].values[0],
-                                df["price"].values[0],
-                                df["price"].values[0],
-                                msg["size"],
-                            ]
-                        ],
-                    )
-            # candles dataframe contains some data
-            else:
-                # check if the current candle exists
-                candle_exists = ((self.candles["date"] == df["candle"].values[0]) & (self.candles["market"] == df["market"].values[0])).any()
-                if not candle_exists:
-                    # populate historical data via api if it does not exist
-                    if len(self.candles[self.candles["market"] == df["market"].values[0]]) == 0:
-                        resp = AuthAPI(self.app.api_key, self.app.api_secret, self.app.api_url, app=self.app).get_historical_data(
-                            df["market"].values[0], self.granularity.to_integer
-                        )
-                        if len(resp) > 0:
-                            df_new_candle = resp
-                        else:
-                            # create dataframe from websocket message
-                            df_new_candle = pd.DataFrame(
-                                columns=[
-                                    "date",
-                                    "market",
-                                    "granularity",
-                                    "open",
-                                    "high",
-                                    "close",
-                                    "low",
-                                    "volume",
-                                ],
-                                data=[
-                                    [
-                                        df["candle"].values[0],
-                                        df["market"].values[0],
-                                        self.granularity.to_integer,
-                                        df["price"].values[0],
-                                        df["price"].values[0],
-                                        df["price"].values[0],
-                                        df["price"].values[0],
-                                        msg["size"],
-                                    ]
-                                ],
-                            )
-
-                    else:
-                        df_new_candle = pd.DataFrame(
-                            columns=[
-                                "date",
-                                "market",
-                                "granularity",
-                                "open",
-                                "high",
-                                "close",
-                                "low",
-                                "volume",
-                            ],
-                            data=[
-                                [
-                                    df["candle"].values[0],
-                                    df["market"].values[0],
-                                    self.granularity.to_integer,
-                                    df["price"].values[0],
-                                    df["price"].values[0],
-                                    df["price"].values[0],
-                                    df["price"].values[0],
-                                    msg["size"],
-                                ]
-                            ],
-                        )
-
-                    try:
-                        df_new_candle.index = df_new_candle["date"]
-                        self.candles = pd.concat([self.candles, df_new_candle])
-                        df_new_candle = None
-                    except Exception as err:
-                        print(err)
-                        pass
-                else:
-                    candle = self.candles[((self.candles["date"] == df["candle"].values[0]) & (self.candles["market"] == df["market"].values[0]))]
+    def adopt(self, client) -> None:
+        """Takes over the candles another websocket client holds for the markets of this one, they are not seeded again"""
 
-                    # set high on high
-                    if float(df["price"].values[0]) > float(candle.high.values[0]):
-                        self.candles.at[candle.index.values[0], "high"] = df["price"].values[0]
+        self._stream.adopt(client._stream)
 
-                    self.candles.at[candle.index.values[0], "close"] = df["price"].values[0]
-
-                    # set low on low
-                    if float(df["price"].values[0]) < float(candle.low.values[0]):
-                        self.candles.at[candle.index.values[0], "low"] = df["price"].values[0]
+    def on_ticker(self, market: str, date, price: float) -> None:
+        """Called with every ticker of the websocket"""
 
-                    # increment candle base volume
-                    self.candles.at[candle.index.values[0], "volume"] = float(candle["volume"].values[0]) + float(msg["size"])
-
-            # insert first entry
-            if self.tickers is None and len(df) > 0:
-                self.tickers = df
-            # append future entries without duplicates
-            elif self.tickers is not None and len(df) > 0:
-                self.tickers = pd.concat([self.tickers, df]).drop_duplicates(subset="market", keep="last").reset_index(drop=True)
+    def on_candle_closed(self, market: str, candle: tuple) -> None:
+        """Called with every (epoch, low, high, open, close, volume) candle that closes"""
 
-            # convert dataframes to a time series
-            tsidx = pd.DatetimeIndex(pd.to_datetime(self.tickers["date"]).dt.strftime("%Y-%m-%dT%H:%M:%S.%Z"))
-            self.tickers.set_index(tsidx, inplace=True)
-            self.tickers.index.name = "ts"
+    def on_open(self):
+        self.message_count = 0
 
-            # set correct column types
-            self.candles["open"] = self.candles["open"].astype("float64")
-            self.candles["high"] = self.candles["high"].astype("float64")
-            self.candles["close"] = self.candles["close"].astype("float64")
-            self.candles["low"] = self.candles["low"].astype("float64")
-            self.candles["volume"] = self.candles["volume"].astype("float64")
+    def on_message(self, msg):
+        if self.start_time is not None:
+            self.time_elapsed = round((datetime.now() - self.start_time).total_seconds())
 
-            # keep last 300 candles per market
-            self.candles = self.candles.groupby("market").tail(300)
+        if "time" in msg and "product_id" in msg and "price" in msg and "size" in msg:
+            self._stream.add_trade(msg["product_id"], msg["time"], float(msg["price"]), float(msg["size"]))
 
         self.message_count += 1
 
@@ -1518,7 +1421,7 @@ class WebSocket(AuthAPIBase):
         message = f"{timestamp}{channel}{product_ids_str}"
         signature = hmac.new(self.app.api_secret.encode("utf-8"), message.encode("utf-8"), digestmod=hashlib.sha256).hexdigest()
 
-        self.ws = create_connection(self._ws_url)
+        self.ws = create_connection(mock_url(self._ws_url))
         self.ws.send(
             json.dumps(
                 {
@@ -15,7 +15,14 @@ from requests.auth import AuthBase
 from requests import Request
 from threading import Thread
 from websocket import create_connection, WebSocketConnectionClosedException
+from models.exchange.ClientPool import decode_json, get_session, mock_url
+from models.exchange.ExchangesEnum import Exchange
 from models.exchange.Granularity import Granularity
+from models.exchange.MetadataCache import FEES_TTL, MARKETS_TTL, cached
+from models.exchange.RateLimiter import get_limiter, retry_after
+from models.exchange.Retry import RetryPolicy, candle_deadline, get_breaker
+from models.exchange.StreamBuffer import TradeStream
+from models.helper.CandleHelper import parse_candles
 from views.PyCryptoBot import RichText
 
 MARGIN_ADJUSTMENT = 0.0025
@@ -155,6 +162,7 @@ class AuthAPI(AuthAPIBase):
         except Exception:
             return pd.DataFrame()
 
+    @cached(FEES_TTL)
     def get_fees(self, market: str = "") -> pd.DataFrame:
         """Retrieves market fees"""
 
@@ -216,8 +224,8 @@ class AuthAPI(AuthAPIBase):
         except Exception:
             return 0
 
-    def get_orders(self, market: str = "", action: str = "", status: str = "all") -> pd.DataFrame:
-        """Retrieves your list of orders with optional filtering"""
+    def get_orders(self, market: str = "", action: str = "", status: str = "all", since: datetime = None) -> pd.DataFrame:
+        """Retrieves your list of orders with optional filtering, created since a UTC datetime when given"""
 
         # if market provided
         if market != "":
@@ -236,8 +244,12 @@ class AuthAPI(AuthAPIBase):
             raise ValueError("Invalid order status.")
 
         try:
+            uri = f"orders?status={status}"
+            if since is not None:
+                uri += f"&start_date={since.strftime('%Y-%m-%dT%H:%M:%SZ')}"
+
             # GET /orders?status
-            resp = self.auth_api("GET", f"orders?status={status}")
+            resp = self.auth_api("GET", uri)
             if len(resp) > 0:
                 if status == "open":
                     df = resp.copy()[
@@ -516,10 +528,16 @@ class AuthAPI(AuthAPIBase):
         except Exception:
             return pd.DataFrame()
 
+    @cached(MARKETS_TTL)
+    def get_product(self, market: str) -> pd.DataFrame:
+        """Retrieves a product, including its base and quote increments"""
+
+        return self.auth_api("GET", f"products/{market}")
+
     def market_base_increment(self, market, amount) -> float:
         """Retrieves the market base increment"""
 
-        product = self.auth_api("GET", f"products/{market}")
+        product = self.get_product(market)
 
         if "base_increment" not in product:
             return amount
@@ -536,7 +554,7 @@ class AuthAPI(AuthAPIBase):
     def market_quote_increment(self, market, amount) -> float:
         """Retrieves the market quote increment"""
 
-        product = self.auth_api("GET", f"products/{market}")
+        product = self.get_product(market)
 
         if "quote_increment" not in product:
             return amount
@@ -562,18 +580,33 @@ class AuthAPI(AuthAPIBase):
         if not isinstance(uri, str):
             raise TypeError("URI is not a string.")
 
+        breaker = get_breaker(Exchange.COINBASEPRO, uri)
+        if not breaker.allow():
+            return self.handle_api_error(f"CoinbasePro API Error: {uri} is failing, next attempt in {breaker.retry_in:.0f} seconds", "CoinbasePro Private API Error")
+        retry = RetryPolicy(candle_deadline(getattr(self.app, "granularity", None)), breaker)
+
         reason, msg = (None, None)
-        trycnt, maxretry, connretry = (1, 5, 10)
-        while trycnt <= connretry:
+        trycnt, maxretry, connretry = (0, 5, 10)
+        while trycnt < connretry:
+            trycnt += 1
             try:
+                get_limiter(Exchange.COINBASEPRO, "private").acquire()
                 if method == "DELETE":
-                    resp = requests.delete(self._api_url + uri, auth=self)
+                    resp = get_session(self._api_url).delete(self._api_url + uri, auth=self)
                 elif method == "GET":
-                    resp = requests.get(self._api_url + uri, auth=self)
+                    resp = get_session(self._api_url).get(self._api_url + uri, auth=self)
                 elif method == "POST":
-                    resp = requests.post(self._api_url + uri, json=payload, auth=self)
+                    resp = get_session(self._api_url).post(self._api_url + uri, json=payload, auth=self)
 
-                trycnt += 1
+                # only server errors count towards opening the circuit breaker
+                if resp.status_code >= 500:
+                    breaker.record_failure()
+                else:
+                    breaker.record_success()
+
+                if resp.status_code == 429:
+                    get_limiter(Exchange.COINBASEPRO, "private").backoff(retry_after(resp))
+                    continue
                 resp.raise_for_status()
 
                 if resp.status_code == 200:
@@ -599,12 +632,14 @@ class AuthAPI(AuthAPIBase):
                     reason = "Invalid Response"
 
             except requests.ConnectionError as err:
+                breaker.record_failure()
                 reason, msg = ("ConnectionError", err)
 
             except requests.exceptions.HTTPError as err:
                 reason, msg = ("HTTPError", err)
 
             except requests.Timeout as err:
+                breaker.record_failure()
                 reason, msg = ("TimeoutError", err)
 
             except json.decoder.JSONDecodeError as err:
@@ -613,22 +648,19 @@ class AuthAPI(AuthAPIBase):
             except Exception as err:
                 reason, msg = ("GeneralException", err)
 
-            if trycnt >= maxretry:
-                if reason in ("ConnectionError", "HTTPError") and trycnt <= connretry:
-                    if self.app:
-                        RichText.notify(f"{reason}:  URI: {uri} trying again.  Attempt: {trycnt}", self.app, "error")
-                    if trycnt > 5:
-                        time.sleep(30)
-                else:
-                    if msg is None:
-                        msg = f"Unknown CoinbasePro Private API Error: call to {uri} attempted {trycnt} times, resulted in error"
-                    if reason is None:
-                        reason = "Unknown Error"
-                    return self.handle_api_error(msg, reason)
-            else:
+            if trycnt >= maxretry and reason not in ("ConnectionError", "HTTPError"):
+                if msg is None:
+                    msg = f"Unknown CoinbasePro Private API Error: call to {uri} attempted {trycnt} times, resulted in error"
+                if reason is None:
+                    reason = "Unknown Error"
+                return self.handle_api_error(msg, reason)
+
+            if trycnt < connretry:
+                # back off with jitter, unless the endpoint is failing or the next candle is due
+                if not retry.wait(trycnt):
+                    return self.handle_api_error(f"CoinbasePro API Error: call to {uri} attempted {trycnt} times, stopped retrying - {msg}", reason)
                 if self.app:
-                    RichText.notify(f"{str(msg)} - trying again.  Attempt: {trycnt}", self.app, "error")
-                time.sleep(15)
+                    RichText.notify(f"{str(msg)} - trying again.  Attempt: {trycnt + 1}", self.app, "error")
         else:
             return self.handle_api_error(
                 f"CoinbasePro API Error: call to {uri} attempted {trycnt} times without valid response", "CoinbasePro Private API Error"
@@ -730,11 +762,6 @@ class PublicAPI(AuthAPIBase):
                         resp = self.auth_api("GET", f"products/{market}/candles?granularity={granularity}")
 
                 if len(resp) > 0:
-                    # convert the API response into a Pandas DataFrame
-                    df = pd.DataFrame(resp, columns=["epoch", "low", "high", "open", "close", "volume"])
-                    # reverse the order of the response with earliest last
-                    df = df.iloc[::-1].reset_index()
-
                     try:
                         if isinstance(granularity, Granularity):
                             freq = FREQUENCY_EQUIVALENTS[SUPPORTED_GRANULARITY.index(granularity.to_integer)]
@@ -743,54 +770,14 @@ class PublicAPI(AuthAPIBase):
                     except Exception:
                         freq = "D"
 
-                    # convert the DataFrame into a time series with the date as the index/key
-                    try:
-                        tsidx = pd.DatetimeIndex(
-                            pd.to_datetime(df["epoch"], unit="s"),
-                            dtype="datetime64[ns]",
-                            freq=freq,
-                        )
-                        df.set_index(tsidx, inplace=True)
-                        df = df.drop(columns=["epoch", "index"])
-                        df.index.names = ["ts"]
-                        df["date"] = tsidx
-                    except ValueError:
-                        tsidx = pd.DatetimeIndex(pd.to_datetime(df["epoch"], unit="s"), dtype="datetime64[ns]")
-                        df.set_index(tsidx, inplace=True)
-                        df = df.drop(columns=["epoch", "index"])
-                        df.index.names = ["ts"]
-                        df["date"] = tsidx
-
-                    df["market"] = market
-                    if isinstance(granularity, Granularity):
-                        df["granularity"] = granularity.to_integer
-                    else:
-                        df["granularity"] = granularity
-
-                    # re-order columns
-                    df = df[
-                        [
-                            "date",
-                            "market",
-                            "granularity",
-                            "low",
-                            "high",
-                            "open",
-                            "close",
-                            "volume",
-                        ]
-                    ]
-
-                    df["low"] = df["low"].astype(float)
-                    df["high"] = df["high"].astype(float)
-                    df["open"] = df["open"].astype(float)
-                    df["close"] = df["close"].astype(float)
-                    df["volume"] = df["volume"].astype(float)
-
-                    # reset pandas dataframe index
-                    df.reset_index()
-
-                    return df
+                    # convert the API response into a Pandas DataFrame
+                    return parse_candles(
+                        resp,
+                        ["time", "low", "high", "open", "close", "volume"],
+                        market,
+                        granularity.to_integer if isinstance(granularity, Granularity) else granularity,
+                        freq=freq,
+                    )
                 else:
                     if trycnt >= (maxretry):
                         if self.app:
@@ -881,31 +868,49 @@ class PublicAPI(AuthAPIBase):
         if not isinstance(uri, str):
             raise TypeError("URI is not a string.")
 
+        breaker = get_breaker(Exchange.COINBASEPRO, uri)
+        if not breaker.allow():
+            return self.handle_api_error(f"CoinbasePro API Error: {uri} is failing, next attempt in {breaker.retry_in:.0f} seconds", "CoinbasePro Public API Error")
+        retry = RetryPolicy(candle_deadline(getattr(self.app, "granularity", None)), breaker)
+
         reason, msg = (None, None)
-        trycnt, maxretry, connretry = (1, 5, 10)
-        while trycnt <= connretry:
+        trycnt, maxretry, connretry = (0, 5, 10)
+        while trycnt < connretry:
+            trycnt += 1
             try:
+                get_limiter(Exchange.COINBASEPRO, "public").acquire()
                 if method == "GET":
-                    resp = requests.get(self._api_url + uri)
+                    resp = get_session(self._api_url).get(self._api_url + uri)
                 elif method == "POST":
-                    resp = requests.post(self._api_url + uri, json=payload)
+                    resp = get_session(self._api_url).post(self._api_url + uri, json=payload)
 
-                trycnt += 1
+                # only server errors count towards opening the circuit breaker
+                if resp.status_code >= 500:
+                    breaker.record_failure()
+                else:
+                    breaker.record_success()
+
+                if resp.status_code == 429:
+                    get_limiter(Exchange.COINBASEPRO, "public").backoff(retry_after(resp))
+                    continue
                 resp.raise_for_status()
 
-                if resp.status_code == 200 and len(resp.json()) > 0:
-                    return resp.json()
+                data = decode_json(resp)
+                if resp.status_code == 200 and len(data) > 0:
+                    return data
                 else:
                     msg = f"{method} ({resp.status_code}) {self._api_url}{uri} - {resp.json()['message']}"
                     reason = "Invalid Response"
 
             except requests.ConnectionError as err:
+                breaker.record_failure()
                 reason, msg = ("ConnectionError", err)
 
             except requests.exceptions.HTTPError as err:
                 reason, msg = ("HTTPError", err)
 
             except requests.Timeout as err:
+                breaker.record_failure()
                 reason, msg = ("TimeoutError", err)
 
             except json.decoder.JSONDecodeError as err:
@@ -914,21 +919,19 @@ class PublicAPI(AuthAPIBase):
             except Exception as err:
                 reason, msg = ("GeneralException", err)
 
-            if trycnt >= maxretry:
-                if reason in ("ConnectionError", "HTTPError") and trycnt <= connretry:
-                    if self.app:
-                        RichText.notify(f"{reason}:  URI: {uri} trying again.  Attempt: {trycnt}", self.app, "error")
-                    if trycnt > 5:
-                        time.sleep(30)
-                else:
-                    if msg is None:
-                        msg = f"Unknown CoinbasePro Public API Error: call to {uri} attempted {trycnt} times, resulted in error"
-                    if reason is None:
-                        reason = "Unknown Error"
-                    return self.handle_api_error(msg, reason)
-            else:
-                time.sleep(15)
-
+            if trycnt >= maxretry and reason not in ("ConnectionError", "HTTPError"):
+                if msg is None:
+                    msg = f"Unknown CoinbasePro Public API Error: call to {uri} attempted {trycnt} times, resulted in error"
+                if reason is None:
+                    reason = "Unknown Error"
+                return self.handle_api_error(msg, reason)
+
+            if trycnt < connretry:
+                # back off with jitter, unless the endpoint is failing or the next candle is due
+                if not retry.wait(trycnt):
+                    return self.handle_api_error(f"CoinbasePro API Error: call to {uri} attempted {trycnt} times, stopped retrying - {msg}", reason)
+                if self.app:
+                    RichText.notify(f"{str(msg)} - trying again.  Attempt: {trycnt + 1}", self.app, "error")
         else:
             return self.handle_api_error(
                 f"CoinbasePro API Error: call to {uri} attempted {trycnt} times without valid response", "CoinbasePro Public API Error"
@@ -1023,7 +1026,7 @@ class WebSocket(AuthAPIBase):
         elif not isinstance(self.markets, list):
             self.markets = [self.markets]
 
-        self.ws = create_connection(self._ws_url)
+        self.ws = create_connection(mock_url(self._ws_url))
         self.ws.send(
             json.dumps(
                 {
@@ -1166,175 +1169,58 @@ class WebSocketClient(WebSocket):
 
         self.markets = markets
         self.granularity = granularity
-        self.tickers = None
-        self.candles = None
         self.start_time = None
         self.time_elapsed = 0
 
-    def on_open(self):
-        self.message_count = 0
+        self._stream = TradeStream(
+            markets,
+            granularity,
+            self._seed,
+            on_ticker=lambda *ticker: self.on_ticker(*ticker),
+            on_candle_closed=lambda *candle: self.on_candle_closed(*candle),
+        )
 
-    def on_message(self, msg):
-        if self.start_time is not None:
-            self.time_elapsed = round((datetime.now() - self.start_time).total_seconds())
+    def _seed(self, market: str) -> pd.DataFrame:
+        return PublicAPI().get_historical_data(market, self.granularity)
 
-        if "time" in msg and "product_id" in msg and "price" in msg:
-            # create dataframe from websocket message
-            df = pd.DataFrame(
-                columns=["date", "market", "price"],
-                data=[
-                    [
-                        datetime.strptime(msg["time"], "%Y-%m-%dT%H:%M:%S.%fZ").strftime("%Y-%m-%d %H:%M:%S"),
-                        msg["product_id"],
-                        msg["price"],
-                    ]
-                ],
-            )
+    @property
+    def tickers(self) -> pd.DataFrame:
+        return self._stream.tickers
 
-            # set column types
-            df["date"] = df["date"].astype("datetime64[ns]")
-            df["price"] = df["price"].astype("float64")
+    @tickers.setter
+    def tickers(self, value) -> None:
+        # the stream state is only cleared, it is built from the websocket messages
+        if value is None and hasattr(self, "_stream"):
+            self._stream.reset()
 
-            # form candles
-            df["candle"] = df["date"].dt.floor(freq=self.granularity.frequency)
+    @property
+    def candles(self) -> pd.DataFrame:
+        return self._stream.candles
 
-            # candles dataframe is empty
-            if self.candles is None:
-                resp = PublicAPI().get_historical_data(df["market"].values[0], self.granularity)
-                if len(resp) > 0:
-                    self.candles = resp
-                else:
-                    # create dataframe from websocket message
-                    self.candles = pd.DataFrame(
-                        columns=[
-                            "date",
-                            "market",
-                            "granularity",
-                            "open",
-                            "high",
-                            "close",
-                            "low",
-                            "volume",
-                        ],
-                        data=[
-                            [
-                                df["candle"].values[0],
-                                df["market"].values[0],
-                                self.granularity.to_integer,
-                                df["price"].values[0],
-                                df["price"].values[0],
-                                df["price"].values[0],
-                                df["price"].values[0],
-                                msg["size"],
-                            ]
-                        ],
-                    )
-            # candles dataframe contains some data
-            else:
-                # check if the current candle exists
-                candle_exists = ((self.candles["date"] == df["candle"].values[0]) & (self.candles["market"] == df["market"].values[0])).any()
-                if not candle_exists:
-                    # populate historical data via api if it does not exist
-                    if len(self.candles[self.candles["market"] == df["market"].values[0]]) == 0:
-                        resp = PublicAPI().get_historical_data(df["market"].values[0], self.granularity)
-                        if len(resp) > 0:
-                            df_new_candle = resp
-                        else:
-                            # create dataframe from websocket message
-                            df_new_candle = pd.DataFrame(
-                                columns=[
-                                    "date",
-                                    "market",
-                                    "granularity",
-                                    "open",
-                                    "high",
-                                    "close",
-                                    "low",
-                                    "volume",
-                                ],
-                                data=[
-                                    [
-                                        df["candle"].values[0],
-                                        df["market"].values[0],
-                                        self.granularity.to_integer,
-                                        df["price"].values[0],
-                                        df["price"].values[0],
-                                        df["price"].values[0],
-                                        df["price"].values[0],
-                                        msg["size"],
-                                    ]
-                                ],
-                            )
+    @candles.setter
+    def candles(self, value) -> None:
+        if value is None and hasattr(self, "_stream"):
+            self._stream.reset()
 
-                    else:
-                        df_new_candle = pd.DataFrame(
-                            columns=[
-                                "date",
-                                "market",
-                                "granularity",
-                                "open",
-                                "high",
-                                "close",
-                                "low",
-                                "volume",
-                            ],
-                            data=[
-                                [
-                                    df["candle"].values[0],
-                                    df["market"].values[0],
-                                    self.granularity.to_integer,
-                                    df["price"].values[0],
-                                    df["price"].values[0],
-                                    df["price"].values[0],
-                                    df["price"].values[0],
-                                    msg["size"],
-                                ]
-                            ],
-                        )
+    def adopt(self, client) -> None:
+        """Takes over the candles another websocket client holds for the markets of this one, they are not seeded again"""
 
-                    try:
-                        df_new_candle.index = df_new_candle["date"]
-                        self.candles = pd.concat([self.candles, df_new_candle])
-                        df_new_candle = None
-                    except Exception as err:
-                        print(err)
-                        pass
-                else:
-                    candle = self.candles[((self.candles["date"] == df["candle"].values[0]) & (self.candles["market"] == df["market"].values[0]))]
-
-                    # set high on high
-                    if float(df["price"].values[0]) > float(candle.high.values[0]):
-                        self.candles.at[candle.index.values[0], "high"] = df["price"].values[0]
-
-                    self.candles.at[candle.index.values[0], "close"] = df["price"].values[0]
-
-                    # set low on low
-                    if float(df["price"].values[0]) < float(candle.low.values[0]):
-                        self.candles.at[candle.index.values[0], "low"] = df["price"].values[0]
-
-                    # increment candle base volume
-                    self.candles.at[candle.index.values[0], "volume"] = float(candle["volume"].values[0]) + float(msg["size"])
-
-            # insert first entry
-            if self.tickers is None and len(df) > 0:
-                self.tickers = df
-            # append future entries without duplicates
-            elif self.tickers is not None and len(df) > 0:
-                self.tickers = pd.concat([self.tickers, df]).drop_duplicates(subset="market", keep="last").reset_index(drop=True)
-
-            # convert dataframes to a time series
-            tsidx = pd.DatetimeIndex(pd.to_datetime(self.tickers["date"]).dt.strftime("%Y-%m-%dT%H:%M:%S.%Z"))
-            self.tickers.set_index(tsidx, inplace=True)
-            self.tickers.index.name = "ts"
-
-            # set correct column types
-            self.candles["open"] = self.candles["open"].astype("float64")
-            self.candles["high"] = self.candles["high"].astype("float64")
-            self.candles["close"] = self.candles["close"].astype("float64")
-            self.candles["low"] = self.candles["low"].astype("float64")
-            self.candles["volume"] = self.candles["volume"].astype("float64")
-
-            # keep last 300 candles per market
-            self.candles = self.candles.groupby("market").tail(300)
+        self._stream.adopt(client._stream)
+
+    def on_ticker(self, market: str, date, price: float) -> None:
+        """Called with every ticker of the websocket"""
+
+    def on_candle_closed(self, market: str, candle: tuple) -> None:
+        """Called with every (epoch, low, high, open, close, volume) candle that closes"""
+
+    def on_open(self):
+        self.message_count = 0
+
+    def on_message(self, msg):
+        if self.start_time is not None:
+            self.time_elapsed = round((datetime.now() - self.start_time).total_seconds())
+
+        if "time" in msg and "product_id" in msg and "price" in msg and "size" in msg:
+            self._stream.add_trade(msg["product_id"], msg["time"], float(msg["price"]), float(msg["size"]))
 
         self.message_count += 1
@@ -19,7 +19,14 @@ from requests import Request
 from views.PyCryptoBot import RichText
 from threading import Thread
 from websocket import create_connection, WebSocketConnectionClosedException
+from models.exchange.ClientPool import decode_json, get_session, mock_url
+from models.exchange.ExchangesEnum import Exchange
 from models.exchange.Granularity import Granularity
+from models.exchange.MetadataCache import FEES_TTL, MARKETS_TTL, cached
+from models.exchange.RateLimiter import get_limiter, retry_after
+from models.exchange.Retry import RetryPolicy, candle_deadline, get_breaker
+from models.helper.CandleHelper import parse_candles
+from models.OrderStore import OrderStore
 from urllib import parse
 
 MARGIN_ADJUSTMENT = 0.0025
@@ -27,6 +34,7 @@ DEFAULT_MAKER_FEE_RATE = 0.018
 DEFAULT_TAKER_FEE_RATE = 0.018
 DEFAULT_TRADE_FEE_RATE = 0.018  # added 0.0005 to allow for self.price movements
 MINIMUM_TRADE_AMOUNT = 10
+ORDER_SYNC_INTERVAL = 6 * 3600  # seconds between order history syncs
 SUPPORTED_GRANULARITY = [
     "1min",
     "3min",
@@ -78,6 +86,9 @@ class AuthAPI(AuthAPIBase):
         # options
         self.die_on_api_error = False
 
+        # reason of the last failed call, an empty DataFrame is also a valid response
+        self.last_api_error = None
+
         valid_urls = [
             "https://api.kucoin.com",
             "https://api.kucoin.com/",
@@ -116,19 +127,33 @@ class AuthAPI(AuthAPIBase):
         self._api_url = api_url
 
         if use_cache:
-            # Make the cache folder if it doesn't exist
-
-            if not os.path.exists(cache_path):
-                os.makedirs(cache_path)
-
             self._cache_path = cache_path
-            self._cache_filepath = cache_path + os.path.sep + "kucoin_order_cache.json"
-            self._cache_lock_filepath = cache_path + os.path.sep + "kucoin_order_cache.lock"
+            self._order_store = OrderStore(Exchange.KUCOIN, cache_path)
+
+            # import the order history of the previous JSON cache, one bot of the host does it
+            json_cache_filepath = os.path.join(cache_path, "kucoin_order_cache.json")
+            with self._order_store.syncing() as syncing:
+                if syncing:
+                    self._import_order_cache(json_cache_filepath)
 
         self.usekucoincache = use_cache
         # use pagination if cache is enabled
         self.usepagination = use_cache
 
+    def _import_order_cache(self, json_cache_filepath: str) -> None:
+        try:
+            orders = pd.read_json(json_cache_filepath, convert_dates=False) if self.validateJSONFile(json_cache_filepath) else None
+        except (OSError, ValueError):
+            # another bot imported and removed the cache meanwhile
+            return
+
+        if orders is not None:
+            self._order_store.add_orders(orders)
+            try:
+                os.remove(json_cache_filepath)
+            except FileNotFoundError:
+                pass
+
     def handle_init_error(self, err: str, app: object = None) -> None:
         """Handle initialisation error"""
 
@@ -198,6 +223,7 @@ class AuthAPI(AuthAPIBase):
 
         return self.auth_api("GET", f"api/v1/accounts/{account}")
 
+    @cached(FEES_TTL)
     def get_fees(self, market: str = "") -> pd.DataFrame:
         """Retrieves market fees"""
 
@@ -246,6 +272,7 @@ class AuthAPI(AuthAPIBase):
         fees = self.get_fees()
         return float(fees["usd_volume"].to_string(index=False).strip())
 
+    @cached(MARKETS_TTL)
     def getMarkets(self) -> list:
         """Retrieves a list of markets on the exchange"""
 
@@ -264,8 +291,8 @@ class AuthAPI(AuthAPIBase):
         df = df.reset_index()
         return df
 
-    def get_orders(self, market: str = "", action: str = "", status: str = "all") -> pd.DataFrame:
-        """Retrieves your list of orders with optional filtering"""
+    def get_orders(self, market: str = "", action: str = "", status: str = "all", since: datetime = None) -> pd.DataFrame:
+        """Retrieves your list of orders with optional filtering, created since a UTC datetime when given"""
 
         # if market provided
         if market != "":
@@ -287,8 +314,12 @@ class AuthAPI(AuthAPIBase):
         if self.usekucoincache:
             self.buildOrderHistoryCache()
 
+        uri = f"api/v1/orders?symbol={market}"
+        if since is not None:
+            uri += f"&startAt={int(since.replace(tzinfo=timezone.utc).timestamp() * 1000)}"
+
         # GET /orders?status
-        resp = self.auth_api("GET", f"api/v1/orders?symbol={market}", use_order_cache=self.usekucoincache, use_pagination=self.usepagination)
+        resp = self.auth_api("GET", uri, use_order_cache=self.usekucoincache, use_pagination=self.usepagination)
         if len(resp) > 0:
             if status == "active":
                 df = resp.copy()[
@@ -545,6 +576,7 @@ class AuthAPI(AuthAPIBase):
         model = AuthAPI(self._api_key, self._api_secret, self._api_passphrase, self._api_url)
         return model.auth_api("POST", "orders", order)
 
+    @cached(FEES_TTL)
     def get_trade_fee(self, market: str) -> float:
         """Retrieves the trade fees"""
 
@@ -568,10 +600,16 @@ class AuthAPI(AuthAPIBase):
         model = AuthAPI(self._api_key, self._api_secret, self._api_passphrase, self._api_url)
         return model.auth_api("DELETE", "orders")
 
+    @cached(MARKETS_TTL)
+    def get_symbols(self, market: str) -> pd.DataFrame:
+        """Retrieves the trading symbols, including their base and quote increments"""
+
+        return self.auth_api("GET", f"api/v1/symbols?{market}")
+
     def market_base_increment(self, market, amount) -> float:
         """Retrieves the market base increment"""
         pMarket = market.split("-")[0]
-        product = self.auth_api("GET", f"api/v1/symbols?{pMarket}")
+        product = self.get_symbols(pMarket)
 
         for ind in product.index:
             if product["symbol"][ind] == market:
@@ -591,7 +629,7 @@ class AuthAPI(AuthAPIBase):
     def market_quote_increment(self, market, amount) -> float:
         """Retrieves the market quote increment"""
 
-        products = self.auth_api("GET", f"api/v1/symbols?{market}")
+        products = self.get_symbols(market)
 
         for ind in products.index:
             if products["symbol"][ind] == market:
@@ -620,118 +658,40 @@ class AuthAPI(AuthAPIBase):
             return False
 
     def buildOrderHistoryCache(self, days_to_keep=45, enable_purge=True) -> bool:
-        """Intelligently builds an order history cache to use in subsequent api calls"""
-
-        if exists(self._cache_lock_filepath):
-            # Lock file exists - wait
-            last_modified_lock = datetime.now() - datetime.fromtimestamp(os.path.getmtime(os.path.join(self._cache_lock_filepath)))
-            while exists(self._cache_lock_filepath):
-                try:
-                    last_modified_lock = datetime.now() - datetime.fromtimestamp(os.path.getmtime(os.path.join(self._cache_lock_filepath)))
-                    if last_modified_lock > 1799:
-                        # lock has existed for longer than 30 mins - try and salvage
-                        break
-                except Exception:
-                    pass
-                time.sleep(5)
+        """Incrementally syncs the order history store from the last order created"""
 
-        if exists(self._cache_filepath):
-            last_modified = datetime.now() - datetime.fromtimestamp(os.path.getmtime(os.path.join(self._cache_filepath)))
-
-            # If last build over a day ago
-            if last_modified.seconds < 21599:
-                # print (f"Last modified cache: {last_modified.seconds}")
+        store = self._order_store
+        with store.syncing() as syncing:
+            # another bot is syncing the store, the stored orders are used meanwhile
+            if not syncing or time.time() - store.synced < ORDER_SYNC_INTERVAL:
                 return True
 
-        # pd.set_option('display.max_rows', 4000)
-
-        now = int(round(time.time() * 1000))
-        hour = 1 * 3600 * 1000
-        day = 24 * hour
-        week = 7 * day
-        month = day * 30  # noqa: F841
-        # Date of Kucoin Starting
-        since = 1504224000000
-        end = min(since + week, now)  # noqa: F841
-
-        purgeAfter = now - (day * days_to_keep)
-        # endAt = min(since + week, now)
-        startAt = now - (30 * day)
-
-        break_build = False
-        last_timestamp_check = now - (12 * hour)
-
-        # Validate the json cache file
-        if not self.validateJSONFile(self._cache_filepath):
-            # Delete the json file so it can be rebuilt
-            if exists(self._cache_filepath):
-                os.remove(self._cache_filepath)
-
-        # If a previous cache file exists - load it up into the df
-        if exists(self._cache_filepath):
-            df = pd.read_json(self._cache_filepath)
-        else:
-            df = pd.DataFrame()
-
-        if not df.empty:
-            if len(df.columns) > 1:
-                if "createdAt" in df.columns:
-                    df = df.sort_values(by="createdAt", ascending=True)
-                    startAt = df.createdAt.iloc[-1] + 1
-
-        while (now - (12 * hour)) > startAt:
-
-            st_dt = datetime.fromtimestamp(startAt / 1000.0)
-            st_str = st_dt.strftime("%m/%d/%Y, %H:%M:%S")
-            print(f"Start at HR: {st_str}")
-
-            # Create the lock file
-            if not exists(self._cache_lock_filepath):
-                with open(self._cache_lock_filepath, "w") as fp:
-                    pass
-                fp.close()
-
-            print("Doing historic orders build... ")
-            resp = self.auth_api("GET", f"api/v1/orders?startAt={startAt}", use_pagination=True)
-            if last_timestamp_check == startAt:
-                # print ("Hit Last timestamp check")
-                resp = self.auth_api("GET", "api/v1/orders?", use_pagination=True)
-                break_build = True
-            if len(resp) > 0:
-                df = df.append(resp)
-                df = df.drop_duplicates("id")
-                df = df.reset_index(drop=True)
-
-                if "createdAt" in df.columns:
-                    df = df.sort_values(by="createdAt", ascending=True)
-                    startAt = df.createdAt.iloc[-1] + 1
-                    last_timestamp_check = startAt
-
-            if break_build:
-                break
+            now = int(round(time.time() * 1000))
+            day = 24 * 3600 * 1000
+            purgeAfter = now - (day * days_to_keep)
+
+            startAt = store.cursor
+            if startAt is None:
+                startAt = now - (30 * day)
+            startAt = max(startAt, purgeAfter)
+
+            # Kucoin returns the orders of at most a week per request
+            while startAt < now:
+                endAt = min(startAt + 7 * day, now)
+                self.last_api_error = None
+                resp = self.auth_api("GET", f"api/v1/orders?startAt={startAt}&endAt={endAt}", use_pagination=True)
+                if self.last_api_error is not None:
+                    # the next sync resumes from the failed week
+                    return False
+                if len(resp) > 0:
+                    store.add_orders(resp)
+                startAt = endAt + 1
 
-            time.sleep(5)
-
-        df = df.drop_duplicates("id")
-        # Purge anything older than a month
-        if enable_purge:
-            df = df[df["createdAt"] > purgeAfter]
-        # Do final sort
-        if "createdAt" in df.columns:
-            df = df.sort_values(by="createdAt", ascending=True)
-            startAt = df.createdAt.iloc[-1] + 1
-        df = df.reset_index(drop=True)
-
-        # Remove json cache - and then recreate with latest data
-        if exists(self._cache_filepath):
-            os.remove(self._cache_filepath)
-        time.sleep(1)
-        df.to_json(self._cache_filepath, orient="records")
-        time.sleep(1)
-        # Delete Lock File
-        if exists(self._cache_lock_filepath):
-            os.remove(self._cache_lock_filepath)
-        return df
+            if enable_purge:
+                store.purge(purgeAfter)
+            store.set_synced()
+
+        return True
 
     def auth_api(
         self,
@@ -755,19 +715,26 @@ class AuthAPI(AuthAPIBase):
         if not isinstance(uri, str):
             raise TypeError("URI is not a string.")
 
+        breaker = get_breaker(Exchange.KUCOIN, uri)
+        if not breaker.allow():
+            return self.handle_api_error(f"Kucoin API Error: {uri} is failing, next attempt in {breaker.retry_in:.0f} seconds", "Kucoin Private API Error")
+        retry = RetryPolicy(candle_deadline(getattr(self.app, "granularity", None)), breaker)
+
+        # Store the original URI for use later, retries page from it again
+        orig_uri = uri
+
         reason, msg = (None, None)
-        trycnt, maxretry, connretry = (1, 5, 10)
-        while trycnt <= connretry:
+        trycnt, maxretry, connretry = (0, 5, 10)
+        while trycnt < connretry:
+            trycnt += 1
             try:
-                # Store the original URI for use later
-                orig_uri = uri
                 symbol = ""
 
                 if method == "GET" and use_pagination and getting_pages:
                     # We are getting this and subsequent pages
-                    uri = uri + f"&currentPage={page_num}&pageSize={per_page}"
+                    uri = orig_uri + f"&currentPage={page_num}&pageSize={per_page}"
                 elif method == "GET" and use_pagination and not getting_pages:
-                    uri = uri + f"&currentPage=1&pageSize={per_page}"
+                    uri = orig_uri + f"&currentPage=1&pageSize={per_page}"
 
                 # Get the symbol from the URL if it exists in parameters
                 if use_order_cache and ("symbol" in (self._api_url + uri)) and not ("symbols" in (self._api_url + uri)):
@@ -780,14 +747,23 @@ class AuthAPI(AuthAPIBase):
                 else:
                     symbol = None
 
+                get_limiter(Exchange.KUCOIN, "private").acquire()
                 if method == "DELETE":
-                    resp = requests.delete(self._api_url + uri, auth=self)
+                    resp = get_session(self._api_url).delete(self._api_url + uri, auth=self)
                 elif method == "GET":
-                    resp = requests.get(self._api_url + uri, auth=self)
+                    resp = get_session(self._api_url).get(self._api_url + uri, auth=self)
                 elif method == "POST":
-                    resp = requests.post(self._api_url + uri, json=payload, auth=self)
+                    resp = get_session(self._api_url).post(self._api_url + uri, json=payload, auth=self)
 
-                trycnt += 1
+                # only server errors count towards opening the circuit breaker
+                if resp.status_code >= 500:
+                    breaker.record_failure()
+                else:
+                    breaker.record_success()
+
+                if resp.status_code == 429:
+                    get_limiter(Exchange.KUCOIN, "private").backoff(retry_after(resp))
+                    continue
                 resp.raise_for_status()
 
                 if resp.status_code == 200 and len(resp.json()) > 0:
@@ -831,17 +807,10 @@ class AuthAPI(AuthAPIBase):
                         if int(df["code"].values[0]) != 200000:
                             raise RuntimeError(df["msg"].iloc[0])
 
-                    # If a previous cache file exists - load it up into the df
-                    if use_order_cache and exists(self._cache_filepath) and "v1/orders" in uri and method == "GET":
-                        if exists(self._cache_lock_filepath):
-                            # Lock file exists - wait
-                            while exists(self._cache_lock_filepath):
-                                time.sleep(5)
-                        cache_df = pd.read_json(self._cache_filepath)
-                        df = df.append(cache_df)
+                    # Add the stored orders of the symbol, the exchange returns the latest page only
+                    if use_order_cache and "v1/orders" in uri and method == "GET":
+                        df = pd.concat([df, self._order_store.get_orders(symbol)], ignore_index=True)
                         df = df.drop_duplicates("id")
-                    else:
-                        cache_df = None
 
                     if use_pagination:
                         # Get subsequent pages - if in original AuthAPI call
@@ -849,12 +818,11 @@ class AuthAPI(AuthAPIBase):
                             if (not getting_pages) and (not use_order_cache) and (max_pages > current_page):
                                 page_counter = 1
                                 while page_counter <= max_pages:
-                                    time.sleep(10)
                                     page_counter += 1
                                     append_df = self.auth_api(
                                         method=method, uri=orig_uri, payload=payload, getting_pages=True, page_num=page_counter, per_page=per_page
                                     )
-                                    df = df.append(append_df)
+                                    df = pd.concat([df, append_df])
                                     if page_counter == max_pages:
                                         break
 
@@ -871,12 +839,14 @@ class AuthAPI(AuthAPIBase):
                     reason = "Invalid Response"
 
             except requests.ConnectionError as err:
+                breaker.record_failure()
                 reason, msg = ("ConnectionError", err)
 
             except requests.exceptions.HTTPError as err:
                 reason, msg = ("HTTPError", err)
 
             except requests.Timeout as err:
+                breaker.record_failure()
                 reason, msg = ("TimeoutError", err)
 
             except json.decoder.JSONDecodeError as err:
@@ -888,29 +858,26 @@ class AuthAPI(AuthAPIBase):
             except Exception as err:
                 reason, msg = ("GeneralException", err)
 
-            if trycnt >= maxretry:
-                if reason in ("ConnectionError", "HTTPError") and trycnt <= connretry:
-                    if self.app:
-                        RichText.notify(f"{reason}:  URI: {uri} trying again.  Attempt: {trycnt}", self.app, "error")
-                    if trycnt > 5:
-                        time.sleep(30)
-                else:
-                    if msg is None:
-                        msg = f"Unknown Kucoin Private API Error: call to {uri} attempted {trycnt} times, resulted in error"
-                    if reason is None:
-                        reason = "Unknown Error"
-                    return self.handle_api_error(msg, reason)
-            else:
+            if trycnt >= maxretry and reason not in ("ConnectionError", "HTTPError"):
+                if msg is None:
+                    msg = f"Unknown Kucoin Private API Error: call to {uri} attempted {trycnt} times, resulted in error"
+                if reason is None:
+                    reason = "Unknown Error"
+                return self.handle_api_error(msg, reason)
+
+            if trycnt < connretry:
+                # back off with jitter, unless the endpoint is failing or the next candle is due
+                if not retry.wait(trycnt):
+                    return self.handle_api_error(f"Kucoin API Error: call to {uri} attempted {trycnt} times, stopped retrying - {msg}", reason)
                 if self.app:
-                    RichText.notify(f"{str(msg)} - trying again.  Attempt: {trycnt}", self.app, "error")
-                time.sleep(15)
-
+                    RichText.notify(f"{str(msg)} - trying again.  Attempt: {trycnt + 1}", self.app, "error")
         else:
             return self.handle_api_error(f"Kucoin API Error: call to {uri} attempted {trycnt} times without valid response", "Kucoin Private API Error")
 
     def handle_api_error(self, err: str, reason: str, app: object = None) -> pd.DataFrame:
         """Handle API errors"""
 
+        self.last_api_error = reason
         if app is not None and app.debug is True:
             if self.die_on_api_error:
                 raise SystemExit(err)
@@ -1019,25 +986,19 @@ class PublicAPI(AuthAPIBase):
                 trycnt += 1
                 try:
                     if "data" in resp:
-                        # convert the API response into a Pandas DataFrame
-                        df = pd.DataFrame(
-                            resp["data"],
-                            columns=["time", "open", "close", "high", "low", "volume", "turnover"],
-                        )
-                        # reverse the order of the response with earliest last
-                        df = df.iloc[::-1].reset_index()
-
                         try:
                             freq = granularity.get_frequency
                         except Exception:
                             freq = "D"
 
-                        # convert the DataFrame into a time series with the date as the index/key
-                        tsidx = pd.DatetimeIndex(pd.to_datetime(df["time"], unit="s"), dtype="datetime64[ns]", freq=freq)
-                        df.set_index(tsidx, inplace=True)
-                        df = df.drop(columns=["time", "index"])
-                        df.index.names = ["ts"]
-                        df["date"] = tsidx
+                        # convert the API response into a Pandas DataFrame
+                        df = parse_candles(
+                            resp["data"],
+                            ["time", "open", "close", "high", "low", "volume", "turnover"],
+                            market,
+                            granularity.to_medium,
+                            freq=freq,
+                        )
 
                         break
                     else:
@@ -1050,20 +1011,7 @@ class PublicAPI(AuthAPIBase):
                         raise Exception(f"Kucoin API Error for Historical Data - attempted {trycnt} times - Error: {err}")
                     time.sleep(15)
 
-            df["market"] = market
-            df["granularity"] = granularity.to_medium
-
-            # re-order columns
-            df = df[["date", "market", "granularity", "low", "high", "open", "close", "volume"]]
-
-            df["low"] = df["low"].astype(float).fillna(0)
-            df["high"] = df["high"].astype(float).fillna(0)
-            df["open"] = df["open"].astype(float).fillna(0)
-            df["close"] = df["close"].astype(float).fillna(0)
-            df["volume"] = df["volume"].astype(float).fillna(0)
-
-            # reset pandas dataframe index
-            df.reset_index()
+            df[["low", "high", "open", "close", "volume"]] = df[["low", "high", "open", "close", "volume"]].fillna(0)
         return df
 
     def get_ticker(self, market: str = DEFAULT_MARKET, websocket=None) -> tuple:
@@ -1142,32 +1090,50 @@ class PublicAPI(AuthAPIBase):
         if not isinstance(uri, str):
             raise TypeError("URI is not a string.")
 
+        breaker = get_breaker(Exchange.KUCOIN, uri)
+        if not breaker.allow():
+            return self.handle_api_error(f"Kucoin API Error: {uri} is failing, next attempt in {breaker.retry_in:.0f} seconds", "Kucoin Public API Error")
+        retry = RetryPolicy(candle_deadline(getattr(self.app, "granularity", None)), breaker)
+
         # If API returns an error status code, retry request up to 5 times
         reason, msg = (None, None)
-        trycnt, maxretry, connretry = (1, 5, 10)
-        while trycnt <= connretry:
+        trycnt, maxretry, connretry = (0, 5, 10)
+        while trycnt < connretry:
+            trycnt += 1
             try:
+                get_limiter(Exchange.KUCOIN, "public").acquire()
                 if method == "GET":
-                    resp = requests.get(self._api_url + uri)
+                    resp = get_session(self._api_url).get(self._api_url + uri)
                 elif method == "POST":
-                    resp = requests.post(self._api_url + uri, json=payload)
+                    resp = get_session(self._api_url).post(self._api_url + uri, json=payload)
 
-                trycnt += 1
+                # only server errors count towards opening the circuit breaker
+                if resp.status_code >= 500:
+                    breaker.record_failure()
+                else:
+                    breaker.record_success()
+
+                if resp.status_code == 429:
+                    get_limiter(Exchange.KUCOIN, "public").backoff(retry_after(resp))
+                    continue
                 resp.raise_for_status()
 
-                if resp.status_code == 200 and len(resp.json()) > 0:
-                    return resp.json()
+                data = decode_json(resp)
+                if resp.status_code == 200 and len(data) > 0:
+                    return data
                 else:
                     msg = f"{method} ({resp.status_code}) {self._api_url}{uri} - {resp.json()['msg']}"
                     reason = "Invalid Response"
 
             except requests.ConnectionError as err:
+                breaker.record_failure()
                 reason, msg = ("ConnectionError", err)
 
             except requests.exceptions.HTTPError as err:
                 reason, msg = ("HTTPError", err)
 
             except requests.Timeout as err:
+                breaker.record_failure()
                 reason, msg = ("TimeoutError", err)
 
             except json.decoder.JSONDecodeError as err:
@@ -1176,21 +1142,19 @@ class PublicAPI(AuthAPIBase):
             except Exception as err:
                 reason, msg = ("GeneralException", err)
 
-            if trycnt >= maxretry:
-                if reason in ("ConnectionError", "HTTPError") and trycnt <= connretry:
-                    if self.app:
-                        RichText.notify(f"{reason}:  URI: {uri} trying again.  Attempt: {trycnt}", self.app, "error")
-                    if trycnt > 5:
-                        time.sleep(30)
-                else:
-                    if msg is None:
-                        msg = f"Unknown Kucoin Public API Error: call to {uri} attempted {trycnt} times, resulted in error"
-                    if reason is None:
-                        reason = "Unknown Error"
-                    return self.handle_api_error(msg, reason)
-            else:
-                time.sleep(15)
-
+            if trycnt >= maxretry and reason not in ("ConnectionError", "HTTPError"):
+                if msg is None:
+                    msg = f"Unknown Kucoin Public API Error: call to {uri} attempted {trycnt} times, resulted in error"
+                if reason is None:
+                    reason = "Unknown Error"
+                return self.handle_api_error(msg, reason)
+
+            if trycnt < connretry:
+                # back off with jitter, unless the endpoint is failing or the next candle is due
+                if not retry.wait(trycnt):
+                    return self.handle_api_error(f"Kucoin API Error: call to {uri} attempted {trycnt} times, stopped retrying - {msg}", reason)
+                if self.app:
+                    RichText.notify(f"{str(msg)} - trying again.  Attempt: {trycnt + 1}", self.app, "error")
         else:
             return self.handle_api_error(f"Kucoin API Error: call to {uri} attempted {trycnt} times without valid response", "Kucoin Public API Error")
 
@@ -1279,7 +1243,7 @@ class WebSocket(AuthAPIBase):
         elif not isinstance(self.markets, list):
             self.markets = [self.markets]
 
-        self.ws = create_connection(self._ws_url + f"/endpoint?token={self.token}")
+        self.ws = create_connection(mock_url(self._ws_url + f"/endpoint?token={self.token}"))
         self.ws.send(json.dumps({"type": "subscribe", "topic": f"/market/ticker:{','.join(self.markets)}", "privateChannel": "false", "response": "true"}))
 
         self.start_time = datetime.now()
@@ -1421,6 +1385,20 @@ class WebSocketClient(WebSocket):
         # print("token: " + ts["data"]["token"])
         self.token = ts["data"]["token"]
 
+    def adopt(self, client) -> None:
+        """Takes over the candles another websocket client holds for the markets of this one, they are not seeded again"""
+
+        if isinstance(client.candles, pd.DataFrame):
+            candles = client.candles[client.candles["market"].isin(self.markets)]
+            if len(candles) > 0:
+                self.candles = candles.copy()
+
+    def on_ticker(self, market: str, date, price: float) -> None:
+        """Called with every ticker of the websocket"""
+
+    def on_candle_closed(self, market: str, candle: tuple) -> None:
+        """Called with every (epoch, low, high, open, close, volume) candle that closes"""
+
     def on_open(self):
         self.message_count = 0
 
@@ -1429,6 +1407,8 @@ class WebSocketClient(WebSocket):
             self.time_elapsed = round((datetime.now() - self.start_time).total_seconds())
         # if any new errors, len(msg) > 0 is new
         if len(msg) > 0 and "data" in msg and "time" in msg["data"] and "price" in msg["data"]:
+            closed = None
+
             # create dataframe from websocket message
             df = pd.DataFrame(
                 columns=["date", "market", "price"],
@@ -1519,6 +1499,16 @@ class WebSocketClient(WebSocket):
                             )
 
                     else:
+                        # the trade opens the next candle of the market, its latest candle is closed
+                        last = self.candles[self.candles["market"] == df["market"].values[0]].iloc[-1]
+                        closed = (
+                            int(pd.Timestamp(last["date"]).timestamp()),
+                            float(last["low"]),
+                            float(last["high"]),
+                            float(last["open"]),
+                            float(last["close"]),
+                            float(last["volume"]),
+                        )
                         df_new_candle = pd.DataFrame(
                             columns=[
                                 "date",
@@ -1588,6 +1578,10 @@ class WebSocketClient(WebSocket):
             # keep last 300 candles per market
             self.candles = self.candles.groupby("market").tail(300)
 
+            self.on_ticker(df["market"].values[0], df["date"].values[0], float(df["price"].values[0]))
+            if closed is not None:
+                self.on_candle_closed(df["market"].values[0], closed)
+
             # print (f'{msg["time"]} {msg["product_id"]} {msg["price"]}')
             # print(json.dumps(msg, indent=4, sort_keys=True))
 
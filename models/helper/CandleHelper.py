@@ -0,0 +1,123 @@
+"""Candle parsing and resampling functions"""
+
+import numpy as np
+import pandas as pd
+
+from models.exchange.Granularity import Granularity
+
+
+CANDLE_COLUMNS = ["date", "market", "granularity", "low", "high", "open", "close", "volume"]
+
+
+def parse_candles(rows: list, fields: list, market: str, granularity, unit: str = "s", freq: str = None) -> pd.DataFrame:
+    """
+    Build a candle dataframe from the kline rows an exchange returns.
+
+    The rows are converted into NumPy arrays once, times are converted from integer epochs
+    and the dataframe is built in one go, sorted earliest first.
+    """
+
+    if not isinstance(rows, list) or len(rows) == 0:
+        return pd.DataFrame(columns=CANDLE_COLUMNS, index=pd.DatetimeIndex([], name="ts"))
+
+    columns = list(zip(*rows))
+    prices = np.array([columns[fields.index(column)] for column in ["low", "high", "open", "close", "volume"]], dtype=np.float64).T
+    times = np.array(columns[fields.index("time")], dtype=np.int64)
+
+    if len(times) > 1 and times[0] > times[-1]:
+        prices, times = prices[::-1], times[::-1]
+
+    dates = times.astype(f"datetime64[{unit}]").astype("datetime64[ns]")
+    try:
+        tsidx = pd.DatetimeIndex(dates, freq=freq, name="ts")
+    except ValueError:
+        tsidx = pd.DatetimeIndex(dates, name="ts")
+
+    return pd.DataFrame(
+        {
+            "date": tsidx,
+            "market": market,
+            "granularity": granularity,
+            "low": prices[:, 0],
+            "high": prices[:, 1],
+            "open": prices[:, 2],
+            "close": prices[:, 3],
+            "volume": prices[:, 4],
+        },
+        index=tsidx,
+    )
+
+
+def resample_candles(df: pd.DataFrame, base: Granularity, granularity: Granularity) -> pd.DataFrame:
+    """
+    Resample exchange candles into a coarser granularity.
+
+    Only candles fully covered by the base candles are returned, the candles are bucketed from
+    the epoch like the exchange candles are and are formatted like the base candles.
+    """
+
+    if not isinstance(df, pd.DataFrame):
+        raise TypeError("'df' not a Pandas dataframe")
+
+    if not isinstance(base, Granularity) or not isinstance(granularity, Granularity):
+        raise TypeError("Granularity Enum required.")
+
+    if granularity.to_integer <= base.to_integer or granularity.to_integer % base.to_integer != 0:
+        raise ValueError(f"{base.to_short} candles can not be resampled into {granularity.to_short} candles")
+
+    if len(df) == 0:
+        return pd.DataFrame(columns=CANDLE_COLUMNS)
+
+    df = df.sort_index()
+    buckets = df[["low", "high", "open", "close", "volume"]].astype(float).resample(f"{granularity.to_integer}s", label="left", closed="left", origin="epoch")
+    resampled = buckets.agg({"low": "min", "high": "max", "open": "first", "close": "last", "volume": "sum"})
+
+    # exchanges skip candles without trades, an empty bucket has no candle either
+    resampled = resampled[buckets["close"].count() > 0]
+
+    # the first and last candles are partial if the base candles start or end inside them
+    first_covered = df.index[0].ceil(f"{granularity.to_integer}s")
+    last_covered = (df.index[-1] + pd.Timedelta(seconds=base.to_integer)).floor(f"{granularity.to_integer}s")
+    resampled = resampled[(resampled.index >= first_covered) & (resampled.index < last_covered)]
+
+    # the exchanges format the granularity column differently
+    granularity_value = df["granularity"].iloc[0]
+    if granularity_value == base.to_short:
+        granularity_value = granularity.to_short
+    elif granularity_value == base.to_medium:
+        granularity_value = granularity.to_medium
+    elif granularity_value == base:
+        granularity_value = granularity
+    else:
+        granularity_value = granularity.to_integer
+
+    resampled.insert(0, "date", resampled.index)
+    resampled.insert(1, "market", df["market"].iloc[0])
+    resampled.insert(2, "granularity", granularity_value)
+    resampled.index.name = "ts"
+
+    return resampled[CANDLE_COLUMNS]
+
+
+def compare_candles(resampled: pd.DataFrame, exchange: pd.DataFrame, rtol: float = 1e-6) -> bool:
+    """
+    Validate resampled candles against the exchange candles for the same granularity.
+
+    The candles must overlap and the prices of every overlapping candle must match, volume is
+    compared loosely as the exchanges round it.
+    """
+
+    if len(resampled) == 0 or len(exchange) == 0:
+        return False
+
+    overlap = resampled.index.intersection(exchange.index)
+    if len(overlap) == 0:
+        return False
+
+    resampled = resampled.loc[overlap]
+    exchange = exchange.loc[~exchange.index.duplicated(keep="last")].loc[overlap]
+    for column in ["low", "high", "open", "close"]:
+        if not np.allclose(resampled[column].astype(float), exchange[column].astype(float), rtol=rtol, atol=0):
+            return False
+
+    return bool(np.allclose(resampled["volume"].astype(float), exchange["volume"].astype(float), rtol=1e-3, atol=1e-8))
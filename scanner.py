@@ -1,4 +1,4 @@
-import time
+import asyncio
 import json
 import pandas as pd
 
@@ -10,10 +10,21 @@ from models.exchange.binance import PublicAPI as BPublicAPI
 from models.exchange.coinbase import AuthAPI as CBAuthAPI
 from models.exchange.coinbase_pro import PublicAPI as CPublicAPI
 from models.exchange.kucoin import PublicAPI as KPublicAPI
+from models.exchange.AsyncAPI import AsyncAPI, gather
 from models.exchange.Granularity import Granularity
 from models.exchange.ExchangesEnum import Exchange
 
 GRANULARITY = Granularity(Granularity.ONE_HOUR)
+CONCURRENCY = 4
+
+
+async def get_historical_data(api, markets: list) -> dict:
+    async_api = AsyncAPI(api)
+
+    # the exchange rate limiters pace the requests
+    calls = [async_api.get_historical_data(market, GRANULARITY, None) for market in markets]
+    return dict(zip(markets, await gather(calls, CONCURRENCY)))
+
 
 try:
     with open("scanner.json", encoding='utf8') as json_file:
@@ -83,12 +94,17 @@ for exchange in config:
 
         print("Processing, please wait...")
 
+        historical_data = asyncio.run(get_historical_data(api, list(df_markets[df_markets["volume"] > 0].index)))
+
         ROW = 1
         for market, data in df_markets.T.items():
             print(f"[{ROW}/{len(df_markets)}] {market} {round((ROW/len(df_markets))*100, 2)}%")
             try:
                 if int(data["volume"]) > 0:
-                    ta = TechnicalAnalysis(api.get_historical_data(market, GRANULARITY, None), app=app)
+                    if isinstance(historical_data[market], Exception):
+                        raise historical_data[market]
+
+                    ta = TechnicalAnalysis(historical_data[market], app=app)
                     ta.add_ema(12)
                     ta.add_ema(26)
                     ta.add_atr(72)
@@ -107,9 +123,6 @@ for exchange in config:
             except Exception as err:
                 print(err)
 
-            # don't flood exchange, sleep 1 second
-            time.sleep(2)
-
             # current position
             ROW += 1
 
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+# encoding: utf-8
+
+"""Python Crypto Bot parameter sweep
+
+Back tests a grid or random search space of bot options in parallel over one
+set of candles, e.g.
+
+    python3 sweep.py --sim fast-vector --market BTC-GBP --sweep sweep.json --workers 8
+"""
+
+import argparse
+import json
+import sys
+
+from rich import box
+from rich.console import Console
+from rich.table import Table
+
+from controllers.PyCryptoBot import PyCryptoBot
+from models.Sweep import ParameterSweep
+from models.Trading import TechnicalAnalysis
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Python Crypto Bot parameter sweep")
+    parser.add_argument("--sweep", type=str, default="sweep.json", help="search space of bot options")
+    parser.add_argument("--workers", type=int, default=None, help="number of worker processes (default: all cores)")
+    parser.add_argument("--samples", type=int, default=0, help="number of random combinations (default: the whole grid)")
+    parser.add_argument("--seed", type=int, default=None, help="random search seed")
+    parser.add_argument("--top", type=int, default=20, help="number of results to show")
+    parser.add_argument("--output", type=str, default=None, help="save every result to a csv file")
+    args, _ = parser.parse_known_args()
+
+    with open(args.sweep, encoding="utf8") as json_file:
+        space = json.load(json_file)
+
+    app = PyCryptoBot()
+    if not app.is_sim:
+        sys.stderr.write("A sweep requires a simulation, e.g. --sim fast-vector\n")
+        sys.exit(1)
+
+    app.simresultonly = True
+    app.disabletelegram = True
+    app.disabletracker = True
+    app.initialise(banner=False)
+
+    trading_data = app.trading_data
+    if app.simenddate:
+        trading_data = trading_data[trading_data["date"] <= app.simenddate]
+
+    technical_analysis = TechnicalAnalysis(trading_data, len(trading_data), app=app)
+    technical_analysis.add_all()
+    df = technical_analysis.get_df()
+
+    start = 0
+    if app.simstartdate is not None:
+        start = df.index.get_loc(str(app.get_date_from_iso8601_str(app.simstartdate)))
+
+    results = ParameterSweep(app, df, start, space, args.samples, args.seed).run(args.workers)
+
+    table = Table(title=f"Parameter Sweep: {app.market} {app.print_granularity()}", box=box.SQUARE, border_style="white")
+    for column in results.columns:
+        table.add_column(column, justify="right", style="cyan" if column in space else "white")
+    for row in results.head(args.top).itertuples(index=False):
+        table.add_row(*[str(value) for value in row])
+
+    Console(no_color=(not app.term_color), width=app.term_width).print(table)
+
+    if args.output:
+        results.to_csv(args.output, index=False)
+
+
+if __name__ == "__main__":
+    main()
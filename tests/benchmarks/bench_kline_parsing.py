@@ -0,0 +1,125 @@
+"""Kline parsing microbenchmark
+
+Compares the previous Binance kline parsing (per-column casts and regex epoch trimming on a
+stdlib decoded response) with the shared parser, e.g.
+
+    python3 tests/benchmarks/bench_kline_parsing.py --rows 300 1000 10000
+"""
+
+import argparse
+import json
+import sys
+import timeit
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(".")
+from models.exchange.ClientPool import orjson
+from models.exchange.Granularity import Granularity
+from models.helper.CandleHelper import parse_candles
+
+
+def get_payload(rows: int) -> bytes:
+    rng = np.random.default_rng(1)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.002, rows)))
+    start = 1640995200000
+
+    klines = []
+    for i in range(rows):
+        open_time = start + i * 3600000
+        klines.append(
+            [
+                open_time,
+                f"{close[i - 1] if i else close[0]:.8f}",
+                f"{close[i] * 1.001:.8f}",
+                f"{close[i] * 0.999:.8f}",
+                f"{close[i]:.8f}",
+                f"{rng.random() * 10:.8f}",
+                open_time + 3599999,
+                f"{rng.random() * 1000:.8f}",
+                int(rng.integers(1, 1000)),
+                "0.00000000",
+                "0.00000000",
+                "0",
+            ]
+        )
+
+    return json.dumps(klines).encode()
+
+
+def legacy(content: bytes, market: str, granularity: Granularity) -> pd.DataFrame:
+    resp = json.loads(content)
+
+    df = pd.DataFrame(
+        resp,
+        columns=[
+            "open_time",
+            "open",
+            "high",
+            "low",
+            "close",
+            "volume",
+            "close_time",
+            "quote_asset_volume",
+            "number_of_trades",
+            "taker_buy_base_asset_volume",
+            "traker_buy_quote_asset_volume",
+            "ignore",
+        ],
+    )
+
+    df["market"] = market
+    df["granularity"] = granularity.to_short
+
+    df["open_time"] = df["open_time"] + 1
+    df["open_time"] = df["open_time"].astype(str)
+    df["open_time"] = df["open_time"].str.replace(r"\d{3}$", "", regex=True)
+
+    tsidx = pd.DatetimeIndex(pd.to_datetime(df["open_time"], unit="s"), dtype="datetime64[ns]", freq=granularity.get_frequency)
+    df.set_index(tsidx, inplace=True)
+    df = df.drop(columns=["open_time"])
+    df.index.names = ["ts"]
+    df["date"] = tsidx
+
+    df = df[["date", "market", "granularity", "low", "high", "open", "close", "volume"]]
+
+    df["low"] = df["low"].astype(float)
+    df["high"] = df["high"].astype(float)
+    df["open"] = df["open"].astype(float)
+    df["close"] = df["close"].astype(float)
+    df["volume"] = df["volume"].astype(float)
+
+    return df
+
+
+def fast(content: bytes, market: str, granularity: Granularity) -> pd.DataFrame:
+    resp = orjson.loads(content) if orjson is not None else json.loads(content)
+
+    return parse_candles(
+        resp, ["time", "open", "high", "low", "close", "volume"], market, granularity.to_short, unit="ms", freq=granularity.get_frequency
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Kline parsing microbenchmark")
+    parser.add_argument("--rows", type=int, nargs="+", default=[300, 1000, 10000], help="klines per response")
+    parser.add_argument("--repeat", type=int, default=5, help="timing repeats, the best is reported")
+    args = parser.parse_args()
+
+    print(f"JSON decoder: {'orjson' if orjson is not None else 'json'}")
+    print(f"{'rows':>8} {'legacy ms':>12} {'fast ms':>10} {'speedup':>9}")
+
+    for rows in args.rows:
+        content = get_payload(rows)
+        pd.testing.assert_frame_equal(legacy(content, "BTCGBP", Granularity.ONE_HOUR), fast(content, "BTCGBP", Granularity.ONE_HOUR))
+
+        number = max(1, 3000 // rows)
+        legacy_time = min(timeit.repeat(lambda: legacy(content, "BTCGBP", Granularity.ONE_HOUR), number=number, repeat=args.repeat)) / number
+        fast_time = min(timeit.repeat(lambda: fast(content, "BTCGBP", Granularity.ONE_HOUR), number=number, repeat=args.repeat)) / number
+
+        print(f"{rows:>8} {legacy_time * 1000:>12.3f} {fast_time * 1000:>10.3f} {legacy_time / fast_time:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,15 @@
+"""Mock exchange for offline benchmarks and tests
+
+    with MockExchange(latency=0.05) as mock:
+        PublicAPI().get_historical_data("BTCGBP", Granularity.ONE_HOUR)
+
+or run it for a whole bot, scanner or websocket session:
+
+    python3 -m tests.mock_exchange --port 8080 --latency 0.05
+    PYCRYPTOBOT_MOCK_EXCHANGE=http://127.0.0.1:8080 python3 pycryptobot.py --exchange binance
+"""
+
+from tests.mock_exchange.market import Fixtures, RandomWalk
+from tests.mock_exchange.server import DEFAULT_MARKETS, MockExchange
+
+__all__ = ["DEFAULT_MARKETS", "Fixtures", "MockExchange", "RandomWalk"]
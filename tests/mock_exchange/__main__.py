@@ -0,0 +1,47 @@
+import argparse
+import sys
+import time
+
+sys.path.append(".")
+from models.exchange.ClientPool import MOCK_EXCHANGE_ENV
+from tests.mock_exchange import DEFAULT_MARKETS, Fixtures, MockExchange, RandomWalk
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="PyCryptoBot mock exchange")
+    parser.add_argument("--host", type=str, default="127.0.0.1", help="listening address (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8080, help="listening port (default: 8080)")
+    parser.add_argument("--fixtures", type=str, help="directory of recorded {market}-{granularity}.csv candles")
+    parser.add_argument("--seed", type=int, default=0, help="random walk seed (default: 0)")
+    parser.add_argument("--volatility", type=float, default=0.03, help="random walk daily volatility (default: 0.03)")
+    parser.add_argument("--markets", type=str, nargs="+", default=DEFAULT_MARKETS, help="listed markets")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to each REST response")
+    parser.add_argument("--ratelimit", type=float, help="REST requests per second and exchange before 429 responses")
+    parser.add_argument("--streaminterval", type=float, default=1.0, help="seconds between websocket updates (default: 1)")
+    args = parser.parse_args()
+
+    data = RandomWalk(args.seed, args.volatility)
+    if args.fixtures:
+        data = Fixtures(args.fixtures, fallback=data)
+
+    mock = MockExchange(
+        data,
+        markets=args.markets,
+        host=args.host,
+        port=args.port,
+        latency=args.latency,
+        rate_limit=args.ratelimit,
+        stream_interval=args.streaminterval,
+    )
+    mock.start()
+    print(f"Mock exchange listening, run the bot with {MOCK_EXCHANGE_ENV}={mock.url}")
+
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        mock.stop()
+
+
+if __name__ == "__main__":
+    main()
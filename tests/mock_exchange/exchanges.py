@@ -0,0 +1,819 @@
+"""Exchange protocol emulation for the mock exchange"""
+
+import re
+import uuid
+from datetime import datetime, timezone
+from threading import Lock
+
+import numpy as np
+
+from models.exchange.ExchangesEnum import Exchange
+from models.exchange.Granularity import Granularity
+from tests.mock_exchange.market import canonical_market, split_market
+
+DEFAULT_BALANCES = {"GBP": 1000.0, "EUR": 1000.0, "USD": 1000.0, "USDT": 1000.0, "BTC": 0.1, "ETH": 1.0}
+
+# Coinbase Advanced Trade candle granularities
+COINBASE_GRANULARITIES = {
+    "ONE_MINUTE": 60,
+    "FIVE_MINUTE": 300,
+    "FIFTEEN_MINUTE": 900,
+    "THIRTY_MINUTE": 1800,
+    "ONE_HOUR": 3600,
+    "TWO_HOUR": 7200,
+    "SIX_HOUR": 21600,
+    "ONE_DAY": 86400,
+}
+
+
+class OrderError(ValueError):
+    pass
+
+
+def iso(epoch: float) -> str:
+    return datetime.fromtimestamp(epoch, tz=timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+
+
+def decimal(value: float, digits: int = 8) -> str:
+    return f"{value:.{digits}f}"
+
+
+def parse_time(value, default: float = None) -> float:
+    """Parses epoch seconds, epoch milliseconds or an ISO 8601 date"""
+
+    if value in (None, ""):
+        return default
+
+    try:
+        value = float(value)
+        return value / 1000 if value > 1e11 else value
+    except ValueError:
+        return datetime.fromisoformat(str(value).replace("Z", "")).replace(tzinfo=timezone.utc).timestamp()
+
+
+class Account:
+    def __init__(self, balances: dict = None, taker_fee: float = 0.001, maker_fee: float = 0.001) -> None:
+        """Balances and filled orders of one exchange account"""
+
+        self.balances = dict(DEFAULT_BALANCES if balances is None else balances)
+        self.taker_fee = taker_fee
+        self.maker_fee = maker_fee
+        self.orders = []
+
+        self._lock = Lock()
+
+    def fill(self, market: str, side: str, price: float, now: float, size: float = None, funds: float = None) -> dict:
+        """Fills a market order at the price, by base size or by quote funds"""
+
+        if side not in ("buy", "sell"):
+            raise OrderError(f"Invalid order side: {side}")
+
+        if (size is None) == (funds is None):
+            raise OrderError("Either the order size or funds are required.")
+
+        base, quote = split_market(market)
+        if size is None:
+            # the fee of a buy by funds comes out of the funds
+            funds = float(funds)
+            fee = funds * self.taker_fee
+            size = (funds - fee) / price if side == "buy" else funds / price
+            spend = funds
+        else:
+            size = float(size)
+            funds = size * price
+            fee = funds * self.taker_fee
+            spend = funds + fee
+
+        with self._lock:
+            if side == "buy":
+                if self.balances.get(quote, 0.0) < spend - 1e-9:
+                    raise OrderError("Insufficient funds")
+                self.balances[quote] = self.balances.get(quote, 0.0) - spend
+                self.balances[base] = self.balances.get(base, 0.0) + size
+            else:
+                if self.balances.get(base, 0.0) < size - 1e-9:
+                    raise OrderError("Insufficient funds")
+                self.balances[base] = self.balances.get(base, 0.0) - size
+                self.balances[quote] = self.balances.get(quote, 0.0) + funds - fee
+
+            order = {
+                "id": str(uuid.uuid4()),
+                "market": canonical_market(market),
+                "side": side,
+                "type": "market",
+                "size": size,
+                "funds": funds,
+                "fee": fee,
+                "price": price,
+                "time": now,
+                "status": "done",
+            }
+            self.orders.append(order)
+
+        return order
+
+    def get_orders(self, market: str = None, side: str = None) -> list:
+        with self._lock:
+            return [o for o in self.orders if (market is None or o["market"] == canonical_market(market)) and (side is None or o["side"] == side)]
+
+
+class MockAPI:
+    """REST and stream protocol of one exchange
+
+    Routes are (method, regex) pairs matched against the request path, a route returns the
+    decoded response body, or a (status, body) tuple.
+    """
+
+    exchange = None
+    taker_fee = 0.001
+    maker_fee = 0.001
+    max_candles = 300
+
+    def __init__(self, data, markets: list, clock, balances: dict = None) -> None:
+        self.data = data
+        self.markets = [canonical_market(market) for market in markets]
+        self.clock = clock
+        self.account = Account(balances, self.taker_fee, self.maker_fee)
+        self.routes = [(method, re.compile(f"^{pattern}$"), func) for method, pattern, func in self.get_routes()]
+
+    def get_routes(self) -> list:
+        return []
+
+    def handle(self, method: str, path: str, query: dict, body: dict):
+        for route_method, pattern, func in self.routes:
+            match = pattern.match(path)
+            if match and route_method == method:
+                try:
+                    return func(query, body, *match.groups())
+                except OrderError as err:
+                    return self.error(400, str(err))
+                except (KeyError, StopIteration, ValueError) as err:
+                    return self.error(400, f"Invalid request: {err}")
+
+        return self.error(404, f"Unknown endpoint: {method} {path}")
+
+    def error(self, status: int, message: str) -> tuple:
+        return status, {"message": message}
+
+    def symbol(self, market: str) -> str:
+        """Returns a canonical market in the exchange format"""
+
+        return canonical_market(market)
+
+    def price(self, market: str) -> float:
+        return self.data.price(market, self.clock())
+
+    def candles(self, market: str, granularity: int, start: float = None, end: float = None, limit: int = None) -> np.ndarray:
+        """Returns the candles in a range, the latest candles up to now by default, oldest first"""
+
+        limit = min(limit or self.max_candles, self.max_candles)
+        end = self.clock() if end is None else min(end, self.clock())
+
+        # candles opening at the end are included, as the exchanges include the current candle
+        if start is None:
+            start = (end // granularity - limit + 1) * granularity
+            return self.data.candles(market, granularity, start, end + 1)[-limit:]
+
+        return self.data.candles(market, granularity, start, end + 1)[:limit]
+
+    def stats(self, market: str) -> dict:
+        """Returns the 24 hour statistics of a market from its hourly candles"""
+
+        last = self.price(market)
+        candles = self.candles(market, 3600, limit=24)
+        if len(candles) == 0:
+            return {"open": last, "high": last, "low": last, "last": last, "volume": 0.0, "quote_volume": 0.0}
+
+        return {
+            "open": float(candles["open"][0]),
+            "high": float(candles["high"].max()),
+            "low": float(candles["low"].min()),
+            "last": last,
+            "volume": float(candles["volume"].sum()),
+            "quote_volume": float(np.sum(candles["volume"] * candles["close"])),
+        }
+
+    def subscribe(self, message: dict) -> list:
+        """Returns the markets a websocket subscription message asks for"""
+
+        return [canonical_market(market) for market in message.get("product_ids", [])]
+
+    def welcome(self) -> list:
+        return []
+
+    def stream(self, markets: list, state: dict) -> list:
+        """Returns the websocket messages for the subscribed markets"""
+
+        return []
+
+
+class BinanceAPI(MockAPI):
+    exchange = Exchange.BINANCE
+    max_candles = 1000
+
+    def get_routes(self) -> list:
+        return [
+            ("GET", "/api/v3/time", lambda q, b: {"serverTime": int(self.clock() * 1000)}),
+            ("GET", "/api/v3/klines", self.get_klines),
+            ("GET", "/api/v3/ticker/price", self.get_ticker),
+            ("GET", "/api/v3/ticker/24hr", self.get_24hr),
+            ("GET", "/api/v3/exchangeInfo", self.get_exchange_info),
+            ("GET", "/api/v3/account", self.get_account),
+            ("GET", "/api/v3/allOrders", self.get_orders),
+            ("POST", "/api/v3/order", self.post_order),
+            ("POST", "/api/v3/order/test", lambda q, b: {}),
+            ("GET", "/sapi/v1/asset/tradeFee", self.get_trade_fee),
+        ]
+
+    def error(self, status: int, message: str) -> tuple:
+        return status, {"code": -1100 if status == 400 else -1000, "msg": message}
+
+    def symbol(self, market: str) -> str:
+        return "".join(split_market(market))
+
+    def get_klines(self, query, body):
+        granularity = Granularity.convert_to_enum(query["interval"]).to_integer
+        candles = self.candles(query["symbol"], granularity, parse_time(query.get("startTime")), parse_time(query.get("endTime")), int(query.get("limit", 500)))
+
+        return [
+            [
+                int(c["epoch"]) * 1000,
+                decimal(c["open"]),
+                decimal(c["high"]),
+                decimal(c["low"]),
+                decimal(c["close"]),
+                decimal(c["volume"]),
+                (int(c["epoch"]) + granularity) * 1000 - 1,
+                decimal(c["volume"] * c["close"]),
+                100,
+                decimal(c["volume"] / 2),
+                decimal(c["volume"] * c["close"] / 2),
+                "0",
+            ]
+            for c in candles
+        ]
+
+    def get_ticker(self, query, body):
+        if "symbol" in query:
+            return {"symbol": query["symbol"], "price": decimal(self.price(query["symbol"]))}
+
+        return [{"symbol": self.symbol(market), "price": decimal(self.price(market))} for market in self.markets]
+
+    def _24hr(self, market: str) -> dict:
+        stats = self.stats(market)
+        return {
+            "symbol": self.symbol(market),
+            "priceChange": decimal(stats["last"] - stats["open"]),
+            "priceChangePercent": decimal((stats["last"] / stats["open"] - 1) * 100, 3),
+            "openPrice": decimal(stats["open"]),
+            "highPrice": decimal(stats["high"]),
+            "lowPrice": decimal(stats["low"]),
+            "lastPrice": decimal(stats["last"]),
+            "volume": decimal(stats["volume"]),
+            "quoteVolume": decimal(stats["quote_volume"]),
+            "count": 2400,
+        }
+
+    def get_24hr(self, query, body):
+        if "symbol" in query:
+            return self._24hr(query["symbol"])
+
+        return [self._24hr(market) for market in self.markets]
+
+    def get_exchange_info(self, query, body):
+        markets = [canonical_market(query["symbol"])] if "symbol" in query else self.markets
+
+        symbols = []
+        for market in markets:
+            base, quote = split_market(market)
+            symbols.append(
+                {
+                    "symbol": self.symbol(market),
+                    "status": "TRADING",
+                    "baseAsset": base,
+                    "quoteAsset": quote,
+                    "isSpotTradingAllowed": True,
+                    "filters": [
+                        {"filterType": "PRICE_FILTER", "minPrice": "0.00000100", "maxPrice": "1000000.00000000", "tickSize": "0.00000100"},
+                        {"filterType": "LOT_SIZE", "minQty": "0.00001000", "maxQty": "9000.00000000", "stepSize": "0.00001000"},
+                        {"filterType": "MIN_NOTIONAL", "minNotional": "10.00000000", "applyToMarket": True, "avgPriceMins": 5},
+                    ],
+                }
+            )
+
+        return {"timezone": "UTC", "serverTime": int(self.clock() * 1000), "symbols": symbols}
+
+    def get_account(self, query, body):
+        return {
+            "makerCommission": int(self.maker_fee * 10000),
+            "takerCommission": int(self.taker_fee * 10000),
+            "canTrade": True,
+            "balances": [{"asset": asset, "free": decimal(balance), "locked": "0.00000000"} for asset, balance in sorted(self.account.balances.items())],
+        }
+
+    def _order(self, order: dict) -> dict:
+        return {
+            "symbol": self.symbol(order["market"]),
+            "orderId": abs(hash(order["id"])) % 10**9,
+            "clientOrderId": order["id"],
+            "price": "0.00000000",
+            "origQty": decimal(order["size"]),
+            "executedQty": decimal(order["size"]),
+            "cummulativeQuoteQty": decimal(order["funds"]),
+            "status": "FILLED",
+            "timeInForce": "GTC",
+            "type": "MARKET",
+            "side": order["side"].upper(),
+            "time": int(order["time"] * 1000),
+            "updateTime": int(order["time"] * 1000),
+            "isWorking": True,
+        }
+
+    def get_orders(self, query, body):
+        start = parse_time(query.get("startTime"), 0.0)
+        return [self._order(order) for order in self.account.get_orders(query["symbol"]) if order["time"] >= start]
+
+    def post_order(self, query, body):
+        market = query["symbol"]
+        if "quoteOrderQty" in query:
+            order = self.account.fill(market, query["side"].lower(), self.price(market), self.clock(), funds=query["quoteOrderQty"])
+        else:
+            order = self.account.fill(market, query["side"].lower(), self.price(market), self.clock(), size=query["quantity"])
+
+        resp = self._order(order)
+        resp["fills"] = [{"price": decimal(order["price"]), "qty": decimal(order["size"]), "commission": decimal(order["fee"]), "commissionAsset": split_market(market)[1]}]
+        return resp
+
+    def get_trade_fee(self, query, body):
+        return [{"symbol": query["symbol"], "makerCommission": str(self.maker_fee), "takerCommission": str(self.taker_fee)}]
+
+    def subscribe(self, message: dict) -> list:
+        markets = []
+        for param in message.get("params", []):
+            stream, _, kind = param.partition("@")
+            if kind.startswith("kline_"):
+                markets.append((canonical_market(stream), Granularity.convert_to_enum(kind[6:]).to_integer))
+        return markets
+
+    def stream(self, markets: list, state: dict) -> list:
+        now = self.clock()
+        messages = []
+        for market, granularity in markets:
+            price = self.price(market)
+            messages.append({"e": "24hrMiniTicker", "E": int(now * 1000), "s": self.symbol(market), "c": decimal(price)})
+
+            # close the previous candle when a new one opens
+            candles = self.candles(market, granularity, limit=2)
+            if state.get(market) is not None and state[market] != int(candles["epoch"][-1]) and len(candles) > 1:
+                messages.append(self._kline(market, granularity, candles[-2], now, closed=True))
+            state[market] = int(candles["epoch"][-1])
+            messages.append(self._kline(market, granularity, candles[-1], now, closed=False))
+
+        return messages
+
+    def _kline(self, market: str, granularity: int, candle, now: float, closed: bool) -> dict:
+        return {
+            "e": "kline",
+            "E": int(now * 1000),
+            "s": self.symbol(market),
+            "k": {
+                "t": int(candle["epoch"]) * 1000,
+                "T": (int(candle["epoch"]) + granularity) * 1000 - 1,
+                "s": self.symbol(market),
+                "i": Granularity.convert_to_enum(granularity).to_short,
+                "o": decimal(candle["open"]),
+                "c": decimal(candle["close"]),
+                "h": decimal(candle["high"]),
+                "l": decimal(candle["low"]),
+                "v": decimal(candle["volume"]),
+                "V": decimal(candle["volume"] / 2),
+                "x": closed,
+            },
+        }
+
+
+class CoinbaseProAPI(MockAPI):
+    exchange = Exchange.COINBASEPRO
+    taker_fee = 0.005
+    maker_fee = 0.005
+
+    def get_routes(self) -> list:
+        return [
+            ("GET", "/time", lambda q, b: {"iso": iso(self.clock()), "epoch": self.clock()}),
+            ("GET", "/products", lambda q, b: [self._product(market) for market in self.markets]),
+            ("GET", "/products/stats", self.get_stats),
+            ("GET", "/products/([^/]+)", lambda q, b, market: self._product(market)),
+            ("GET", "/products/([^/]+)/candles", self.get_candles),
+            ("GET", "/products/([^/]+)/ticker", self.get_ticker),
+            ("GET", "/accounts", lambda q, b: self._accounts()),
+            ("GET", "/accounts/([^/]+)", lambda q, b, account: next(a for a in self._accounts() if a["id"] == account)),
+            ("GET", "/fees", lambda q, b: {"taker_fee_rate": str(self.taker_fee), "maker_fee_rate": str(self.maker_fee), "usd_volume": "0"}),
+            ("GET", "/orders", self.get_orders),
+            ("POST", "/orders", self.post_order),
+            ("DELETE", "/orders", lambda q, b: []),
+        ]
+
+    def _product(self, market: str) -> dict:
+        base, quote = split_market(market)
+        return {
+            "id": self.symbol(market),
+            "base_currency": base,
+            "quote_currency": quote,
+            "base_increment": "0.00000001",
+            "quote_increment": "0.01",
+            "base_min_size": "0.00001",
+            "min_market_funds": "1",
+            "display_name": f"{base}/{quote}",
+            "status": "online",
+            "trading_disabled": False,
+        }
+
+    def get_stats(self, query, body):
+        stats = {}
+        for market in self.markets:
+            day = self.stats(market)
+            stats[self.symbol(market)] = {
+                "stats_24hour": {key: decimal(day[key]) for key in ("open", "high", "low", "last", "volume")},
+                "stats_30day": {"volume": decimal(day["volume"] * 30)},
+            }
+        return stats
+
+    def get_candles(self, query, body, market):
+        candles = self.candles(market, int(query["granularity"]), parse_time(query.get("start")), parse_time(query.get("end")))
+
+        # newest first
+        return [[int(c["epoch"]), float(c["low"]), float(c["high"]), float(c["open"]), float(c["close"]), float(c["volume"])] for c in candles[::-1]]
+
+    def get_ticker(self, query, body, market):
+        price = self.price(market)
+        return {"trade_id": int(self.clock()), "price": decimal(price), "size": "0.01", "time": iso(self.clock()), "bid": decimal(price * 0.9999), "ask": decimal(price * 1.0001), "volume": decimal(self.stats(market)["volume"])}
+
+    def _accounts(self) -> list:
+        return [
+            {"id": str(uuid.uuid5(uuid.NAMESPACE_URL, currency)), "currency": currency, "balance": decimal(balance, 16), "hold": decimal(0, 16), "available": decimal(balance, 16), "profile_id": "mock", "trading_enabled": True}
+            for currency, balance in sorted(self.account.balances.items())
+        ]
+
+    def _order(self, order: dict) -> dict:
+        resp = {
+            "id": order["id"],
+            "product_id": self.symbol(order["market"]),
+            "side": order["side"],
+            "type": "market",
+            "created_at": iso(order["time"]),
+            "done_at": iso(order["time"]),
+            "done_reason": "filled",
+            "fill_fees": decimal(order["fee"], 16),
+            "filled_size": decimal(order["size"]),
+            "executed_value": decimal(order["funds"], 16),
+            "status": "done",
+            "settled": True,
+        }
+        if order["side"] == "buy":
+            resp["funds"] = resp["specified_funds"] = decimal(order["funds"], 16)
+        else:
+            resp["size"] = decimal(order["size"])
+        return resp
+
+    def get_orders(self, query, body):
+        status, start = query.get("status", "all"), parse_time(query.get("start_date"), 0.0)
+        return [self._order(order) for order in self.account.get_orders(query.get("product_id"))[::-1] if status in ("all", "done") and order["time"] >= start]
+
+    def post_order(self, query, body):
+        market = body["product_id"]
+        if "funds" in body:
+            order = self.account.fill(market, body["side"], self.price(market), self.clock(), funds=body["funds"])
+        else:
+            order = self.account.fill(market, body["side"], self.price(market), self.clock(), size=body["size"])
+        return self._order(order)
+
+    def stream(self, markets: list, state: dict) -> list:
+        now = self.clock()
+        state["trade_id"] = state.get("trade_id", 0) + 1
+        return [
+            {"type": "match", "trade_id": state["trade_id"], "side": "buy", "size": "0.01", "price": decimal(self.price(market)), "product_id": self.symbol(market), "time": iso(now)}
+            for market in markets
+        ]
+
+
+class CoinbaseAPI(MockAPI):
+    exchange = Exchange.COINBASE
+    taker_fee = 0.006
+    maker_fee = 0.004
+
+    def get_routes(self) -> list:
+        prefix = "/api/v3/brokerage"
+        return [
+            ("GET", "/time", lambda q, b: {"iso": iso(self.clock()), "epoch": self.clock()}),
+            ("GET", f"{prefix}/products", lambda q, b: {"products": [self._product(market) for market in self.markets], "num_products": len(self.markets)}),
+            ("GET", f"{prefix}/products/([^/]+)", lambda q, b, market: self._product(market)),
+            ("GET", f"{prefix}/products/([^/]+)/candles", self.get_candles),
+            ("GET", f"{prefix}/products/([^/]+)/ticker", self.get_ticker),
+            ("GET", f"{prefix}/accounts", lambda q, b: {"accounts": self._accounts(), "has_next": False, "cursor": "", "size": len(self.account.balances)}),
+            ("GET", f"{prefix}/accounts/([^/]+)", lambda q, b, uuid: {"account": next(a for a in self._accounts() if a["uuid"] == uuid)}),
+            ("GET", f"{prefix}/transaction_summary", self.get_transaction_summary),
+            ("GET", f"{prefix}/orders/historical/batch", self.get_orders),
+            ("POST", f"{prefix}/orders", self.post_order),
+        ]
+
+    def _product(self, market: str) -> dict:
+        base, quote = split_market(market)
+        stats = self.stats(market)
+        return {
+            "product_id": self.symbol(market),
+            "price": decimal(stats["last"]),
+            "price_percentage_change_24h": decimal((stats["last"] / stats["open"] - 1) * 100, 4),
+            "volume_24h": decimal(stats["volume"]),
+            "volume_percentage_change_24h": "0",
+            "base_increment": "0.00000001",
+            "quote_increment": "0.01",
+            "quote_min_size": "1",
+            "quote_max_size": "10000000",
+            "base_min_size": "0.00000001",
+            "base_max_size": "10000",
+            "base_name": base,
+            "quote_name": quote,
+            "status": "online",
+            "cancel_only": False,
+            "limit_only": False,
+            "post_only": False,
+            "trading_disabled": False,
+            "auction_mode": False,
+            "product_type": "SPOT",
+            "quote_currency_id": quote,
+            "base_currency_id": base,
+            "mid_market_price": decimal(stats["last"]),
+            "base_display_symbol": base,
+            "quote_display_symbol": quote,
+        }
+
+    def get_candles(self, query, body, market):
+        granularity = COINBASE_GRANULARITIES[query["granularity"]]
+        candles = self.candles(market, granularity, parse_time(query.get("start")), parse_time(query.get("end")))
+        return {
+            "candles": [
+                {"start": str(int(c["epoch"])), "low": decimal(c["low"]), "high": decimal(c["high"]), "open": decimal(c["open"]), "close": decimal(c["close"]), "volume": decimal(c["volume"])}
+                for c in candles[::-1]
+            ]
+        }
+
+    def get_ticker(self, query, body, market):
+        price = self.price(market)
+        trade = {"trade_id": str(int(self.clock())), "product_id": self.symbol(market), "price": decimal(price), "size": "0.01", "time": iso(self.clock()), "side": "BUY", "bid": "", "ask": ""}
+        return {"trades": [trade], "best_bid": decimal(price * 0.9999), "best_ask": decimal(price * 1.0001)}
+
+    def _accounts(self) -> list:
+        return [
+            {
+                "uuid": str(uuid.uuid5(uuid.NAMESPACE_URL, currency)),
+                "name": f"{currency} Wallet",
+                "currency": currency,
+                "available_balance": {"value": decimal(balance, 16), "currency": currency},
+                "default": True,
+                "active": True,
+                "created_at": iso(0),
+                "updated_at": iso(0),
+                "deleted_at": None,
+                "type": "ACCOUNT_TYPE_CRYPTO",
+                "ready": True,
+                "hold": {"value": decimal(0, 16), "currency": currency},
+            }
+            for currency, balance in sorted(self.account.balances.items())
+        ]
+
+    def get_transaction_summary(self, query, body):
+        fee_tier = {"pricing_tier": "", "usd_from": "0", "usd_to": "10000", "taker_fee_rate": str(self.taker_fee), "maker_fee_rate": str(self.maker_fee)}
+        return {"total_volume": 0, "total_fees": 0, "fee_tier": fee_tier}
+
+    def _order(self, order: dict) -> dict:
+        if order["side"] == "buy":
+            configuration = {"market_market_ioc": {"quote_size": decimal(order["funds"])}}
+        else:
+            configuration = {"market_market_ioc": {"base_size": decimal(order["size"])}}
+
+        return {
+            "order_id": order["id"],
+            "product_id": self.symbol(order["market"]),
+            "order_configuration": configuration,
+            "side": order["side"].upper(),
+            "client_order_id": order["id"],
+            "status": "FILLED",
+            "created_time": iso(order["time"]),
+            "completion_percentage": "100",
+            "filled_size": decimal(order["size"]),
+            "average_filled_price": decimal(order["price"]),
+            "number_of_fills": "1",
+            "filled_value": decimal(order["funds"]),
+            "total_fees": decimal(order["fee"]),
+            "order_type": "MARKET",
+            "settled": True,
+            "product_type": "SPOT",
+        }
+
+    def get_orders(self, query, body):
+        side = query.get("order_side", "").lower() or None
+        start = parse_time(query.get("start_date"), 0.0)
+        orders = [self._order(order) for order in self.account.get_orders(query.get("product_id"), side)[::-1] if order["time"] >= start]
+        return {"orders": orders, "has_next": False, "cursor": "", "sequence": "0"}
+
+    def post_order(self, query, body):
+        market = body["product_id"]
+        ioc = body["order_configuration"]["market_market_ioc"]
+        if "quote_size" in ioc:
+            order = self.account.fill(market, body["side"].lower(), self.price(market), self.clock(), funds=ioc["quote_size"])
+        else:
+            order = self.account.fill(market, body["side"].lower(), self.price(market), self.clock(), size=ioc["base_size"])
+
+        success = {"order_id": order["id"], "product_id": self.symbol(market), "side": body["side"], "client_order_id": body.get("client_order_id", "")}
+        return {"success": True, "order_id": order["id"], "success_response": success, "order_configuration": body["order_configuration"]}
+
+    def stream(self, markets: list, state: dict) -> list:
+        now = self.clock()
+        state["trade_id"] = state.get("trade_id", 0) + 1
+        trades = [
+            {"trade_id": str(state["trade_id"]), "product_id": self.symbol(market), "price": decimal(self.price(market)), "size": "0.01", "side": "BUY", "time": iso(now)}
+            for market in markets
+        ]
+        return [{"channel": "market_trades", "timestamp": iso(now), "sequence_num": state["trade_id"], "events": [{"type": "update", "trades": [trade]}]} for trade in trades]
+
+
+class KucoinAPI(MockAPI):
+    exchange = Exchange.KUCOIN
+    max_candles = 1500
+
+    def get_routes(self) -> list:
+        return [
+            ("GET", "/api/v1/timestamp", lambda q, b: self.ok(int(self.clock() * 1000))),
+            ("GET", "/api/v1/market/candles", self.get_candles),
+            ("GET", "/api/v1/market/orderbook/level1", self.get_ticker),
+            ("GET", "/api/v1/market/allTickers", self.get_all_tickers),
+            ("GET", "/api/v1/symbols", lambda q, b: self.ok([self._symbol(market) for market in self.markets])),
+            ("POST", "/api/v1/bullet-(?:public|private)", self.post_bullet),
+            ("GET", "/api/v1/accounts", lambda q, b: self.ok(self._accounts())),
+            ("GET", "/api/v1/accounts/([^/]+)", lambda q, b, account: self.ok(next(a for a in self._accounts() if a["id"] == account))),
+            ("GET", "/api/v1/base-fee", lambda q, b: self.ok({"takerFeeRate": str(self.taker_fee), "makerFeeRate": str(self.maker_fee)})),
+            ("GET", "/api/v1/trade-fees", self.get_trade_fees),
+            ("GET", "/api/v1/orders", self.get_orders),
+            ("POST", "/api/v1/orders", self.post_order),
+            ("DELETE", "/orders", lambda q, b: self.ok({"cancelledOrderIds": []})),
+        ]
+
+    @staticmethod
+    def ok(data) -> dict:
+        return {"code": "200000", "data": data}
+
+    def error(self, status: int, message: str) -> tuple:
+        return status, {"code": str(status * 1000), "msg": message}
+
+    def get_candles(self, query, body):
+        granularity = Granularity.convert_to_enum(query["type"]).to_integer
+        candles = self.candles(query["symbol"], granularity, parse_time(query.get("startAt")), parse_time(query.get("endAt")))
+
+        # newest first
+        return self.ok(
+            [
+                [str(int(c["epoch"])), decimal(c["open"]), decimal(c["close"]), decimal(c["high"]), decimal(c["low"]), decimal(c["volume"]), decimal(c["volume"] * c["close"])]
+                for c in candles[::-1]
+            ]
+        )
+
+    def get_ticker(self, query, body):
+        price = self.price(query["symbol"])
+        return self.ok(
+            {
+                "time": int(self.clock() * 1000),
+                "sequence": str(int(self.clock())),
+                "price": decimal(price),
+                "size": "0.01",
+                "bestBid": decimal(price * 0.9999),
+                "bestBidSize": "1",
+                "bestAsk": decimal(price * 1.0001),
+                "bestAskSize": "1",
+            }
+        )
+
+    def get_all_tickers(self, query, body):
+        tickers = []
+        for market in self.markets:
+            stats = self.stats(market)
+            tickers.append(
+                {
+                    "symbol": self.symbol(market),
+                    "symbolName": self.symbol(market),
+                    "buy": decimal(stats["last"] * 0.9999),
+                    "sell": decimal(stats["last"] * 1.0001),
+                    "changeRate": decimal(stats["last"] / stats["open"] - 1, 4),
+                    "changePrice": decimal(stats["last"] - stats["open"]),
+                    "high": decimal(stats["high"]),
+                    "low": decimal(stats["low"]),
+                    "vol": decimal(stats["volume"]),
+                    "volValue": decimal(stats["quote_volume"]),
+                    "last": decimal(stats["last"]),
+                    "takerFeeRate": str(self.taker_fee),
+                    "makerFeeRate": str(self.maker_fee),
+                }
+            )
+        return self.ok({"time": int(self.clock() * 1000), "ticker": tickers})
+
+    def _symbol(self, market: str) -> dict:
+        base, quote = split_market(market)
+        return {
+            "symbol": self.symbol(market),
+            "name": self.symbol(market),
+            "baseCurrency": base,
+            "quoteCurrency": quote,
+            "baseMinSize": "0.00001",
+            "quoteMinSize": "0.1",
+            "baseMaxSize": "10000",
+            "quoteMaxSize": "99999999",
+            "baseIncrement": "0.00000001",
+            "quoteIncrement": "0.000001",
+            "priceIncrement": "0.1",
+            "feeCurrency": quote,
+            "enableTrading": True,
+            "isMarginEnabled": False,
+        }
+
+    def post_bullet(self, query, body):
+        server = {"endpoint": "wss://ws-api.kucoin.com/endpoint", "encrypt": True, "protocol": "websocket", "pingInterval": 18000, "pingTimeout": 10000}
+        return self.ok({"token": "mock", "instanceServers": [server]})
+
+    def _accounts(self) -> list:
+        return [
+            {"id": uuid.uuid5(uuid.NAMESPACE_URL, currency).hex[:24], "currency": currency, "type": "trade", "balance": decimal(balance), "available": decimal(balance), "holds": "0"}
+            for currency, balance in sorted(self.account.balances.items())
+        ]
+
+    def get_trade_fees(self, query, body):
+        return self.ok([{"symbol": symbol, "takerFeeRate": str(self.taker_fee), "makerFeeRate": str(self.maker_fee)} for symbol in query["symbols"].split(",")])
+
+    def _order(self, order: dict) -> dict:
+        return {
+            "id": order["id"],
+            "symbol": self.symbol(order["market"]),
+            "opType": "DEAL",
+            "type": "market",
+            "side": order["side"],
+            "price": "0",
+            "size": decimal(order["size"]) if order["side"] == "sell" else "0",
+            "funds": decimal(order["funds"]) if order["side"] == "buy" else "0",
+            "dealFunds": decimal(order["funds"]),
+            "dealSize": decimal(order["size"]),
+            "fee": decimal(order["fee"]),
+            "feeCurrency": split_market(order["market"])[1],
+            "timeInForce": "GTC",
+            "isActive": False,
+            "cancelExist": False,
+            "createdAt": int(order["time"] * 1000),
+            "tradeType": "TRADE",
+        }
+
+    def get_orders(self, query, body):
+        start, end = parse_time(query.get("startAt"), 0.0), parse_time(query.get("endAt"), float("inf"))
+        orders = [self._order(order) for order in self.account.get_orders(query.get("symbol"))[::-1] if start <= order["time"] <= end]
+        page, size = int(query.get("currentPage", 1)), int(query.get("pageSize", 50))
+        items = orders[(page - 1) * size : page * size]
+        return self.ok({"currentPage": page, "pageSize": size, "totalNum": len(orders), "totalPage": max(1, -(-len(orders) // size)), "items": items})
+
+    def post_order(self, query, body):
+        market = body["symbol"]
+        if "funds" in body:
+            order = self.account.fill(market, body["side"], self.price(market), self.clock(), funds=body["funds"])
+        else:
+            order = self.account.fill(market, body["side"], self.price(market), self.clock(), size=body["size"])
+        return self.ok({"orderId": order["id"]})
+
+    def subscribe(self, message: dict) -> list:
+        topic = message.get("topic", "")
+        if not topic.startswith("/market/ticker:"):
+            return []
+        return [canonical_market(market) for market in topic.split(":", 1)[1].split(",")]
+
+    def welcome(self) -> list:
+        return [{"id": "mock", "type": "welcome"}]
+
+    def stream(self, markets: list, state: dict) -> list:
+        now = self.clock()
+        state["sequence"] = state.get("sequence", 0) + 1
+        messages = []
+        for market in markets:
+            price = self.price(market)
+            data = {"sequence": str(state["sequence"]), "price": decimal(price), "size": "0.01", "bestAsk": decimal(price * 1.0001), "bestBid": decimal(price * 0.9999), "time": int(now * 1000)}
+            messages.append({"type": "message", "topic": f"/market/ticker:{self.symbol(market)}", "subject": "trade.ticker", "data": data})
+        return messages
+
+
+def get_api_class(host: str):
+    """Returns the protocol of an exchange host, e.g. api.binance.com"""
+
+    host = host.split(":")[0]
+    if "binance" in host:
+        return BinanceAPI
+    if "kucoin" in host:
+        return KucoinAPI
+    if host in ("api.coinbase.com", "advanced-trade-ws.coinbase.com"):
+        return CoinbaseAPI
+    if "coinbase" in host:
+        return CoinbaseProAPI
+
+    raise ValueError(f"Unknown exchange host: {host}")
@@ -0,0 +1,209 @@
+"""Market data sources for the mock exchange"""
+
+import glob
+import os
+import zlib
+
+import numpy as np
+import pandas as pd
+
+from models.CandleStore import CANDLE_DTYPE
+
+# quote currencies recognised when splitting exchange symbols such as BTCGBP
+QUOTE_CURRENCIES = ["USDT", "BUSD", "USDC", "TUSD", "GBP", "EUR", "USD", "BTC", "ETH", "BNB"]
+
+# starting prices in USD, markets of other currencies start at a random price
+USD_PRICES = {
+    "USD": 1.0,
+    "USDT": 1.0,
+    "BUSD": 1.0,
+    "USDC": 1.0,
+    "TUSD": 1.0,
+    "GBP": 1.25,
+    "EUR": 1.1,
+    "BTC": 30000.0,
+    "ETH": 2000.0,
+    "BNB": 300.0,
+    "ADA": 0.4,
+    "SOL": 25.0,
+    "DOT": 5.0,
+    "XRP": 0.5,
+}
+
+# price samples per candle used for the high and low
+CANDLE_SAMPLES = 8
+
+YEAR = 365 * 86400
+
+
+def split_market(market: str) -> tuple:
+    """Returns the base and quote currency of a market in any exchange format"""
+
+    if "-" in market:
+        base, quote = market.split("-", 1)
+        return base, quote
+
+    for quote in QUOTE_CURRENCIES:
+        if market.endswith(quote) and len(market) > len(quote):
+            return market[: -len(quote)], quote
+
+    raise ValueError(f"Unknown market: {market}")
+
+
+def canonical_market(market: str) -> str:
+    """Returns a market in the BASE-QUOTE format"""
+
+    return "-".join(split_market(market.upper()))
+
+
+class RandomWalk:
+    def __init__(self, seed: int = 0, daily_volatility: float = 0.03, components: int = 64) -> None:
+        """Synthetic prices following a geometric random walk
+
+        The walk is a random Fourier series (a Wiener-Paley construction of Brownian motion) so
+        the price at any time is computed directly, every request sees the same market and
+        candles agree across granularities.
+
+        Parameters
+        ----------
+        seed : int
+            random seed, the same seed always produces the same markets
+        daily_volatility : float
+            standard deviation of the daily log returns
+        components : int
+            sinusoids in the series, periods range from two minutes to four years
+        """
+
+        if daily_volatility <= 0:
+            raise ValueError("Daily volatility must be positive.")
+
+        self.seed = seed
+        self.daily_volatility = daily_volatility
+
+        self._omega = 2 * np.pi / np.geomspace(120, 4 * YEAR, components)
+
+        # variance of a Brownian motion spread over the frequency bands, scaled to the daily volatility
+        scale = daily_volatility**2 / np.sum((1 - np.cos(self._omega * 86400)) / self._omega)
+        self._amplitude = np.sqrt(scale / self._omega)
+        self._markets = {}
+
+    def _market(self, market: str) -> tuple:
+        if market not in self._markets:
+            rng = np.random.default_rng([self.seed, zlib.crc32(market.encode())])
+            price = 10 ** rng.uniform(-1, 4.5)
+
+            base, quote = split_market(market)
+            if base in USD_PRICES and quote in USD_PRICES:
+                price = USD_PRICES[base] / USD_PRICES[quote]
+            amplitude = self._amplitude * np.sqrt(rng.exponential(1.0, len(self._omega)))
+            phase = rng.uniform(0, 2 * np.pi, len(self._omega))
+            self._markets[market] = (np.log(price), amplitude, phase, float(rng.uniform(0, 1000)))
+
+        return self._markets[market]
+
+    def prices(self, market: str, epochs) -> np.ndarray:
+        """Returns the prices of a market at epoch seconds"""
+
+        log_price, amplitude, phase, _ = self._market(canonical_market(market))
+        epochs = np.asarray(epochs, dtype=float)
+
+        return np.exp(log_price + np.sin(np.multiply.outer(epochs, self._omega) + phase) @ amplitude)
+
+    def price(self, market: str, epoch: float) -> float:
+        return float(self.prices(market, [epoch])[0])
+
+    def candles(self, market: str, granularity: int, start: int, end: int) -> np.ndarray:
+        """Returns the candles opening from start up to, but excluding, end"""
+
+        first = -(-int(start) // granularity) * granularity
+        epochs = np.arange(first, int(end), granularity, dtype=np.int64)
+
+        market = canonical_market(market)
+        samples = self.prices(market, epochs[:, None] + np.linspace(0, granularity, CANDLE_SAMPLES + 1)).reshape(len(epochs), -1)
+        volume_scale = self._market(market)[3]
+
+        candles = np.empty(len(epochs), dtype=CANDLE_DTYPE)
+        candles["epoch"] = epochs
+        candles["open"] = samples[:, 0]
+        candles["close"] = samples[:, -1]
+        candles["high"] = samples.max(axis=1)
+        candles["low"] = samples.min(axis=1)
+
+        # deterministic noise in [0, 1) so repeated requests return the same volume
+        noise = np.modf(np.abs(np.sin(epochs * 12.9898 + volume_scale) * 43758.5453))[0]
+        candles["volume"] = volume_scale * granularity / 3600 * (0.5 + noise)
+
+        return candles
+
+
+class Fixtures:
+    def __init__(self, path: str, fallback: RandomWalk = None) -> None:
+        """Recorded candles replayed at their recorded times
+
+        Each {path}/{market}-{granularity}.csv file holds the candles of one market, for example a
+        DataFrame returned by get_historical_data saved with to_csv, or with an epoch column.
+
+        Parameters
+        ----------
+        path : str
+            directory of the fixture files
+        fallback : RandomWalk
+            serves the markets and granularities without a fixture
+        """
+
+        self.fallback = fallback
+        self._candles = {}
+
+        for filename in sorted(glob.glob(os.path.join(path, "*.csv"))):
+            name = os.path.splitext(os.path.basename(filename))[0]
+            market, granularity = name.rsplit("-", 1)
+            self._candles[(canonical_market(market), int(granularity))] = self._load(filename)
+
+        if len(self._candles) == 0 and fallback is None:
+            raise ValueError(f"No candle fixtures in {path}.")
+
+    @staticmethod
+    def _load(filename: str) -> np.ndarray:
+        df = pd.read_csv(filename)
+
+        if "epoch" not in df:
+            df["epoch"] = pd.to_datetime(df["date"]).astype("int64") // 10**9
+
+        candles = np.empty(len(df), dtype=CANDLE_DTYPE)
+        for name in CANDLE_DTYPE.names:
+            candles[name] = df[name].to_numpy()
+
+        return np.sort(candles, order="epoch")
+
+    @property
+    def markets(self) -> list:
+        return sorted({market for market, _ in self._candles})
+
+    def _series(self, market: str, granularity: int = None) -> np.ndarray:
+        market = canonical_market(market)
+        if granularity is not None:
+            return self._candles.get((market, granularity))
+
+        # the finest recorded granularity prices the market best
+        granularities = sorted(g for m, g in self._candles if m == market)
+        return self._candles[(market, granularities[0])] if granularities else None
+
+    def price(self, market: str, epoch: float) -> float:
+        candles = self._series(market)
+        if candles is None:
+            if self.fallback is None:
+                raise ValueError(f"No fixture for {market}.")
+            return self.fallback.price(market, epoch)
+
+        # the close of the last candle at the time, or the first open before the recording starts
+        i = np.searchsorted(candles["epoch"], epoch, side="right") - 1
+        return float(candles["close"][i]) if i >= 0 else float(candles["open"][0])
+
+    def candles(self, market: str, granularity: int, start: int, end: int) -> np.ndarray:
+        candles = self._series(market, granularity)
+        if candles is None:
+            if self.fallback is None:
+                raise ValueError(f"No fixture for {market} {granularity}.")
+            return self.fallback.candles(market, granularity, start, end)
+
+        return candles[(candles["epoch"] >= start) & (candles["epoch"] < end)]
@@ -0,0 +1,330 @@
+"""Local HTTP and WebSocket server standing in for the exchanges"""
+
+import base64
+import hashlib
+import json
+import os
+import select
+import socket
+import struct
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Event, Lock, Thread
+from urllib.parse import parse_qsl, urlsplit
+
+from models.exchange.ClientPool import MOCK_EXCHANGE_ENV
+from models.exchange.RateLimiter import TokenBucket, binance_weight
+from tests.mock_exchange.exchanges import BinanceAPI, get_api_class
+from tests.mock_exchange.market import RandomWalk
+
+DEFAULT_MARKETS = ["BTC-GBP", "ETH-GBP", "BTC-EUR", "ETH-EUR", "BTC-USDT", "ETH-USDT", "ADA-USDT", "SOL-USDT", "DOT-USDT", "XRP-USDT"]
+
+WEBSOCKET_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+
+class MockExchange:
+    def __init__(
+        self,
+        data=None,
+        markets: list = None,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency: float = 0.0,
+        rate_limit: float = None,
+        stream_interval: float = 1.0,
+        balances: dict = None,
+        clock=time.time,
+    ) -> None:
+        """Mock of the Binance, Coinbase, Coinbase Pro and Kucoin REST and websocket APIs
+
+        Requests reach the server when the bot runs with PYCRYPTOBOT_MOCK_EXCHANGE set to its URL,
+        the exchange host becomes the first path segment, e.g. /api.binance.com/api/v3/klines.
+
+        Parameters
+        ----------
+        data : RandomWalk or Fixtures
+            market data, a seeded random walk by default
+        markets : list
+            markets listed by the exchange info, product and 24 hour stats endpoints
+        host : str
+            listening address
+        port : int
+            listening port, a free port when 0
+        latency : float
+            seconds added to every REST response
+        rate_limit : float
+            REST requests per second and exchange, requests over the limit get 429 responses
+        stream_interval : float
+            seconds between websocket updates
+        balances : dict
+            starting balance of each currency
+        """
+
+        if latency < 0:
+            raise ValueError("Latency can not be negative.")
+
+        if rate_limit is not None and rate_limit <= 0:
+            raise ValueError("Rate limit must be positive.")
+
+        self.data = data if data is not None else RandomWalk()
+        self.markets = markets if markets is not None else DEFAULT_MARKETS
+        self.latency = latency
+        self.rate_limit = rate_limit
+        self.stream_interval = stream_interval
+        self.balances = balances
+        self.clock = clock
+
+        # requests served per (exchange host, method, path)
+        self.requests = Counter()
+
+        self._lock = Lock()
+        self._apis = {}
+        self._buckets = {}
+        self._weights = {}
+        self._stopped = Event()
+        self._previous_env = None
+
+        self._server = ThreadingHTTPServer((host, port), _handler(self))
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def get_api(self, host: str):
+        """Returns the emulated API of an exchange host, each exchange keeps its own account"""
+
+        cls = get_api_class(host)
+        with self._lock:
+            if cls not in self._apis:
+                self._apis[cls] = cls(self.data, self.markets, self.clock, self.balances)
+
+            return self._apis[cls]
+
+    def throttle(self, api) -> float:
+        """Returns 0 when a request is within the rate limit, otherwise the seconds to retry after"""
+
+        if self.rate_limit is None:
+            return 0.0
+
+        with self._lock:
+            if api.exchange not in self._buckets:
+                self._buckets[api.exchange] = TokenBucket(self.rate_limit, self.rate_limit, clock=self.clock)
+            bucket = self._buckets[api.exchange]
+
+        tokens = bucket.tokens
+        if tokens < 1:
+            return (1 - tokens) / bucket.rate
+
+        bucket.acquire()
+        return 0.0
+
+    def binance_used_weight(self, path: str, query: dict) -> int:
+        """Adds a request to the Binance weight of the current minute and returns the minute's weight"""
+
+        minute = int(self.clock() // 60)
+        with self._lock:
+            self._weights = {minute: self._weights.get(minute, 0) + binance_weight(path, query)}
+            return self._weights[minute]
+
+    def start(self) -> "MockExchange":
+        self._stopped.clear()
+        self._thread = Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self) -> "MockExchange":
+        """Starts the server and routes the exchange clients of this process to it"""
+
+        self.start()
+        self._previous_env = os.environ.get(MOCK_EXCHANGE_ENV)
+        os.environ[MOCK_EXCHANGE_ENV] = self.url
+        return self
+
+    def __exit__(self, *exc) -> None:
+        if self._previous_env is None:
+            os.environ.pop(MOCK_EXCHANGE_ENV, None)
+        else:
+            os.environ[MOCK_EXCHANGE_ENV] = self._previous_env
+        self.stop()
+
+
+def _handler(exchange: MockExchange):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def _route(self) -> tuple:
+            url = urlsplit(self.path)
+            host, _, path = url.path.lstrip("/").partition("/")
+            return host, "/" + path, dict(parse_qsl(url.query))
+
+        def _send(self, status: int, body, headers: dict = None) -> None:
+            content = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(content)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, str(value))
+            self.end_headers()
+            self.wfile.write(content)
+
+        def _rest(self, method: str) -> None:
+            host, path, query = self._route()
+            try:
+                api = exchange.get_api(host)
+            except ValueError as err:
+                return self._send(404, {"message": str(err)})
+
+            length = int(self.headers.get("Content-Length") or 0)
+            body = json.loads(self.rfile.read(length) or b"{}") if length else {}
+
+            with exchange._lock:
+                exchange.requests[(host, method, path)] += 1
+
+            if exchange.latency > 0:
+                time.sleep(exchange.latency)
+
+            headers = {}
+            if isinstance(api, BinanceAPI):
+                headers["X-MBX-USED-WEIGHT-1M"] = exchange.binance_used_weight(path, query)
+
+            wait = exchange.throttle(api)
+            if wait > 0:
+                headers["Retry-After"] = max(1, round(wait))
+                message = "Too much request weight used; current limit exceeded." if isinstance(api, BinanceAPI) else "Too many requests"
+                status, resp = api.error(429, message)
+                return self._send(status, resp, headers)
+
+            resp = api.handle(method, path, query, body)
+            status, resp = resp if isinstance(resp, tuple) else (200, resp)
+            self._send(status, resp, headers)
+
+        def do_GET(self):
+            if self.headers.get("Upgrade", "").lower() == "websocket":
+                return self._websocket()
+            self._rest("GET")
+
+        def do_POST(self):
+            self._rest("POST")
+
+        def do_DELETE(self):
+            self._rest("DELETE")
+
+        def _websocket(self) -> None:
+            host, path, query = self._route()
+            try:
+                api = exchange.get_api(host)
+            except ValueError as err:
+                return self._send(404, {"message": str(err)})
+
+            accept = base64.b64encode(hashlib.sha1((self.headers["Sec-WebSocket-Key"] + WEBSOCKET_GUID).encode()).digest()).decode()
+            self.send_response(101, "Switching Protocols")
+            self.send_header("Upgrade", "websocket")
+            self.send_header("Connection", "Upgrade")
+            self.send_header("Sec-WebSocket-Accept", accept)
+            self.end_headers()
+            self.wfile.flush()
+            self.close_connection = True
+
+            with exchange._lock:
+                exchange.requests[(host, "WEBSOCKET", path)] += 1
+
+            connection = WebSocketConnection(self.connection)
+            markets, state = [], {}
+            try:
+                for message in api.welcome():
+                    connection.send(message)
+
+                next_update = time.monotonic()
+                while not exchange._stopped.is_set():
+                    timeout = max(0.0, next_update - time.monotonic())
+                    message = connection.receive(timeout)
+                    if message is WebSocketConnection.CLOSED:
+                        break
+                    if message is not None:
+                        markets.extend(m for m in api.subscribe(message) if m not in markets)
+                        continue
+                    if time.monotonic() < next_update:
+                        continue
+
+                    if markets:
+                        for update in api.stream(markets, state):
+                            connection.send(update)
+                    next_update = time.monotonic() + exchange.stream_interval
+            except (ConnectionError, OSError):
+                pass
+
+    return Handler
+
+
+class WebSocketConnection:
+    """Server side of a websocket, text frames only"""
+
+    CLOSED = object()
+
+    def __init__(self, sock: socket.socket) -> None:
+        self.sock = sock
+
+    def send(self, message, opcode: int = 0x1) -> None:
+        payload = message if isinstance(message, bytes) else json.dumps(message).encode()
+
+        if len(payload) < 126:
+            header = struct.pack("!BB", 0x80 | opcode, len(payload))
+        elif len(payload) < 2**16:
+            header = struct.pack("!BBH", 0x80 | opcode, 126, len(payload))
+        else:
+            header = struct.pack("!BBQ", 0x80 | opcode, 127, len(payload))
+
+        self.sock.sendall(header + payload)
+
+    def _read(self, size: int) -> bytes:
+        data = b""
+        while len(data) < size:
+            chunk = self.sock.recv(size - len(data))
+            if not chunk:
+                raise ConnectionError("Websocket closed.")
+            data += chunk
+        return data
+
+    def receive(self, timeout: float):
+        """Returns the next decoded text message, None on a timeout or control frame, or CLOSED"""
+
+        if not select.select([self.sock], [], [], timeout)[0]:
+            return None
+
+        first, second = self._read(2)
+        opcode, length = first & 0x0F, second & 0x7F
+        if length == 126:
+            length = struct.unpack("!H", self._read(2))[0]
+        elif length == 127:
+            length = struct.unpack("!Q", self._read(8))[0]
+
+        mask = self._read(4) if second & 0x80 else b"\x00\x00\x00\x00"
+        payload = bytes(b ^ mask[i % 4] for i, b in enumerate(self._read(length)))
+
+        if opcode == 0x8:
+            self.send(payload[:2], opcode=0x8)
+            return self.CLOSED
+        if opcode == 0x9:
+            self.send(payload, opcode=0xA)
+            return None
+        if opcode != 0x1:
+            return None
+
+        try:
+            return json.loads(payload)
+        except ValueError:
+            return None
@@ -0,0 +1,54 @@
+import asyncio
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.append('.')
+from models.exchange.AsyncAPI import AsyncAPI, gather
+
+
+class Client:
+    def __init__(self):
+        self.die_on_api_error = False
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    def get_ticker(self, market):
+        with self._lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        time.sleep(0.1)
+        with self._lock:
+            self.in_flight -= 1
+
+        if market == "INVALID":
+            raise ValueError("Invalid market.")
+        return market, 1.0
+
+
+def test_methods_are_coroutines():
+    api = AsyncAPI(Client())
+
+    assert api.die_on_api_error is False
+    assert asyncio.run(api.get_ticker("BTC-GBP")) == ("BTC-GBP", 1.0)
+
+    with pytest.raises(TypeError):
+        AsyncAPI(None)
+
+
+def test_gather_runs_concurrently():
+    client = Client()
+    api = AsyncAPI(client)
+    markets = ["BTC-GBP", "ETH-GBP", "INVALID", "ADA-GBP", "SOL-GBP", "DOT-GBP"]
+
+    start = time.time()
+    results = asyncio.run(gather([api.get_ticker(market) for market in markets], limit=3))
+
+    assert time.time() - start < 0.5
+    assert client.max_in_flight == 3
+    assert results[0] == ("BTC-GBP", 1.0)
+    assert isinstance(results[2], ValueError)
+    assert [result[0] for result in results if not isinstance(result, Exception)] == ["BTC-GBP", "ETH-GBP", "ADA-GBP", "SOL-GBP", "DOT-GBP"]
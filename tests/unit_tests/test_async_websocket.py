@@ -0,0 +1,105 @@
+import asyncio
+import sys
+from threading import Event, Thread
+from types import SimpleNamespace
+
+import pandas as pd
+import pytest
+
+sys.path.append('.')
+from models.EventTrigger import CANDLE_CLOSED, EventTrigger
+from models.exchange.AsyncWebSocket import DROP_NEWEST, DROP_OLDEST, AsyncWebSocket, DropQueue
+from models.exchange.Granularity import Granularity
+from models.exchange.binance import PublicAPI, WebSocketClient
+
+
+def test_drop_queue():
+    async def drain(queue):
+        return [await queue.get() for _ in range(len(queue))]
+
+    queue = DropQueue(2, DROP_OLDEST)
+    assert [queue.put(item) for item in [1, 2, 3]] == [True, True, True]
+    assert asyncio.run(drain(queue)) == [2, 3] and queue.dropped == 1
+
+    queue = DropQueue(2, DROP_NEWEST)
+    assert [queue.put(item) for item in [1, 2, 3]] == [True, True, False]
+    assert asyncio.run(drain(queue)) == [1, 2] and queue.dropped == 1
+
+    with pytest.raises(ValueError):
+        DropQueue(1, "block")
+
+
+def ticker(market, second, price):
+    return {"e": "24hrMiniTicker", "E": (1672567200 + second) * 1000, "s": market, "c": str(price)}
+
+
+def kline(market, epoch, close):
+    k = {"t": epoch * 1000, "i": "1m", "l": close, "h": close, "o": close, "c": close, "v": "2.0", "V": "1.0", "x": True}
+    return {"e": "kline", "s": market, "k": k}
+
+
+def test_async_websocket(monkeypatch):
+    monkeypatch.setattr(PublicAPI, "get_historical_data", lambda self, market, granularity: pd.DataFrame())
+
+    client = WebSocketClient(["BTCGBP", "ETHGBP"], Granularity.ONE_MINUTE)
+    resume = Event()
+
+    def feed():
+        # the frames the reader thread of the client receives
+        client.on_open()
+        for price in range(1000):
+            client.on_message(ticker("BTCGBP", price, 100 + price))
+        for epoch in [0, 60, 120]:
+            client.on_message(kline("BTCGBP", epoch, str(epoch)))
+        resume.wait(5)
+        client.on_message(ticker("ETHGBP", 0, 50))
+
+    reader = Thread(target=feed)
+    monkeypatch.setattr(client, "start", reader.start)
+    monkeypatch.setattr(client, "close", lambda: resume.set() or reader.join())
+
+    async def main():
+        async with AsyncWebSocket(client, queue_size=2, drop=DROP_OLDEST) as stream:
+            candles = stream.subscribe()
+            assert await stream.next_candle("BTCGBP", timeout=5) == ("BTCGBP", (0, 0.0, 0.0, 0.0, 0.0, 1.0))
+
+            next_ticker = asyncio.ensure_future(stream.next_ticker("ETHGBP", timeout=5))
+            await asyncio.sleep(0.1)
+            resume.set()
+            assert (await next_ticker)[::2] == ("ETHGBP", 50.0)
+
+            # the slow consumer only finds the latest candles, the tickers are coalesced
+            assert candles.dropped == 1
+            assert [(await candles.get())[1][0] for _ in range(2)] == [60, 120]
+            assert stream.ticker("BTCGBP")[1] == 1099.0
+            assert client.candles["close"].tolist() == [0.0, 60.0, 120.0]
+            assert client.tickers["price"].tolist() == [1099.0, 50.0]
+
+            with pytest.raises(asyncio.TimeoutError):
+                await stream.next_candle(timeout=0.05)
+
+    asyncio.run(main())
+    assert not reader.is_alive()
+
+
+def test_async_websocket_shares_client():
+    client = SimpleNamespace(on_ticker=lambda market, date, price: None, on_candle_closed=lambda market, candle: None, start=lambda: None, close=lambda: None)
+    trigger = EventTrigger(price_move=0, delay=0)
+    trigger.attach(client)
+    stream = AsyncWebSocket(client)
+
+    # closing a runtime that never started does nothing
+    asyncio.run(stream.close())
+
+    async def main():
+        await stream.start()
+        next_ticker = asyncio.ensure_future(stream.next_ticker("BTCGBP", timeout=5))
+        await asyncio.sleep(0)
+        client.on_ticker("BTCGBP", None, 1.0)
+        client.on_candle_closed("BTCGBP", (0, 1.0, 1.0, 1.0, 1.0, 1.0))
+        assert await next_ticker == ("BTCGBP", None, 1.0)
+        await stream.close()
+
+    # the runtime and the event trigger both receive the events of the client
+    asyncio.run(main())
+    assert trigger.wait(Granularity.ONE_DAY, timeout=0) == CANDLE_CLOSED
@@ -0,0 +1,206 @@
+import sys
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.append('.')
+from models.AppState import AppState
+from models.Backtest import Backtest
+from models.Strategy import Strategy
+from models.exchange.ExchangesEnum import Exchange
+from models.helper.MarginHelper import calculate_margin
+
+TAKER_FEE = 0.005
+
+
+def get_app(**kwargs):
+    app = SimpleNamespace(
+        exchange=Exchange.DUMMY,
+        market="BTC-GBP",
+        is_sim="fast-vector",
+        is_live=0,
+        simresultonly=True,
+        debug=False,
+        term_color=False,
+        term_width=120,
+        disablelog=True,
+        disabletelegram=True,
+        telegram=False,
+        enable_custom_strategy=False,
+        smart_switch=0,
+        manual_trades_only=False,
+        enableinsufficientfundslogging=False,
+        insufficientfunds=False,
+        adjusttotalperiods=300,
+        disablebullonly=True,
+        disablebuynearhigh=False,
+        nobuynearhighpcnt=3.0,
+        disablebuyema=False,
+        disablebuymacd=False,
+        disablebuyobv=True,
+        disablebuyelderray=True,
+        disablebuybbands_s1=True,
+        disablebuybbands_s2=False,
+        preventloss=False,
+        preventlosstrigger=1.0,
+        preventlossmargin=0.1,
+        sellatloss=True,
+        nosellminpcnt=None,
+        nosellmaxpcnt=None,
+        trailing_stop_loss=0.0,
+        trailing_stop_loss_trigger=0.0,
+        dynamic_tsl=False,
+        tsl_multiplier=1.1,
+        tsl_trigger_multiplier=1.1,
+        tsl_max_pcnt=-5.0,
+        disablefailsafelowerpcnt=False,
+        sell_lower_pcnt=None,
+        disableprofitbankupperpcnt=False,
+        sell_upper_pcnt=None,
+        disablefailsafefibonaccilow=True,
+        sellatresistance=False,
+        selltriggeroverride=False,
+        trailingbuypcnt=0.0,
+        trailingimmediatebuy=False,
+        trailingbuyimmediatepcnt=0.0,
+        buymaxsize=0.0,
+        buylastsellsize=False,
+        trade_tracker=pd.DataFrame(columns=["Datetime", "Market", "Action", "Price", "Base", "Quote", "Margin", "Profit", "Fee", "DF_High", "DF_Low"]),
+    )
+    app.__dict__.update(kwargs)
+    app.get_taker_fee = lambda: TAKER_FEE
+    app.get_sell_percent = lambda: 100
+    app.get_interval = lambda df, iterations=0: df.iloc[iterations - 1 : iterations]
+    app.print_granularity = lambda: "1h"
+    app.notify_telegram = lambda msg: None
+
+    app.state = AppState(app, None)
+    app.state.last_action = "SELL"
+    app.state.last_buy_size = 1000
+    app.state.first_buy_size = 1000
+    return app
+
+
+def get_df(rows: int = 1200, seed: int = 42) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, rows)))
+    ts = pd.date_range("2022-01-01", periods=rows, freq="H")
+    df = pd.DataFrame({"date": ts, "close": close}, index=ts)
+    df.index.name = "ts"
+    for column in ["ema12gtema26co", "macdgtsignal", "eri_buy", "closegtbb20_upperco", "ema12ltema26co", "macdltsignal", "closeltbb20_lowerco", "closeltbb20_midco"]:
+        df[column] = rng.random(rows) < 0.3
+    df["goldencross"] = rng.random(rows) < 0.6
+    df["obv_pc"] = rng.normal(0, 5, rows)
+    return df
+
+
+def simulate_candles(app, df: pd.DataFrame, start: int) -> None:
+    """Candle by candle reference using the same decision order as PyCryptoBot.execute_job"""
+
+    state = app.state
+    trades = []
+    for i in range(start, len(df)):
+        current_sim_date = str(df.index[i])
+        price = df["close"].values[i]
+        sdf = df.iloc[max(0, i + 1 - app.adjusttotalperiods) : i + 1]
+        goldencross = False if app.adjusttotalperiods < 200 else bool(df["goldencross"].values[i])
+
+        strategy = Strategy(app, state, sdf, len(sdf))
+        state.action, _ = strategy.get_action(state, price, current_sim_date, None)
+
+        immediate_action = False
+        margin = 0
+        if state.last_buy_size > 0 and state.last_buy_price > 0 and price > 0 and state.last_action == "BUY":
+            if price > state.last_buy_high:
+                state.last_buy_high = price
+            change_pcnt_high = ((price / state.last_buy_high) - 1) * 100
+            state.last_buy_fee = round(state.last_buy_size * TAKER_FEE, 8)
+            state.last_buy_filled = round(((state.last_buy_size - state.last_buy_fee) / state.last_buy_price), 8)
+            margin, profit, sell_fee = calculate_margin(
+                state.last_buy_size, state.last_buy_filled, state.last_buy_price, state.last_buy_fee, 100, price, 0.0, TAKER_FEE
+            )
+            if strategy.is_sell_trigger(state, price, 0.0, margin, change_pcnt_high):
+                state.action = "SELL"
+                immediate_action = True
+
+        if state.action != "WAIT" and strategy.is_wait_trigger(margin, goldencross):
+            state.action = "WAIT"
+            immediate_action = False
+
+        if state.action == "BUY" and immediate_action is not True:
+            state.action, state.trailing_buy, _, immediate_action = strategy.check_trailing_buy(state, price)
+
+        if state.last_action == "BUY":
+            state.open_trade_margin_float = margin
+
+        if state.action == "BUY":
+            state.last_buy_price = price
+            state.last_buy_high = price
+            state.buy_count += 1
+            state.buy_sum += state.last_buy_size
+            state.trailing_buy = False
+            state.last_action = "BUY"
+            trades.append((current_sim_date, "BUY", price, state.last_buy_size))
+        elif state.action == "SELL":
+            state.sell_count += 1
+            sell_size = (price / state.last_buy_price) * (state.last_buy_size - state.last_buy_fee)
+            state.last_sell_size = sell_size - sell_fee
+            state.margintracker += float(margin)
+            state.profitlosstracker += float(profit)
+            state.buy_tracker += float(state.last_buy_size)
+            state.last_action = "SELL"
+            state.prevent_loss = False
+            state.tsl_triggered = False
+            state.last_buy_size += profit
+            trades.append((current_sim_date, "SELL", price, state.last_sell_size))
+
+    return trades
+
+
+@pytest.mark.parametrize(
+    "options",
+    [
+        {},
+        {"trailing_stop_loss": -1.0, "trailing_stop_loss_trigger": 1.0},
+        {"preventloss": True, "preventlosstrigger": 1.0, "preventlossmargin": 0.2},
+        {"sellatloss": False, "trailing_stop_loss": -2.0, "trailing_stop_loss_trigger": 2.0},
+        {"nosellminpcnt": -2.0, "nosellmaxpcnt": 1.0, "sell_upper_pcnt": 4.0, "sell_lower_pcnt": -3.0},
+        {"trailingbuypcnt": 0.5, "disablebuynearhigh": True},
+        {"disablebullonly": False, "disablebuybbands_s2": True, "disablebuyobv": False},
+    ],
+)
+def test_backtest_matches_candle_by_candle_simulation(options):
+    df = get_df()
+
+    expected_app = get_app(**options)
+    expected_trades = simulate_candles(expected_app, df, 300)
+
+    app = get_app(**options)
+    trade_tracker = Backtest(app, df, 300, chunk_size=64).run()
+
+    assert len(expected_trades) > 0
+    assert list(trade_tracker["Datetime"]) == [trade[0] for trade in expected_trades]
+    assert list(trade_tracker["Action"]) == [trade[1] for trade in expected_trades]
+    assert np.allclose(trade_tracker["Price"].astype(float), [trade[2] for trade in expected_trades])
+    assert np.allclose(trade_tracker["Quote"].astype(float), [trade[3] for trade in expected_trades])
+
+    for counter in ["buy_count", "sell_count", "margintracker", "profitlosstracker", "buy_tracker", "last_buy_size", "open_trade_margin_float"]:
+        assert getattr(app.state, counter) == pytest.approx(getattr(expected_app.state, counter))
+
+
+def test_backtest_unsupported_options():
+    app = get_app(dynamic_tsl=True, sellatresistance=True)
+    assert Backtest.unsupported_options(app) == ["dynamictsl", "sellatresistance"]
+    assert Backtest.unsupported_options(get_app()) == []
+
+
+def test_backtest_invalid_dataframe():
+    app = get_app()
+
+    with pytest.raises(TypeError):
+        Backtest(app, "invalid")
+
+    with pytest.raises(ValueError):
+        Backtest(app, pd.DataFrame())
@@ -0,0 +1,115 @@
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.append('.')
+from models.exchange.Granularity import Granularity
+from models.helper.CandleHelper import compare_candles, parse_candles, resample_candles
+
+
+def get_df(start: str = "2022-01-01 00:35", rows: int = 600, granularity: Granularity = Granularity.FIVE_MINUTES, value=300) -> pd.DataFrame:
+    rng = np.random.default_rng(1)
+    close = np.round(100 * np.exp(np.cumsum(rng.normal(0, 0.002, rows))), 2)
+    open = np.concatenate([[close[0]], close[:-1]])
+    tsidx = pd.date_range(start, periods=rows, freq=f"{granularity.to_integer}s")
+    df = pd.DataFrame(
+        {
+            "date": tsidx,
+            "market": "BTC-GBP",
+            "granularity": value,
+            "low": np.minimum(open, close) - 0.5,
+            "high": np.maximum(open, close) + 0.5,
+            "open": open,
+            "close": close,
+            "volume": np.round(rng.random(rows) * 10, 4),
+        },
+        index=tsidx,
+    )
+    df.index.names = ["ts"]
+    return df
+
+
+def test_resample_five_minutes_into_one_hour():
+    df = get_df()
+    resampled = resample_candles(df, Granularity.FIVE_MINUTES, Granularity.ONE_HOUR)
+
+    assert list(resampled.columns) == ["date", "market", "granularity", "low", "high", "open", "close", "volume"]
+    assert resampled.index.names == ["ts"]
+    assert resampled["granularity"].iloc[0] == 3600
+
+    # partial first and last hours are dropped
+    assert resampled.index[0] == pd.Timestamp("2022-01-01 01:00")
+    assert resampled.index[-1] == pd.Timestamp("2022-01-03 01:00")
+    assert np.all(resampled["date"] == resampled.index)
+
+    hour = df.loc["2022-01-01 05:00":"2022-01-01 05:55"]
+    candle = resampled.loc["2022-01-01 05:00"]
+    assert candle["open"] == hour["open"].iloc[0]
+    assert candle["close"] == hour["close"].iloc[-1]
+    assert candle["high"] == hour["high"].max()
+    assert candle["low"] == hour["low"].min()
+    assert candle["volume"] == pytest.approx(hour["volume"].sum())
+
+
+def test_resample_skips_missing_candles():
+    df = get_df().drop(pd.date_range("2022-01-01 03:00", "2022-01-01 03:55", freq="5min"))
+    df = df.drop(pd.Timestamp("2022-01-01 04:10"))
+    resampled = resample_candles(df, Granularity.FIVE_MINUTES, Granularity.ONE_HOUR)
+
+    assert pd.Timestamp("2022-01-01 03:00") not in resampled.index
+    assert pd.Timestamp("2022-01-01 04:00") in resampled.index
+    assert len(resampled) == 48
+
+
+@pytest.mark.parametrize("value,expected", [("5m", "6h"), ("5min", "6hour"), (300, 21600)])
+def test_resample_granularity_format(value, expected):
+    df = get_df("2022-01-01", 6 * 12 * 4, value=value)
+    resampled = resample_candles(df, Granularity.FIVE_MINUTES, Granularity.SIX_HOURS)
+
+    assert len(resampled) == 4
+    assert list(resampled.index.hour) == [0, 6, 12, 18]
+    assert resampled["granularity"].iloc[0] == expected
+
+
+def test_compare_candles():
+    exchange = resample_candles(get_df("2022-01-01", 12 * 48), Granularity.FIVE_MINUTES, Granularity.ONE_HOUR)
+    resampled = resample_candles(get_df("2022-01-01", 12 * 48), Granularity.FIVE_MINUTES, Granularity.ONE_HOUR).iloc[24:]
+
+    assert compare_candles(resampled, exchange) is True
+    assert compare_candles(resampled, exchange.iloc[:24]) is False
+
+    exchange.iloc[30, exchange.columns.get_loc("close")] += 0.01
+    assert compare_candles(resampled, exchange) is False
+
+
+def test_resample_invalid_arguments():
+    with pytest.raises(TypeError):
+        resample_candles("invalid", Granularity.FIVE_MINUTES, Granularity.ONE_HOUR)
+
+    with pytest.raises(ValueError):
+        resample_candles(get_df(), Granularity.ONE_HOUR, Granularity.FIFTEEN_MINUTES)
+
+    with pytest.raises(ValueError):
+        resample_candles(get_df(), Granularity.FIFTEEN_MINUTES, Granularity.FIVE_MINUTES)
+
+
+def test_parse_candles():
+    rows = [[1641002400000, "3.0", "4.0", "2.0", "3.5", "10"], [1640998800000, "2.0", "3.0", "1.0", "2.5", None]]
+    df = parse_candles(rows, ["time", "open", "high", "low", "close", "volume"], "BTCGBP", "1h", unit="ms", freq="H")
+
+    assert list(df.columns) == ["date", "market", "granularity", "low", "high", "open", "close", "volume"]
+    assert df.index.names == ["ts"]
+    assert df.index.freqstr == "H"
+    assert list(df.index) == [pd.Timestamp("2022-01-01 01:00"), pd.Timestamp("2022-01-01 02:00")]
+    assert np.all(df["date"] == df.index)
+    assert list(df["close"]) == [2.5, 3.5]
+    assert np.isnan(df["volume"].iloc[0])
+
+
+def test_parse_candles_empty():
+    for rows in ([], {}, "error"):
+        df = parse_candles(rows, ["time", "low", "high", "open", "close", "volume"], "BTC-GBP", 3600)
+        assert len(df) == 0
+        assert list(df.columns) == ["date", "market", "granularity", "low", "high", "open", "close", "volume"]
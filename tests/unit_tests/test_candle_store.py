@@ -0,0 +1,114 @@
+import sys
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.append('.')
+from models.CandleStore import CandleStore
+from models.exchange.ExchangesEnum import Exchange
+from models.exchange.Granularity import Granularity
+
+NOW = datetime(2022, 3, 1, 12, 30)
+
+
+class FakeExchange:
+    """Serves hourly candles up to now, the last one still open, and records the requests"""
+
+    def __init__(self):
+        self.now = NOW
+        self.requests = []
+
+    def get_historical_data(self, iso8601start: str, iso8601end: str) -> pd.DataFrame:
+        self.requests.append((iso8601start, iso8601end))
+        start = datetime.strptime(iso8601start, "%Y-%m-%dT%H:%M:%S")
+        end = min(datetime.strptime(iso8601end, "%Y-%m-%dT%H:%M:%S"), self.now)
+        tsidx = pd.date_range(start, end, freq="H")[:300]
+        close = tsidx.asi8 / 1e13
+        df = pd.DataFrame(
+            {"date": tsidx, "market": "BTC-GBP", "granularity": 3600, "low": close - 1, "high": close + 1, "open": close, "close": close, "volume": 1.0},
+            index=tsidx,
+        )
+        df.index.names = ["ts"]
+        return df
+
+
+def get_store(tmp_path) -> CandleStore:
+    return CandleStore(Exchange.COINBASEPRO, "BTC-GBP", Granularity.ONE_HOUR, str(tmp_path))
+
+
+def test_serves_cached_ranges_locally(tmp_path):
+    exchange = FakeExchange()
+    start, end = datetime(2022, 1, 1), datetime(2022, 2, 1)
+
+    df = get_store(tmp_path).get_candles(start, end, exchange.get_historical_data, NOW)
+    assert len(df) == 31 * 24 + 1
+    assert len(exchange.requests) == 3
+    assert list(df.columns) == ["date", "market", "granularity", "low", "high", "open", "close", "volume"]
+    assert df["granularity"].iloc[0] == 3600
+
+    exchange.requests = []
+    cached = get_store(tmp_path).get_candles(start, end, exchange.get_historical_data, NOW)
+    assert exchange.requests == []
+    pd.testing.assert_frame_equal(df, cached)
+
+
+def test_fills_gaps_only(tmp_path):
+    exchange = FakeExchange()
+    store = get_store(tmp_path)
+    store.get_candles(datetime(2022, 1, 1), datetime(2022, 1, 2), exchange.get_historical_data, NOW)
+    store.get_candles(datetime(2022, 1, 3), datetime(2022, 1, 4), exchange.get_historical_data, NOW)
+
+    exchange.requests = []
+    df = store.get_candles(datetime(2022, 1, 1), datetime(2022, 1, 4), exchange.get_historical_data, NOW)
+    assert exchange.requests == [("2022-01-02T01:00:00", "2022-01-02T23:00:00")]
+    assert len(df) == 3 * 24 + 1
+    assert df.index.is_monotonic_increasing
+    assert store.coverage == [(1640995200, 1641254400)]
+
+
+def test_open_candle_is_returned_but_not_stored(tmp_path):
+    exchange = FakeExchange()
+    store = get_store(tmp_path)
+
+    df = store.get_candles(NOW - timedelta(hours=299), NOW, exchange.get_historical_data, NOW)
+    assert len(df) == 300
+    assert df.index[-1] == datetime(2022, 3, 1, 12)
+    assert store.coverage[-1][1] == (datetime(2022, 3, 1, 11) - datetime(1970, 1, 1)).total_seconds()
+
+    # live warm up an hour later only needs the newly closed candles
+    exchange.requests = []
+    later = exchange.now = NOW + timedelta(hours=1)
+    df = store.get_candles(later - timedelta(hours=299), later, exchange.get_historical_data, later)
+    assert exchange.requests == [("2022-03-01T12:00:00", "2022-03-01T13:00:00")]
+    assert len(df) == 300
+    assert df.index[-1] == datetime(2022, 3, 1, 13)
+    assert np.all(np.diff(df.index.asi8) == 3600 * 10**9)
+
+
+def test_failed_request_is_not_covered(tmp_path):
+    exchange = FakeExchange()
+    store = get_store(tmp_path)
+    start, end = datetime(2022, 1, 1), datetime(2022, 1, 5)
+
+    # the exchange APIs return an empty DataFrame on an error response
+    df = store.get_candles(start, end, lambda iso8601start, iso8601end: pd.DataFrame(), NOW)
+    assert len(df) == 0
+    assert store.coverage == []
+
+    df = store.get_candles(start, end, exchange.get_historical_data, NOW)
+    assert exchange.requests == [("2022-01-01T00:00:00", "2022-01-05T00:00:00")]
+    assert len(df) == 4 * 24 + 1
+    assert store.coverage == [(1640995200, 1641340800)]
+
+
+def test_invalid_arguments(tmp_path):
+    with pytest.raises(TypeError):
+        CandleStore("coinbasepro", "BTC-GBP", Granularity.ONE_HOUR, str(tmp_path))
+
+    with pytest.raises(TypeError):
+        CandleStore(Exchange.COINBASEPRO, "", Granularity.ONE_HOUR, str(tmp_path))
+
+    with pytest.raises(TypeError):
+        CandleStore(Exchange.COINBASEPRO, "BTC-GBP", 3600, str(tmp_path))
@@ -0,0 +1,81 @@
+import sys
+
+import pytest
+import requests
+
+sys.path.append('.')
+from models.exchange import ClientPool
+from models.exchange.binance import PublicAPI
+
+
+class Client:
+    def __init__(self, api_key="", api_url="", order_history=None, app=None):
+        self.api_key = api_key
+        self.api_url = api_url
+
+
+@pytest.fixture(autouse=True)
+def reset_pool():
+    ClientPool.configure(ClientPool.DEFAULT_POOL_SIZE, ClientPool.DEFAULT_TIMEOUT)
+    ClientPool.close()
+    yield
+    ClientPool.configure(ClientPool.DEFAULT_POOL_SIZE, ClientPool.DEFAULT_TIMEOUT)
+    ClientPool.close()
+
+
+def test_session_per_host():
+    session = ClientPool.get_session("https://api.binance.com")
+
+    assert ClientPool.get_session("https://api.binance.com/api/v3/time") is session
+    assert ClientPool.get_session("https://api.binance.us") is not session
+    assert session.get_adapter("https://api.binance.com")._pool_maxsize == ClientPool.DEFAULT_POOL_SIZE
+
+
+def test_configure_replaces_sessions():
+    session = ClientPool.get_session("https://api.kucoin.com/")
+    ClientPool.configure(pool_size=4, timeout=5)
+
+    pooled = ClientPool.get_session("https://api.kucoin.com/")
+    assert pooled is not session
+    assert pooled.timeout == 5.0
+    assert pooled.get_adapter("https://api.kucoin.com/")._pool_maxsize == 4
+
+    with pytest.raises(ValueError):
+        ClientPool.configure(pool_size=0)
+
+    with pytest.raises(ValueError):
+        ClientPool.configure(timeout=-1)
+
+
+def test_client_per_credentials():
+    client = ClientPool.get_client(Client, "key1", api_url="https://api.binance.com")
+
+    assert ClientPool.get_client(Client, "key1", api_url="https://api.binance.com") is client
+    assert ClientPool.get_client(Client, "key2", api_url="https://api.binance.com") is not client
+
+    # unhashable options can not be shared
+    assert ClientPool.get_client(Client, "key1", order_history=[]) is not ClientPool.get_client(Client, "key1", order_history=[])
+
+
+def test_requests_share_connections(monkeypatch):
+    ClientPool.configure(timeout=7)
+    session = ClientPool.get_session("https://api.binance.com")
+    adapter = session.get_adapter("https://api.binance.com")
+
+    timeouts = []
+
+    def send(request, **kwargs):
+        timeouts.append(kwargs["timeout"])
+        resp = requests.Response()
+        resp.status_code = 200
+        resp._content = b'{"serverTime": 1640995200000}'
+        resp.request = request
+        return resp
+
+    monkeypatch.setattr(adapter, "send", send)
+
+    api = ClientPool.get_client(PublicAPI, api_url="https://api.binance.com")
+    api.get_time()
+    ClientPool.get_client(PublicAPI, api_url="https://api.binance.com").get_time()
+
+    assert timeouts == [7.0, 7.0]
@@ -0,0 +1,69 @@
+import sys
+import time
+from threading import Thread
+
+import pytest
+
+sys.path.append('.')
+from models.EventTrigger import CANDLE_BOUNDARY, CANDLE_CLOSED, PRICE_MOVED, WAIT_TIMEOUT, EventTrigger, next_candle_boundary
+from models.exchange.Granularity import Granularity
+
+
+def test_next_candle_boundary():
+    assert next_candle_boundary(1672567200, Granularity.ONE_MINUTE) == 1672567260
+    assert next_candle_boundary(1672567259.5, Granularity.ONE_MINUTE) == 1672567260
+    assert next_candle_boundary(1672567200, Granularity.ONE_DAY) == 1672617600
+
+    with pytest.raises(TypeError):
+        next_candle_boundary(1672567200, 60)
+
+
+class FakeClient:
+    def on_ticker(self, market, date, price):
+        pass
+
+    def on_candle_closed(self, market, candle):
+        pass
+
+
+def test_event_trigger(monkeypatch):
+    client = FakeClient()
+    trigger = EventTrigger(price_move=1.0, delay=0)
+    trigger.attach(client)
+
+    # the first ticker sets the price, moves of less than 1% do not wake the job
+    client.on_ticker("BTCGBP", None, 100.0)
+    assert trigger.wait(Granularity.ONE_MINUTE) == PRICE_MOVED
+    client.on_ticker("BTCGBP", None, 100.5)
+    client.on_ticker("BTCGBP", None, 99.5)
+    client.on_ticker("BTCGBP", None, 101.0)
+    assert trigger.wait(Granularity.ONE_MINUTE) == PRICE_MOVED
+
+    # events coalesce, a candle close outranks a price move
+    client.on_candle_closed("BTCGBP", (0, 1.0, 1.0, 1.0, 1.0, 1.0))
+    client.on_ticker("BTCGBP", None, 110.0)
+    assert trigger.wait(Granularity.ONE_MINUTE) == CANDLE_CLOSED
+
+    # an event on the websocket thread wakes a waiting job right away
+    waker = Thread(target=lambda: time.sleep(0.05) or client.on_candle_closed("BTCGBP", (60, 1.0, 1.0, 1.0, 1.0, 1.0)))
+    waker.start()
+    started = time.monotonic()
+    assert trigger.wait(Granularity.ONE_DAY) == CANDLE_CLOSED
+    assert time.monotonic() - started < 5
+    waker.join()
+
+    # without events the job wakes at the candle boundary
+    clock = [1672567259.5]
+    monkeypatch.setattr(time, "time", lambda: clock[0])
+    monkeypatch.setattr(trigger._condition, "wait", lambda timeout: clock.append(clock.pop() + timeout))
+    assert trigger.wait(Granularity.ONE_MINUTE) == CANDLE_BOUNDARY
+    assert clock == [1672567260.0]
+
+    # a capped wait returns before a candle boundary that is further away
+    assert trigger.wait(Granularity.ONE_HOUR, timeout=60) == WAIT_TIMEOUT
+    assert clock == [1672567320.0]
+    assert trigger.wait(Granularity.ONE_MINUTE, timeout=120) == CANDLE_BOUNDARY
+    assert clock == [1672567380.0]
+
+    with pytest.raises(ValueError):
+        EventTrigger(price_move=-1)
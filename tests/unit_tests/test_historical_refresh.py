@@ -0,0 +1,112 @@
+import os
+import sys
+import time
+from datetime import datetime
+
+import pandas as pd
+import pytest
+
+sys.path.append('.')
+from controllers.PyCryptoBot import PyCryptoBot
+from models.exchange.ExchangesEnum import Exchange
+from models.exchange.Granularity import Granularity
+from tests.unit_tests.test_candle_resampling import get_df
+
+app = PyCryptoBot(exchange=Exchange.BINANCE)
+
+
+class Exchange300:
+    """Returns the candles of a 600 candle feed like an exchange would, 300 at most"""
+
+    def __init__(self, candles):
+        self.candles = candles
+        self.calls = []
+
+    def __call__(self, market, granularity, websocket, iso8601start="", iso8601end=""):
+        self.calls.append((iso8601start, iso8601end))
+        if iso8601start == "":
+            return self.candles.iloc[-300:].copy()
+
+        # like Binance, the range is read in the local time of the host
+        start = pd.Timestamp(datetime.timestamp(datetime.strptime(iso8601start, "%Y-%m-%dT%H:%M:%S")), unit="s")
+        return self.candles.loc[start:].iloc[:300].copy()
+
+
+def refresh(stored, candles, monkeypatch, now=None):
+    exchange = Exchange300(candles)
+    monkeypatch.setattr(app, "get_historical_data", exchange)
+
+    # the candles are the latest ones, the candle after the last one is still open
+    utcnow = (now or candles.index[-1] + pd.Timedelta(minutes=2)).to_pydatetime()
+
+    class FrozenDatetime(datetime):
+        @classmethod
+        def utcnow(cls):
+            return utcnow
+
+    monkeypatch.setattr("controllers.PyCryptoBot.datetime", FrozenDatetime)
+    monkeypatch.setattr(app, "exchange", Exchange.BINANCE)
+    app.trading_data = stored
+    app.usecandlestore = False
+    return app.refresh_historical_data("BTCGBP", Granularity.FIVE_MINUTES, None), exchange
+
+
+def test_refresh_requests_only_new_candles(monkeypatch):
+    candles = get_df()
+
+    # the last stored candle was still open, and the stored frame has indicator columns
+    stored = candles.iloc[295:595].copy()
+    stored.iloc[-1, stored.columns.get_loc("close")] = 1.0
+    stored["ema12"] = 1.0
+
+    df, exchange = refresh(stored, candles, monkeypatch)
+
+    assert exchange.calls[0][0] == "2022-01-03T02:05:00"
+    assert len(exchange.calls) == 1
+    assert list(df.columns) == list(candles.columns)
+    assert df.equals(candles.iloc[300:600])
+
+
+def test_refresh_falls_back_on_gaps(monkeypatch):
+    candles = get_df()
+
+    df, exchange = refresh(candles.iloc[:250].copy(), candles.drop(candles.index[250:260]), monkeypatch)
+    assert len(exchange.calls) == 2
+    assert exchange.calls[1] == ("", "")
+    assert df.index[-1] == candles.index[-1]
+
+    df, exchange = refresh(pd.DataFrame(), candles, monkeypatch)
+    assert exchange.calls == [("", "")]
+
+
+def test_refresh_falls_back_on_stale_candles(monkeypatch):
+    candles = get_df()
+
+    # the exchange has not returned the candles of the last hour
+    df, exchange = refresh(candles.iloc[295:595].copy(), candles, monkeypatch, now=candles.index[-1] + pd.Timedelta(hours=1))
+    assert len(exchange.calls) == 2
+    assert exchange.calls[1] == ("", "")
+
+
+@pytest.fixture
+def tokyo_time():
+    tz = os.environ.get("TZ")
+    os.environ["TZ"] = "Asia/Tokyo"
+    time.tzset()
+    yield
+    if tz is None:
+        del os.environ["TZ"]
+    else:
+        os.environ["TZ"] = tz
+    time.tzset()
+
+
+def test_refresh_in_local_time(monkeypatch, tokyo_time):
+    candles = get_df()
+
+    df, exchange = refresh(candles.iloc[295:595].copy(), candles, monkeypatch)
+
+    # the range is sent in the local time the exchange API reads it in
+    assert exchange.calls[0][0] == "2022-01-03T11:05:00"
+    assert len(exchange.calls) == 1
+    assert df.equals(candles.iloc[300:600])
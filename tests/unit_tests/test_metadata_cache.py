@@ -0,0 +1,73 @@
+import sys
+
+import pandas as pd
+import pytest
+
+sys.path.append('.')
+from models.exchange.MetadataCache import TTLCache, invalidate
+from models.exchange.binance import AuthAPI
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_ttl_per_key():
+    clock = Clock()
+    cache = TTLCache(clock=clock)
+
+    cache.set("fees", 0.001, ttl=60)
+    cache.set("filters", "LOT_SIZE", ttl=120)
+    assert cache.get("fees") == 0.001
+
+    clock.now = 60
+    assert cache.get("fees") is None
+    assert cache.get("filters") == "LOT_SIZE"
+    assert len(cache) == 1
+
+    assert cache.invalidate() == 1
+    assert cache.get("filters", "missing") == "missing"
+
+    with pytest.raises(ValueError):
+        cache.set("fees", 0.001, ttl=0)
+
+
+def test_client_metadata_is_cached(monkeypatch):
+    calls = []
+
+    def auth_api(self, method, uri, payload=None):
+        calls.append(uri)
+        if uri == "/api/v3/exchangeInfo":
+            return {"symbols": [{"filters": [{"filterType": "LOT_SIZE", "stepSize": "0.00001000"}]}]}
+        return [{"symbol": payload["symbol"], "takerCommission": "0.001"}]
+
+    monkeypatch.setattr(AuthAPI, "auth_api", auth_api)
+    invalidate()
+
+    api = AuthAPI("0" * 64, "0" * 64)
+    filters = api.get_market_info_filters("BTCGBP")
+    filters["stepSize"] = "changed"
+
+    # a second client of the same account and every later call are served from the cache
+    for _ in range(3):
+        assert AuthAPI("0" * 64, "0" * 64).get_market_info_filters("BTCGBP")["stepSize"][0] == "0.00001000"
+        assert api.get_trade_fee("BTCGBP") == 0.001
+    assert calls == ["/api/v3/exchangeInfo", "/sapi/v1/asset/tradeFee"]
+
+    assert invalidate(api, "get_trade_fee") == 1
+    api.get_trade_fee("BTCGBP")
+    api.get_trade_fee("ETHGBP")
+    assert calls[2:] == ["/sapi/v1/asset/tradeFee", "/sapi/v1/asset/tradeFee"]
+
+    # empty responses are retried
+    monkeypatch.setattr(AuthAPI, "auth_api", lambda self, method, uri, payload=None: calls.append(uri) or {})
+    assert api.get_market_info_filters("ETHGBP").empty
+    assert api.get_market_info_filters("ETHGBP").empty
+    assert calls[4:] == ["/api/v3/exchangeInfo", "/api/v3/exchangeInfo"]
+
+    invalidate()
+    assert isinstance(api.get_market_info_filters("BTCGBP"), pd.DataFrame)
@@ -0,0 +1,112 @@
+import json
+import sys
+
+import numpy as np
+import pytest
+from websocket import create_connection
+
+sys.path.append('.')
+from models.exchange.ClientPool import MOCK_EXCHANGE_ENV, get_session, mock_url
+from models.exchange.Granularity import Granularity
+from models.exchange.MetadataCache import invalidate
+from models.exchange.binance import AuthAPI as BAuthAPI
+from models.exchange.binance import PublicAPI as BPublicAPI
+from models.exchange.coinbase_pro import PublicAPI as CPublicAPI
+from models.exchange.kucoin import PublicAPI as KPublicAPI
+from tests.mock_exchange import Fixtures, MockExchange, RandomWalk
+
+
+def test_random_walk():
+    walk = RandomWalk(seed=1)
+    start = 1640995200
+
+    hours = walk.candles("BTC-GBP", 3600, start, start + 24 * 3600)
+    assert len(hours) == 24
+    assert np.array_equal(hours, walk.candles("BTCGBP", 3600, start, start + 24 * 3600))
+    assert np.all(hours["high"] >= np.maximum(hours["open"], hours["close"]))
+    assert np.all(hours["low"] <= np.minimum(hours["open"], hours["close"]))
+
+    # candles of different granularities describe the same market
+    minutes = walk.candles("BTC-GBP", 60, start, start + 3600)
+    assert minutes["open"][0] == pytest.approx(hours["open"][0])
+    assert minutes["close"][-1] == pytest.approx(hours["close"][0])
+
+    days = walk.candles("BTC-GBP", 86400, start, start + 2000 * 86400)
+    assert np.std(np.diff(np.log(days["close"]))) == pytest.approx(0.03, rel=0.3)
+    assert walk.price("BTC-GBP", start) != RandomWalk(seed=2).price("BTC-GBP", start)
+
+
+def test_rest_endpoints():
+    with MockExchange() as mock:
+        df = BPublicAPI().get_historical_data("BTCGBP", Granularity.ONE_HOUR)
+        assert len(df) == 300
+        assert df.index[-1] == df.index[0] + 299 * df.index.freq
+
+        kucoin = KPublicAPI().get_historical_data("BTC-GBP", Granularity.ONE_HOUR)
+        coinbase_pro = CPublicAPI().get_historical_data("BTC-GBP", Granularity.ONE_HOUR)
+        assert kucoin["close"].tolist()[-300:] == pytest.approx(coinbase_pro["close"].tolist()[-300:])
+        assert KPublicAPI().get_ticker("BTC-GBP")[1] == pytest.approx(coinbase_pro["close"].iloc[-1], rel=0.01)
+
+        assert mock.requests[("api.binance.com", "GET", "/api/v3/klines")] == 1
+        assert get_session("https://api.binance.com").get("https://api.binance.com/api/v3/unknown").status_code == 404
+
+
+def test_orders_and_metadata_requests():
+    invalidate()
+    with MockExchange(balances={"GBP": 1000.0}) as mock:
+        api = BAuthAPI("0" * 64, "0" * 64)
+
+        for _ in range(3):
+            assert api.get_taker_fee("BTCGBP") == 0.001
+        order = api.market_buy("BTCGBP", 100.0)
+        assert order["status"] == "FILLED"
+
+        balances = api.get_accounts().set_index("currency")["available"].astype(float)
+        assert 1000 - balances["GBP"] == pytest.approx(float(order["cummulativeQuoteQty"]), rel=0.002)
+        assert balances["BTC"] == float(order["executedQty"])
+        assert len(api.get_orders("BTCGBP")) == 1
+
+        # the fees, filters and trade fee were each requested once
+        assert mock.requests[("api.binance.com", "GET", "/api/v3/exchangeInfo")] == 1
+        assert mock.requests[("api.binance.com", "GET", "/sapi/v1/asset/tradeFee")] == 1
+        assert mock.requests[("api.binance.com", "GET", "/api/v3/account")] == 2
+    invalidate()
+
+
+def test_latency_and_rate_limit():
+    with MockExchange(latency=0.05, rate_limit=2) as mock:
+        session = get_session("https://api.kucoin.com")
+        statuses = [session.get("https://api.kucoin.com/api/v1/timestamp") for _ in range(3)]
+
+        assert [resp.status_code for resp in statuses] == [200, 200, 429]
+        assert statuses[-1].headers["Retry-After"] == "1"
+        assert statuses[0].elapsed.total_seconds() >= 0.05
+        assert sum(mock.requests.values()) == 3
+
+
+def test_websocket_stream():
+    with MockExchange(stream_interval=0.05):
+        ws = create_connection(mock_url("wss://ws-api.kucoin.com/endpoint?token=mock"), timeout=5)
+        assert json.loads(ws.recv())["type"] == "welcome"
+
+        ws.send(json.dumps({"type": "subscribe", "topic": "/market/ticker:BTC-USDT,ETH-USDT"}))
+        topics = {json.loads(ws.recv())["topic"] for _ in range(4)}
+        assert topics == {"/market/ticker:BTC-USDT", "/market/ticker:ETH-USDT"}
+        ws.close()
+
+
+def test_fixtures(tmp_path, monkeypatch):
+    with MockExchange(RandomWalk(seed=3)):
+        df = BPublicAPI().get_historical_data("BTCGBP", Granularity.ONE_HOUR)
+    df["close"] = df["close"] * 2
+    df.to_csv(tmp_path / "BTC-GBP-3600.csv")
+
+    fixtures = Fixtures(str(tmp_path))
+    assert fixtures.markets == ["BTC-GBP"]
+
+    monkeypatch.delenv(MOCK_EXCHANGE_ENV, raising=False)
+    now = int(df.index[-1].timestamp()) + 1800
+    with MockExchange(fixtures, markets=["BTC-GBP"], clock=lambda: now):
+        replay = BPublicAPI().get_historical_data("BTCGBP", Granularity.ONE_HOUR)
+        assert replay["close"].tolist() == pytest.approx(df["close"].tolist())
+        assert BPublicAPI().get_ticker("BTCGBP")[1] == pytest.approx(df["close"].iloc[-1])
@@ -0,0 +1,119 @@
+import os
+import sys
+import time
+
+import pandas as pd
+import pytest
+
+sys.path.append('.')
+from models.OrderLedger import FULL_SYNC_INTERVAL, OrderLedger, get_ledger
+from models.exchange.binance import AuthAPI as BAuthAPI
+from tests.mock_exchange import MockExchange
+
+
+class FakeAPI:
+    def __init__(self, orders):
+        self.orders = orders
+        self.calls = []
+
+    def get_orders(self, market="", action="", status="all", since=None):
+        self.calls.append(since)
+        orders = self.orders
+        if since is not None:
+            orders = orders[pd.to_datetime(orders["created_at"], utc=True) >= since]
+        return orders.reset_index(drop=True)
+
+
+def orders(*rows):
+    return pd.DataFrame(
+        [[created_at, "BTC-GBP", action, "market", size, size, 0.0, 100.0, "done"] for created_at, action, size in rows],
+        columns=["created_at", "market", "action", "type", "size", "filled", "fees", "price", "status"],
+    )
+
+
+def test_incremental_sync():
+    now = [0]
+    api = FakeAPI(orders(("2023-01-01T10:00:00Z", "buy", 1.0), ("2023-01-01T11:00:00Z", "sell", 1.0)))
+    ledger = OrderLedger(api, "BTC-GBP", max_orders=3, clock=lambda: now[0])
+
+    assert ledger.sync()["action"].tolist() == ["buy", "sell"]
+    assert api.calls == [None]
+    assert ledger.cursor == pd.Timestamp("2023-01-01T11:00:00Z")
+
+    # only orders since the newest order are fetched, the order at the cursor is not repeated
+    api.orders = pd.concat([api.orders, orders(("2023-01-01T12:00:00Z", "buy", 2.0), ("2023-01-01T13:00:00Z", "sell", 2.0))])
+    assert ledger.sync()["action"].tolist() == ["sell", "buy", "sell"]
+    assert api.calls[-1] == pd.Timestamp("2023-01-01T11:00:00Z")
+    assert ledger.last_order["size"].iloc[0] == 2.0
+
+    assert len(ledger.sync()) == 3
+    assert ledger.cursor == pd.Timestamp("2023-01-01T13:00:00Z")
+
+    # identical orders in the same second are both kept
+    api.orders = pd.concat([api.orders, orders(("2023-01-01T13:00:00Z", "sell", 2.0))])
+    assert ledger.sync()["action"].tolist() == ["buy", "sell", "sell"]
+
+    # the whole history is synced again from time to time
+    now[0] = FULL_SYNC_INTERVAL
+    ledger.sync()
+    assert api.calls[-1] is None
+
+    with pytest.raises(ValueError):
+        OrderLedger(api, "BTC-GBP", max_orders=0)
+
+
+def test_time_series_index():
+    # orders with the same values at different times are kept apart by the index
+    df = orders(("2023-01-01T10:00:00Z", "buy", 1.0), ("2023-01-01T11:00:00Z", "buy", 1.0))
+    df = df.set_index(pd.DatetimeIndex(df["created_at"].str.rstrip("Z"))).drop(columns=["created_at"])
+
+    class API:
+        def get_orders(self, market="", action="", status="all", since=None):
+            return df
+
+    ledger = OrderLedger(API(), "BTC-GBP")
+    assert len(ledger.sync()) == 2
+    assert ledger.cursor == pd.Timestamp("2023-01-01T11:00:00Z")
+    assert len(ledger.sync()) == 2
+
+
+def test_binance_ledger():
+    with MockExchange(balances={"GBP": 1000.0}) as mock:
+        api = BAuthAPI("0" * 64, "0" * 64)
+        ledger = get_ledger(api, "BTCGBP")
+        assert get_ledger(api, "BTCGBP") is ledger
+
+        api.market_buy("BTCGBP", 100.0)
+        assert ledger.sync()["action"].tolist() == ["buy"]
+
+        api.market_sell("BTCGBP", 0.001)
+        assert ledger.sync()["action"].tolist() == ["buy", "sell"]
+        assert mock.requests[("api.binance.com", "GET", "/api/v3/allOrders")] == 2
+
+
+@pytest.fixture
+def tokyo_time():
+    tz = os.environ.get("TZ")
+    os.environ["TZ"] = "Asia/Tokyo"
+    time.tzset()
+    yield
+    if tz is None:
+        del os.environ["TZ"]
+    else:
+        os.environ["TZ"] = tz
+    time.tzset()
+
+
+def test_binance_ledger_local_time(tokyo_time):
+    with MockExchange(balances={"GBP": 1000.0}):
+        api = BAuthAPI("0" * 64, "0" * 64)
+        ledger = OrderLedger(api, "BTCGBP")
+
+        api.market_buy("BTCGBP", 100.0)
+        started = pd.Timestamp.now(tz="UTC").floor("s")
+        assert ledger.sync()["action"].tolist() == ["buy"]
+        assert abs(ledger.cursor - started) < pd.Timedelta(minutes=1)
+
+        # the incremental sync starts at the newest order, not hours after it
+        api.market_sell("BTCGBP", 0.001)
+        assert ledger.sync()["action"].tolist() == ["buy", "sell"]
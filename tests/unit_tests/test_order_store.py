@@ -0,0 +1,129 @@
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+sys.path.append('.')
+from models.exchange.ExchangesEnum import Exchange
+from models.exchange.kucoin import AuthAPI
+from models.OrderStore import OrderStore, fcntl
+from tests.mock_exchange import MockExchange
+
+
+def order(id, symbol="BTC-USDT", created_at=1000, active=False, size="0.1"):
+    return {"id": id, "symbol": symbol, "createdAt": created_at, "isActive": active, "size": size}
+
+
+def test_order_store(tmp_path):
+    store = OrderStore(Exchange.KUCOIN, str(tmp_path))
+    assert store.cursor is None and store.synced == 0
+
+    assert store.add_orders(pd.DataFrame([order("a", created_at=1000), order("b", "ETH-USDT", 2000), order("c", created_at=3000)])) == 3
+    assert store.get_orders("BTC-USDT")["id"].tolist() == ["c", "a"]
+    assert store.get_orders(since=2000)["id"].tolist() == ["c", "b"]
+    assert store.cursor == 3001
+
+    # orders are updated in place, active orders are synced again
+    store.add_orders(pd.DataFrame([order("a", size="0.2"), order("d", created_at=2500, active=True)]))
+    assert len(store) == 4
+    assert store.get_orders("BTC-USDT").set_index("id")["size"]["a"] == "0.2"
+    assert store.cursor == 2500
+
+    assert store.purge(2000) == 1
+    assert sorted(store.get_orders()["id"]) == ["b", "c", "d"]
+
+    # other bots on the host share the store
+    other = OrderStore(Exchange.KUCOIN, str(tmp_path))
+    assert len(other) == 3
+    other.set_synced(1234.0)
+    assert store.synced == 1234.0
+
+    with pytest.raises(ValueError):
+        store.add_orders(pd.DataFrame([{"id": "e"}]))
+
+
+@pytest.mark.skipif(fcntl is None, reason="requires fcntl")
+def test_one_bot_syncs(tmp_path):
+    store = OrderStore(Exchange.KUCOIN, str(tmp_path))
+    other = OrderStore(Exchange.KUCOIN, str(tmp_path))
+
+    with store.syncing() as syncing:
+        assert syncing
+        with other.syncing() as other_syncing:
+            assert not other_syncing
+
+    with other.syncing() as other_syncing:
+        assert other_syncing
+
+
+def test_kucoin_order_history(tmp_path):
+    pd.DataFrame([order("old", created_at=1000)]).to_json(tmp_path / "kucoin_order_cache.json", orient="records")
+
+    with MockExchange(balances={"USDT": 1000.0}) as mock:
+        api = AuthAPI("0" * 24, "0" * 36, "passphrase", cache_path=str(tmp_path), use_cache=True)
+        assert not (tmp_path / "kucoin_order_cache.json").exists()
+
+        api.market_buy("BTC-USDT", 100)
+        orders = api.get_orders("BTC-USDT")
+        assert len(orders) == 1
+
+        requests = sum(count for (_, method, path), count in mock.requests.items() if path == "/api/v1/orders" and method == "GET")
+        api.get_orders("BTC-USDT")
+        api.get_orders("BTC-USDT")
+
+        # synced once, later calls only fetch the latest page
+        assert sum(count for (_, method, path), count in mock.requests.items() if path == "/api/v1/orders" and method == "GET") == requests + 2
+        assert len(api._order_store.get_orders("BTC-USDT")) == 1
+
+
+@pytest.mark.skipif(fcntl is None, reason="requires fcntl")
+def test_kucoin_order_cache_import(tmp_path, monkeypatch):
+    json_cache = tmp_path / "kucoin_order_cache.json"
+    pd.DataFrame([order("old", created_at=1000)]).to_json(json_cache, orient="records")
+
+    # a bot that starts while another one holds the store leaves the import to a later start
+    other = OrderStore(Exchange.KUCOIN, str(tmp_path))
+    with other.syncing():
+        AuthAPI("0" * 24, "0" * 36, "passphrase", cache_path=str(tmp_path), use_cache=True)
+    assert json_cache.exists() and len(other) == 0
+
+    # the cache removed by another bot while it is read is skipped
+    def validate(self, json_file):
+        os.remove(json_file)
+        return True
+
+    with monkeypatch.context() as patch:
+        patch.setattr(AuthAPI, "validateJSONFile", validate)
+        AuthAPI("0" * 24, "0" * 36, "passphrase", cache_path=str(tmp_path), use_cache=True)
+    assert len(other) == 0
+
+    pd.DataFrame([order("old", created_at=1000)]).to_json(json_cache, orient="records")
+    AuthAPI("0" * 24, "0" * 36, "passphrase", cache_path=str(tmp_path), use_cache=True)
+    assert not json_cache.exists() and len(other) == 1
+
+
+def test_kucoin_failed_sync_resumes(tmp_path, monkeypatch):
+    api = AuthAPI("0" * 24, "0" * 36, "passphrase", cache_path=str(tmp_path), use_cache=True)
+    store = api._order_store
+    requests = []
+
+    def auth_api(method, uri, use_pagination=False):
+        requests.append(int(uri.split("startAt=")[1].split("&")[0]))
+        if len(requests) == 1:
+            return api.handle_api_error("Kucoin API Error", "HTTPError")
+        if len(requests) == 3:
+            return pd.DataFrame([order("a", created_at=requests[-1])])
+        return pd.DataFrame()
+
+    monkeypatch.setattr(api, "auth_api", auth_api)
+
+    # the first week fails, the sync stops there without being recorded
+    assert not api.buildOrderHistoryCache()
+    assert len(requests) == 1
+    assert store.synced == 0 and store.cursor is None
+
+    # the next sync requests the failed week again
+    assert api.buildOrderHistoryCache()
+    assert requests[1] - requests[0] < 60 * 1000
+    assert len(store) == 1 and store.synced > 0
@@ -0,0 +1,136 @@
+import multiprocessing
+import sys
+import time
+
+import pytest
+import requests
+
+sys.path.append('.')
+from models.exchange.ExchangesEnum import Exchange
+from models.exchange.RateLimiter import SharedTokenBucket, TokenBucket, binance_weight, configure, get_limiter, retry_after
+from models.exchange.binance import PublicAPI
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+def get_bucket(capacity=10, rate=2):
+    clock = Clock()
+    return TokenBucket(capacity, rate, clock=clock, sleep=clock.sleep), clock
+
+
+def test_bucket_bursts_then_paces():
+    bucket, clock = get_bucket()
+
+    assert sum(bucket.acquire() for _ in range(10)) == 0
+    assert bucket.acquire() == pytest.approx(0.5)
+    assert bucket.acquire(2) == pytest.approx(1.0)
+    assert clock.now == pytest.approx(1.5)
+
+    clock.now += 60
+    assert bucket.tokens == 10
+
+
+def test_bucket_update_and_backoff():
+    bucket, clock = get_bucket()
+
+    bucket.update(used=8)
+    assert bucket.tokens == pytest.approx(2)
+    assert bucket.acquire(3) == pytest.approx(0.5)
+
+    bucket.backoff(5)
+    start = clock.now
+    bucket.acquire()
+    assert clock.now - start == pytest.approx(5.5)
+
+    with pytest.raises(ValueError):
+        TokenBucket(0, 1)
+
+
+def test_limiters():
+    assert get_limiter(Exchange.KUCOIN, "public") is get_limiter(Exchange.KUCOIN, "public")
+    assert get_limiter(Exchange.KUCOIN, "public") is not get_limiter(Exchange.KUCOIN, "private")
+
+    with pytest.raises(ValueError):
+        get_limiter(Exchange.KUCOIN, "orders")
+
+    assert binance_weight("/api/v3/klines", {"symbol": "BTCGBP", "limit": 50}) == 1
+    assert binance_weight("/api/v3/ticker/24hr") == 40
+    assert binance_weight("/api/v3/ticker/24hr", {"symbol": "BTCGBP"}) == 1
+    assert binance_weight("/api/v3/account", {"recvWindow": 5000}) == 10
+
+
+def test_binance_klines_weight():
+    # the weight of a kline request grows with the number of candles requested
+    assert binance_weight("/api/v3/klines", {"symbol": "BTCGBP", "limit": 99}) == 1
+    assert binance_weight("/api/v3/klines", {"symbol": "BTCGBP", "limit": 100}) == 2
+    assert binance_weight("/api/v3/klines", {"symbol": "BTCGBP", "interval": "1h", "limit": 300}) == 2
+    assert binance_weight("/api/v3/klines", {"symbol": "BTCGBP", "limit": "500"}) == 5
+    assert binance_weight("/api/v3/klines", {"symbol": "BTCGBP"}) == 5
+    assert binance_weight("/api/v3/klines", {"symbol": "BTCGBP", "limit": 1000}) == 5
+    assert binance_weight("/api/v3/klines", {"symbol": "BTCGBP", "limit": 1500}) == 10
+
+
+def test_binance_used_weight_header():
+    resp = requests.Response()
+    resp.status_code = 200
+    resp.headers["X-MBX-USED-WEIGHT-1M"] = "1100"
+
+    limiter = get_limiter(Exchange.BINANCE, "weight")
+    PublicAPI()._update_rate_limit(resp)
+    assert limiter.tokens <= 101
+
+    resp.status_code = 429
+    resp.headers["Retry-After"] = "2"
+    assert retry_after(resp) == 2.0
+    PublicAPI()._update_rate_limit(resp)
+    assert limiter.tokens < 0
+
+    # leave the shared limiter as it was
+    limiter._tokens = limiter.capacity
+
+
+def reserve(path, count, results):
+    bucket = SharedTokenBucket(path, 10, 10)
+    for _ in range(count):
+        bucket.acquire()
+    results.put(time.time())
+    bucket.close()
+
+
+def test_shared_bucket_across_processes(tmp_path):
+    path = str(tmp_path / "binance-weight.bucket")
+    start = time.time()
+    SharedTokenBucket(path, 10, 10).close()
+
+    results = multiprocessing.Queue()
+    processes = [multiprocessing.Process(target=reserve, args=(path, 10, results)) for _ in range(3)]
+    for process in processes:
+        process.start()
+    finished = max(results.get(timeout=30) for _ in processes)
+    for process in processes:
+        process.join()
+
+    # 30 tokens from a bucket of 10 refilling at 10 per second can not be served within 2 seconds
+    assert 1.95 <= finished - start < 4
+
+
+def test_configure_shared_quota(tmp_path):
+    configure(shared=True, path=str(tmp_path))
+    try:
+        limiter = get_limiter(Exchange.KUCOIN, "public")
+        assert isinstance(limiter, SharedTokenBucket)
+        assert limiter.path == str(tmp_path / "kucoin-public.bucket")
+        assert SharedTokenBucket(limiter.path, 30, 10).tokens == pytest.approx(30, abs=1)
+    finally:
+        configure(shared=False)
+
+    assert not isinstance(get_limiter(Exchange.KUCOIN, "public"), SharedTokenBucket)
@@ -0,0 +1,111 @@
+import socket
+import sys
+
+import pytest
+
+sys.path.append('.')
+from models.exchange.ClientPool import MOCK_EXCHANGE_ENV
+from models.exchange.ExchangesEnum import Exchange
+from models.exchange.Granularity import Granularity
+from models.exchange.Retry import CircuitBreaker, Deadline, RetryPolicy, candle_deadline, endpoint, get_breaker, reset_breakers
+from models.exchange.kucoin import PublicAPI
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+def test_circuit_breaker():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=60, clock=clock)
+
+    for _ in range(2):
+        breaker.record_failure()
+    breaker.record_success()
+    for _ in range(2):
+        breaker.record_failure()
+    assert breaker.allow() and breaker.state == CircuitBreaker.CLOSED
+
+    breaker.record_failure()
+    assert not breaker.allow() and breaker.state == CircuitBreaker.OPEN
+    assert breaker.retry_in == 60
+
+    # a single trial request after the timeout, a failed trial reopens the breaker
+    clock.now = 60
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.record_failure()
+    clock.now = 119
+    assert not breaker.allow()
+
+    clock.now = 120
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.allow() and breaker.state == CircuitBreaker.CLOSED
+
+    with pytest.raises(ValueError):
+        CircuitBreaker(failure_threshold=0)
+
+
+def test_retry_policy():
+    clock = FakeClock()
+    retry = RetryPolicy(Deadline(20, clock=clock), sleep=clock.sleep, rng=lambda: 1.0)
+
+    assert [retry.backoff(attempt) for attempt in range(1, 8)] == [1, 2, 4, 8, 16, 30, 30]
+    assert RetryPolicy(rng=lambda: 0.0).backoff(3) == 2
+
+    # waits until the next backoff would pass the deadline
+    assert [retry.wait(attempt) for attempt in range(1, 6)] == [True, True, True, True, False]
+    assert clock.now == 15
+
+    breaker = CircuitBreaker(failure_threshold=1, clock=clock)
+    retry = RetryPolicy(breaker=breaker, sleep=clock.sleep)
+    breaker.record_failure()
+    assert not retry.wait(1)
+    assert clock.now == 15
+
+
+def test_endpoint():
+    assert endpoint("api/v1/market/stats?symbol=BTC-USDT") == "api/v1/market/stats"
+    assert endpoint("/api/v1/orders/5c35c02703aa673ceec2a168") == "api/v1/orders/*"
+    assert endpoint("api/v3/brokerage/orders/historical/0e1a6f52-2c3a-4a1e-9a42-6b8c1d9a7f10") == "api/v3/brokerage/orders/historical/*"
+    assert endpoint("api/v3/brokerage/products/BTC-GBP/candles") == "api/v3/brokerage/products/BTC-GBP/candles"
+    assert get_breaker(Exchange.KUCOIN, "api/v1/orders/1") is get_breaker(Exchange.KUCOIN, "api/v1/orders/2")
+    assert get_breaker(Exchange.KUCOIN, "api/v1/orders") is not get_breaker(Exchange.COINBASE, "api/v1/orders")
+
+
+def test_candle_deadline():
+    assert candle_deadline(None).remaining() == float("inf")
+    assert candle_deadline(Granularity.ONE_HOUR, now=3600 * 10 + 600).remaining() == pytest.approx(2995, abs=1)
+    assert candle_deadline(300, now=299).remaining() == pytest.approx(10, abs=1)
+
+
+def test_auth_api_fails_fast(monkeypatch):
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    monkeypatch.setenv(MOCK_EXCHANGE_ENV, f"http://127.0.0.1:{port}")
+
+    waits = []
+    monkeypatch.setattr(RetryPolicy, "backoff", lambda self, attempt: waits.append(attempt) or 0.0)
+    reset_breakers()
+
+    api = PublicAPI()
+    assert api.auth_api("GET", "api/v1/market/stats?symbol=BTC-USDT") == {}
+    assert waits == [1, 2, 3, 4]
+    assert get_breaker(Exchange.KUCOIN, "api/v1/market/stats").state == CircuitBreaker.OPEN
+
+    # other markets of the endpoint fail fast, other endpoints are still tried
+    assert api.auth_api("GET", "api/v1/market/stats?symbol=ETH-USDT") == {}
+    assert waits == [1, 2, 3, 4]
+    assert api.auth_api("GET", "api/v1/market/orderbook/level1?symbol=BTC-USDT") == {}
+    assert waits == [1, 2, 3, 4] * 2
+
+    reset_breakers()
@@ -0,0 +1,157 @@
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.append('.')
+from models.exchange.Granularity import Granularity
+from models.exchange.StreamBuffer import CandleAggregator, CandleRing, TickerBoard
+from models.exchange.binance import PublicAPI, WebSocketClient
+from models.exchange.coinbase_pro import PublicAPI as CPublicAPI, WebSocketClient as CWebSocketClient
+from models.helper.CandleHelper import parse_candles
+
+
+def test_candle_ring():
+    ring = CandleRing(3)
+    assert len(ring) == 0 and ring.last_epoch is None
+
+    for epoch in [60, 120, 180]:
+        assert ring.update(epoch, 1.0, 2.0, 1.5, 1.5, 10.0)
+    assert ring.update(180, 1.0, 3.0, 1.5, 2.5, 20.0)
+    assert not ring.update(120, 1.0, 2.0, 1.5, 1.5, 10.0)
+    assert ring.to_array()["epoch"].tolist() == [60, 120, 180]
+    assert ring.to_array()["close"][-1] == 2.5
+
+    # the oldest candle is overwritten
+    ring.update(240, 1.0, 2.0, 1.5, 1.5, 10.0)
+    assert len(ring) == 3 and ring.to_array()["epoch"].tolist() == [120, 180, 240]
+
+    with pytest.raises(ValueError):
+        CandleRing(0)
+
+
+def test_candle_aggregator():
+    aggregator = CandleAggregator(60, capacity=3)
+    aggregator.seed(pd.DataFrame({"date": pd.to_datetime([0, 60], unit="s"), "low": 1.0, "high": 3.0, "open": 2.0, "close": 2.0, "volume": 5.0}))
+
+    # trades continue the open candle of the seed
+    assert aggregator.add_trade(61, 4.0, 1.0)
+    assert aggregator.add_trade(119, 0.5, 1.0)
+    assert not aggregator.add_trade(59, 2.0, 1.0)
+    assert len(aggregator) == 2
+    assert aggregator.to_array()[-1].item() == (60, 0.5, 4.0, 2.0, 0.5, 7.0)
+
+    assert aggregator.add_trade(130, 2.0, 1.0)
+    assert aggregator.add_trade(250, 3.0, 2.0)
+    candles = aggregator.to_array()
+    assert candles["epoch"].tolist() == [60, 120, 240]
+    assert candles[-1].item() == (240, 3.0, 3.0, 3.0, 3.0, 2.0)
+    assert aggregator.open_epoch == 240
+
+    with pytest.raises(ValueError):
+        CandleAggregator(0)
+
+
+def test_ticker_board():
+    board = TickerBoard(["BTCGBP", "ETHGBP"])
+    assert board.update("ETHGBP", pd.Timestamp("2023-01-01 10:05:30"), 1000.0)
+    assert not board.update("XRPGBP", pd.Timestamp("2023-01-01 10:05:30"), 1.0)
+
+    df = board.to_frame("5T")
+    assert df["market"].tolist() == ["ETHGBP"]
+    assert df["candle"].iloc[0] == pd.Timestamp("2023-01-01 10:05:00")
+    assert df.index.name == "ts"
+
+
+def kline(market, epoch, close, closed=True):
+    return {
+        "e": "kline",
+        "s": market,
+        "k": {"t": epoch * 1000, "i": "1m", "l": close, "h": close, "o": close, "c": close, "v": "2.0", "V": "1.0", "x": closed},
+    }
+
+
+def test_binance_websocket(monkeypatch):
+    rows = [[epoch * 1000, 1.0, 1.0, 1.0, 1.0, 1.0] for epoch in range(0, 300 * 60, 60)]
+    seed = parse_candles(rows, ["time", "open", "high", "low", "close", "volume"], "BTCGBP", "1m", unit="ms")
+    monkeypatch.setattr(PublicAPI, "get_historical_data", lambda self, market, granularity: seed.assign(market=market))
+
+    websocket = WebSocketClient(["BTCGBP", "ETHGBP"], Granularity.ONE_MINUTE)
+    websocket.on_open()
+    assert websocket.tickers is None and websocket.candles is None
+
+    websocket.on_message({"e": "24hrMiniTicker", "E": 1672567530000, "s": "BTCGBP", "c": "20000.0"})
+    websocket.on_message({"e": "24hrMiniTicker", "E": 1672567531000, "s": "BTCGBP", "c": "20001.0"})
+    assert websocket.tickers["price"].tolist() == [20001.0]
+
+    # open klines only seed the candles, the closed kline replaces the open candle of the seed
+    websocket.on_message(kline("BTCGBP", 299 * 60, "5.0", closed=False))
+    assert len(websocket.candles) == 300 and websocket.candles["close"].iloc[-1] == 1.0
+    websocket.on_message(kline("BTCGBP", 299 * 60, "5.0"))
+    candles = websocket.candles
+    assert len(candles) == 300 and candles["close"].iloc[-1] == 5.0
+    assert websocket.candles is candles
+
+    websocket.on_message(kline("BTCGBP", 300 * 60, "6.0"))
+    candles = websocket.candles
+    assert len(candles) == 300
+    assert candles["date"].iloc[-1] == pd.Timestamp(300 * 60, unit="s")
+    assert candles.index.name == "ts" and candles["close"].dtype == np.float64
+
+    websocket.on_message(kline("ETHGBP", 300 * 60, "7.0"))
+    candles = websocket.candles
+    assert len(candles) == 600 and candles["date"].is_monotonic_increasing
+    assert candles.loc[candles["market"] == "ETHGBP"]["close"].iloc[-1] == 7.0
+    assert websocket.message_count == 6
+
+    # a websocket for more markets takes over the candles instead of seeding them again
+    monkeypatch.setattr(PublicAPI, "get_historical_data", lambda self, market, granularity: seed.assign(market=market, close=9.0))
+    wider = WebSocketClient(["BTCGBP", "ETHGBP", "LTCGBP"], Granularity.ONE_MINUTE)
+    wider.adopt(websocket)
+    wider.on_open()
+    wider.on_message(kline("BTCGBP", 301 * 60, "8.0"))
+    wider.on_message(kline("LTCGBP", 300 * 60, "9.0"))
+    candles = wider.candles
+    assert candles.loc[candles["market"] == "BTCGBP"]["close"].tolist()[-3:] == [5.0, 6.0, 8.0]
+    assert candles.loc[candles["market"] == "LTCGBP"]["close"].iloc[0] == 9.0
+    assert len(websocket.candles) == 600
+
+    websocket.on_error()
+    assert websocket.tickers is None and websocket.candles is None
+
+
+def test_coinbase_pro_websocket(monkeypatch):
+    seed = pd.DataFrame({"date": pd.to_datetime([0, 60], unit="s"), "low": 1.0, "high": 1.0, "open": 1.0, "close": 1.0, "volume": 1.0})
+    monkeypatch.setattr(CPublicAPI, "get_historical_data", lambda self, market, granularity: seed)
+
+    websocket = CWebSocketClient(["BTC-GBP"], Granularity.ONE_MINUTE)
+    closed = []
+    websocket.on_candle_closed = lambda market, candle: closed.append((market, candle))
+    websocket.on_open()
+    assert websocket.tickers is None and websocket.candles is None
+
+    for time, price in [("00:01:10", 2.0), ("00:01:20", 0.5), ("00:02:05", 3.0)]:
+        websocket.on_message({"type": "match", "product_id": "BTC-GBP", "time": f"1970-01-01T{time}.000000Z", "price": str(price), "size": "1.5"})
+
+    candles = websocket.candles
+    assert candles["date"].tolist() == list(pd.to_datetime([0, 60, 120], unit="s"))
+    assert candles.iloc[1][["low", "high", "open", "close", "volume"]].tolist() == [0.5, 2.0, 1.0, 0.5, 4.0]
+    assert candles["granularity"].iloc[-1] == 60 and candles.index.name == "ts"
+    assert websocket.candles is candles
+    assert closed == [("BTC-GBP", (60, 0.5, 2.0, 1.0, 0.5, 4.0))]
+
+    tickers = websocket.tickers
+    assert tickers["price"].tolist() == [3.0]
+    assert tickers["candle"].iloc[0] == pd.Timestamp(120, unit="s")
+    assert websocket.message_count == 3
+
+    # the open candle is continued by the websocket that takes over
+    wider = CWebSocketClient(["BTC-GBP", "ETH-GBP"], Granularity.ONE_MINUTE)
+    wider.adopt(websocket)
+    wider.on_open()
+    wider.on_message({"type": "match", "product_id": "BTC-GBP", "time": "1970-01-01T00:02:10.000000Z", "price": "4.0", "size": "1.0"})
+    assert wider.candles.iloc[-1][["low", "high", "open", "close", "volume"]].tolist() == [3.0, 4.0, 3.0, 4.0, 2.5]
+
+    websocket.on_error("closed")
+    assert websocket.candles is None
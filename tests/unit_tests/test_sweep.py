@@ -0,0 +1,83 @@
+import sys
+
+import pytest
+
+sys.path.append('.')
+from models.Backtest import Backtest
+from models.Sweep import ParameterSweep
+from tests.unit_tests.test_backtest import get_app, get_df
+
+SPACE = {"trailing_stop_loss": [-1.0, -2.0], "trailing_stop_loss_trigger": [1.0, 2.0], "trailingbuypcnt": [0.0, 0.5]}
+
+
+def get_sweep_app():
+    app = get_app()
+
+    def _simulation_summary():
+        data = {"buy_count": app.state.buy_count, "sell_count": app.state.sell_count, "margin": 0.0}
+        if app.state.sell_count > 0:
+            data["all_trades"] = {"margin": app.state.margintracker, "profit_loss": app.state.profitlosstracker}
+        return {"data": data}
+
+    app._simulation_summary = _simulation_summary
+    return app
+
+
+def test_grid_combinations():
+    sweep = ParameterSweep(get_sweep_app(), get_df(), 300, SPACE)
+    combinations = sweep.combinations()
+
+    assert len(combinations) == 8
+    assert combinations[0] == {"trailing_stop_loss": -1.0, "trailing_stop_loss_trigger": 1.0, "trailingbuypcnt": 0.0}
+
+
+def test_random_combinations():
+    space = {"trailing_stop_loss": {"min": -3.0, "max": -1.0}, "trailingbuypcnt": [0.0, 0.5]}
+    combinations = ParameterSweep(get_sweep_app(), get_df(), 300, space, samples=5, seed=7).combinations()
+
+    assert len(combinations) == 5
+    assert all(-3.0 <= combination["trailing_stop_loss"] <= -1.0 for combination in combinations)
+    assert combinations == ParameterSweep(get_sweep_app(), get_df(), 300, space, samples=5, seed=7).combinations()
+
+
+def test_parallel_results_match_sequential():
+    app = get_sweep_app()
+    sweep = ParameterSweep(app, get_df(), 300, SPACE)
+
+    sequential = sweep.run(workers=1)
+    parallel = sweep.run(workers=4)
+
+    assert list(sequential.columns) == list(SPACE.keys()) + ["buy_count", "sell_count", "margin", "profit_loss", "fees", "open_trade_margin"]
+    assert sequential["margin"].is_monotonic_decreasing
+    assert sequential.equals(parallel)
+
+    # the app is left as it was
+    assert app.trailing_stop_loss == 0.0
+    assert app.state.buy_count == 0
+    assert len(app.trade_tracker) == 0
+
+
+def test_results_match_backtest():
+    results = ParameterSweep(get_sweep_app(), get_df(), 300, SPACE).run(workers=1)
+
+    for _, row in results.iterrows():
+        combination = {option: row[option] for option in SPACE}
+        app = get_app(**combination)
+        Backtest(app, get_df(), 300).run()
+
+        assert (row["buy_count"], row["sell_count"]) == (app.state.buy_count, app.state.sell_count)
+        assert row["margin"] == pytest.approx(app.state.margintracker if app.state.sell_count > 0 else 0.0)
+
+
+def test_invalid_space():
+    with pytest.raises(TypeError):
+        ParameterSweep(get_sweep_app(), get_df(), 300, {})
+
+    with pytest.raises(ValueError):
+        ParameterSweep(get_sweep_app(), get_df(), 300, {"market": ["BTC-GBP"]})
+
+    with pytest.raises(ValueError):
+        ParameterSweep(get_sweep_app(), get_df(), 300, {"trailing_stop_loss": {"min": -3.0, "max": -1.0}})
+
+    with pytest.raises(ValueError):
+        ParameterSweep(get_sweep_app(), get_df(), 300, {"dynamic_tsl": [True]}).run(workers=1)
@@ -0,0 +1,152 @@
+import socket
+import sys
+import time
+
+import pandas as pd
+import pytest
+
+sys.path.append('.')
+from models.exchange.ExchangesEnum import Exchange
+from models.exchange.Granularity import Granularity
+from models.exchange.WebSocketHub import HubClient, Subscriber, WebSocketHub
+
+pytestmark = pytest.mark.skipif(not hasattr(socket, "AF_UNIX"), reason="requires Unix sockets")
+
+
+class FakeFeed:
+    def __init__(self, markets, granularity):
+        self.markets = markets
+        self.granularity = granularity
+        self.message_count = 0
+        self.time_elapsed = 0
+        self.started = False
+        self.closed = False
+        self.tickers = None
+        self.candles = None
+        self.adopted = None
+
+    def adopt(self, client):
+        self.adopted = client
+        self.candles = client.candles
+
+    def start(self):
+        self.started = True
+
+    def close(self):
+        self.closed = True
+
+    def push(self, epoch, close, price):
+        dates = pd.to_datetime([epoch] * len(self.markets), unit="s")
+        candles = pd.DataFrame(
+            {"date": dates, "market": self.markets, "granularity": "1m", "low": close, "high": close, "open": close, "close": close, "volume": 1.0},
+            index=dates,
+        )
+        self.candles = candles if self.candles is None else pd.concat([self.candles[self.candles["date"] != dates[0]], candles])
+        self.tickers = pd.DataFrame({"date": dates, "market": self.markets, "price": price})
+        self.message_count += 1
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def test_websocket_hub(tmp_path):
+    feeds = []
+
+    def factory(exchange, markets, granularity):
+        feed = FakeFeed(markets, granularity)
+        feeds.append(feed)
+        return feed
+
+    hub = WebSocketHub(str(tmp_path / "hub.sock"), client_factory=factory, interval=0.01, linger=1)
+    hub.start()
+    bots = []
+    try:
+        bots.append(HubClient(Exchange.BINANCE, ["BTCGBP"], Granularity.ONE_MINUTE, path=hub.path))
+        closed = []
+        bots[0].on_candle_closed = lambda market, candle: closed.append((market, candle[0], candle[4]))
+        bots[0].start()
+        wait_for(lambda: len(hub.feeds) == 1)
+        feed = hub.feeds[(Exchange.BINANCE, Granularity.ONE_MINUTE)]
+        assert feed.markets == ["BTCGBP"] and feed.started
+
+        feed.push(0, 1.0, 1.5)
+        wait_for(lambda: bots[0].candles is not None and bots[0].tickers is not None)
+        assert bots[0].tickers["price"].tolist() == [1.5]
+
+        # a second bot widens the one subscription of the exchange and granularity
+        bots.append(HubClient(Exchange.BINANCE, ["ETHGBP"], Granularity.ONE_MINUTE, path=hub.path))
+        bots[1].start()
+        wait_for(lambda: sorted(hub.feeds[(Exchange.BINANCE, Granularity.ONE_MINUTE)].markets) == ["BTCGBP", "ETHGBP"])
+        assert feed.closed
+
+        # the new websocket takes over the candles of the previous one
+        previous, feed = feed, hub.feeds[(Exchange.BINANCE, Granularity.ONE_MINUTE)]
+        assert feed.adopted is previous and feed.candles is not None
+        feed.push(0, 1.0, 1.5)
+        feed.push(0, 2.0, 2.5)
+        feed.push(60, 3.0, 3.5)
+        wait_for(lambda: bots[1].candles is not None and len(bots[1].candles) == 2 and bots[1].tickers["price"].iloc[0] == 3.5)
+
+        # the updated candle replaces the one sent before
+        candles = bots[1].candles
+        assert candles["market"].unique().tolist() == ["ETHGBP"]
+        assert candles["close"].tolist() == [2.0, 3.0]
+        assert candles["granularity"].iloc[0] == "1m" and candles.index.name == "ts"
+        wait_for(lambda: len(bots[0].candles) == 2)
+        assert bots[0].candles["close"].tolist() == [2.0, 3.0]
+        assert closed == [("BTCGBP", 0, 2.0)]
+
+        # a bot that restarts finds its market still subscribed
+        bots.pop().close()
+        bots.append(HubClient(Exchange.BINANCE, ["ETHGBP"], Granularity.ONE_MINUTE, path=hub.path))
+        bots[1].start()
+        wait_for(lambda: bots[1].candles is not None)
+        assert hub.feeds[(Exchange.BINANCE, Granularity.ONE_MINUTE)] is feed
+
+        # the subscription narrows again once the market lingered unused
+        bots.pop().close()
+        wait_for(lambda: hub.feeds[(Exchange.BINANCE, Granularity.ONE_MINUTE)].markets == ["BTCGBP"])
+    finally:
+        for bot in bots:
+            bot.close()
+        hub.close()
+
+    assert all(feed.closed for feed in feeds if feed.started)
+
+
+def test_hub_client_rejected(tmp_path):
+    hub = WebSocketHub(str(tmp_path / "hub.sock"), interval=0.01)
+    hub.start()
+    try:
+        bot = HubClient(Exchange.BINANCE, ["BTC-GBP"], Granularity.ONE_MINUTE, path=hub.path)
+        bot.start()
+        wait_for(lambda: bot.stop)
+        bot.close()
+        assert hub.feeds == {}
+    finally:
+        hub.close()
+
+    with pytest.raises(TypeError):
+        HubClient("binance", ["BTCGBP"])
+
+
+def test_slow_subscriber(monkeypatch):
+    monkeypatch.setattr("models.exchange.WebSocketHub.MAX_PENDING", 1 << 16)
+    hub_end, bot_end = socket.socketpair(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        subscriber = Subscriber(hub_end, Exchange.BINANCE, ["BTCGBP"], Granularity.ONE_MINUTE)
+        message = {"type": "ticker", "market": "BTCGBP", "date": "2023-01-01T00:00:00", "price": 1.0}
+
+        # a bot that does not read never blocks the hub, it is given up on once too far behind
+        started = time.monotonic()
+        with pytest.raises(OSError):
+            for _ in range(100000):
+                subscriber.send(message)
+        assert time.monotonic() - started < 5
+    finally:
+        hub_end.close()
+        bot_end.close()
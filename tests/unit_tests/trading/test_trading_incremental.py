@@ -0,0 +1,115 @@
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.append(".")
+# pylint: disable=import-error
+from models.Trading import TechnicalAnalysis
+from models.TradingIncremental import IncrementalTechnicalAnalysis
+
+# add_all() fills the ADX warm up rows with the mean of the whole frame
+ADX_COLUMNS = ["-di14", "+di14", "adx14", "adx14_trend", "adx14_strength"]
+ADX_WARM_UP = 27
+
+
+def get_df(rows: int = 500, seed: int = 1) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    close = np.round(100 * np.exp(np.cumsum(rng.normal(0, 0.01, rows))), 2)
+    open = np.concatenate([[close[0]], close[:-1]])
+    high = np.maximum(open, close) * (1 + rng.random(rows) * 0.005)
+    low = np.minimum(open, close) * (1 - rng.random(rows) * 0.005)
+    volume = np.round(rng.random(rows) * 1000, 3)
+    ts = pd.date_range("2022-01-01", periods=rows, freq="H")
+    df = pd.DataFrame(
+        {"date": ts, "market": "BTC-GBP", "granularity": 3600, "low": low, "high": high, "open": open, "close": close, "volume": volume},
+        index=ts,
+    )
+    df.index.name = "ts"
+    return df
+
+
+def add_all(df: pd.DataFrame, total_periods: int) -> pd.DataFrame:
+    technical_analysis = TechnicalAnalysis(df.copy(), total_periods)
+    technical_analysis.add_all()
+    return technical_analysis.get_df()
+
+
+def assert_row_equal(expected: pd.Series, actual: dict, rtol: float = 1e-12) -> None:
+    for column, value in actual.items():
+        if isinstance(value, (bool, str)):
+            assert expected[column] == value, column
+        else:
+            assert float(expected[column]) == pytest.approx(value, rel=rtol, abs=1e-10, nan_ok=True), column
+
+
+@pytest.mark.parametrize("total_periods", [300, 100])
+def test_seed_matches_add_all(total_periods):
+    df = get_df()
+    expected = add_all(df, total_periods)
+    actual = IncrementalTechnicalAnalysis(total_periods).seed(df)
+
+    assert sorted(actual.columns) == sorted(set(expected.columns) - set(df.columns))
+
+    for column in actual.columns:
+        start = ADX_WARM_UP if column in ADX_COLUMNS else 0
+        if actual[column].dtype == object or actual[column].dtype == bool:
+            assert list(actual[column].iloc[start:]) == list(expected[column].iloc[start:]), column
+        else:
+            assert np.allclose(actual[column].iloc[start:], expected[column].iloc[start:], rtol=1e-12, atol=1e-10, equal_nan=True), column
+
+
+def test_update_pending_and_new_candles_match_add_all():
+    df = get_df(400)
+    ohlcv = ["open", "high", "low", "close", "volume"]
+    incremental = IncrementalTechnicalAnalysis(300)
+    incremental.seed(df.iloc[:300])
+
+    for i in range(300, 310):
+        ticks = df.iloc[: i + 1].copy()
+        ticks.iloc[-1, ticks.columns.get_loc("close")] = ticks["open"].iloc[-1]
+        incremental.update(tuple(ticks[ohlcv].iloc[-1]), True)
+        assert_row_equal(add_all(ticks, 300).iloc[-1], incremental.update(tuple(ticks[ohlcv].iloc[-1])))
+
+        assert_row_equal(add_all(df.iloc[: i + 1], 300).iloc[-1], incremental.update(tuple(df[ohlcv].iloc[i])))
+
+
+def test_max_rows_matches_add_all_over_the_frame():
+    df = get_df(700, 3)
+    ohlcv = ["open", "high", "low", "close", "volume"]
+    incremental = IncrementalTechnicalAnalysis(300, 300)
+    incremental.seed(df.iloc[:300])
+
+    for i in range(300, 700):
+        actual = incremental.update(tuple(df[ohlcv].iloc[i]), True)
+        if i % 50 == 0:
+            # emas started before the frame converge to the ones add_all() seeds at its start
+            assert_row_equal(add_all(df.iloc[i - 299 : i + 1], 300).iloc[-1], actual, rtol=1e-7)
+
+
+def test_update_df():
+    df = add_all(get_df(301), 300)
+    incremental = IncrementalTechnicalAnalysis(300)
+    columns = incremental.seed(df.iloc[:300]).columns
+
+    df.iloc[-1, df.columns.get_loc("rsi14")] = 0
+    incremental.update_df(df)
+    assert_row_equal(add_all(get_df(301), 300).iloc[-1], df[columns].iloc[-1].to_dict())
+
+    with pytest.raises(ValueError):
+        incremental.update_df(df.iloc[:100])
+
+
+def test_invalid_arguments():
+    with pytest.raises(TypeError):
+        IncrementalTechnicalAnalysis("300")
+
+    with pytest.raises(ValueError):
+        IncrementalTechnicalAnalysis(20)
+
+    with pytest.raises(ValueError):
+        IncrementalTechnicalAnalysis(300).update((1, 1, 1, 1, 1))
+
+    with pytest.raises(TypeError):
+        IncrementalTechnicalAnalysis(300).seed("invalid")
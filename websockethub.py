@@ -0,0 +1,29 @@
+#!/usr/bin/env python3
+# encoding: utf-8
+
+import argparse
+
+from models.exchange.WebSocketHub import WebSocketHub, hub_socket_path
+
+parser = argparse.ArgumentParser(description="PyCryptoBot Websocket Hub")
+parser.add_argument(
+    "--socket",
+    type=str,
+    help=f"unix socket the bots attach to (default: {hub_socket_path()})",
+)
+parser.add_argument(
+    "--interval",
+    type=float,
+    default=0.25,
+    help="seconds between updates to the bots (default: 0.25)",
+)
+
+args = parser.parse_args()
+
+if __name__ == "__main__":
+    hub = WebSocketHub(args.socket, interval=args.interval)
+    print(f"Websocket hub listening on {hub.path}, start the bots with websockethub enabled")
+    try:
+        hub.serve_forever()
+    except KeyboardInterrupt:
+        pass